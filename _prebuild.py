@@ -0,0 +1,100 @@
+"""Build the static payloads handlers serve without importing the engine.
+
+``/api/config`` and the vanilla odds behind ``/api/exact`` never change
+between deploys, so they are rendered once here into ``prebuilt/`` and
+shipped with the functions. Run ``python _prebuild.py`` after changing
+config specs or vanilla combat; ``--check`` exits non-zero when the
+committed files are stale (the test suite runs it).
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import Any, Callable
+
+PREBUILT_DIR = Path(__file__).resolve().with_name("prebuilt")
+# Vanilla win probabilities are tabulated for stacks up to this size.
+VANILLA_TABLE_MAX = 100
+
+
+def config_payload() -> dict[str, Any]:
+    from _shared import (
+        attacker_slider_specs,
+        defender_slider_specs,
+        default_combat_tuning,
+        planet_upgrade_mode_specs,
+        structures_config,
+    )
+    from engine.heroes import HERO_TIERS
+
+    return {
+        "hero_tiers": HERO_TIERS,
+        "structures": structures_config(),
+        "attacker_sliders": attacker_slider_specs(),
+        "defender_sliders": defender_slider_specs(),
+        "planet_upgrade_modes": planet_upgrade_mode_specs(),
+        "default_planet_upgrade_mode": default_combat_tuning().planet_upgrade_mode,
+    }
+
+
+def vanilla_tables() -> dict[str, Any]:
+    from engine.kernel import win_probability_surface
+    from engine.probabilities import SINGLE_ROLL_PROBABILITIES, expected_losses
+
+    surface = win_probability_surface(VANILLA_TABLE_MAX, VANILLA_TABLE_MAX)
+    return {
+        "max_units": VANILLA_TABLE_MAX,
+        "single_roll_probabilities": {
+            f"{ad}v{dd}": {
+                f"atk_loses_{al}_def_loses_{dl}": round(float(p), 4)
+                for (al, dl), p in outcomes.items()
+            }
+            for (ad, dd), outcomes in SINGLE_ROLL_PROBABILITIES.items()
+        },
+        "expected_losses": {f"{ad}v{dd}": list(expected_losses(ad, dd)) for ad, dd in SINGLE_ROLL_PROBABILITIES},
+        # win_probability[a][d] for 0 <= a, d <= max_units
+        "win_probability": [
+            [round(surface[a][d], 6) for d in range(VANILLA_TABLE_MAX + 1)]
+            for a in range(VANILLA_TABLE_MAX + 1)
+        ],
+    }
+
+
+PAYLOADS: dict[str, Callable[[], dict[str, Any]]] = {
+    "config.json": config_payload,
+    "vanilla.json": vanilla_tables,
+}
+
+
+def render(payload: dict[str, Any]) -> bytes:
+    # Deterministic bytes, so the ETag only changes with the content.
+    return json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+
+
+def build(check: bool = False) -> list[str]:
+    """Write every payload (or, with ``check``, only compare); return the stale names."""
+    stale = []
+    for name, builder in PAYLOADS.items():
+        path = PREBUILT_DIR / name
+        body = render(builder())
+        if path.exists() and path.read_bytes() == body:
+            continue
+        stale.append(name)
+        if not check:
+            PREBUILT_DIR.mkdir(exist_ok=True)
+            path.write_bytes(body)
+    return stale
+
+
+def main(argv: list[str]) -> int:
+    check = "--check" in argv
+    stale = build(check=check)
+    for name in stale:
+        print(f"{'stale' if check else 'wrote'} prebuilt/{name}")
+    return 1 if check and stale else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
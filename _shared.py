@@ -1,34 +1,148 @@
+import functools
+import hashlib
 import json
-from dataclasses import asdict
-from typing import Any
+import math
+import os
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+from urllib.parse import parse_qs, urlsplit
 
-from engine.heroes import HERO_TIERS
-from engine.models import Army, Hero
-from engine.structures import STRUCTURES
-from engine.tuning import CombatTuning, PLANET_UPGRADE_MODES
+from engine import instrument
 
-DEFAULT_COMBAT_TUNING = CombatTuning()
-ABILITY_MIN = -6
-ABILITY_MAX = 6
-VALUE_PER_UPGRADE_MIN = 0
-VALUE_PER_UPGRADE_MAX = 4
+# Engine modules other than the dependency-free instrument are imported
+# inside the functions that need them, so a handler only pays for what it
+# uses on a cold start (see benchmarks/importtime.py).
+if TYPE_CHECKING:
+    from engine.models import Army
+    from engine.planner import AdmissionController, Rejected
+    from engine.tuning import CombatTuning
+
+PREBUILT_DIR = Path(__file__).resolve().with_name("prebuilt")
+PREBUILT_CACHE_CONTROL = "public, max-age=300, s-maxage=86400"
+# Wall-clock and CPU seconds one request may spend solving (see engine.planner).
+REQUEST_BUDGET_SECONDS = 2.0
+# Estimated seconds of expensive work admitted at once per process.
+ADMISSION_CAPACITY_SECONDS = 2.0 * REQUEST_BUDGET_SECONDS
 
 
 # --- HTTP helpers ---
 
-def send_json(h, data: Any, status: int = 200) -> None:
-    body = json.dumps(data).encode()
+def diagnostics_enabled() -> bool:
+    """Whether /api/metrics and ``?profile=1`` are served.
+
+    Both expose process internals and profiling costs CPU, so they are
+    off unless the operator sets ``GALACTIC_DIAGNOSTICS=1``.
+    """
+    return os.environ.get("GALACTIC_DIAGNOSTICS", "0") == "1"
+
+
+def instrumented(endpoint: str) -> Callable:
+    """Wrap a do_GET/do_POST in an instrumentation scope for ``endpoint``.
+
+    With diagnostics enabled, ``?profile=1`` on the request adds a
+    cProfile report to the JSON response under "profile". A no-op when
+    instrumentation is disabled.
+    """
+    def decorator(method: Callable) -> Callable:
+        if not instrument.ENABLED:
+            return method
+
+        @functools.wraps(method)
+        def wrapper(h) -> None:
+            query = parse_qs(urlsplit(h.path).query)
+            profile = diagnostics_enabled() and query.get("profile", ["0"])[0] not in ("", "0", "false")
+            with instrument.request(endpoint, profile):
+                method(h)
+        return wrapper
+    return decorator
+
+
+def send_json(h, data: Any, status: int = 200, headers: dict[str, str] | None = None) -> None:
+    recorder = instrument.current()
+    if recorder is not None:
+        report = recorder.finish_profile()
+        if report is not None and isinstance(data, dict):
+            data = dict(data, profile=report)
+    with instrument.timer("serialize"):
+        body = json.dumps(data).encode()
     h.send_response(status)
     h.send_header("Content-Type", "application/json")
     h.send_header("Content-Length", str(len(body)))
+    for name, value in (headers or {}).items():
+        h.send_header(name, value)
+    if recorder is not None:
+        h.send_header("Server-Timing", recorder.server_timing())
     h.end_headers()
     h.wfile.write(body)
 
 
+@functools.lru_cache(maxsize=None)
+def admission() -> "AdmissionController":
+    """The process-wide admission controller for expensive endpoints."""
+    from engine.planner import AdmissionController
+
+    return AdmissionController(ADMISSION_CAPACITY_SECONDS)
+
+
+def client_key(h) -> str:
+    """Who a request counts against for admission: the first forwarded address, else the peer."""
+    forwarded = h.headers.get("X-Forwarded-For", "").split(",")[0].strip()
+    return forwarded or h.client_address[0]
+
+
+def send_rejected(h, exc: "Rejected") -> None:
+    """Answer a request that admission control turned away."""
+    send_json(h, {"error": str(exc)}, 429, {"Retry-After": str(max(1, int(exc.retry_after)))})
+
+
+@functools.lru_cache(maxsize=None)
+def load_prebuilt(name: str) -> tuple[bytes, str]:
+    """Return a prebuilt payload's bytes and strong ETag (see _prebuild.py)."""
+    body = (PREBUILT_DIR / name).read_bytes()
+    return body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+@functools.lru_cache(maxsize=None)
+def load_prebuilt_json(name: str) -> Any:
+    return json.loads(load_prebuilt(name)[0])
+
+
+def send_prebuilt(h, name: str, cache_control: str = PREBUILT_CACHE_CONTROL) -> None:
+    """Serve a prebuilt JSON payload as-is, answering 304 when the ETag matches."""
+    body, etag = load_prebuilt(name)
+    recorder = instrument.current()
+    matches = etag in [tag.strip() for tag in h.headers.get("If-None-Match", "").split(",")]
+    h.send_response(304 if matches else 200)
+    h.send_header("ETag", etag)
+    h.send_header("Cache-Control", cache_control)
+    if recorder is not None:
+        h.send_header("Server-Timing", recorder.server_timing())
+    if matches:
+        h.end_headers()
+        return
+    h.send_header("Content-Type", "application/json")
+    h.send_header("Content-Length", str(len(body)))
+    h.end_headers()
+    h.wfile.write(body)
+
+
+def pack_float32(rows) -> str:
+    """Pack a 2-D grid row-major as little-endian float32, base64-encoded."""
+    import base64
+    from array import array
+
+    packed = array("f", (value for row in rows for value in row))
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+
 def read_json_body(h) -> dict:
-    length = int(h.headers.get("Content-Length", 0))
-    raw = h.rfile.read(length)
-    return json.loads(raw) if raw else {}
+    with instrument.timer("parse"):
+        length = int(h.headers.get("Content-Length", 0))
+        raw = h.rfile.read(length)
+        return json.loads(raw) if raw else {}
 
 
 # --- Parsing helpers ---
@@ -40,46 +154,78 @@ def _safe_int(value: Any, fallback: int) -> int:
         return fallback
 
 
+def _safe_float(value: Any, fallback: float) -> float:
+    try:
+        result = float(value)
+    except (TypeError, ValueError):
+        return fallback
+    return result if math.isfinite(result) else fallback
+
+
 def _clamp(value: int, minimum: int, maximum: int) -> int:
     return max(minimum, min(maximum, value))
 
 
-def _parse_army(data: dict) -> Army:
-    hero = None
-    hero_key = data.get("hero")
-    if hero_key and hero_key in HERO_TIERS:
-        hero = Hero(name=hero_key, die_size=HERO_TIERS[hero_key])
-    structs = [STRUCTURES[s] for s in data.get("structures", []) if s in STRUCTURES]
-    units = max(1, _safe_int(data.get("units", 1), 1))
-    return Army(units=units, hero=hero, structures=structs)
-
-
-def _parse_tuning(data: dict) -> CombatTuning:
-    raw = data.get("balance", {})
-    if not isinstance(raw, dict):
-        raw = {}
-    d = DEFAULT_COMBAT_TUNING
-    return CombatTuning(
-        attacker_ability=_clamp(_safe_int(raw.get("attacker_ability", d.attacker_ability), 0), ABILITY_MIN, ABILITY_MAX),
-        defender_ability=_clamp(_safe_int(raw.get("defender_ability", d.defender_ability), 0), ABILITY_MIN, ABILITY_MAX),
-        hero_upgrade_level=_clamp(_safe_int(raw.get("hero_upgrade_level", d.hero_upgrade_level), 0), 0, d.max_hero_upgrade_level),
-        planet_upgrade_level=_clamp(_safe_int(raw.get("planet_upgrade_level", d.planet_upgrade_level), 0), 0, d.max_planet_upgrade_level),
-        hero_value_per_upgrade=_clamp(_safe_int(raw.get("hero_value_per_upgrade", d.hero_value_per_upgrade), d.hero_value_per_upgrade), VALUE_PER_UPGRADE_MIN, VALUE_PER_UPGRADE_MAX),
-        planet_value_per_upgrade=_clamp(_safe_int(raw.get("planet_value_per_upgrade", d.planet_value_per_upgrade), d.planet_value_per_upgrade), VALUE_PER_UPGRADE_MIN, VALUE_PER_UPGRADE_MAX),
-        max_hero_upgrade_level=d.max_hero_upgrade_level,
-        max_planet_upgrade_level=d.max_planet_upgrade_level,
-        planet_upgrade_mode=(
-            raw.get("planet_upgrade_mode")
-            if raw.get("planet_upgrade_mode") in PLANET_UPGRADE_MODES
-            else d.planet_upgrade_mode
-        ),
+@functools.lru_cache(maxsize=None)
+def default_combat_tuning() -> "CombatTuning":
+    from engine.tuning import CombatTuning
+
+    return CombatTuning()
+
+
+def __getattr__(name: str) -> Any:
+    # DEFAULT_COMBAT_TUNING is built on first use to keep the import lazy.
+    if name == "DEFAULT_COMBAT_TUNING":
+        return default_combat_tuning()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _parse_army(data: dict) -> "Army":
+    from engine.heroes import HEROES
+    from engine.models import Army
+    from engine.structures import STRUCTURES
+
+    with instrument.timer("parse"):
+        hero_key = data.get("hero")
+        hero = HEROES.get(hero_key) if isinstance(hero_key, str) else None
+        structs = [STRUCTURES[s] for s in data.get("structures", []) if s in STRUCTURES]
+        units = max(1, _safe_int(data.get("units", 1), 1))
+        return Army(units=units, hero=hero, structures=structs)
+
+
+def _parse_tuning(data: dict) -> "CombatTuning":
+    from engine.tuning import (
+        ABILITY_MAX, ABILITY_MIN, PLANET_UPGRADE_MODES, VALUE_PER_UPGRADE_MAX, VALUE_PER_UPGRADE_MIN, CombatTuning,
     )
 
+    with instrument.timer("parse"):
+        raw = data.get("balance", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        d = default_combat_tuning()
+        return CombatTuning(
+            attacker_ability=_clamp(_safe_int(raw.get("attacker_ability", d.attacker_ability), 0), ABILITY_MIN, ABILITY_MAX),
+            defender_ability=_clamp(_safe_int(raw.get("defender_ability", d.defender_ability), 0), ABILITY_MIN, ABILITY_MAX),
+            hero_upgrade_level=_clamp(_safe_int(raw.get("hero_upgrade_level", d.hero_upgrade_level), 0), 0, d.max_hero_upgrade_level),
+            planet_upgrade_level=_clamp(_safe_int(raw.get("planet_upgrade_level", d.planet_upgrade_level), 0), 0, d.max_planet_upgrade_level),
+            hero_value_per_upgrade=_clamp(_safe_int(raw.get("hero_value_per_upgrade", d.hero_value_per_upgrade), d.hero_value_per_upgrade), VALUE_PER_UPGRADE_MIN, VALUE_PER_UPGRADE_MAX),
+            planet_value_per_upgrade=_clamp(_safe_int(raw.get("planet_value_per_upgrade", d.planet_value_per_upgrade), d.planet_value_per_upgrade), VALUE_PER_UPGRADE_MIN, VALUE_PER_UPGRADE_MAX),
+            max_hero_upgrade_level=d.max_hero_upgrade_level,
+            max_planet_upgrade_level=d.max_planet_upgrade_level,
+            planet_upgrade_mode=(
+                raw.get("planet_upgrade_mode")
+                if raw.get("planet_upgrade_mode") in PLANET_UPGRADE_MODES
+                else d.planet_upgrade_mode
+            ),
+        )
+
 
 # --- Config spec builders ---
 
 def attacker_slider_specs() -> list[dict]:
-    d = DEFAULT_COMBAT_TUNING
+    from engine.tuning import ABILITY_MAX, ABILITY_MIN, VALUE_PER_UPGRADE_MAX, VALUE_PER_UPGRADE_MIN
+
+    d = default_combat_tuning()
     return [
         {"id": "atk-ability", "key": "attacker_ability", "label": "Ability value", "help": "Flat modifier added to each attacker comparison.", "min": ABILITY_MIN, "max": ABILITY_MAX, "step": 1, "value": d.attacker_ability},
         {"id": "hero-upgrade-level", "key": "hero_upgrade_level", "label": "Hero upgrade level", "help": "Current hero tech tier. Zero keeps baseline Risk odds.", "min": 0, "max": d.max_hero_upgrade_level, "step": 1, "value": d.hero_upgrade_level},
@@ -88,7 +234,9 @@ def attacker_slider_specs() -> list[dict]:
 
 
 def defender_slider_specs() -> list[dict]:
-    d = DEFAULT_COMBAT_TUNING
+    from engine.tuning import ABILITY_MAX, ABILITY_MIN, VALUE_PER_UPGRADE_MAX, VALUE_PER_UPGRADE_MIN
+
+    d = default_combat_tuning()
     return [
         {"id": "def-ability", "key": "defender_ability", "label": "Ability value", "help": "Flat modifier added to each defender comparison.", "min": ABILITY_MIN, "max": ABILITY_MAX, "step": 1, "value": d.defender_ability},
         {"id": "planet-upgrade-level", "key": "planet_upgrade_level", "label": "Planet upgrade level", "help": "Current planet defense tier. Zero keeps baseline Risk odds.", "min": 0, "max": d.max_planet_upgrade_level, "step": 1, "value": d.planet_upgrade_level},
@@ -105,4 +253,6 @@ def planet_upgrade_mode_specs() -> list[dict]:
 
 
 def structures_config() -> dict:
+    from engine.structures import STRUCTURES
+
     return {key: {"name": s.name, "description": s.description} for key, s in STRUCTURES.items()}
@@ -0,0 +1,59 @@
+from http.server import BaseHTTPRequestHandler
+from _shared import _parse_army, _parse_tuning, _safe_int, send_json, read_json_body, instrumented
+from engine import instrument
+from engine.allocation import OBJECTIVES, AllocationTarget, allocate_reinforcements
+
+MAX_TARGETS = 12
+MAX_UNITS = 100
+
+
+class handler(BaseHTTPRequestHandler):
+    @instrumented("allocate")
+    def do_POST(self):
+        try:
+            data = read_json_body(self)
+        except Exception:
+            send_json(self, {"error": "Invalid JSON body"}, 400)
+            return
+
+        raw_targets = data.get("targets", [])
+        if not isinstance(raw_targets, list) or not raw_targets:
+            send_json(self, {"error": "targets must be a non-empty list"}, 400)
+            return
+        if len(raw_targets) > MAX_TARGETS:
+            send_json(self, {"error": f"At most {MAX_TARGETS} targets are supported"}, 400)
+            return
+
+        objective = data.get("objective", "expected_value")
+        if objective not in OBJECTIVES:
+            objective = "expected_value"
+        reinforcements = max(0, min(MAX_UNITS, _safe_int(data.get("reinforcements", 0), 0)))
+
+        targets = []
+        for raw in raw_targets:
+            if not isinstance(raw, dict):
+                raw = {}
+            attacker = _parse_army(raw.get("attacker", {}))
+            defender = _parse_army(raw.get("defender", {}))
+            targets.append(AllocationTarget(
+                defender_units=min(MAX_UNITS, defender.units),
+                structures=defender.structures,
+                tuning=_parse_tuning(raw),
+                attacker_units=min(MAX_UNITS, attacker.units),
+                hero=attacker.hero,
+                value=float(max(0, _safe_int(raw.get("value", 1), 1))),
+            ))
+
+        with instrument.timer("solve"):
+            result = allocate_reinforcements(reinforcements, targets, objective)
+        send_json(self, {
+            "objective": result.objective,
+            "reinforcements": reinforcements,
+            "allocation": result.allocation,
+            "attacker_win_probabilities": [round(p * 100, 2) for p in result.win_probabilities],
+            "expected_captures": round(result.expected_captures, 4),
+            "objective_value": round(result.objective_value, 6),
+        })
+
+    def log_message(self, format, *args):
+        pass
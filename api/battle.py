@@ -1,10 +1,16 @@
 from http.server import BaseHTTPRequestHandler
-from dataclasses import asdict
-from _shared import _parse_army, _parse_tuning, send_json, read_json_body
+from _shared import _parse_army, _parse_tuning, send_json, read_json_body, instrumented
+from engine import instrument
 from engine.combat import resolve_battle
 
+# Every round is returned, so stacks are capped; rounds are capped too
+# because rules where nothing can change a state never end.
+MAX_UNITS = 1000
+MAX_ROUNDS = 5000
+
 
 class handler(BaseHTTPRequestHandler):
+    @instrumented("battle")
     def do_POST(self):
         try:
             data = read_json_body(self)
@@ -16,9 +22,12 @@ class handler(BaseHTTPRequestHandler):
         defender = _parse_army(data.get("defender", {}))
         auto = data.get("auto_resolve", True)
         tuning = _parse_tuning(data)
+        attacker.units = min(MAX_UNITS, attacker.units)
+        defender.units = min(MAX_UNITS, defender.units)
 
-        result = resolve_battle(attacker, defender, auto_resolve=auto, tuning=tuning)
-        send_json(self, asdict(result))
+        with instrument.timer("solve"):
+            result = resolve_battle(attacker, defender, auto_resolve=auto, tuning=tuning, max_rounds=MAX_ROUNDS)
+        send_json(self, result.to_dict())
 
     def log_message(self, format, *args):
         pass
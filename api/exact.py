@@ -1,13 +1,18 @@
 from http.server import BaseHTTPRequestHandler
-from _shared import _safe_int, send_json, read_json_body
-from engine.probabilities import (
-    SINGLE_ROLL_PROBABILITIES,
-    expected_losses,
-    win_probability_exact,
+from _shared import (
+    REQUEST_BUDGET_SECONDS, _safe_float, _safe_int, admission, client_key, load_prebuilt_json, send_json,
+    send_rejected, read_json_body, instrumented,
 )
+from engine import instrument
+
+# Stacks beyond the prebuilt table go to engine.planner, which can always
+# fall back to the constant-time large-army approximation, so the cap is
+# generous.
+MAX_UNITS = 1_000_000
 
 
 class handler(BaseHTTPRequestHandler):
+    @instrumented("exact")
     def do_POST(self):
         try:
             data = read_json_body(self)
@@ -15,31 +20,61 @@ class handler(BaseHTTPRequestHandler):
             send_json(self, {"error": "Invalid JSON body"}, 400)
             return
 
-        atk_units = max(2, min(50, _safe_int(data.get("attacker_units", 10), 10)))
-        def_units = max(1, min(50, _safe_int(data.get("defender_units", 5), 5)))
+        atk_units = max(2, min(MAX_UNITS, _safe_int(data.get("attacker_units", 10), 10)))
+        def_units = max(1, min(MAX_UNITS, _safe_int(data.get("defender_units", 5), 5)))
+        # Largest acceptable error on the win probability. Without one, the
+        # most accurate engine that fits the budget answers (exact whenever
+        # it fits) and reports its estimated error.
+        tolerance = None
+        if "tolerance" in data:
+            tolerance = max(0.0, min(1.0, _safe_float(data["tolerance"], 0.0)))
+
+        # Vanilla tables are prebuilt (see _prebuild.py); the engine is
+        # only imported for stacks beyond them.
+        tables = load_prebuilt_json("vanilla.json")
+        with instrument.timer("solve"):
+            if atk_units <= tables["max_units"] and def_units <= tables["max_units"]:
+                win_prob = tables["win_probability"][atk_units][def_units]
+                method, estimated_error, error_basis = "exact", 0.0, "exact"
+            else:
+                from engine.planner import (
+                    ERROR_BASIS, Deadline, OverBudget, Query, Rejected, answer, plan_most_accurate, plan_query,
+                )
 
-        win_prob = win_probability_exact(atk_units, def_units)
+                query = Query(atk_units, def_units, tolerance=tolerance or 0.0)
+                try:
+                    if tolerance is None:
+                        plan = plan_most_accurate(query, REQUEST_BUDGET_SECONDS)
+                    else:
+                        plan = plan_query(query, REQUEST_BUDGET_SECONDS)
+                    with admission().admit(client_key(self), plan.seconds):
+                        odds = answer(query, plan, Deadline(REQUEST_BUDGET_SECONDS))
+                except OverBudget as exc:
+                    send_json(self, {"error": str(exc), "estimated_seconds": round(exc.plan.seconds, 1)}, 413)
+                    return
+                except Rejected as exc:
+                    send_rejected(self, exc)
+                    return
+                win_prob, estimated_error = odds.win_probability, odds.estimated_error
+                error_basis = ERROR_BASIS[odds.engine]
+                method = "exact" if odds.engine in ("table", "exact") else odds.engine
 
         atk_dice = min(3, atk_units - 1)
         def_dice = min(2, def_units)
-        atk_exp, def_exp = expected_losses(atk_dice, def_dice)
-
-        roll_probs = {}
-        for (ad, dd), outcomes in SINGLE_ROLL_PROBABILITIES.items():
-            roll_probs[f"{ad}v{dd}"] = {
-                f"atk_loses_{al}_def_loses_{dl}": round(float(p), 4)
-                for (al, dl), p in outcomes.items()
-            }
+        atk_exp, def_exp = tables["expected_losses"][f"{atk_dice}v{def_dice}"]
 
         send_json(self, {
             "attacker_units": atk_units,
             "defender_units": def_units,
             "attacker_win_probability": round(win_prob * 100, 2),
             "defender_win_probability": round((1 - win_prob) * 100, 2),
+            "method": method,
+            "estimated_error": round(estimated_error * 100, 2),
+            "error_basis": error_basis,
             "current_roll_type": f"{atk_dice}v{def_dice}",
             "expected_attacker_losses_per_roll": atk_exp,
             "expected_defender_losses_per_roll": def_exp,
-            "single_roll_probabilities": roll_probs,
+            "single_roll_probabilities": tables["single_roll_probabilities"],
         })
 
     def log_message(self, format, *args):
@@ -0,0 +1,69 @@
+from http.server import BaseHTTPRequestHandler
+from _shared import (
+    _parse_army, _parse_tuning, admission, client_key, send_json, send_rejected, read_json_body,
+    instrumented,
+)
+from engine import instrument
+from engine.explain import explain_battle
+from engine.planner import SECONDS_PER_DP_CELL, Rejected
+
+MAX_UNITS = 100
+# Upper bound on the distinct rule sets one explanation solves, for admission.
+MAX_RULE_SETS = 32
+
+
+class handler(BaseHTTPRequestHandler):
+    @instrumented("explain")
+    def do_POST(self):
+        try:
+            data = read_json_body(self)
+        except Exception:
+            send_json(self, {"error": "Invalid JSON body"}, 400)
+            return
+
+        attacker = _parse_army(data.get("attacker", {}))
+        defender = _parse_army(data.get("defender", {}))
+        tuning = _parse_tuning(data)
+        atk_units = max(2, min(MAX_UNITS, attacker.units))
+        def_units = max(1, min(MAX_UNITS, defender.units))
+        cost = SECONDS_PER_DP_CELL * atk_units * def_units * MAX_RULE_SETS
+
+        try:
+            with admission().admit(client_key(self), cost):
+                with instrument.timer("solve"):
+                    result = explain_battle(atk_units, def_units, attacker.hero, defender.structures, tuning)
+        except Rejected as exc:
+            send_rejected(self, exc)
+            return
+
+        send_json(self, {
+            "attacker_units": atk_units,
+            "defender_units": def_units,
+            "attacker_win_probability": round(result.win_probability * 100, 2),
+            "vanilla_win_probability": round(result.vanilla_win_probability * 100, 2),
+            "interaction": round(result.interaction * 100, 2),
+            "rule_sets": result.rule_sets,
+            "factors": [
+                {
+                    "kind": f.kind,
+                    "name": f.name,
+                    "without": round(f.win_probability * 100, 2),
+                    "delta": round(f.delta * 100, 2),
+                }
+                for f in result.factors
+            ],
+            "sensitivities": [
+                {
+                    "parameter": s.parameter,
+                    "value": s.value,
+                    "win_probabilities": [
+                        {"value": v, "win_probability": round(p * 100, 2)} for v, p in s.win_probabilities.items()
+                    ],
+                    "slope": round(s.slope(result.win_probability) * 100, 2),
+                }
+                for s in result.sensitivities
+            ],
+        })
+
+    def log_message(self, format, *args):
+        pass
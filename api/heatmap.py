@@ -0,0 +1,53 @@
+from http.server import BaseHTTPRequestHandler
+from _shared import _parse_army, _parse_tuning, _safe_int, pack_float32, send_json, read_json_body, instrumented
+from engine import instrument
+from engine.kernel import battle_surfaces, compile_rules
+
+MAX_UNITS = 100
+METRICS = ("win_probability", "attacker_remaining", "defender_remaining", "rounds")
+ENCODINGS = ("json", "float32")
+
+
+class handler(BaseHTTPRequestHandler):
+    @instrumented("heatmap")
+    def do_POST(self):
+        try:
+            data = read_json_body(self)
+        except Exception:
+            send_json(self, {"error": "Invalid JSON body"}, 400)
+            return
+
+        attacker = _parse_army(data.get("attacker", {}))
+        defender = _parse_army(data.get("defender", {}))
+        tuning = _parse_tuning(data)
+        max_atk = max(2, min(MAX_UNITS, _safe_int(data.get("max_attacker_units", 50), 50)))
+        max_def = max(1, min(MAX_UNITS, _safe_int(data.get("max_defender_units", 50), 50)))
+        encoding = data.get("encoding", "json")
+        if encoding not in ENCODINGS:
+            encoding = "json"
+        requested = data.get("metrics", list(METRICS))
+        if not isinstance(requested, list):
+            requested = list(METRICS)
+        metrics = [m for m in METRICS if m in requested] or list(METRICS)
+
+        with instrument.timer("solve"):
+            rules = compile_rules(attacker.hero, defender.structures, tuning)
+            surfaces = battle_surfaces(max_atk, max_def, rules)
+
+        # Rows are attacker units 1..max_atk, columns defender units 1..max_def.
+        payload = {
+            "encoding": encoding,
+            "shape": [max_atk, max_def],
+            "attacker_units": [1, max_atk],
+            "defender_units": [1, max_def],
+        }
+        for metric in metrics:
+            grid = [row[1:] for row in getattr(surfaces, metric)[1:]]
+            if encoding == "float32":
+                payload[metric] = pack_float32(grid)
+            else:
+                payload[metric] = [[round(v, 4) for v in row] for row in grid]
+        send_json(self, payload)
+
+    def log_message(self, format, *args):
+        pass
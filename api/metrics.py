@@ -0,0 +1,20 @@
+from http.server import BaseHTTPRequestHandler
+from _shared import admission, diagnostics_enabled, send_json
+from engine import instrument, kernel
+
+
+class handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if not diagnostics_enabled():
+            send_json(self, {"error": "Not found"}, 404)
+            return
+        # Totals are per process: on serverless each warm instance keeps its own.
+        send_json(self, {
+            "instrumentation_enabled": instrument.ENABLED,
+            "endpoints": instrument.snapshot(),
+            "admission": admission().snapshot(),
+            "caches": kernel.cache_sizes(),
+        })
+
+    def log_message(self, format, *args):
+        pass
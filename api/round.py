@@ -1,10 +1,12 @@
 from http.server import BaseHTTPRequestHandler
 from dataclasses import asdict
-from _shared import _parse_army, _parse_tuning, send_json, read_json_body
+from _shared import _parse_army, _parse_tuning, send_json, read_json_body, instrumented
+from engine import instrument
 from engine.combat import resolve_single_round
 
 
 class handler(BaseHTTPRequestHandler):
+    @instrumented("round")
     def do_POST(self):
         try:
             data = read_json_body(self)
@@ -16,7 +18,8 @@ class handler(BaseHTTPRequestHandler):
         defender = _parse_army(data.get("defender", {}))
         tuning = _parse_tuning(data)
 
-        result = resolve_single_round(attacker, defender, tuning=tuning)
+        with instrument.timer("solve"):
+            result = resolve_single_round(attacker, defender, tuning=tuning)
         send_json(self, asdict(result))
 
     def log_message(self, format, *args):
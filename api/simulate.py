@@ -1,13 +1,23 @@
 from http.server import BaseHTTPRequestHandler
 from dataclasses import asdict
-from _shared import _safe_int, _parse_tuning, send_json, read_json_body
-from engine.heroes import HERO_TIERS
-from engine.models import Hero
+from _shared import (
+    REQUEST_BUDGET_SECONDS, _safe_int, _parse_tuning, admission, client_key, send_json, send_rejected,
+    read_json_body, instrumented,
+)
+from engine import instrument
+from engine.heroes import HEROES
+from engine.kernel import compile_rules
+from engine.planner import ERROR_BASIS, Deadline, OverBudget, Query, Rejected, answer, plan_query, plan_simulation, simulate
 from engine.structures import STRUCTURES
-from engine.simulation import SimulationConfig, run_simulation
+from engine.simulation import SimulationConfig
+
+MAX_BATTLES = 50000
+# Error accepted on the odds offered instead when a simulation is over budget.
+FALLBACK_TOLERANCE = 0.05
 
 
 class handler(BaseHTTPRequestHandler):
+    @instrumented("simulate")
     def do_POST(self):
         try:
             data = read_json_body(self)
@@ -18,9 +28,8 @@ class handler(BaseHTTPRequestHandler):
         atk = data.get("attacker", {})
         dfn = data.get("defender", {})
 
-        hero_atk = None
-        if atk.get("hero") and atk["hero"] in HERO_TIERS:
-            hero_atk = Hero(name=atk["hero"], die_size=HERO_TIERS[atk["hero"]])
+        hero_key = atk.get("hero")
+        hero_atk = HEROES.get(hero_key) if isinstance(hero_key, str) else None
 
         structs = [STRUCTURES[s] for s in dfn.get("structures", []) if s in STRUCTURES]
         tuning = _parse_tuning(data)
@@ -31,11 +40,43 @@ class handler(BaseHTTPRequestHandler):
             attacker_hero=hero_atk,
             defender_structures=structs,
             tuning=tuning,
-            num_battles=min(50000, max(100, _safe_int(data.get("num_battles", 10000), 10000))),
+            num_battles=min(MAX_BATTLES, max(100, _safe_int(data.get("num_battles", 10000), 10000))),
         )
 
-        result = run_simulation(config)
-        send_json(self, asdict(result))
+        try:
+            plan = plan_simulation(config, REQUEST_BUDGET_SECONDS)
+        except OverBudget as exc:
+            # Too big to sample: offer the odds from the cheapest engine instead.
+            rules = compile_rules(hero_atk, structs, tuning)
+            query = Query(config.attacker_units, config.defender_units, rules, FALLBACK_TOLERANCE)
+            try:
+                fallback = plan_query(query, REQUEST_BUDGET_SECONDS)
+                with admission().admit(client_key(self), fallback.seconds):
+                    odds = answer(query, fallback, Deadline(REQUEST_BUDGET_SECONDS))
+                estimate = {"attacker_win_probability": odds.win_probability, "estimated_error": odds.estimated_error,
+                            "error_basis": ERROR_BASIS[odds.engine], "engine": odds.engine}
+            except OverBudget:
+                estimate = None
+            except Rejected as rejected:
+                send_rejected(self, rejected)
+                return
+            send_json(self, {"error": str(exc), "estimated_seconds": round(exc.plan.seconds, 1),
+                             "estimate": estimate}, 413)
+            return
+
+        try:
+            with admission().admit(client_key(self), plan.seconds):
+                with instrument.timer("solve"):
+                    result = simulate(config, plan, Deadline(REQUEST_BUDGET_SECONDS))
+        except Rejected as exc:
+            send_rejected(self, exc)
+            return
+        send_json(self, dict(asdict(result), plan={
+            "engine": plan.engine,
+            "estimated_seconds": round(plan.seconds, 4),
+            "requested_battles": config.num_battles,
+            "partial": result.num_battles < config.num_battles,
+        }))
 
     def log_message(self, format, *args):
         pass
@@ -0,0 +1,8 @@
+"""Engine micro-benchmarks with saved baselines.
+
+Run ``python -m benchmarks`` from the repo root to measure every case and
+compare it against ``benchmarks/baselines.json``; the command exits
+non-zero when a case regresses past the threshold. ``--save`` records the
+current numbers as the new baseline. Baselines are machine-specific, so
+save them on the machine that checks them.
+"""
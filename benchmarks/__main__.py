@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from benchmarks.suite import (
+    BASELINE_PATH,
+    BENCHMARKS,
+    DEFAULT_THRESHOLD,
+    find_regressions,
+    load_baselines,
+    relative_change,
+    run_suite,
+    save_baselines,
+)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Engine micro-benchmarks")
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fractional slowdown that fails the run (default %(default)s)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="record these results as the baseline")
+    parser.add_argument("--list", action="store_true", help="list case names and exit")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if args.list:
+        print("\n".join(names))
+        return 0
+    if not names:
+        print(f"No benchmark matches {args.filter!r}", file=sys.stderr)
+        return 2
+
+    baselines = load_baselines(args.baseline)
+    measurements = run_suite(names, args.repeats)
+    width = max(len(n) for n in names)
+    for m in measurements:
+        line = f"{m.name:<{width}}  {m.value:>14,.2f} {m.unit}"
+        base = baselines.get(m.name)
+        if base is not None and base.unit == m.unit:
+            change = relative_change(m, base)
+            line += f"  ({abs(change):.1%} {'slower' if change > 0 else 'faster'} than baseline)"
+        print(line)
+
+    if args.save:
+        save_baselines(measurements, args.baseline)
+        print(f"Saved {len(measurements)} baselines to {args.baseline}")
+        return 0
+
+    regressions = find_regressions(measurements, baselines, args.threshold)
+    for current, base, change in regressions:
+        print(
+            f"REGRESSION {current.name}: {current.value:,.2f} vs {base.value:,.2f} {current.unit} "
+            f"({change:.1%} slower, threshold {args.threshold:.0%})",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
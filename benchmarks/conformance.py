@@ -0,0 +1,329 @@
+"""Statistical conformance of the fast engines against the reference simulator.
+
+``resolve_single_round`` and ``resolve_battle`` are the rules of record.
+Every faster path (the exact kernel, the transition-table sampler behind
+``evaluate_battles(mode="monte_carlo")``) must reproduce their outcome
+distributions exactly, including the subtle rules: rerolls kept only
+when higher, suppression clamped at 1, absorb applied after comparison.
+
+Each check draws samples and runs a goodness-of-fit test: chi-square for
+categorical outcomes against exact probabilities, two-sample
+Kolmogorov-Smirnov for round counts. ``run_conformance`` applies every
+check across a seeded random grid of configurations and uses a
+Bonferroni-corrected threshold, so the whole grid raises a false alarm
+with probability at most ``FAMILY_ALPHA``.
+"""
+
+from __future__ import annotations
+
+import math
+import random as _random
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Hashable, Mapping
+
+from engine.combat import resolve_battle, resolve_single_round
+from engine.kernel import RoundRules, battle_distribution, compile_rules, round_distribution
+from engine.models import Army, Hero, Structure
+from engine.simulation import chain_sampler
+from engine.structures import STRUCTURES, compile_structures
+from engine.tuning import PLANET_UPGRADE_MODES, CombatTuning
+
+# Chance that a correct engine fails anywhere in a conformance run.
+FAMILY_ALPHA = 0.001
+# Bins with a smaller expected count are pooled before the chi-square test.
+MIN_EXPECTED = 5.0
+
+
+# --- Test statistics ---
+
+def _regularized_gamma_q(a: float, x: float) -> float:
+    """Upper regularized incomplete gamma Q(a, x) (Numerical Recipes 6.2)."""
+    if x <= 0.0:
+        return 1.0
+    log_prefactor = -x + a * math.log(x) - math.lgamma(a)
+    if x < a + 1.0:
+        term = total = 1.0 / a
+        n = a
+        for _ in range(10000):
+            n += 1.0
+            term *= x / n
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_prefactor))
+    # Modified Lentz continued fraction.
+    tiny = 1e-300
+    b = x + 1.0 - a
+    c = 1.0 / tiny
+    d = 1.0 / b
+    h = d
+    for i in range(1, 10000):
+        an = -i * (i - a)
+        b += 2.0
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-15:
+            break
+    return min(1.0, math.exp(log_prefactor) * h)
+
+
+def chi_square_sf(statistic: float, dof: int) -> float:
+    """P(X >= statistic) for X ~ chi-square with ``dof`` degrees of freedom."""
+    if dof <= 0:
+        return 1.0
+    return _regularized_gamma_q(dof / 2.0, statistic / 2.0)
+
+
+def kolmogorov_sf(x: float) -> float:
+    """P(K >= x) for the Kolmogorov distribution."""
+    if x < 0.2:
+        return 1.0
+    total = 0.0
+    for k in range(1, 101):
+        term = 2.0 * (-1) ** (k - 1) * math.exp(-2.0 * k * k * x * x)
+        total += term
+        if abs(term) < 1e-16:
+            break
+    return min(1.0, max(0.0, total))
+
+
+@dataclass(frozen=True)
+class FitResult:
+    name: str
+    statistic: float
+    p_value: float
+    samples: int
+    dof: int = 0
+
+
+def chi_square_test(
+    name: str,
+    observed: Mapping[Hashable, int],
+    expected: Mapping[Hashable, float],
+    min_expected: float = MIN_EXPECTED,
+) -> FitResult:
+    """Pearson chi-square of observed counts against exact probabilities.
+
+    The rarest bins are pooled until every bin expects ``min_expected``
+    samples. An observation the exact distribution calls impossible fails
+    outright (p = 0).
+    """
+    n = sum(observed.values())
+    if any(count and expected.get(key, 0.0) <= 0.0 for key, count in observed.items()):
+        return FitResult(name, math.inf, 0.0, n)
+
+    bins = sorted(((n * p, observed.get(key, 0)) for key, p in expected.items() if p > 0.0), reverse=True)
+    pooled: list[tuple[float, int]] = []
+    rest_e, rest_o = 0.0, 0
+    for e, o in reversed(bins):
+        if rest_e + e < min_expected or e < min_expected:
+            rest_e += e
+            rest_o += o
+        else:
+            pooled.append((e, o))
+    if rest_e > 0.0:
+        if rest_e >= min_expected or not pooled:
+            pooled.append((rest_e, rest_o))
+        else:
+            e, o = pooled.pop()
+            pooled.append((e + rest_e, o + rest_o))
+
+    statistic = sum((o - e) ** 2 / e for e, o in pooled)
+    dof = len(pooled) - 1
+    return FitResult(name, statistic, chi_square_sf(statistic, dof), n, dof)
+
+
+def ks_two_sample(name: str, xs: list[float], ys: list[float]) -> FitResult:
+    """Two-sample Kolmogorov-Smirnov test.
+
+    The asymptotic p-value is conservative for discrete data such as round
+    counts, so it never inflates the false-alarm rate.
+    """
+    if not xs or not ys:
+        return FitResult(name, 0.0, 1.0, len(xs) + len(ys))
+    xs, ys = sorted(xs), sorted(ys)
+    n, m = len(xs), len(ys)
+    i = j = 0
+    d = 0.0
+    while i < n and j < m:
+        value = min(xs[i], ys[j])
+        while i < n and xs[i] == value:
+            i += 1
+        while j < m and ys[j] == value:
+            j += 1
+        d = max(d, abs(i / n - j / m))
+    effective = math.sqrt(n * m / (n + m))
+    p = kolmogorov_sf((effective + 0.12 + 0.11 / effective) * d)
+    return FitResult(name, d, p, n + m)
+
+
+# --- Configurations ---
+
+@dataclass(frozen=True)
+class ConformanceConfig:
+    attacker_units: int
+    defender_units: int
+    hero: Hero | None = None
+    structures: tuple[Structure, ...] = ()
+    tuning: CombatTuning = CombatTuning()
+
+    @property
+    def rules(self) -> RoundRules:
+        return compile_rules(self.hero, list(self.structures), self.tuning)
+
+    def label(self) -> str:
+        hero = f"d{self.hero.die_size}" if self.hero else "d6"
+        names = "+".join(s.name for s in self.structures) or "none"
+        t = self.tuning
+        return (
+            f"{self.attacker_units}v{self.defender_units} hero={hero} structures={names} "
+            f"{t.planet_upgrade_mode}@{t.planet_upgrade_level} hero_up={t.hero_upgrade_level}"
+        )
+
+
+# Structures beyond STRUCTURES, so every registered effect gets exercised.
+_VARIANT_STRUCTURES: tuple[Structure, ...] = (
+    Structure("Deflector Array", "chance_absorb", amount=1, chance=0.5),
+    Structure("Ablative Plating", "limited_absorb", amount=2),
+    Structure("Saboteurs", "ties_favor_attacker"),
+)
+
+
+def random_config(rng: Any, mode: str | None = None) -> ConformanceConfig:
+    """Draw a small battle with a random hero, structures and tuning."""
+    hero_size = rng.choice([6, 8, 10, 12])
+    pool = list(STRUCTURES.values()) + list(_VARIANT_STRUCTURES)
+    structures = tuple(s for s in pool if rng.random() < 0.25)
+    tuning = CombatTuning(
+        attacker_ability=rng.choice([0, 0, 1]),
+        defender_ability=rng.choice([0, 0, 1]),
+        hero_upgrade_level=rng.randint(0, 3),
+        planet_upgrade_level=rng.randint(0, 3),
+        planet_upgrade_mode=mode or rng.choice(PLANET_UPGRADE_MODES),
+    )
+    return ConformanceConfig(
+        attacker_units=rng.randint(2, 9),
+        defender_units=rng.randint(1, 6),
+        hero=Hero("Hero", hero_size) if hero_size > 6 else None,
+        structures=structures,
+        tuning=tuning,
+    )
+
+
+# --- Checks ---
+
+def _end_state(attacker_units: int, defender_units: int) -> tuple[str, int]:
+    if defender_units <= 0:
+        return ("attacker", attacker_units)
+    return ("defender", defender_units)
+
+
+def _exact_end_states(config: ConformanceConfig) -> dict[tuple[str, int], float]:
+    dist = battle_distribution(config.attacker_units, config.defender_units, config.rules)
+    expected = {("attacker", a): p for a, p in dist.attacker_wins.items()}
+    expected.update({("defender", d): p for d, p in dist.defender_wins.items()})
+    return expected
+
+
+def check_rounds(config: ConformanceConfig, rng: Any, samples: int) -> list[FitResult]:
+    """``resolve_single_round`` losses against the exact kernel, for every dice pairing."""
+    rules = config.rules
+    effects = compile_structures(list(config.structures))
+    results = []
+    for atk_dice in (1, 2, 3):
+        for base_def_dice in (1, 2):
+            observed: Counter[tuple[int, int]] = Counter()
+            attacker = Army(units=atk_dice + 1, hero=config.hero)
+            defender = Army(units=base_def_dice, structures=list(config.structures))
+            for _ in range(samples):
+                attacker.units = atk_dice + 1
+                defender.units = base_def_dice
+                result = resolve_single_round(attacker, defender, rng, config.tuning, effects.start_battle())
+                observed[(result.attacker_losses, result.defender_losses)] += 1
+            expected = {k: float(p) for k, p in round_distribution(rules, atk_dice, rules.defender_dice(base_def_dice)).items()}
+            results.append(chi_square_test(f"round {atk_dice}v{base_def_dice}", observed, expected))
+    return results
+
+
+def check_reference_battles(config: ConformanceConfig, rng: Any, samples: int) -> tuple[FitResult, list[int]]:
+    """``resolve_battle`` end states against the exact kernel; also returns round counts."""
+    observed: Counter[tuple[str, int]] = Counter()
+    rounds = []
+    for _ in range(samples):
+        attacker = Army(units=config.attacker_units, hero=config.hero)
+        defender = Army(units=config.defender_units, structures=list(config.structures))
+        result = resolve_battle(attacker, defender, rng=rng, tuning=config.tuning)
+        observed[_end_state(result.attacker_remaining, result.defender_remaining)] += 1
+        rounds.append(len(result.rounds))
+    return chi_square_test("reference battle", observed, _exact_end_states(config)), rounds
+
+
+def check_sampler_battles(config: ConformanceConfig, rng: Any, samples: int) -> tuple[FitResult, list[int]]:
+    """Transition-table sampler end states against the exact kernel; also returns round counts."""
+    sampler = chain_sampler(config.rules)
+    observed: Counter[tuple[str, int]] = Counter()
+    rounds = []
+    for _ in range(samples):
+        a, d, r = sampler.sample(config.attacker_units, config.defender_units, rng)
+        observed[_end_state(a, d)] += 1
+        rounds.append(r)
+    return chi_square_test("sampler battle", observed, _exact_end_states(config)), rounds
+
+
+@dataclass
+class ConformanceReport:
+    alpha: float  # per-test threshold after the Bonferroni correction
+    results: list[tuple[ConformanceConfig, FitResult]] = field(default_factory=list)
+
+    @property
+    def failures(self) -> list[tuple[ConformanceConfig, FitResult]]:
+        return [(c, r) for c, r in self.results if r.p_value < self.alpha]
+
+    @property
+    def passed(self) -> bool:
+        return not self.failures
+
+    def summary(self) -> str:
+        lines = [f"{len(self.results)} tests, per-test alpha {self.alpha:.2e}, {len(self.failures)} failed"]
+        for config, result in self.failures:
+            lines.append(f"  FAIL {result.name} p={result.p_value:.2e} stat={result.statistic:.3f} [{config.label()}]")
+        return "\n".join(lines)
+
+
+def run_conformance(
+    num_configs: int = 12,
+    round_samples: int = 2000,
+    battle_samples: int = 2000,
+    seed: int = 0,
+    family_alpha: float = FAMILY_ALPHA,
+) -> ConformanceReport:
+    """Run every check over a seeded random grid of configurations.
+
+    Configurations cycle through the planet upgrade modes so each is
+    covered. Ones that can stalemate are skipped: the reference
+    simulator would never finish them.
+    """
+    rng = _random.Random(seed)
+    configs: list[ConformanceConfig] = []
+    while len(configs) < num_configs:
+        config = random_config(rng, PLANET_UPGRADE_MODES[len(configs) % len(PLANET_UPGRADE_MODES)])
+        if battle_distribution(config.attacker_units, config.defender_units, config.rules).stalemate == 0.0:
+            configs.append(config)
+
+    tests_per_config = 6 + 3  # six dice pairings, two end-state fits, one round-count fit
+    report = ConformanceReport(alpha=family_alpha / (tests_per_config * len(configs)))
+    for config in configs:
+        for result in check_rounds(config, rng, round_samples):
+            report.results.append((config, result))
+        reference, reference_rounds = check_reference_battles(config, rng, battle_samples)
+        sampled, sampled_rounds = check_sampler_battles(config, rng, battle_samples)
+        report.results.append((config, reference))
+        report.results.append((config, sampled))
+        report.results.append((config, ks_two_sample("rounds reference vs sampler", reference_rounds, sampled_rounds)))
+    return report
@@ -0,0 +1,131 @@
+"""Measure what each API handler costs to import on a cold start.
+
+Every handler module is imported in a fresh interpreter under
+``python -X importtime``. The report gives the handler's total import
+time and the most expensive modules beneath it, by self time, with
+repo modules (``engine``, ``_shared``, ``api``) flagged.
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --budget-ms 150 --top 5 exact config
+
+``--budget-ms`` fails the run when any handler takes longer. Each
+handler is imported several times and the fastest run is kept, because
+the first import after an edit also compiles bytecode.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+REPO_PREFIXES = ("engine", "_shared", "api", "_prebuild")
+
+
+@dataclass
+class ModuleCost:
+    name: str
+    self_ms: float
+    cumulative_ms: float
+
+    @property
+    def in_repo(self) -> bool:
+        return self.name.split(".")[0] in REPO_PREFIXES
+
+
+@dataclass
+class ImportReport:
+    module: str
+    total_ms: float
+    modules: list[ModuleCost] = field(default_factory=list)  # everything imported beneath it
+
+    def top(self, n: int) -> list[ModuleCost]:
+        return sorted(self.modules, key=lambda m: m.self_ms, reverse=True)[:n]
+
+
+def handler_modules() -> list[str]:
+    return sorted(p.stem for p in (REPO_ROOT / "api").glob("*.py") if not p.stem.startswith("_"))
+
+
+def parse_importtime(stderr: str, module: str) -> ImportReport:
+    """Parse ``-X importtime`` output, keeping the subtree under ``module``.
+
+    Children are printed before their parent, indented one level deeper,
+    so the subtree is every line between the previous top-level entry and
+    the module's own line.
+    """
+    rows: list[tuple[int, ModuleCost]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        depth = (len(raw_name) - len(raw_name.lstrip(" ")) - 1) // 2
+        rows.append((depth, ModuleCost(raw_name.strip(), int(self_us) / 1000.0, int(cumulative_us) / 1000.0)))
+
+    for index, (depth, cost) in enumerate(rows):
+        if cost.name == module:
+            start = index
+            while start > 0 and rows[start - 1][0] > depth:
+                start -= 1
+            subtree = [c for _, c in rows[start:index]]
+            return ImportReport(module, cost.cumulative_ms, subtree + [cost])
+    return ImportReport(module, 0.0)  # already imported by the interpreter
+
+
+def measure_import(module: str, repeats: int = 3) -> ImportReport:
+    """Import ``module`` in fresh interpreters; return the fastest run."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(REPO_ROOT), str(REPO_ROOT / "api")]))
+    best: ImportReport | None = None
+    for _ in range(max(1, repeats)):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+        report = parse_importtime(proc.stderr, module)
+        if best is None or report.total_ms < best.total_ms:
+            best = report
+    assert best is not None
+    return best
+
+
+def format_report(reports: list[ImportReport], top: int) -> str:
+    lines = []
+    for report in sorted(reports, key=lambda r: r.total_ms, reverse=True):
+        lines.append(f"{report.module:<16} {report.total_ms:8.1f} ms")
+        for cost in report.top(top):
+            marker = "*" if cost.in_repo else " "
+            lines.append(f"   {marker} {cost.name:<34} self {cost.self_ms:7.2f} ms  cumulative {cost.cumulative_ms:7.2f} ms")
+    lines.append("(* = repo module)")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.importtime", description=__doc__.split("\n")[0])
+    parser.add_argument("handlers", nargs="*", help="api modules to measure (default: all)")
+    parser.add_argument("--top", type=int, default=8, help="modules listed per handler")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail when a handler exceeds this")
+    parser.add_argument("--json", type=Path, default=None, help="write the reports here")
+    args = parser.parse_args(argv)
+
+    reports = [measure_import(f"api.{name}", args.repeats) for name in (args.handlers or handler_modules())]
+    print(format_report(reports, args.top))
+    if args.json:
+        args.json.write_text(json.dumps([asdict(r) for r in reports], indent=2) + "\n")
+    if args.budget_ms is not None:
+        over = [r for r in reports if r.total_ms > args.budget_ms]
+        for r in over:
+            print(f"OVER BUDGET {r.module}: {r.total_ms:.1f} ms > {args.budget_ms:.1f} ms", file=sys.stderr)
+        return 1 if over else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
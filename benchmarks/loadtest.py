@@ -0,0 +1,398 @@
+"""Local load generator for the serverless handlers in ``api/``.
+
+Every handler class is served from its own loopback ``ThreadingHTTPServer``
+in this process, so the numbers include JSON parsing and
+``send_json`` overhead but no network. A seeded request mix is replayed
+at a fixed concurrency, optionally paced to a target rate, and the run
+reports per-endpoint throughput and latency percentiles plus process CPU
+and peak memory.
+
+    python -m benchmarks.loadtest --mix default --requests 2000 --concurrency 8
+    python -m benchmarks.loadtest --rate 200 --duration 30 --json run.json
+    python -m benchmarks.loadtest --compare run.json
+
+With ``--rate`` latency is measured from each request's scheduled send
+time, so queueing behind a saturated server counts against it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import importlib
+import json
+import math
+import random
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+HEROES = [None, "captain", "general", "admiral"]
+STRUCTURE_KEYS = ["shield_generator", "orbital_battery", "fortress"]
+UPGRADE_MODES = ["flat_bonus", "reroll_lowest_defender", "suppress_attacker_highest"]
+
+
+# --- Request mixes ---
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str  # module under api/, also the route: /api/<name>
+    method: str
+    body: Callable[[random.Random], dict[str, Any]] | None = None
+
+
+def _balance(rng: random.Random) -> dict[str, Any]:
+    return {
+        "hero_upgrade_level": rng.randint(0, 3),
+        "planet_upgrade_level": rng.randint(0, 3),
+        "planet_upgrade_mode": rng.choice(UPGRADE_MODES),
+    }
+
+
+def _armies(rng: random.Random, max_units: int) -> dict[str, Any]:
+    return {
+        "attacker": {"units": rng.randint(2, max_units), "hero": rng.choice(HEROES)},
+        "defender": {
+            "units": rng.randint(1, max_units),
+            "structures": [s for s in STRUCTURE_KEYS if rng.random() < 0.3],
+        },
+        "balance": _balance(rng),
+    }
+
+
+def _round_body(rng: random.Random) -> dict[str, Any]:
+    return _armies(rng, 20)
+
+
+def _battle_body(rng: random.Random) -> dict[str, Any]:
+    return dict(_armies(rng, 20), auto_resolve=True)
+
+
+def _simulate_body(rng: random.Random) -> dict[str, Any]:
+    body = _armies(rng, 20)
+    return {
+        "attacker": {"units": body["attacker"]["units"], "hero": body["attacker"]["hero"]},
+        "defender": body["defender"],
+        "balance": body["balance"],
+        "num_battles": rng.choice([1000, 5000, 10000]),
+    }
+
+
+def _exact_body(rng: random.Random) -> dict[str, Any]:
+    top = rng.choice([50, 50, 50, 1000, 100000])
+    return {"attacker_units": rng.randint(2, top), "defender_units": rng.randint(1, top)}
+
+
+def _heatmap_body(rng: random.Random) -> dict[str, Any]:
+    body = _armies(rng, 2)
+    body["max_attacker_units"] = rng.choice([20, 50, 100])
+    body["max_defender_units"] = rng.choice([20, 50, 100])
+    body["encoding"] = rng.choice(["json", "float32"])
+    return body
+
+
+def _allocate_body(rng: random.Random) -> dict[str, Any]:
+    return {
+        "reinforcements": rng.randint(5, 30),
+        "objective": rng.choice(["expected_value", "capture_all"]),
+        "targets": [
+            {"attacker": {"units": rng.randint(1, 10)}, "defender": {"units": rng.randint(1, 10)}}
+            for _ in range(rng.randint(1, 4))
+        ],
+    }
+
+
+def _explain_body(rng: random.Random) -> dict[str, Any]:
+    return _armies(rng, 30)
+
+
+ENDPOINTS: dict[str, Endpoint] = {
+    "config": Endpoint("config", "GET"),
+    "round": Endpoint("round", "POST", _round_body),
+    "battle": Endpoint("battle", "POST", _battle_body),
+    "simulate": Endpoint("simulate", "POST", _simulate_body),
+    "exact": Endpoint("exact", "POST", _exact_body),
+    "heatmap": Endpoint("heatmap", "POST", _heatmap_body),
+    "allocate": Endpoint("allocate", "POST", _allocate_body),
+    "explain": Endpoint("explain", "POST", _explain_body),
+}
+
+# Relative request weights per endpoint.
+MIXES: dict[str, dict[str, float]] = {
+    # Roughly what the web UI sends: config on load, then mostly single
+    # rounds/battles and odds lookups, with occasional heavy requests.
+    "default": {
+        "config": 10, "round": 25, "battle": 20, "exact": 25,
+        "simulate": 5, "heatmap": 10, "allocate": 5,
+    },
+    "light": {"config": 30, "round": 40, "battle": 30},
+    "exact": {"exact": 60, "heatmap": 25, "allocate": 15},
+    "simulate": {"simulate": 1},
+}
+
+
+def build_plan(mix: dict[str, float], count: int, seed: int = 0) -> list[tuple[str, bytes | None]]:
+    """A reproducible list of (endpoint, body) requests drawn from ``mix``."""
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    plan = []
+    for _ in range(count):
+        endpoint = ENDPOINTS[rng.choices(names, weights)[0]]
+        body = json.dumps(endpoint.body(rng)).encode() if endpoint.body else None
+        plan.append((endpoint.name, body))
+    return plan
+
+
+# --- Servers ---
+
+class LocalServers:
+    """One loopback server per handler module, torn down on exit."""
+
+    def __init__(self, names: list[str]) -> None:
+        for path in (str(REPO_ROOT), str(REPO_ROOT / "api")):
+            if path not in sys.path:
+                sys.path.insert(0, path)
+        self.ports: dict[str, int] = {}
+        self._servers: list[ThreadingHTTPServer] = []
+        for name in names:
+            handler = importlib.import_module(f"api.{name}").handler
+            server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self._servers.append(server)
+            self.ports[name] = server.server_port
+
+    def __enter__(self) -> LocalServers:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+
+def send(port: int, method: str, path: str, body: bytes | None, timeout: float = 60.0) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+# --- Running and reporting ---
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 <= q <= 100)."""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass
+class EndpointStats:
+    requests: int
+    errors: int
+    throughput: float  # completed requests per second of wall time
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+@dataclass
+class LoadReport:
+    mix: str
+    concurrency: int
+    rate: float | None
+    requests: int
+    wall_seconds: float
+    throughput: float
+    cpu_seconds: float  # process CPU, servers and load generator together
+    peak_rss_mb: float | None
+    commit: str | None
+    endpoints: dict[str, EndpointStats] = field(default_factory=dict)
+
+    def to_json(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> LoadReport:
+        endpoints = {k: EndpointStats(**v) for k, v in data.get("endpoints", {}).items()}
+        return cls(**{**data, "endpoints": endpoints})
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_load(
+    mix_name: str = "default",
+    requests: int = 500,
+    concurrency: int = 8,
+    rate: float | None = None,
+    duration: float | None = None,
+    warmup: int = 0,
+    seed: int = 0,
+) -> LoadReport:
+    """Replay a seeded request mix against in-process servers.
+
+    ``rate`` paces sends to that many requests per second across all
+    workers; ``duration`` (with ``rate``) sets the request count instead of
+    ``requests``. ``warmup`` requests from the same mix run first and are
+    not recorded, to compare cold and warm caches.
+    """
+    mix = MIXES[mix_name]
+    if rate and duration:
+        requests = max(1, int(rate * duration))
+    plan = build_plan(mix, warmup + requests, seed)
+    warm, plan = plan[:warmup], plan[warmup:]
+
+    latencies: dict[str, list[float]] = {name: [] for name in mix}
+    errors: dict[str, int] = {name: 0 for name in mix}
+    lock = threading.Lock()
+    next_index = 0
+
+    with LocalServers(list(mix)) as servers:
+        for name, body in warm:
+            send(servers.ports[name], ENDPOINTS[name].method, f"/api/{name}", body)
+
+        def worker() -> None:
+            nonlocal next_index
+            while True:
+                with lock:
+                    index = next_index
+                    next_index += 1
+                if index >= len(plan):
+                    return
+                name, body = plan[index]
+                scheduled = start + index / rate if rate else time.perf_counter()
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                try:
+                    status = send(servers.ports[name], ENDPOINTS[name].method, f"/api/{name}", body)
+                    ok = status < 400
+                except OSError:
+                    ok = False
+                elapsed = (time.perf_counter() - scheduled) * 1000.0
+                with lock:
+                    latencies[name].append(elapsed)
+                    if not ok:
+                        errors[name] += 1
+
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(max(1, concurrency))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = max(1e-9, time.perf_counter() - start)
+        cpu = time.process_time() - cpu_start
+
+    report = LoadReport(
+        mix=mix_name,
+        concurrency=concurrency,
+        rate=rate,
+        requests=len(plan),
+        wall_seconds=round(wall, 4),
+        throughput=round(len(plan) / wall, 2),
+        cpu_seconds=round(cpu, 4),
+        peak_rss_mb=_peak_rss_mb(),
+        commit=_commit(),
+    )
+    for name, values in latencies.items():
+        if not values:
+            continue
+        report.endpoints[name] = EndpointStats(
+            requests=len(values),
+            errors=errors[name],
+            throughput=round(len(values) / wall, 2),
+            mean_ms=round(sum(values) / len(values), 3),
+            p50_ms=round(percentile(values, 50), 3),
+            p95_ms=round(percentile(values, 95), 3),
+            p99_ms=round(percentile(values, 99), 3),
+            max_ms=round(max(values), 3),
+        )
+    return report
+
+
+def format_report(report: LoadReport, baseline: LoadReport | None = None) -> str:
+    lines = [
+        f"mix={report.mix} concurrency={report.concurrency} rate={report.rate or 'max'} "
+        f"commit={report.commit or '?'}",
+        f"{report.requests} requests in {report.wall_seconds:.2f}s = {report.throughput:,.1f} req/s, "
+        f"CPU {report.cpu_seconds:.2f}s, peak RSS "
+        + (f"{report.peak_rss_mb:.1f} MB" if report.peak_rss_mb is not None else "n/a"),
+        f"{'endpoint':<10} {'reqs':>6} {'err':>4} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}",
+    ]
+    for name, s in report.endpoints.items():
+        line = (
+            f"{name:<10} {s.requests:>6} {s.errors:>4} {s.throughput:>9.1f} "
+            f"{s.p50_ms:>9.2f} {s.p95_ms:>9.2f} {s.p99_ms:>9.2f} {s.max_ms:>9.2f}"
+        )
+        base = baseline.endpoints.get(name) if baseline else None
+        if base is not None and base.p50_ms > 0 and base.p95_ms > 0:
+            line += f"  p50 {s.p50_ms / base.p50_ms - 1:+.0%} p95 {s.p95_ms / base.p95_ms - 1:+.0%}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description=__doc__.split("\n")[0])
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=None, help="target requests per second (default: as fast as possible)")
+    parser.add_argument("--duration", type=float, default=None, help="seconds to run at --rate")
+    parser.add_argument("--warmup", type=int, default=0, help="unrecorded requests sent first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, default=None, help="write the report here")
+    parser.add_argument("--compare", type=Path, default=None, help="show changes against a saved report")
+    args = parser.parse_args(argv)
+
+    report = run_load(args.mix, args.requests, args.concurrency, args.rate, args.duration, args.warmup, args.seed)
+    baseline = LoadReport.from_json(json.loads(args.compare.read_text())) if args.compare else None
+    print(format_report(report, baseline))
+    if args.json:
+        args.json.write_text(json.dumps(report.to_json(), indent=2) + "\n")
+    return 1 if any(s.errors for s in report.endpoints.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
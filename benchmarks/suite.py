@@ -0,0 +1,248 @@
+"""Benchmark cases, timing and baseline comparison."""
+
+from __future__ import annotations
+
+import json
+import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from engine import kernel
+from engine.asymptotic import approximate_battle
+from engine.combat import resolve_battle, resolve_single_round
+from engine.game import GameRules, GreedyPolicy, play_game
+from engine.models import Army, Hero, Structure
+from engine.probabilities import win_probability_exact
+from engine.simulation import SimulationConfig, run_simulation
+from engine.starmap import Territory, ring_galaxy
+from engine.structures import STRUCTURES, compile_structures
+from engine.tuning import PLANET_UPGRADE_MODES, CombatTuning
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+# Fractional slowdown that counts as a regression. Best-of-N timings on a
+# shared machine still wander by 20-30%, so tighter gates need quieter hardware.
+DEFAULT_THRESHOLD = 0.35
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    run: Callable[[], int]  # does one batch of work, returns the number of items
+    unit: str  # "battles/s"-style throughput, or "ms/solve" latency
+    setup: Callable[[], None] | None = None  # runs untimed before every repeat
+
+    @property
+    def higher_is_better(self) -> bool:
+        return self.unit.endswith("/s")
+
+
+@dataclass(frozen=True)
+class Measurement:
+    name: str
+    value: float
+    unit: str
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def register(name: str, unit: str, setup: Callable[[], None] | None = None):
+    """Register a benchmark case under ``name``."""
+    def decorator(run: Callable[[], int]) -> Callable[[], int]:
+        BENCHMARKS[name] = Benchmark(name, run, unit, setup)
+        return run
+    return decorator
+
+
+# --- Canonical configurations ---
+
+@dataclass(frozen=True)
+class Scenario:
+    attacker_units: int
+    defender_units: int
+    hero: Hero | None = None
+    structures: tuple[Structure, ...] = ()
+    tuning: CombatTuning = CombatTuning()
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "vanilla-10v10": Scenario(10, 10),
+    "admiral-vs-all": Scenario(10, 10, Hero("Admiral", 12), tuple(STRUCTURES.values())),
+}
+for _mode in PLANET_UPGRADE_MODES:
+    SCENARIOS[f"{_mode}-3"] = Scenario(
+        10, 10, tuning=CombatTuning(planet_upgrade_level=3, planet_upgrade_mode=_mode),
+    )
+
+ROUNDS_PER_RUN = 20000
+BATTLES_PER_RUN = 2000
+SIMULATIONS_PER_RUN = 2000
+CAPTURES_PER_RUN = 5000
+GAMES_PER_RUN = 20
+
+
+def _round_case(scenario: Scenario) -> Callable[[], int]:
+    def run() -> int:
+        rng = random.Random(1)
+        effects = compile_structures(list(scenario.structures))
+        attacker = Army(units=scenario.attacker_units, hero=scenario.hero)
+        defender = Army(units=scenario.defender_units, structures=list(scenario.structures))
+        for _ in range(ROUNDS_PER_RUN):
+            attacker.units = scenario.attacker_units
+            defender.units = scenario.defender_units
+            resolve_single_round(attacker, defender, rng, scenario.tuning, effects.start_battle())
+        return ROUNDS_PER_RUN
+    return run
+
+
+def _battle_case(scenario: Scenario) -> Callable[[], int]:
+    def run() -> int:
+        rng = random.Random(2)
+        for _ in range(BATTLES_PER_RUN):
+            attacker = Army(units=scenario.attacker_units, hero=scenario.hero)
+            defender = Army(units=scenario.defender_units, structures=list(scenario.structures))
+            resolve_battle(attacker, defender, rng=rng, tuning=scenario.tuning)
+        return BATTLES_PER_RUN
+    return run
+
+
+def _simulation_case(scenario: Scenario) -> Callable[[], int]:
+    def run() -> int:
+        config = SimulationConfig(
+            attacker_units=scenario.attacker_units,
+            defender_units=scenario.defender_units,
+            attacker_hero=scenario.hero,
+            defender_structures=list(scenario.structures),
+            tuning=scenario.tuning,
+            num_battles=SIMULATIONS_PER_RUN,
+        )
+        run_simulation(config, random.Random(3))
+        return SIMULATIONS_PER_RUN
+    return run
+
+
+for _name, _scenario in SCENARIOS.items():
+    register(f"round/{_name}", "rounds/s")(_round_case(_scenario))
+    register(f"battle/{_name}", "battles/s")(_battle_case(_scenario))
+    register(f"simulation/{_name}", "battles/s")(_simulation_case(_scenario))
+
+
+@register("exact/win_probability_exact-50x50", "ms/solve")
+def _exact_50() -> int:
+    win_probability_exact(50, 50)
+    return 1
+
+
+@register("exact/win_probability_exact-200x200", "ms/solve")
+def _exact_200() -> int:
+    win_probability_exact(200, 200)
+    return 1
+
+
+@register("exact/surface-admiral-vs-all-100x100", "ms/solve", setup=kernel.clear_caches)
+def _surface_admiral() -> int:
+    scenario = SCENARIOS["admiral-vs-all"]
+    rules = kernel.compile_rules(scenario.hero, list(scenario.structures), scenario.tuning)
+    kernel.win_probability_surface(100, 100, rules)
+    return 1
+
+
+@register("exact/rational-50x50", "ms/solve", setup=kernel.clear_caches)
+def _rational_50() -> int:
+    kernel.win_probability_rational(50, 50)
+    return 1
+
+
+@register("approximate/100000v116000", "ms/solve")
+def _approximate_huge() -> int:
+    approximate_battle(100000, 116000)
+    return 1
+
+
+@register("map/capture-and-reach", "captures/s")
+def _map_capture_and_reach() -> int:
+    galaxy = ring_galaxy()
+    rng = random.Random(0)
+    territory = Territory(galaxy, 2, [p % 2 for p in range(galaxy.size)])
+    for _ in range(CAPTURES_PER_RUN):
+        territory.set_owner(rng.randrange(galaxy.size), rng.randrange(2))
+        territory.reachable(rng.randrange(galaxy.size), 3)
+    return CAPTURES_PER_RUN
+
+
+@register("game/greedy-2p-battery-only", "games/s")
+def _greedy_games() -> int:
+    galaxy = ring_galaxy()
+    rules = GameRules(structure_keys=("orbital_battery",))
+    for seed in range(GAMES_PER_RUN):
+        play_game(galaxy, [GreedyPolicy(), GreedyPolicy()], rules, seed=seed)
+    return GAMES_PER_RUN
+
+
+# --- Measuring and comparing ---
+
+def measure(benchmark: Benchmark, repeats: int = 5) -> Measurement:
+    """Best of ``repeats`` runs after one warm-up, the least noisy estimate on a shared machine."""
+    best = float("inf")
+    items = 1
+    if benchmark.setup is not None:
+        benchmark.setup()
+    benchmark.run()
+    for _ in range(max(1, repeats)):
+        if benchmark.setup is not None:
+            benchmark.setup()
+        start = time.perf_counter()
+        items = benchmark.run()
+        best = min(best, time.perf_counter() - start)
+    best = max(best, 1e-9)
+    if benchmark.higher_is_better:
+        value = items / best
+    else:
+        value = best * 1000.0 / items
+    return Measurement(benchmark.name, value, benchmark.unit)
+
+
+def run_suite(names: list[str] | None = None, repeats: int = 5) -> list[Measurement]:
+    selected = BENCHMARKS if names is None else {n: BENCHMARKS[n] for n in names}
+    return [measure(b, repeats) for b in selected.values()]
+
+
+def load_baselines(path: Path = BASELINE_PATH) -> dict[str, Measurement]:
+    if not path.exists():
+        return {}
+    data = json.loads(path.read_text())
+    return {name: Measurement(name, entry["value"], entry["unit"]) for name, entry in data.items()}
+
+
+def save_baselines(measurements: list[Measurement], path: Path = BASELINE_PATH) -> None:
+    """Merge ``measurements`` into the baseline file, keeping other cases."""
+    data = {m.name: {"value": m.value, "unit": m.unit} for m in load_baselines(path).values()}
+    for m in measurements:
+        data[m.name] = {"value": round(m.value, 4), "unit": m.unit}
+    path.write_text(json.dumps(dict(sorted(data.items())), indent=2) + "\n")
+
+
+def relative_change(current: Measurement, baseline: Measurement) -> float:
+    """Fractional slowdown versus the baseline: positive is worse, negative is faster."""
+    if current.unit.endswith("/s"):
+        return (baseline.value - current.value) / baseline.value
+    return (current.value - baseline.value) / baseline.value
+
+
+def find_regressions(
+    measurements: list[Measurement],
+    baselines: dict[str, Measurement],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[tuple[Measurement, Measurement, float]]:
+    """(current, baseline, slowdown) for every case slower than ``threshold``."""
+    regressions = []
+    for m in measurements:
+        base = baselines.get(m.name)
+        if base is None or base.unit != m.unit or base.value <= 0:
+            continue
+        change = relative_change(m, base)
+        if change > threshold:
+            regressions.append((m, base, change))
+    return regressions
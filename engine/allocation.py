@@ -0,0 +1,106 @@
+"""Split reinforcement armies across several attack targets.
+
+Each target's win probability as a function of extra armies is read from
+a cached exact surface, then a knapsack-style DP over (target, armies
+spent) finds the split that maximizes the objective. No candidate split
+is ever simulated.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+
+from engine.kernel import compile_rules, win_probability_surface
+from engine.models import Hero, Structure
+from engine.tuning import CombatTuning
+
+OBJECTIVES: tuple[str, ...] = (
+    "expected_value",  # sum of value * P(capture) — expected planets when values are 1
+    "capture_all",  # probability every target falls
+)
+
+
+@dataclass
+class AllocationTarget:
+    defender_units: int
+    structures: list[Structure] = field(default_factory=list)
+    tuning: CombatTuning = field(default_factory=CombatTuning)
+    attacker_units: int = 1  # armies already on the planet attacking this target
+    hero: Hero | None = None
+    value: float = 1.0
+
+
+@dataclass
+class AllocationResult:
+    objective: str
+    allocation: list[int]  # reinforcements placed on each target's attacking planet
+    win_probabilities: list[float]
+    objective_value: float
+
+    @property
+    def expected_captures(self) -> float:
+        return sum(self.win_probabilities)
+
+
+def capture_curve(target: AllocationTarget, reinforcements: int) -> list[float]:
+    """Win probability against ``target`` for 0..reinforcements extra armies."""
+    rules = compile_rules(target.hero, target.structures, target.tuning)
+    top = target.attacker_units + reinforcements
+    surface = win_probability_surface(top, target.defender_units, rules)
+    return [surface[target.attacker_units + k][target.defender_units] for k in range(reinforcements + 1)]
+
+
+def allocate_reinforcements(
+    reinforcements: int,
+    targets: list[AllocationTarget],
+    objective: str = "expected_value",
+) -> AllocationResult:
+    """Find the optimal split of ``reinforcements`` across ``targets``.
+
+    Exact DP over targets and armies spent: O(targets * reinforcements^2)
+    table lookups, and optimal even when a capture curve is not concave.
+    Every army is placed: win probability never drops with more attackers.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective {objective!r}; expected one of {OBJECTIVES}")
+    budget = max(0, reinforcements)
+    if not targets:
+        return AllocationResult(objective=objective, allocation=[], win_probabilities=[], objective_value=0.0)
+
+    curves = [capture_curve(t, budget) for t in targets]
+    multiplicative = objective == "capture_all"
+
+    # best[n] = best objective over the targets seen so far using exactly n armies
+    best = [1.0 if multiplicative else 0.0] + [-math.inf] * budget
+    choices: list[list[int]] = []
+    for target, curve in zip(targets, curves):
+        nxt = [-math.inf] * (budget + 1)
+        pick = [0] * (budget + 1)
+        for spent in range(budget + 1):
+            if best[spent] == -math.inf:
+                continue
+            for k in range(budget - spent + 1):
+                if multiplicative:
+                    score = best[spent] * curve[k]
+                else:
+                    score = best[spent] + target.value * curve[k]
+                if score > nxt[spent + k]:
+                    nxt[spent + k] = score
+                    pick[spent + k] = k
+        best = nxt
+        choices.append(pick)
+
+    allocation = [0] * len(targets)
+    remaining = budget
+    for i in range(len(targets) - 1, -1, -1):
+        allocation[i] = choices[i][remaining]
+        remaining -= allocation[i]
+
+    win_probabilities = [curves[i][allocation[i]] for i in range(len(targets))]
+    return AllocationResult(
+        objective=objective,
+        allocation=allocation,
+        win_probabilities=win_probabilities,
+        objective_value=best[budget],
+    )
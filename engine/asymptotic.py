@@ -0,0 +1,188 @@
+"""Large-army approximation of battle outcomes.
+
+Away from the boundary every round uses the same dice (3 attack dice
+against the full defender pool), so losses form a random walk with i.i.d.
+steps. The attacker wins when the defender's cumulative losses reach the
+defender's stack before the attacker's reach its stack minus one. Both
+first-passage times are close to normal for big stacks, so the outcome
+costs a few hundred normal CDF evaluations whatever the stack sizes.
+The endgame near the boundary is finished with the exact DP, and small
+battles go to the exact DP outright.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+
+from engine.kernel import RoundRules, round_denominator, round_loss_counts, win_probability_surface
+
+# Above this many units on either side, estimate_battle switches to the
+# approximation.
+EXACT_THRESHOLD = 150
+# Defender stacks at or below this are finished with the exact DP.
+BOUNDARY_BAND = 8
+# Attacker stacks covered by the exact boundary DP.
+BAND_ATTACKER_CAP = 200
+
+# Berry-Esseen constant for i.i.d. sums (Shevtsova 2011).
+_BERRY_ESSEEN_C = 0.4748
+# Covers the discreteness the normal approximation ignores. Calibrated
+# against the exact DP over stacks from 40 to 400 in every tuning mode;
+# the worst observed error is under 30% of the reported estimate. It is
+# an empirical margin, so ``estimated_error`` is not a proven bound.
+_BOUNDARY_ERROR = 0.2
+
+
+@dataclass(frozen=True)
+class StepMoments:
+    """Mean, variance and third absolute moment of one interior round."""
+
+    stay: float
+    mean_attacker: float
+    mean_defender: float
+    var_attacker: float
+    var_defender: float
+    cov: float
+    rho_attacker: float  # E|X - mean|^3
+    rho_defender: float
+
+
+@dataclass(frozen=True)
+class ApproximateOutcome:
+    win_probability: float
+    expected_rounds: float
+    # Calibrated estimate of |approx - exact| win probability: a Berry-Esseen
+    # term plus the empirical ``_BOUNDARY_ERROR`` margin, not a rigorous bound.
+    estimated_error: float
+    method: str  # "exact" or "asymptotic"
+
+
+def _phi(x: float) -> float:
+    return math.exp(-0.5 * x * x) / math.sqrt(2.0 * math.pi)
+
+
+def _cdf(x: float) -> float:
+    return 0.5 * math.erfc(-x / math.sqrt(2.0))
+
+
+@lru_cache(maxsize=256)
+def step_moments(rules: RoundRules) -> StepMoments:
+    """Loss moments of one round with 3 attack dice vs the full defender pool.
+
+    Moments are conditioned on the round changing something; ``stay`` is
+    the chance a round is fully absorbed, which only stretches time.
+    Limited-use absorb is left out here and added to the defender's stack.
+    """
+    atk_dice = 3
+    def_dice = rules.defender_dice(2)
+    total = round_denominator(rules, atk_dice, def_dice)
+    outcomes = [((al, dl), count) for (al, dl, _), count in round_loss_counts(rules, atk_dice, def_dice, 0)]
+    stay_count = sum(count for (al, dl), count in outcomes if al == 0 and dl == 0)
+    moving = total - stay_count
+    if moving == 0:
+        return StepMoments(1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+    moves = [((al, dl), count / moving) for (al, dl), count in outcomes if al or dl]
+    ma = sum(al * p for (al, _), p in moves)
+    md = sum(dl * p for (_, dl), p in moves)
+    va = sum((al - ma) ** 2 * p for (al, _), p in moves)
+    vd = sum((dl - md) ** 2 * p for (_, dl), p in moves)
+    cov = sum((al - ma) * (dl - md) * p for (al, dl), p in moves)
+    ra = sum(abs(al - ma) ** 3 * p for (al, _), p in moves)
+    rd = sum(abs(dl - md) ** 3 * p for (_, dl), p in moves)
+    return StepMoments(stay_count / total, ma, md, va, vd, cov, ra, rd)
+
+
+def approximate_battle(
+    attacker_units: int,
+    defender_units: int,
+    rules: RoundRules = RoundRules(),
+) -> ApproximateOutcome:
+    """Diffusion through the interior, exact DP inside the boundary band.
+
+    The defender's losses are a renewal process, so the round T at which
+    the defender first drops into the band (``BOUNDARY_BAND`` units or
+    fewer) is close to normal. So is the attacker's stack at that moment.
+    The battle is finished from there with the exact win-probability
+    surface, which captures endgames the interior walk cannot (e.g. one
+    absorbing structure makes a 1-unit garrison unbeatable). Attacker
+    stacks beyond ``BAND_ATTACKER_CAP`` reuse the cap's value, since win
+    probability saturates in attacker size.
+    """
+    m = step_moments(rules)
+    band = min(BOUNDARY_BAND, defender_units)
+    surface = win_probability_surface(BAND_ATTACKER_CAP, band, rules.with_charges(0))
+
+    def finish(a: int) -> float:
+        return surface[min(max(a, 1), BAND_ATTACKER_CAP)][band]
+
+    budget_d = defender_units - band + rules.absorb_charges
+    if budget_d <= 0:
+        return ApproximateOutcome(finish(attacker_units), math.nan, 0.0, "exact")
+    if m.mean_defender <= 0.0:
+        # Nothing ever gets through: the defender cannot lose.
+        return ApproximateOutcome(0.0, math.inf, 0.0, "asymptotic")
+
+    # Rounds (ignoring fully absorbed ones) until the defender reaches the band.
+    mean_t = budget_d / m.mean_defender
+    var_t = budget_d * m.var_defender / m.mean_defender ** 3
+    # Attacker stack at that round: A - S_a(T) by the delta method, where
+    # the attacker's noise correlates with T through the shared dice.
+    mean_a = attacker_units - m.mean_attacker * mean_t
+    var_a = (
+        m.var_attacker * mean_t
+        + m.mean_attacker ** 2 * var_t
+        - 2.0 * m.mean_attacker * m.cov * mean_t / m.mean_defender
+    )
+    sd_a = math.sqrt(max(var_a, 1e-12))
+
+    win = 0.0
+    lower = 0.0  # P(A_entry < a - 0.5) for the current a
+    for a in range(2, BAND_ATTACKER_CAP):
+        upper = _cdf((a + 0.5 - mean_a) / sd_a)
+        win += (upper - lower) * finish(a)
+        lower = upper
+    win += (1.0 - lower) * finish(BAND_ATTACKER_CAP)
+
+    # Clark (1961): E[min(T_a, T_d)] for jointly normal passage times.
+    budget_a = max(0.5, attacker_units - 1.5)
+    full_d = defender_units + rules.absorb_charges - 0.5
+    mean_ta = budget_a / m.mean_attacker if m.mean_attacker > 0 else math.inf
+    mean_td = full_d / m.mean_defender
+    if math.isinf(mean_ta):
+        moving_rounds = mean_td
+    else:
+        var_ta = budget_a * m.var_attacker / m.mean_attacker ** 3
+        var_td = full_d * m.var_defender / m.mean_defender ** 3
+        cov_t = min(mean_ta, mean_td) * m.cov / (m.mean_attacker * m.mean_defender)
+        theta = math.sqrt(max(1e-12, var_ta + var_td - 2.0 * cov_t))
+        alpha = (mean_ta - mean_td) / theta
+        expected_max = mean_ta * _cdf(alpha) + mean_td * _cdf(-alpha) + theta * _phi(alpha)
+        moving_rounds = mean_ta + mean_td - expected_max
+    expected_rounds = moving_rounds / (1.0 - m.stay)
+
+    n = max(1.0, min(mean_t, mean_ta))
+    be = 0.0
+    if m.var_attacker > 0:
+        be += _BERRY_ESSEEN_C * m.rho_attacker / (m.var_attacker ** 1.5 * math.sqrt(n))
+    if m.var_defender > 0:
+        be += _BERRY_ESSEEN_C * m.rho_defender / (m.var_defender ** 1.5 * math.sqrt(n))
+    bound = min(1.0, be + _BOUNDARY_ERROR / math.sqrt(n))
+    return ApproximateOutcome(min(1.0, max(0.0, win)), expected_rounds, bound, "asymptotic")
+
+
+def estimate_battle(
+    attacker_units: int,
+    defender_units: int,
+    rules: RoundRules = RoundRules(),
+    threshold: int = EXACT_THRESHOLD,
+) -> ApproximateOutcome:
+    """Exact DP for small stacks, the asymptotic approximation above ``threshold``."""
+    if attacker_units <= 1 or defender_units <= 0:
+        return ApproximateOutcome(1.0 if defender_units <= 0 else 0.0, 0.0, 0.0, "exact")
+    if max(attacker_units, defender_units) <= threshold:
+        q = win_probability_surface(attacker_units, defender_units, rules)
+        return ApproximateOutcome(q[attacker_units][defender_units], math.nan, 0.0, "exact")
+    return approximate_battle(attacker_units, defender_units, rules)
@@ -0,0 +1,157 @@
+"""Search tuning and structure parameters for a target win probability.
+
+Designers state goals such as "Admiral with max upgrades vs all three
+structures should be 50/50 at 10v10". The solver runs a coordinate search
+over integer parameters, scoring every candidate with the exact battle
+solver. Kernel caches persist between iterations (and inside each worker
+process, or across workers through an installed ``engine.tablestore``), so
+later iterations only pay for genuinely new rule sets.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields, replace
+from typing import Iterable
+
+from engine import tablestore
+from engine.kernel import RoundRules, compile_rules, win_probability_surface
+from engine.models import Hero, Structure
+from engine.tuning import CombatTuning
+
+TUNING_PARAMETERS: frozenset[str] = frozenset(
+    f.name for f in fields(CombatTuning) if f.name != "planet_upgrade_mode"
+)
+# RoundRules fields stand in for structure parameters (absorb per round,
+# extra defender dice) and override whatever the structures compile to.
+RULE_PARAMETERS: frozenset[str] = frozenset(
+    f.name for f in fields(RoundRules) if f.name != "absorb_chances"
+)
+
+
+@dataclass
+class BalanceScenario:
+    attacker_units: int
+    defender_units: int
+    target_win_probability: float = 0.5
+    hero: Hero | None = None
+    structures: list[Structure] = field(default_factory=list)
+    tuning: CombatTuning = field(default_factory=CombatTuning)
+
+
+@dataclass
+class BalanceResult:
+    parameters: dict[str, int]
+    win_probabilities: list[float]
+    max_error: float
+    converged: bool
+    iterations: int
+    evaluations: int
+
+
+def scenario_rules(scenario: BalanceScenario, parameters: dict[str, int]) -> RoundRules:
+    """Compile a scenario with candidate parameters applied."""
+    tuning_overrides = {k: v for k, v in parameters.items() if k in TUNING_PARAMETERS}
+    rule_overrides = {k: v for k, v in parameters.items() if k in RULE_PARAMETERS}
+    tuning = replace(scenario.tuning, **tuning_overrides)
+    rules = compile_rules(scenario.hero, scenario.structures, tuning)
+    return replace(rules, **rule_overrides) if rule_overrides else rules
+
+
+def evaluate_parameters(scenarios: list[BalanceScenario], parameters: dict[str, int]) -> list[float]:
+    """Exact attacker win probability of every scenario under ``parameters``."""
+    results = []
+    for scenario in scenarios:
+        rules = scenario_rules(scenario, parameters)
+        surface = win_probability_surface(scenario.attacker_units, scenario.defender_units, rules)
+        results.append(surface[scenario.attacker_units][scenario.defender_units])
+    return results
+
+
+def _score(scenarios: list[BalanceScenario], probabilities: list[float]) -> tuple[float, float]:
+    errors = [abs(p - s.target_win_probability) for s, p in zip(scenarios, probabilities)]
+    return max(errors), sum(e * e for e in errors)
+
+
+def _default_start(scenario: BalanceScenario, name: str, values: list[int]) -> int:
+    # Start from what the first scenario already uses, when it is in range.
+    if name in TUNING_PARAMETERS:
+        default = getattr(scenario.tuning, name)
+    else:
+        default = getattr(scenario_rules(scenario, {}), name)
+    return default if default in values else values[0]
+
+
+def _evaluate_candidate(args: tuple[list[BalanceScenario], dict[str, int]]) -> list[float]:
+    return evaluate_parameters(*args)
+
+
+def solve_balance(
+    scenarios: list[BalanceScenario],
+    search_space: dict[str, Iterable[int]],
+    start: dict[str, int] | None = None,
+    tolerance: float = 0.01,
+    max_iterations: int = 20,
+    workers: int = 1,
+) -> BalanceResult:
+    """Coordinate search until every scenario is within ``tolerance`` of its target.
+
+    Each iteration sweeps the parameters in order, trying every value in
+    that parameter's range with the others held fixed and keeping the one
+    with the smallest squared error. The search stops when all errors are
+    within tolerance or a full sweep changes nothing. ``workers > 1``
+    evaluates each sweep's candidates in a process pool.
+    """
+    unknown = set(search_space) - TUNING_PARAMETERS - RULE_PARAMETERS
+    if unknown:
+        raise ValueError(f"Unknown balance parameters: {sorted(unknown)}")
+    if not scenarios:
+        raise ValueError("At least one scenario is required")
+
+    space = {name: sorted(set(values)) for name, values in search_space.items()}
+    current = {name: _default_start(scenarios[0], name, values) for name, values in space.items()}
+    if start:
+        current.update({k: v for k, v in start.items() if k in space})
+
+    executor = ProcessPoolExecutor(max_workers=workers, **tablestore.pool_kwargs()) if workers > 1 else None
+    try:
+        probabilities = evaluate_parameters(scenarios, current)
+        max_error, sq_error = _score(scenarios, probabilities)
+        evaluations = 1
+        iterations = 0
+
+        while max_error > tolerance and iterations < max_iterations:
+            iterations += 1
+            improved = False
+            for name, values in space.items():
+                candidates = [dict(current, **{name: v}) for v in values if v != current[name]]
+                if not candidates:
+                    continue
+                jobs = [(scenarios, c) for c in candidates]
+                if executor is not None:
+                    outcomes = list(executor.map(_evaluate_candidate, jobs))
+                else:
+                    outcomes = [_evaluate_candidate(job) for job in jobs]
+                evaluations += len(candidates)
+                for candidate, probs in zip(candidates, outcomes):
+                    cand_max, cand_sq = _score(scenarios, probs)
+                    if cand_sq < sq_error - 1e-15:
+                        current, probabilities = candidate, probs
+                        max_error, sq_error = cand_max, cand_sq
+                        improved = True
+                if max_error <= tolerance:
+                    break
+            if not improved:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return BalanceResult(
+        parameters=current,
+        win_probabilities=probabilities,
+        max_error=max_error,
+        converged=max_error <= tolerance,
+        iterations=iterations,
+        evaluations=evaluations,
+    )
@@ -0,0 +1,124 @@
+"""Exact planner for attack chains (blitzes) across a path of planets.
+
+A turn often looks like: attack planet A, move the survivors in, attack
+planet B from A, and so on. Each step convolves the cached end-state
+distribution of one battle with the distribution of units that arrived,
+so no dice are simulated.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable
+
+from engine.kernel import battle_distribution, compile_rules
+from engine.models import Hero, Structure
+from engine.tuning import CombatTuning
+
+# (step_index, attacker_survivors) -> units moved into the captured planet
+MoveInPolicy = Callable[[int, int], int]
+
+
+def leave_behind(units: int) -> MoveInPolicy:
+    """Move-in policy that garrisons ``units`` armies on every planet left behind."""
+    keep = max(1, units)
+
+    def policy(step: int, survivors: int) -> int:  # noqa: ARG001
+        return survivors - keep
+
+    return policy
+
+
+@dataclass
+class ChainTarget:
+    units: int
+    structures: list[Structure] = field(default_factory=list)
+    tuning: CombatTuning = field(default_factory=CombatTuning)
+
+
+@dataclass
+class ChainStep:
+    target_index: int
+    attack_probability: float  # chance the chain reaches this planet
+    capture_probability: float  # chance this planet (and all before it) falls
+    # Joint distributions with capturing this planet:
+    survivors: dict[int, float]  # attacker units left after the battle
+    moved_in: dict[int, float]  # units advanced onto the captured planet
+    expected_rounds: float  # unconditional, over every chain that attacks here
+
+
+@dataclass
+class ChainResult:
+    steps: list[ChainStep]
+    # reach_distribution[k] = probability that exactly k planets are captured
+    reach_distribution: list[float]
+
+    @property
+    def expected_captures(self) -> float:
+        return sum(k * p for k, p in enumerate(self.reach_distribution))
+
+    def full_chain_probability(self) -> float:
+        return self.reach_distribution[-1]
+
+
+def _clamp_move(requested: int, survivors: int) -> int:
+    # The captured planet needs at least one army; the source keeps one.
+    return max(1, min(survivors - 1, requested))
+
+
+def attack_chain_distribution(
+    attacker_units: int,
+    targets: list[ChainTarget],
+    hero: Hero | None = None,
+    move_in: MoveInPolicy | None = None,
+    hero_follows_stack: bool = False,
+) -> ChainResult:
+    """Compute exactly how far an attack chain gets and what is left at each step.
+
+    ``attacker_units`` is the whole stack on the starting planet, including
+    the army that must stay behind. The Command Ship only boosts the attack
+    from the planet it sits on, so the hero applies to the first battle
+    unless ``hero_follows_stack`` is set. ``move_in`` defaults to
+    ``leave_behind(1)``, i.e. push everything forward.
+    """
+    policy = move_in or leave_behind(1)
+    current: dict[int, float] = {attacker_units: 1.0}
+    steps: list[ChainStep] = []
+    reach = [0.0] * (len(targets) + 1)
+
+    for index, target in enumerate(targets):
+        step_hero = hero if (index == 0 or hero_follows_stack) else None
+        rules = compile_rules(step_hero, target.structures, target.tuning)
+
+        attack_probability = sum(current.values())
+        survivors: dict[int, float] = {}
+        expected_rounds = 0.0
+        for units, p in current.items():
+            if units <= 1:
+                reach[index] += p
+                continue
+            outcome = battle_distribution(units, target.units, rules)
+            expected_rounds += p * outcome.expected_rounds
+            for remaining, q in outcome.attacker_wins.items():
+                survivors[remaining] = survivors.get(remaining, 0.0) + p * q
+            reach[index] += p * (1.0 - outcome.win_probability)
+
+        moved_in: dict[int, float] = {}
+        for remaining, p in survivors.items():
+            moved = _clamp_move(policy(index, remaining), remaining)
+            moved_in[moved] = moved_in.get(moved, 0.0) + p
+
+        steps.append(
+            ChainStep(
+                target_index=index,
+                attack_probability=attack_probability,
+                capture_probability=sum(survivors.values()),
+                survivors=dict(sorted(survivors.items())),
+                moved_in=dict(sorted(moved_in.items())),
+                expected_rounds=expected_rounds,
+            )
+        )
+        current = moved_in
+
+    reach[len(targets)] += sum(current.values())
+    return ChainResult(steps=steps, reach_distribution=reach)
@@ -1,100 +1,166 @@
 from __future__ import annotations
 
+import inspect
 import random as _random
-from typing import Any
+from functools import lru_cache
+from typing import Any, Callable
 
+from engine import instrument
 from engine.dice import reroll_lowest
 from engine.heroes import roll_with_hero
-from engine.models import Army, BattleResult, RoundResult
-from engine.structures import damage_absorbed, extra_defender_dice
+from engine.models import Army, BattleResult, Hero, RoundLog, RoundResult
+from engine.structures import BattleEffects, StructureEffects, compile_structures
 from engine.tuning import CombatTuning
 
 
-def resolve_single_round(
-    attacker: Army,
-    defender: Army,
-    rng: Any = _random,
-    tuning: CombatTuning | None = None,
-) -> RoundResult:
-    """Resolve one round of combat between attacker and defender.
+class _RoundSetup:
+    """Everything about a round that is fixed for a hero, structures and tuning.
 
-    Risk rules:
-    - Attacker rolls up to 3 dice, must leave at least 1 unit behind
-    - Defender rolls up to 2 dice (+ bonus from structures)
-    - Compare highest pairs, defender wins ties
-    - Structures absorb defender losses (damage reduction)
+    Built once per combination, so a battle does not redo the tuning
+    arithmetic or rebuild its note strings every round. Notes are shared
+    tuples, one per (attacker die suppressed, losses absorbed) outcome.
     """
-    notes: list[str] = []
-    active_tuning = tuning or CombatTuning()
+
+    __slots__ = (
+        "hero", "bonus_dice", "rerolls", "attacker_highest_penalty", "atk_bonus", "def_bonus",
+        "ties_to_attacker", "_before_suppress", "_after_suppress", "_notes",
+    )
+
+    def __init__(self, hero: Hero | None, effects: StructureEffects, tuning: CombatTuning) -> None:
+        self.hero = hero
+        self.bonus_dice = effects.extra_defender_dice
+        self.rerolls = tuning.defender_rerolls_per_round()
+        self.attacker_highest_penalty = tuning.attacker_highest_die_penalty()
+        self.atk_bonus = tuning.attacker_total_bonus()
+        self.def_bonus = tuning.defender_total_bonus()
+        self.ties_to_attacker = effects.ties_to_attacker
+
+        before: list[str] = []
+        if self.bonus_dice > 0:
+            before.append(f"Orbital Battery grants +{self.bonus_dice} defender die")
+        if hero and hero.die_size > 6:
+            before.append(f"{hero.name} upgrades one attack die to d{hero.die_size}")
+        if self.rerolls > 0:
+            rerolls = self.rerolls
+            before.append(f"Planet upgrade rerolls defender's lowest die {rerolls} time{'s' if rerolls > 1 else ''}")
+
+        after: list[str] = []
+        hero_upgrade_bonus = tuning.hero_upgrade_bonus()
+        planet_upgrade_bonus = tuning.planet_upgrade_bonus()
+        planet_upgrade_mode = tuning.normalized_planet_upgrade_mode()
+        if hero_upgrade_bonus > 0:
+            after.append(f"Hero upgrades add +{hero_upgrade_bonus} attacker ability")
+        if planet_upgrade_bonus > 0:
+            after.append(f"Planet upgrades add +{planet_upgrade_bonus} defender ability")
+        if tuning.clamped_planet_upgrade_level() > 0 and planet_upgrade_mode != "flat_bonus":
+            after.append(f"Planet upgrade mode: {planet_upgrade_mode}")
+        if tuning.attacker_ability != 0:
+            after.append(f"Attacker base ability modifier: {tuning.attacker_ability:+d}")
+        if tuning.defender_ability != 0:
+            after.append(f"Defender base ability modifier: {tuning.defender_ability:+d}")
+        if self.ties_to_attacker:
+            after.append("Structures hand ties to the attacker")
+
+        self._before_suppress = tuple(before)
+        self._after_suppress = tuple(after)
+        self._notes: dict[tuple[bool, int], tuple[str, ...]] = {}
+
+    def notes(self, suppressed: bool, absorbed: int) -> tuple[str, ...]:
+        key = (suppressed, absorbed)
+        notes = self._notes.get(key)
+        if notes is None:
+            middle = (f"Planet upgrade suppresses highest attacker die by {self.attacker_highest_penalty}",)
+            tail = (f"Structures absorb {absorbed} defender loss{'es' if absorbed > 1 else ''}",)
+            notes = (
+                self._before_suppress
+                + (middle if suppressed else ())
+                + self._after_suppress
+                + (tail if absorbed > 0 else ())
+            )
+            self._notes[key] = notes
+        return notes
+
+
+@lru_cache(maxsize=256)
+def _round_setup(hero: Hero | None, effects: StructureEffects, tuning: CombatTuning) -> _RoundSetup:
+    return _RoundSetup(hero, effects, tuning)
+
+
+def _play_round(
+    attacker: Army,
+    defender: Army,
+    rng: Any,
+    setup: _RoundSetup,
+    effects: BattleEffects,
+) -> tuple[list[int], list[int], int, int, tuple[str, ...]]:
+    """Roll and apply one round; return (attacker rolls, defender rolls, losses each, notes)."""
+    instrument.count("rounds")
 
     # Determine dice counts
     atk_dice = min(3, attacker.units - 1)
-    base_def_dice = min(2, defender.units)
-    bonus_dice = extra_defender_dice(defender.structures)
-    def_dice = base_def_dice + bonus_dice
-    if bonus_dice > 0:
-        notes.append(f"Orbital Battery grants +{bonus_dice} defender die")
+    def_dice = min(2, defender.units) + setup.bonus_dice
 
     # Roll dice. Heroes upgrade attacker dice only.
-    atk_rolls = roll_with_hero(atk_dice, attacker.hero, rng)
+    atk_rolls = roll_with_hero(atk_dice, setup.hero, rng)
     def_rolls = roll_with_hero(def_dice, None, rng)
 
-    if attacker.hero and attacker.hero.die_size > 6:
-        notes.append(f"{attacker.hero.name} upgrades one attack die to d{attacker.hero.die_size}")
-
-    hero_upgrade_bonus = active_tuning.hero_upgrade_bonus()
-    planet_upgrade_bonus = active_tuning.planet_upgrade_bonus()
-    planet_upgrade_mode = active_tuning.normalized_planet_upgrade_mode()
-    rerolls = active_tuning.defender_rerolls_per_round()
-    attacker_highest_penalty = active_tuning.attacker_highest_die_penalty()
-    atk_bonus = active_tuning.attacker_total_bonus()
-    def_bonus = active_tuning.defender_total_bonus()
-
-    if rerolls > 0:
-        for _ in range(rerolls):
-            original_lowest = def_rolls[-1] if def_rolls else 0
-            rerolled = reroll_lowest(def_rolls, rng=rng)
-            if rerolled and rerolled[-1] > original_lowest:
-                def_rolls = rerolled
-        notes.append(f"Planet upgrade rerolls defender's lowest die {rerolls} time{'s' if rerolls > 1 else ''}")
-
-    if attacker_highest_penalty > 0 and atk_rolls:
-        atk_rolls[0] = max(1, atk_rolls[0] - attacker_highest_penalty)
-        atk_rolls = sorted(atk_rolls, reverse=True)
-        notes.append(f"Planet upgrade suppresses highest attacker die by {attacker_highest_penalty}")
-
-    if hero_upgrade_bonus > 0:
-        notes.append(f"Hero upgrades add +{hero_upgrade_bonus} attacker ability")
-    if planet_upgrade_bonus > 0:
-        notes.append(f"Planet upgrades add +{planet_upgrade_bonus} defender ability")
-    if active_tuning.clamped_planet_upgrade_level() > 0 and planet_upgrade_mode != "flat_bonus":
-        notes.append(f"Planet upgrade mode: {planet_upgrade_mode}")
-    if active_tuning.attacker_ability != 0:
-        notes.append(f"Attacker base ability modifier: {active_tuning.attacker_ability:+d}")
-    if active_tuning.defender_ability != 0:
-        notes.append(f"Defender base ability modifier: {active_tuning.defender_ability:+d}")
+    for _ in range(setup.rerolls):
+        original_lowest = def_rolls[-1] if def_rolls else 0
+        rerolled = reroll_lowest(def_rolls, rng=rng)
+        if rerolled and rerolled[-1] > original_lowest:
+            def_rolls = rerolled
+
+    suppressed = setup.attacker_highest_penalty > 0 and bool(atk_rolls)
+    if suppressed:
+        atk_rolls[0] = max(1, atk_rolls[0] - setup.attacker_highest_penalty)
+        atk_rolls.sort(reverse=True)
 
     # Compare sorted pairs. Defender wins ties (standard Risk).
     atk_losses = 0
     def_losses = 0
-    pairs = min(len(atk_rolls), len(def_rolls))
-
-    for i in range(pairs):
-        if atk_rolls[i] + atk_bonus > def_rolls[i] + def_bonus:
+    atk_bonus = setup.atk_bonus
+    def_bonus = setup.def_bonus
+    ties_to_attacker = setup.ties_to_attacker
+    for atk_roll, def_roll in zip(atk_rolls, def_rolls):
+        atk_total = atk_roll + atk_bonus
+        def_total = def_roll + def_bonus
+        if atk_total > def_total or (ties_to_attacker and atk_total == def_total):
             def_losses += 1
         else:  # defender wins ties
             atk_losses += 1
 
     # Apply damage absorption from structures
-    absorbed = min(def_losses, damage_absorbed(defender.structures))
-    if absorbed > 0:
-        def_losses -= absorbed
-        notes.append(f"Structures absorb {absorbed} defender loss{'es' if absorbed > 1 else ''}")
+    absorbed = effects.absorb_losses(def_losses, rng) if def_losses > 0 else 0
+    def_losses -= absorbed
 
     # Apply losses
     attacker.units -= atk_losses
     defender.units -= def_losses
+    return atk_rolls, def_rolls, atk_losses, def_losses, setup.notes(suppressed, absorbed)
+
 
+def resolve_single_round(
+    attacker: Army,
+    defender: Army,
+    rng: Any = _random,
+    tuning: CombatTuning | None = None,
+    effects: BattleEffects | None = None,
+) -> RoundResult:
+    """Resolve one round of combat between attacker and defender.
+
+    Risk rules:
+    - Attacker rolls up to 3 dice, must leave at least 1 unit behind
+    - Defender rolls up to 2 dice (+ bonus from structures)
+    - Compare highest pairs, defender wins ties (unless a structure flips them)
+    - Structures absorb defender losses (damage reduction)
+
+    ``effects`` carries the defender's compiled structures and any
+    battle-scoped state; it is compiled fresh when omitted.
+    """
+    if effects is None:
+        effects = compile_structures(defender.structures).start_battle()
+    setup = _round_setup(attacker.hero, effects.effects, tuning or CombatTuning())
+    atk_rolls, def_rolls, atk_losses, def_losses, notes = _play_round(attacker, defender, rng, setup, effects)
     return RoundResult(
         attacker_rolls=atk_rolls,
         defender_rolls=def_rolls,
@@ -102,27 +168,60 @@ def resolve_single_round(
         defender_losses=def_losses,
         attacker_remaining=attacker.units,
         defender_remaining=defender.units,
-        notes=notes,
+        notes=list(notes),
     )
 
 
+@lru_cache(maxsize=64)
+def _takes_charges(callback: Callable[..., bool]) -> bool:
+    """Whether a retreat callback has a ``charges`` parameter."""
+    try:
+        return "charges" in inspect.signature(callback).parameters
+    except (TypeError, ValueError):  # builtins without a signature
+        return False
+
+
 def resolve_battle(
     attacker: Army,
     defender: Army,
     auto_resolve: bool = True,
     rng: Any = _random,
     tuning: CombatTuning | None = None,
+    retreat: Callable[..., bool] | None = None,
+    max_rounds: int | None = None,
 ) -> BattleResult:
     """Resolve a full battle (potentially multiple rounds).
 
     If auto_resolve is True, fights until one side is eliminated.
     If False, resolves a single round (caller manages round-by-round flow).
+    If retreat is given, it is asked (attacker_units, defender_units) before
+    every round and the attacker withdraws as soon as it returns True. A
+    callback with a ``charges`` parameter (e.g. ``RetreatPolicy.should_retreat``)
+    is also given the defender's remaining limited-absorb charges.
+    If max_rounds is given, the battle stops there with the defender
+    holding and ``truncated`` set; rules where no round can change the
+    state (see ``engine.planner.can_stall``) otherwise never end.
     """
-    rounds: list[RoundResult] = []
+    rounds = RoundLog()
+    retreated = False
+    effects = compile_structures(defender.structures).start_battle()
+    setup = _round_setup(attacker.hero, effects.effects, tuning or CombatTuning())
 
+    with_charges = retreat is not None and _takes_charges(getattr(retreat, "__func__", retreat))
+    truncated = False
     while attacker.units > 1 and defender.units > 0:
-        result = resolve_single_round(attacker, defender, rng=rng, tuning=tuning)
-        rounds.append(result)
+        if max_rounds is not None and len(rounds) >= max_rounds:
+            truncated = True
+            break
+        if retreat is not None and (
+            retreat(attacker.units, defender.units, charges=effects.charges_left)
+            if with_charges
+            else retreat(attacker.units, defender.units)
+        ):
+            retreated = True
+            break
+        atk_rolls, def_rolls, atk_losses, def_losses, notes = _play_round(attacker, defender, rng, setup, effects)
+        rounds.record(atk_rolls, def_rolls, atk_losses, def_losses, attacker.units, defender.units, notes)
         if not auto_resolve:
             break
 
@@ -131,6 +230,7 @@ def resolve_battle(
         rounds=rounds,
         attacker_remaining=attacker.units,
         defender_remaining=defender.units,
-        attacker_retreated=False,
+        attacker_retreated=retreated,
         winner=winner,
+        truncated=truncated,
     )
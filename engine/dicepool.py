@@ -0,0 +1,122 @@
+"""Exact distributions for arbitrary dice pools.
+
+A pool is any multiset of dice (d4 through d20, each with an optional flat
+modifier). Pools are folded in one die at a time while keeping only the
+sorted top-k values, so the joint distribution of the k highest results
+costs a small convolution instead of enumerating every roll. Results are
+integer counts over the product of the die sizes and are memoized, so a
+new hero or defender design is a table lookup after the first call.
+"""
+
+from __future__ import annotations
+
+import random as _random
+from dataclasses import dataclass
+from fractions import Fraction
+from functools import lru_cache
+from typing import Any
+
+
+@dataclass(frozen=True, order=True)
+class Die:
+    sides: int = 6
+    modifier: int = 0  # flat bonus added to every face
+
+    def __post_init__(self) -> None:
+        if self.sides < 1:
+            raise ValueError(f"A die needs at least one side, got d{self.sides}")
+
+    def __str__(self) -> str:
+        if self.modifier:
+            return f"d{self.sides}{self.modifier:+d}"
+        return f"d{self.sides}"
+
+
+DicePool = tuple[Die, ...]
+
+
+def make_pool(num_dice: int, upgrades: tuple[int, ...] = (), base: int = 6) -> DicePool:
+    """Build a pool of ``num_dice`` where the first dice are upgraded to the given sizes.
+
+    ``make_pool(3, (12,))`` is the Admiral's attack: one d12 and two d6.
+    Upgrades beyond ``num_dice`` are dropped, matching how a hero die
+    replaces a standard die rather than adding one.
+    """
+    if num_dice <= 0:
+        return ()
+    sizes = list(upgrades[:num_dice]) + [base] * max(0, num_dice - len(upgrades))
+    return tuple(Die(s) for s in sizes)
+
+
+def roll_pool(pool: DicePool, rng: Any = _random) -> list[int]:
+    """Roll every die in the pool (modifiers applied), return sorted descending."""
+    return sorted((rng.randint(1, die.sides) + die.modifier for die in pool), reverse=True)
+
+
+def pool_denominator(pool: DicePool) -> int:
+    total = 1
+    for die in pool:
+        total *= die.sides
+    return total
+
+
+@lru_cache(maxsize=4096)
+def _top_k_counts(pool: DicePool, k: int) -> tuple[tuple[tuple[int, ...], int], ...]:
+    states: dict[tuple[int, ...], int] = {(): 1}
+    for die in pool:
+        nxt: dict[tuple[int, ...], int] = {}
+        for values, count in states.items():
+            for face in range(1 + die.modifier, die.sides + 1 + die.modifier):
+                merged = tuple(sorted(values + (face,), reverse=True)[:k])
+                nxt[merged] = nxt.get(merged, 0) + count
+        states = nxt
+    return tuple(sorted(states.items(), reverse=True))
+
+
+def top_k_counts(pool: DicePool, k: int | None = None) -> tuple[tuple[tuple[int, ...], int], ...]:
+    """Integer counts of the sorted-descending top ``k`` values of ``pool``.
+
+    ``k`` defaults to the whole pool. Counts share ``pool_denominator(pool)``.
+    """
+    size = len(pool) if k is None else max(0, min(k, len(pool)))
+    return _top_k_counts(tuple(sorted(pool)), size)
+
+
+def top_k_distribution(pool: DicePool, k: int | None = None) -> dict[tuple[int, ...], Fraction]:
+    """Exact joint distribution of the sorted top ``k`` values of ``pool``."""
+    total = pool_denominator(pool)
+    return {values: Fraction(count, total) for values, count in top_k_counts(pool, k)}
+
+
+@lru_cache(maxsize=4096)
+def _comparison_counts(
+    attacker: DicePool,
+    defender: DicePool,
+    ties_to_attacker: bool,
+) -> tuple[tuple[tuple[int, int], int], ...]:
+    pairs = min(len(attacker), len(defender))
+    margin = 0 if ties_to_attacker else 1
+    atk_counts = _top_k_counts(attacker, pairs)
+    def_counts = _top_k_counts(defender, pairs)
+    outcomes: dict[tuple[int, int], int] = {}
+    for atk_values, atk_weight in atk_counts:
+        for def_values, def_weight in def_counts:
+            def_losses = sum(1 for i in range(pairs) if atk_values[i] >= def_values[i] + margin)
+            key = (pairs - def_losses, def_losses)
+            outcomes[key] = outcomes.get(key, 0) + atk_weight * def_weight
+    return tuple(sorted(outcomes.items()))
+
+
+def comparison_loss_distribution(
+    attacker: DicePool,
+    defender: DicePool,
+    ties_to_attacker: bool = False,
+) -> dict[tuple[int, int], Fraction]:
+    """Exact (attacker_losses, defender_losses) when two pools compare highest pairs.
+
+    Risk comparison: the i-th highest die of each side meet, the defender
+    wins ties unless ``ties_to_attacker``. Shaped like the Taflin table.
+    """
+    total = pool_denominator(attacker) * pool_denominator(defender)
+    counts = _comparison_counts(tuple(sorted(attacker)), tuple(sorted(defender)), ties_to_attacker)
+    return {key: Fraction(count, total) for key, count in counts}
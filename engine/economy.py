@@ -0,0 +1,275 @@
+"""RISK card economy: card draws, set trades and reinforcement income.
+
+Standard RISK card rules (``docs/risk-base-rules.md``) carry over to the
+expansion unchanged. A player draws one card on any turn with a capture,
+trades a matched set at the start of a turn (it must trade once it holds
+five cards), and each set is worth more than the last one anyone traded.
+
+``forecast_income`` gives the exact distribution of a player's income for
+every turn. It runs a Markov chain over (hand, sets traded so far) with
+each draw taken independently from the deck's proportions. The chain has
+a few hundred states, so a game simulator or an AI rollout can look up
+card income instead of replaying card flow. ``simulate_income`` instead
+plays many economies side by side from a real shuffled deck, with a
+discard pile that is reshuffled when the deck runs out. It gives the
+distribution of total income and cross-checks the independent-draw
+approximation.
+
+``capture_chance`` turns a turn's planned attacks into the probability
+of drawing a card, using the kernel's exact win-probability surfaces.
+"""
+
+from __future__ import annotations
+
+import random as _random
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Iterable
+
+from engine.kernel import RoundRules, win_probability_surface
+
+CARD_TYPES: tuple[str, ...] = ("infantry", "cavalry", "artillery", "wild")
+TRADE_POLICIES: tuple[str, ...] = ("greedy", "forced")
+
+Hand = tuple[int, int, int, int]  # cards held of each CARD_TYPES entry
+WILD = 3
+
+
+@dataclass(frozen=True)
+class CardRules:
+    deck: Hand = (14, 14, 14, 2)  # cards of each type in the deck
+    set_values: tuple[int, ...] = (4, 6, 8, 10, 12, 15)  # armies for the 1st, 2nd, ... set traded by anyone
+    escalation_step: int = 5  # each later set is worth this much more
+    must_trade_at: int = 5  # hand size that forces a trade
+    territory_bonus: int = 2  # extra armies when a traded card shows a planet you hold
+
+    def set_value(self, sets_traded: int) -> int:
+        """Armies for the next set when ``sets_traded`` sets have already gone in."""
+        if sets_traded < len(self.set_values):
+            return self.set_values[sets_traded]
+        return self.set_values[-1] + self.escalation_step * (sets_traded - len(self.set_values) + 1)
+
+    def draw_probabilities(self) -> tuple[float, ...]:
+        total = sum(self.deck)
+        return tuple(count / total for count in self.deck)
+
+
+def _without(hand: Hand, traded: Hand) -> Hand:
+    return (hand[0] - traded[0], hand[1] - traded[1], hand[2] - traded[2], hand[3] - traded[3])
+
+
+def _with_card(hand: Hand, card: int) -> Hand:
+    counts = list(hand)
+    counts[card] += 1
+    return (counts[0], counts[1], counts[2], counts[3])
+
+
+def _set_of(counts: dict[int, int]) -> Hand:
+    return (counts.get(0, 0), counts.get(1, 0), counts.get(2, 0), counts.get(WILD, 0))
+
+
+def find_set(hand: Hand) -> Hand | None:
+    """The set to trade from ``hand``, or None.
+
+    Wild cards are kept for as long as possible: three of a kind (of the
+    most plentiful type) first, then one of each, then sets using one wild
+    and finally two.
+    """
+    plain = hand[:WILD]
+    best = max(range(WILD), key=lambda i: plain[i])
+    if plain[best] >= 3:
+        return _set_of({best: 3})
+    if all(plain):
+        return (1, 1, 1, 0)
+    wilds = hand[WILD]
+    if wilds >= 1:
+        if plain[best] >= 2:
+            return _set_of({best: 2, WILD: 1})
+        held = [i for i in range(WILD) if plain[i]]
+        if len(held) >= 2:
+            return _set_of({held[0]: 1, held[1]: 1, WILD: 1})
+        if wilds >= 2 and held:
+            return _set_of({held[0]: 1, WILD: 2})
+    return None
+
+
+@dataclass(frozen=True)
+class EconomyConfig:
+    cards: CardRules = field(default_factory=CardRules)
+    base_income: int = 3  # planets // 3 plus sector bonuses, per turn
+    capture_chances: tuple[float, ...] = (0.7,)  # per turn; the last entry repeats
+    rival_trade_chance: float = 0.0  # chance per turn that an opponent trades, moving the set counter on
+    trade_policy: str = "greedy"  # one of TRADE_POLICIES
+    owned_fraction: float = 0.0  # share of the planets shown on cards that you hold
+
+    def capture_chance(self, turn: int) -> float:
+        chances = self.capture_chances
+        return chances[min(turn, len(chances) - 1)] if chances else 0.0
+
+
+@dataclass
+class IncomeForecast:
+    """Treat instances as read-only: they are shared through the cache."""
+
+    income_by_turn: list[dict[int, float]]  # armies received -> probability, per turn
+    card_income: list[float]  # expected armies from trades (and territory bonuses), per turn
+    trade_probability: list[float]  # chance of trading a set, per turn
+    expected_sets_traded: float  # global set counter after the last turn
+
+    @property
+    def expected_income(self) -> list[float]:
+        return [sum(v * p for v, p in dist.items()) for dist in self.income_by_turn]
+
+    @property
+    def expected_total(self) -> float:
+        return sum(self.expected_income)
+
+
+def _trade(hand: Hand, config: EconomyConfig) -> Hand | None:
+    if config.trade_policy == "forced" and sum(hand) < config.cards.must_trade_at:
+        return None
+    return find_set(hand)
+
+
+def _bonus_chance(traded: Hand, owned_fraction: float) -> float:
+    return 1.0 - (1.0 - owned_fraction) ** (3 - traded[WILD])
+
+
+@lru_cache(maxsize=64)
+def forecast_income(config: EconomyConfig, turns: int, start: Hand = (0, 0, 0, 0), sets_traded: int = 0) -> IncomeForecast:
+    """Exact per-turn income distribution over ``turns`` turns.
+
+    Each turn: trade (per the policy) and collect income, draw a card if a
+    planet was captured, then opponents may trade. Draws are independent
+    with the deck's proportions.
+    """
+    if config.trade_policy not in TRADE_POLICIES:
+        raise ValueError(f"Unknown trade policy {config.trade_policy!r}; expected one of {TRADE_POLICIES}")
+    cards = config.cards
+    draw = cards.draw_probabilities()
+    rival = config.rival_trade_chance
+    states: dict[tuple[Hand, int], float] = {(start, sets_traded): 1.0}
+    income_by_turn: list[dict[int, float]] = []
+    card_income: list[float] = []
+    trade_probability: list[float] = []
+
+    for turn in range(turns):
+        capture = config.capture_chance(turn)
+        income: dict[int, float] = {}
+        from_cards = traded_mass = 0.0
+        after: dict[tuple[Hand, int], float] = {}
+        for (hand, n), p in states.items():
+            traded = _trade(hand, config)
+            outcomes: list[tuple[int, float]] = [(config.base_income, 1.0)]
+            if traded is not None:
+                value = cards.set_value(n)
+                bonus = _bonus_chance(traded, config.owned_fraction)
+                outcomes = [(config.base_income + value, 1.0 - bonus)]
+                if bonus > 0.0:
+                    outcomes.append((config.base_income + value + cards.territory_bonus, bonus))
+                from_cards += p * (value + bonus * cards.territory_bonus)
+                traded_mass += p
+                hand = _without(hand, traded)
+                n += 1
+            for armies, q in outcomes:
+                if q > 0.0:
+                    income[armies] = income.get(armies, 0.0) + p * q
+
+            draws: list[tuple[Hand, float]] = [(hand, 1.0 - capture)]
+            for card, q in enumerate(draw):
+                if capture > 0.0 and q > 0.0:
+                    draws.append((_with_card(hand, card), capture * q))
+            for next_hand, q in draws:
+                if q <= 0.0:
+                    continue
+                for step, r in ((0, 1.0 - rival), (1, rival)):
+                    if r > 0.0:
+                        key = (next_hand, n + step)
+                        after[key] = after.get(key, 0.0) + p * q * r
+        income_by_turn.append(dict(sorted(income.items())))
+        card_income.append(from_cards)
+        trade_probability.append(traded_mass)
+        states = after
+
+    return IncomeForecast(
+        income_by_turn=income_by_turn,
+        card_income=card_income,
+        trade_probability=trade_probability,
+        expected_sets_traded=sum(n * p for (_, n), p in states.items()),
+    )
+
+
+@dataclass
+class IncomeSamples:
+    totals: list[int]  # total income over every turn, one per simulated economy
+    mean_by_turn: list[float]
+
+    def quantile(self, q: float) -> int:
+        ordered = sorted(self.totals)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def simulate_income(config: EconomyConfig, turns: int, samples: int = 10000, rng: Any = _random) -> IncomeSamples:
+    """Play ``samples`` economies turn by turn from a real shuffled deck.
+
+    All economies advance one turn at a time over flat per-sample lists.
+    Traded cards go to a discard pile that is shuffled back in when the
+    deck runs out; if every card is in hand, nothing is drawn.
+    """
+    if config.trade_policy not in TRADE_POLICIES:
+        raise ValueError(f"Unknown trade policy {config.trade_policy!r}; expected one of {TRADE_POLICIES}")
+    cards = config.cards
+    pile = [card for card, count in enumerate(cards.deck) for _ in range(count)]
+    decks = []
+    for _ in range(samples):
+        deck = pile[:]
+        rng.shuffle(deck)
+        decks.append(deck)
+    discards: list[list[int]] = [[] for _ in range(samples)]
+    hands: list[Hand] = [(0, 0, 0, 0)] * samples
+    counters = [0] * samples
+    totals = [0] * samples
+    mean_by_turn = []
+
+    for turn in range(turns):
+        capture = config.capture_chance(turn)
+        turn_total = 0
+        for i in range(samples):
+            hand = hands[i]
+            armies = config.base_income
+            traded = _trade(hand, config)
+            if traded is not None:
+                armies += cards.set_value(counters[i])
+                if rng.random() < _bonus_chance(traded, config.owned_fraction):
+                    armies += cards.territory_bonus
+                hand = _without(hand, traded)
+                counters[i] += 1
+                discards[i].extend(card for card, count in enumerate(traded) for _ in range(count))
+            if rng.random() < capture:
+                deck = decks[i]
+                if not deck and discards[i]:
+                    deck.extend(discards[i])
+                    discards[i].clear()
+                    rng.shuffle(deck)
+                if deck:
+                    hand = _with_card(hand, deck.pop())
+            if rng.random() < config.rival_trade_chance:
+                counters[i] += 1
+            hands[i] = hand
+            totals[i] += armies
+            turn_total += armies
+        mean_by_turn.append(turn_total / samples if samples else 0.0)
+
+    return IncomeSamples(totals=totals, mean_by_turn=mean_by_turn)
+
+
+def capture_chance(attacks: Iterable[tuple[int, int, RoundRules]]) -> float:
+    """Chance that at least one of a turn's attacks takes its planet (and earns a card).
+
+    Attacks are (attacker units, defender units, rules), fought to the end
+    and treated as independent.
+    """
+    miss = 1.0
+    for attacker_units, defender_units, rules in attacks:
+        miss *= 1.0 - win_probability_surface(attacker_units, defender_units, rules)[attacker_units][defender_units]
+    return 1.0 - miss
@@ -0,0 +1,135 @@
+"""Where a battle's odds come from: ablations and tuning sensitivities.
+
+``explain_battle`` answers "how much of this result is the hero, the
+structures and the upgrades?" in one call. Each factor is removed on its
+own (the hero, each structure, each tuning knob reset to its default),
+and its delta is the exact win probability lost without it. Every
+integer ``CombatTuning`` field is also stepped one notch each way within
+the range the API accepts, and every other planet upgrade mode is tried,
+giving discrete sensitivities. Steps that compile to the baseline's rules
+are left out.
+
+Many variants compile to the same ``RoundRules`` (a knob that only
+matters with upgrades bought, say), so variants are deduplicated before
+anything is solved. Each distinct rule set costs one win-probability
+surface from the shared kernel cache, and ``workers > 1`` solves them in
+a process pool.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields, replace
+from typing import Any
+
+from engine import tablestore
+from engine.kernel import RoundRules, compile_rules, win_probability_surface
+from engine.models import Hero, Structure
+from engine.tuning import PLANET_UPGRADE_MODES, CombatTuning
+
+FACTOR_KINDS: tuple[str, ...] = ("hero", "structure", "tuning")
+
+
+@dataclass(frozen=True)
+class Factor:
+    kind: str  # one of FACTOR_KINDS
+    name: str  # hero name, structure name or tuning field
+    win_probability: float  # with only this factor removed
+    delta: float  # win probability it adds for the attacker (negative: it helps the defender)
+
+
+@dataclass(frozen=True)
+class Sensitivity:
+    parameter: str  # CombatTuning field
+    value: Any  # current setting
+    win_probabilities: dict[Any, float]  # neighbouring setting -> win probability
+
+    def slope(self, baseline: float) -> float:
+        """Change in win probability per unit step, averaged over the steps available."""
+        steps = [(p - baseline) / (v - self.value) for v, p in self.win_probabilities.items()
+                 if isinstance(v, int) and v != self.value]
+        return sum(steps) / len(steps) if steps else 0.0
+
+
+@dataclass
+class Explanation:
+    attacker_units: int
+    defender_units: int
+    win_probability: float
+    vanilla_win_probability: float  # no hero, no structures, default tuning
+    factors: list[Factor] = field(default_factory=list)
+    sensitivities: list[Sensitivity] = field(default_factory=list)
+    rule_sets: int = 0  # distinct rule sets solved
+
+    @property
+    def interaction(self) -> float:
+        """Part of the total change from vanilla that single-factor deltas do not explain."""
+        total = self.win_probability - self.vanilla_win_probability
+        return total - sum(f.delta for f in self.factors)
+
+
+def _solve(args: tuple[int, int, RoundRules]) -> float:
+    a, d, rules = args
+    return win_probability_surface(a, d, rules)[a][d]
+
+
+def _neighbours(tuning: CombatTuning, name: str) -> list[Any]:
+    value = getattr(tuning, name)
+    if name == "planet_upgrade_mode":
+        return [mode for mode in PLANET_UPGRADE_MODES if mode != value]
+    low, high = tuning.field_bounds(name)
+    return [v for v in (value - 1, value + 1) if low <= v <= high]
+
+
+def explain_battle(
+    attacker_units: int,
+    defender_units: int,
+    hero: Hero | None = None,
+    structures: list[Structure] | None = None,
+    tuning: CombatTuning | None = None,
+    workers: int = 1,
+) -> Explanation:
+    """Ablation deltas for every factor and one-step sensitivities for every tuning field."""
+    structures = list(structures or [])
+    tuning = tuning or CombatTuning()
+    default = CombatTuning()
+
+    # (label, hero, structures, tuning) for every variant, baseline first.
+    variants: list[tuple[tuple[str, ...], Hero | None, list[Structure], CombatTuning]] = [
+        (("baseline",), hero, structures, tuning),
+        (("vanilla",), None, [], default),
+    ]
+    if hero is not None:
+        variants.append((("factor", "hero", hero.name), None, structures, tuning))
+    for i, structure in enumerate(structures):
+        variants.append((("factor", "structure", structure.name), hero, structures[:i] + structures[i + 1:], tuning))
+    for f in fields(CombatTuning):
+        if getattr(tuning, f.name) != getattr(default, f.name):
+            reset = replace(tuning, **{f.name: getattr(default, f.name)})
+            variants.append((("factor", "tuning", f.name), hero, structures, reset))
+    for f in fields(CombatTuning):
+        for value in _neighbours(tuning, f.name):
+            variants.append((("sensitivity", f.name, value), hero, structures, replace(tuning, **{f.name: value})))
+
+    rules = [compile_rules(h, s, t) for _, h, s, t in variants]
+    unique = list(dict.fromkeys(rules))
+    jobs = [(attacker_units, defender_units, r) for r in unique]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers, **tablestore.pool_kwargs()) as executor:
+            solved = dict(zip(unique, executor.map(_solve, jobs)))
+    else:
+        solved = {r: _solve(job) for r, job in zip(unique, jobs)}
+
+    baseline = solved[rules[0]]
+    explanation = Explanation(attacker_units, defender_units, baseline, solved[rules[1]], rule_sets=len(unique))
+    sensitivities: dict[str, dict[Any, float]] = {}
+    for (label, *_), r in zip(variants[2:], rules[2:]):
+        p = solved[r]
+        if label[0] == "factor":
+            explanation.factors.append(Factor(label[1], label[2], p, baseline - p))
+        elif r != rules[0]:  # a step that changes nothing is no sensitivity
+            sensitivities.setdefault(label[1], {})[label[2]] = p
+    explanation.sensitivities = [
+        Sensitivity(name, getattr(tuning, name), probabilities) for name, probabilities in sensitivities.items()
+    ]
+    return explanation
@@ -0,0 +1,682 @@
+"""Headless full games: Reinforce, Command, Attack, Fortify and Build.
+
+Scripted policies play complete games on a star map. The board is a few
+flat integer lists mutated in place (owner, armies and a structure bitmask
+per planet; Command Ship planet and tier per player), so a turn never
+copies the board. In ``distribution`` mode a battle is one draw from the
+cached exact end-state distribution of the kernel (or a walk over cached
+transition tables when the attacker retreats early); ``dice`` mode rolls
+every round with ``resolve_battle``.
+
+RISK card trade-ins are not modelled: reinforcements are planets // 3
+(minimum 3) plus sector bonuses. ``engine.economy`` forecasts card income
+separately.
+"""
+
+from __future__ import annotations
+
+import bisect
+import random as _random
+from array import array
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from engine import instrument
+from engine.combat import resolve_battle
+from engine.asymptotic import approximate_battle
+from engine.heroes import HERO_TIERS, HEROES
+from engine.kernel import RoundRules, battle_distribution, compile_rules, win_probability_surface
+from engine.models import Army, Hero
+from engine.simulation import chain_sampler
+from engine.starmap import UNOWNED, GalaxyMap, Territory, planets_in
+from engine.structures import STRUCTURES, compile_structures
+from engine.tuning import CombatTuning
+
+COMBAT_MODES: tuple[str, ...] = ("distribution", "dice")
+
+# Command Ship tiers, 1-based: tier 1 is a Captain.
+SHIP_TIERS: tuple[str, ...] = tuple(HERO_TIERS)
+_SHIP_HEROES: tuple[Hero, ...] = tuple(HEROES[name] for name in SHIP_TIERS)
+
+# Base RISK starting armies by player count.
+STARTING_ARMIES: dict[int, int] = {2: 40, 3: 35, 4: 30, 5: 25, 6: 20}
+
+NO_SHIP = -1
+
+# Attack odds come from one fixed-size exact surface per rule set up to this
+# stack size and from the asymptotic approximation beyond it, so stacks that
+# grow during a stalled game never force the surface to be re-solved.
+EXACT_ODDS_MAX = 64
+# Battles with both stacks at most this size are drawn in one step from
+# their end-state distribution; larger ones walk cached transition tables.
+OUTCOME_TABLE_MAX = 16
+
+# Always-on absorbers (Shield Generator, Fortress) negate a lone garrison's
+# only possible loss every round, so such a planet held by one army can
+# never be taken and games stall. GameRules leaves them out by default;
+# list them in ``structure_keys`` to play with them.
+CAPTURABLE_STRUCTURES: tuple[str, ...] = tuple(
+    key for key, structure in STRUCTURES.items() if compile_structures([structure]).absorb == 0
+)
+
+
+# --- Rules and state ---
+
+@dataclass(frozen=True)
+class GameRules:
+    num_players: int = 2
+    starting_armies: int | None = None  # per player; None uses the base RISK table
+    tuning: CombatTuning = field(default_factory=CombatTuning)
+    structure_keys: tuple[str, ...] = CAPTURABLE_STRUCTURES  # buildable, by bit index
+    ship_moves: int = 3
+    fortify_path: bool = False  # Expert RISK: fortify along any connected path, not just to a neighbour
+    build_cost: int = 0  # armies taken from the builder's next reinforcements
+    promote_after_captures: int = 3  # captures in one turn that promote the ship; 0 = never
+    max_turns: int = 500  # player turns before the game is called a draw
+    stall_turns: int = 60  # player turns without a capture before the game is called a draw; 0 = never
+    combat: str = "distribution"
+
+    def starting_army_count(self) -> int:
+        if self.starting_armies is not None:
+            return self.starting_armies
+        return STARTING_ARMIES.get(self.num_players, 20)
+
+
+@lru_cache(maxsize=4096)
+def planet_rules(ship_tier: int, structure_mask: int, structure_keys: tuple[str, ...], tuning: CombatTuning) -> RoundRules:
+    """Compiled rules for attacking a planet; ``ship_tier`` 0 means no Command Ship."""
+    hero = _SHIP_HEROES[ship_tier - 1] if ship_tier > 0 else None
+    structures = [STRUCTURES[key] for bit, key in enumerate(structure_keys) if structure_mask >> bit & 1]
+    return compile_rules(hero, structures, tuning)
+
+
+class GameState:
+    """Mutable board state. Policies read it; only ``Game`` writes it.
+
+    ``owner`` is the territory index's own list, so ownership changes go
+    through ``set_owner`` to keep bitsets and regions in step.
+    """
+
+    __slots__ = (
+        "galaxy", "rules", "territory", "owner", "armies", "structures", "planet_counts",
+        "ship_planet", "ship_tier", "build_debt", "player", "turn", "captures_this_turn", "last_capture_turn",
+    )
+
+    def __init__(self, galaxy: GalaxyMap, rules: GameRules) -> None:
+        self.galaxy = galaxy
+        self.rules = rules
+        self.territory = Territory(galaxy, rules.num_players)
+        self.owner = self.territory.owner
+        self.armies = [0] * galaxy.size
+        self.structures = [0] * galaxy.size  # bit i set = rules.structure_keys[i] built
+        self.planet_counts = [0] * rules.num_players
+        self.ship_planet = [NO_SHIP] * rules.num_players
+        self.ship_tier = [1] * rules.num_players
+        self.build_debt = [0] * rules.num_players
+        self.player = 0
+        self.turn = 0
+        self.captures_this_turn = 0  # counts toward promoting the Command Ship
+        self.last_capture_turn = 0
+
+    def copy(self) -> GameState:
+        """Independent copy for search; lists are copied, the map and rules shared."""
+        other = GameState.__new__(GameState)
+        other.galaxy = self.galaxy
+        other.rules = self.rules
+        other.territory = self.territory.copy()
+        other.owner = other.territory.owner
+        other.armies = self.armies[:]
+        other.structures = self.structures[:]
+        other.planet_counts = self.planet_counts[:]
+        other.ship_planet = self.ship_planet[:]
+        other.ship_tier = self.ship_tier[:]
+        other.build_debt = self.build_debt[:]
+        other.player = self.player
+        other.turn = self.turn
+        other.captures_this_turn = self.captures_this_turn
+        other.last_capture_turn = self.last_capture_turn
+        return other
+
+    def key(self) -> bytes:
+        """Compact, collision-free encoding of everything that affects play from here.
+
+        Turn counters are left out, so positions reached by different move
+        orders share a key.
+        """
+        header = array("i", (self.player, self.captures_this_turn, *self.ship_planet, *self.ship_tier, *self.build_debt))
+        return (
+            header.tobytes()
+            + array("b", self.owner).tobytes()
+            + array("i", self.armies).tobytes()
+            + array("H", self.structures).tobytes()
+        )
+
+    def set_owner(self, planet: int, player: int) -> None:
+        previous = self.owner[planet]
+        if previous != UNOWNED:
+            self.planet_counts[previous] -= 1
+        self.planet_counts[player] += 1
+        self.territory.set_owner(planet, player)
+
+    # --- Queries ---
+
+    def planets_of(self, player: int) -> list[int]:
+        return planets_in(self.territory.owned[player])
+
+    def alive(self, player: int) -> bool:
+        return self.planet_counts[player] > 0
+
+    def winner(self) -> int | None:
+        for player, count in enumerate(self.planet_counts):
+            if count == self.galaxy.size:
+                return player
+        return None
+
+    def enemy_neighbors(self, planet: int) -> list[int]:
+        return planets_in(self.galaxy.neighbor_masks[planet] & ~self.territory.owned[self.owner[planet]])
+
+    def is_frontier(self, planet: int) -> bool:
+        return self.galaxy.neighbor_masks[planet] & ~self.territory.owned[self.owner[planet]] != 0
+
+    def reinforcements(self, player: int) -> int:
+        income = max(3, self.planet_counts[player] // 3)
+        territory = self.territory
+        for sector, bonus in enumerate(self.galaxy.sector_bonuses):
+            if territory.holds_sector(player, sector):
+                income += bonus
+        return max(0, income - self.build_debt[player])
+
+    def ship_destinations(self, player: int) -> list[int]:
+        """Planets the Command Ship can reach through owned planets, including where it is."""
+        start = self.ship_planet[player]
+        if start == NO_SHIP:
+            return self.planets_of(player)
+        return planets_in(self.territory.reachable(start, self.rules.ship_moves))
+
+    def attack_rules(self, source: int, target: int) -> RoundRules:
+        player = self.owner[source]
+        tier = self.ship_tier[player] if self.ship_planet[player] == source else 0
+        return planet_rules(tier, self.structures[target], self.rules.structure_keys, self.rules.tuning)
+
+    def attack_odds(self, source: int, target: int, attacker_units: int | None = None) -> float:
+        """Exact chance an attack from ``source`` takes ``target`` if fought to the end."""
+        a = self.armies[source] if attacker_units is None else attacker_units
+        d = self.armies[target]
+        if a <= 1:
+            return 0.0
+        rules = self.attack_rules(source, target)
+        if a > EXACT_ODDS_MAX or d > EXACT_ODDS_MAX:
+            return approximate_battle(a, d, rules).win_probability
+        return win_probability_surface(EXACT_ODDS_MAX, EXACT_ODDS_MAX, rules)[a][d]
+
+
+# --- Orders and policies ---
+
+@dataclass(frozen=True)
+class AttackOrder:
+    source: int
+    target: int
+    retreat_at: int = 1  # withdraw once the attacking stack is down to this
+
+
+class Policy:
+    """Scripted player. Hooks read the state and return orders; the defaults pass.
+
+    ``place`` must spend every army, so the default puts them all on the
+    first frontier planet.
+    """
+
+    def place(self, state: GameState, player: int, armies: int, rng: Any) -> list[tuple[int, int]]:
+        planets = state.planets_of(player)
+        frontier = [p for p in planets if state.is_frontier(p)]
+        return [((frontier or planets)[0], armies)]
+
+    def move_ship(self, state: GameState, player: int, destinations: list[int], rng: Any) -> int | None:
+        return None
+
+    def attack(self, state: GameState, player: int, rng: Any) -> AttackOrder | None:
+        return None
+
+    def move_in(self, state: GameState, order: AttackOrder, survivors: int, rng: Any) -> int:
+        """Armies advanced onto a captured planet; clamped to [1, survivors - 1]."""
+        return survivors - 1
+
+    def fortify(self, state: GameState, player: int, rng: Any) -> tuple[int, int, int] | None:
+        return None
+
+    def build(self, state: GameState, player: int, rng: Any) -> tuple[int, str] | None:
+        return None
+
+
+class RandomPolicy(Policy):
+    """Uniformly random legal orders; useful for fuzzing the rules."""
+
+    def __init__(self, attack_chance: float = 0.8) -> None:
+        self.attack_chance = attack_chance
+
+    def place(self, state, player, armies, rng):
+        planets = state.planets_of(player)
+        orders: dict[int, int] = {}
+        for _ in range(armies):
+            planet = rng.choice(planets)
+            orders[planet] = orders.get(planet, 0) + 1
+        return list(orders.items())
+
+    def move_ship(self, state, player, destinations, rng):
+        return rng.choice(destinations)
+
+    def attack(self, state, player, rng):
+        if rng.random() >= self.attack_chance:
+            return None
+        options = [
+            (p, t) for p in state.planets_of(player) if state.armies[p] > 1 for t in state.enemy_neighbors(p)
+        ]
+        if not options:
+            return None
+        source, target = rng.choice(options)
+        return AttackOrder(source, target, retreat_at=rng.randint(1, state.armies[source] // 2 + 1))
+
+    def move_in(self, state, order, survivors, rng):
+        return rng.randint(1, survivors - 1)
+
+    def fortify(self, state, player, rng):
+        options = [
+            (p, n) for p in state.planets_of(player) if state.armies[p] > 1
+            for n in state.galaxy.neighbors[p] if state.owner[n] == player
+        ]
+        if not options:
+            return None
+        source, target = rng.choice(options)
+        return source, target, rng.randint(1, state.armies[source] - 1)
+
+    def build(self, state, player, rng):
+        keys = state.rules.structure_keys
+        options = [
+            (p, key) for p in state.planets_of(player)
+            for bit, key in enumerate(keys) if not state.structures[p] >> bit & 1
+        ]
+        return rng.choice(options) if options else None
+
+
+class GreedyPolicy(Policy):
+    """Attack whenever the exact odds clear a threshold; stack the frontier.
+
+    Reinforcements and the Command Ship go to the frontier stack with the
+    biggest margin over its weakest neighbour, interior armies walk toward
+    the frontier, and structures go on the biggest frontier stack in
+    ``build_order``.
+    """
+
+    def __init__(
+        self,
+        attack_threshold: float = 0.6,
+        use_ship: bool = True,
+        build_order: tuple[str, ...] | None = None,
+    ) -> None:
+        self.attack_threshold = attack_threshold
+        self.use_ship = use_ship
+        self.build_order = build_order
+
+    def _best_front(self, state: GameState, planets: list[int]) -> int | None:
+        best, best_margin = None, None
+        for planet in planets:
+            enemies = state.enemy_neighbors(planet)
+            if not enemies:
+                continue
+            margin = state.armies[planet] - min(state.armies[e] for e in enemies)
+            if best_margin is None or margin > best_margin:
+                best, best_margin = planet, margin
+        return best
+
+    def place(self, state, player, armies, rng):
+        planets = state.planets_of(player)
+        front = self._best_front(state, planets)
+        return [(planets[0] if front is None else front, armies)]
+
+    def move_ship(self, state, player, destinations, rng):
+        if not self.use_ship:
+            return None
+        return self._best_front(state, destinations)
+
+    def attack(self, state, player, rng):
+        best, best_odds = None, self.attack_threshold
+        for planet in state.planets_of(player):
+            if state.armies[planet] < 2:
+                continue
+            for target in state.enemy_neighbors(planet):
+                odds = state.attack_odds(planet, target)
+                if odds >= best_odds:
+                    best, best_odds = (planet, target), odds
+        return None if best is None else AttackOrder(*best)
+
+    def move_in(self, state, order, survivors, rng):
+        if state.enemy_neighbors(order.source):
+            return max(1, (survivors - 1) // 2 + 1)
+        return survivors - 1
+
+    def fortify(self, state, player, rng):
+        best = None
+        for planet in state.planets_of(player):
+            if state.armies[planet] < 2 or state.is_frontier(planet):
+                continue
+            if best is None or state.armies[planet] > state.armies[best]:
+                best = planet
+        if best is None:
+            return None
+        territory = state.territory
+        if state.rules.fortify_path:
+            owned = planets_in(territory.region(best) & ~(1 << best))
+        else:
+            owned = planets_in(state.galaxy.neighbor_masks[best] & territory.owned[player])
+        if not owned:
+            return None
+        frontier = [n for n in owned if state.is_frontier(n)]
+        target = (frontier or owned)[0]
+        return best, target, state.armies[best] - 1
+
+    def build(self, state, player, rng):
+        keys = state.rules.structure_keys
+        order = [k for k in (self.build_order or keys) if k in keys]
+        frontier = [p for p in state.planets_of(player) if state.is_frontier(p)]
+        for planet in sorted(frontier, key=lambda p: -state.armies[p]):
+            for key in order:
+                if not state.structures[planet] >> keys.index(key) & 1:
+                    return planet, key
+        return None
+
+
+# --- Game loop ---
+
+@lru_cache(maxsize=65536)
+def _outcome_table(rules: RoundRules, a: int, d: int) -> tuple[tuple[float, ...], tuple[tuple[int, int], ...]]:
+    """Cumulative probabilities over a fought-out battle's end states.
+
+    A stalemate leaves both stacks as they were.
+    """
+    dist = battle_distribution(a, d, rules)
+    outcomes = [((units, 0), p) for units, p in dist.attacker_wins.items()]
+    outcomes += [((1, units), p) for units, p in dist.defender_wins.items()]
+    if dist.stalemate > 0.0:
+        outcomes.append(((a, d), dist.stalemate))
+    cumulative = []
+    running = 0.0
+    for _, p in outcomes:
+        running += p
+        cumulative.append(running)
+    return tuple(cumulative), tuple(end for end, _ in outcomes)
+
+
+@dataclass
+class GameResult:
+    winner: int | None  # None when max_turns ran out
+    turns: int  # player turns played
+    battles: int
+    captures: list[int]  # planets taken, per player
+    ships_destroyed: list[int]  # times each player's Command Ship was lost
+    structures_built: list[int]
+    max_ship_tier: list[int]
+    eliminated_turn: list[int | None]  # turn each player lost their last planet
+    stalled: bool = False  # called a draw after stall_turns without a capture
+
+
+class Game:
+    """Plays one game between ``policies`` (one per seat) on ``galaxy``."""
+
+    def __init__(
+        self,
+        galaxy: GalaxyMap,
+        policies: list[Policy],
+        rules: GameRules | None = None,
+        rng: Any = None,
+    ) -> None:
+        self.rules = rules or GameRules(num_players=len(policies))
+        if len(policies) != self.rules.num_players:
+            raise ValueError(f"Expected {self.rules.num_players} policies, got {len(policies)}")
+        if self.rules.combat not in COMBAT_MODES:
+            raise ValueError(f"Unknown combat mode {self.rules.combat!r}; expected one of {COMBAT_MODES}")
+        if galaxy.size < self.rules.num_players:
+            raise ValueError("Fewer planets than players")
+        self.policies = policies
+        self.rng = rng if rng is not None else _random.Random()
+        self.state = GameState(galaxy, self.rules)
+        n = self.rules.num_players
+        self.result = GameResult(
+            winner=None, turns=0, battles=0, captures=[0] * n, ships_destroyed=[0] * n,
+            structures_built=[0] * n, max_ship_tier=[1] * n, eliminated_turn=[None] * n,
+        )
+
+    @classmethod
+    def from_state(cls, state: GameState, policies: list[Policy], rng: Any = None) -> Game:
+        """A game that continues from ``state`` (shared, not copied) with fresh statistics."""
+        game = cls(state.galaxy, policies, state.rules, rng)
+        game.state = state
+        return game
+
+    # --- Setup ---
+
+    def setup(self) -> None:
+        """Deal planets round-robin, place starting armies, then Command Ships."""
+        state, rng = self.state, self.rng
+        order = list(range(state.galaxy.size))
+        rng.shuffle(order)
+        for i, planet in enumerate(order):
+            state.set_owner(planet, i % self.rules.num_players)
+            state.armies[planet] = 1
+        for player, policy in enumerate(self.policies):
+            remaining = self.rules.starting_army_count() - state.planet_counts[player]
+            if remaining > 0:
+                self._place(player, policy.place(state, player, remaining, rng), remaining)
+        for player, policy in enumerate(self.policies):
+            self._deploy_ship(player, policy)
+
+    def _place(self, player: int, orders: list[tuple[int, int]], armies: int) -> None:
+        state = self.state
+        if sum(count for _, count in orders) != armies or any(count < 0 for _, count in orders):
+            raise ValueError(f"Player {player} must place exactly {armies} armies, got {orders}")
+        for planet, count in orders:
+            if state.owner[planet] != player:
+                raise ValueError(f"Player {player} cannot place on planet {planet}")
+            state.armies[planet] += count
+
+    def _deploy_ship(self, player: int, policy: Policy) -> None:
+        state = self.state
+        planets = state.planets_of(player)
+        choice = policy.move_ship(state, player, planets, self.rng)
+        if choice is None:
+            choice = max(planets, key=lambda p: state.armies[p])
+        elif state.owner[choice] != player:
+            raise ValueError(f"Player {player} cannot deploy the Command Ship on planet {choice}")
+        state.ship_planet[player] = choice
+        state.ship_tier[player] = 1
+
+    # --- Phases ---
+
+    def reinforce(self, player: int) -> None:
+        state = self.state
+        armies = state.reinforcements(player)
+        state.build_debt[player] = 0
+        if armies:
+            self._place(player, self.policies[player].place(state, player, armies, self.rng), armies)
+
+    def command(self, player: int) -> None:
+        state, policy = self.state, self.policies[player]
+        if state.ship_planet[player] == NO_SHIP:
+            self._deploy_ship(player, policy)
+            return
+        choice = policy.move_ship(state, player, state.ship_destinations(player), self.rng)
+        if choice is not None:
+            self.move_ship(player, choice)
+
+    def move_ship(self, player: int, planet: int) -> None:
+        state = self.state
+        if state.ship_planet[player] == NO_SHIP or not state.territory.reachable(
+            state.ship_planet[player], self.rules.ship_moves,
+        ) >> planet & 1:
+            raise ValueError(f"Command Ship cannot reach planet {planet}")
+        state.ship_planet[player] = planet
+
+    def _fight(self, source: int, target: int, retreat_at: int) -> tuple[int, int]:
+        state, rng = self.state, self.rng
+        a, d = state.armies[source], state.armies[target]
+        if self.rules.combat == "dice":
+            player = state.owner[source]
+            tier = state.ship_tier[player] if state.ship_planet[player] == source else 0
+            keys = self.rules.structure_keys
+            attacker = Army(a, hero=_SHIP_HEROES[tier - 1] if tier else None)
+            defender = Army(d, structures=[
+                STRUCTURES[key] for bit, key in enumerate(keys) if state.structures[target] >> bit & 1
+            ])
+            resolve_battle(
+                attacker, defender, rng=rng, tuning=self.rules.tuning,
+                retreat=lambda atk, dfn: atk <= retreat_at,
+            )
+            return attacker.units, defender.units
+        rules = state.attack_rules(source, target)
+        if retreat_at <= 1 and a <= OUTCOME_TABLE_MAX and d <= OUTCOME_TABLE_MAX:
+            cumulative, ends = _outcome_table(rules, a, d)
+            i = bisect.bisect_left(cumulative, rng.random() * cumulative[-1])
+            return ends[min(i, len(ends) - 1)]
+        a, d, _ = chain_sampler(rules).sample(a, d, rng, retreat_at)
+        return a, d
+
+    def attack(self, player: int, order: AttackOrder) -> bool:
+        """Fight one battle; return False when it changed nothing."""
+        state = self.state
+        source, target = order.source, order.target
+        if state.owner[source] != player or state.armies[source] < 2:
+            raise ValueError(f"Player {player} cannot attack from planet {source}")
+        if target not in state.galaxy.neighbors[source] or state.owner[target] == player:
+            raise ValueError(f"Planet {target} is not an enemy neighbour of planet {source}")
+
+        before = (state.armies[source], state.armies[target])
+        a, d = self._fight(source, target, max(1, order.retreat_at))
+        self.result.battles += 1
+        instrument.count("battles")
+        state.armies[source] = a
+        state.armies[target] = d
+        if d > 0:
+            return (a, d) != before
+
+        loser = state.owner[target]
+        moved = max(1, min(a - 1, self.policies[player].move_in(state, order, a, self.rng)))
+        state.armies[source] = a - moved
+        state.armies[target] = moved
+        state.set_owner(target, player)
+        self.result.captures[player] += 1
+        if state.ship_planet[loser] == target:
+            state.ship_planet[loser] = NO_SHIP
+            state.ship_tier[loser] = 1
+            self.result.ships_destroyed[loser] += 1
+        if state.planet_counts[loser] == 0:
+            state.ship_planet[loser] = NO_SHIP
+            self.result.eliminated_turn[loser] = state.turn
+
+        state.captures_this_turn += 1
+        state.last_capture_turn = state.turn
+        if state.captures_this_turn == self.rules.promote_after_captures and state.ship_tier[player] < len(SHIP_TIERS):
+            state.ship_tier[player] += 1
+            self.result.max_ship_tier[player] = max(self.result.max_ship_tier[player], state.ship_tier[player])
+        return True
+
+    def fortify(self, player: int, order: tuple[int, int, int]) -> None:
+        state = self.state
+        source, target, count = order
+        if state.owner[source] != player or state.owner[target] != player:
+            raise ValueError(f"Player {player} can only fortify between their own planets")
+        if self.rules.fortify_path:
+            if not state.territory.connected(source, target):
+                raise ValueError(f"Planets {source} and {target} are not connected")
+        elif target not in state.galaxy.neighbors[source]:
+            raise ValueError(f"Planets {source} and {target} are not adjacent")
+        if not 1 <= count < state.armies[source]:
+            raise ValueError(f"Cannot move {count} of {state.armies[source]} armies")
+        state.armies[source] -= count
+        state.armies[target] += count
+
+    def build(self, player: int, order: tuple[int, str]) -> None:
+        state = self.state
+        planet, key = order
+        if state.owner[planet] != player:
+            raise ValueError(f"Player {player} cannot build on planet {planet}")
+        if key not in self.rules.structure_keys:
+            raise ValueError(f"Unknown structure {key!r}")
+        bit = 1 << self.rules.structure_keys.index(key)
+        if state.structures[planet] & bit:
+            raise ValueError(f"Planet {planet} already has a {key}")
+        state.structures[planet] |= bit
+        state.build_debt[player] += self.rules.build_cost
+        self.result.structures_built[player] += 1
+
+    # --- Turns ---
+
+    def begin_turn(self) -> int:
+        """Reinforce and command for the current player; return that player."""
+        state = self.state
+        player = state.player
+        state.captures_this_turn = 0
+        self.reinforce(player)
+        self.command(player)
+        return player
+
+    def attack_phase(self, player: int) -> None:
+        state, policy = self.state, self.policies[player]
+        while state.winner() is None:
+            order = policy.attack(state, player, self.rng)
+            if order is None or not self.attack(player, order):
+                break
+
+    def fortify_phase(self, player: int) -> None:
+        if self.state.winner() is None:
+            order = self.policies[player].fortify(self.state, player, self.rng)
+            if order is not None:
+                self.fortify(player, order)
+
+    def build_phase(self, player: int) -> None:
+        if self.state.winner() is None:
+            order = self.policies[player].build(self.state, player, self.rng)
+            if order is not None:
+                self.build(player, order)
+
+    def end_turn(self) -> None:
+        """Pass play to the next player still in the game."""
+        state = self.state
+        state.turn += 1
+        self.result.turns += 1
+        n = self.rules.num_players
+        for step in range(1, n + 1):
+            nxt = (state.player + step) % n
+            if state.alive(nxt):
+                state.player = nxt
+                break
+
+    def play_turn(self) -> None:
+        """Play every phase for the current player, then pass to the next live one."""
+        player = self.begin_turn()
+        self.attack_phase(player)
+        self.fortify_phase(player)
+        self.build_phase(player)
+        self.end_turn()
+
+    def play(self) -> GameResult:
+        """Set up (if needed) and play until someone holds every planet or turns run out."""
+        state, stall = self.state, self.rules.stall_turns
+        if state.turn == 0 and not any(state.planet_counts):
+            self.setup()
+        while state.winner() is None and state.turn < self.rules.max_turns:
+            if stall and state.turn - state.last_capture_turn >= stall:
+                self.result.stalled = True
+                break
+            self.play_turn()
+        self.result.winner = state.winner()
+        return self.result
+
+
+def play_game(
+    galaxy: GalaxyMap,
+    policies: list[Policy],
+    rules: GameRules | None = None,
+    seed: int | None = None,
+) -> GameResult:
+    """Play one full game; the same seed replays the same game."""
+    return Game(galaxy, policies, rules, _random.Random(seed)).play()
@@ -12,6 +12,9 @@ HERO_TIERS: dict[str, int] = {
     "admiral": 12,
 }
 
+# Heroes are immutable; every army with a given tier shares one instance.
+HEROES: dict[str, Hero] = {name: Hero(name=name, die_size=size) for name, size in HERO_TIERS.items()}
+
 
 def get_die_size(hero: Hero | None) -> int:
     """Return the die size for a hero, or 6 (standard d6) if no hero."""
@@ -0,0 +1,154 @@
+"""Per-request timers and counters for the API handlers.
+
+A handler opens a ``request`` scope; inside it, ``timer`` records how long
+a phase took (parse, compile, solve, serialize) and ``count`` adds to a
+counter (rounds resolved, battles simulated, DP cells, cache hits). The
+engine calls ``count`` unconditionally: outside a request scope it is a
+single context-variable lookup, so library users and the benchmarks pay
+nothing measurable. Finished requests are folded into process-wide
+totals served by ``/api/metrics`` (when ``GALACTIC_DIAGNOSTICS=1``).
+
+Set ``GALACTIC_INSTRUMENT=0`` to skip request scopes entirely.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    import cProfile
+
+ENABLED = os.environ.get("GALACTIC_INSTRUMENT", "1") != "0"
+PROFILE_LIMIT = 30  # functions listed in a profile report
+
+
+class Recorder:
+    """Timings (seconds) and counters collected during one request."""
+
+    __slots__ = ("endpoint", "started", "timings", "counters", "profiler")
+
+    def __init__(self, endpoint: str, profile: bool = False) -> None:
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.timings: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        self.profiler: cProfile.Profile | None = None
+        if profile:
+            import cProfile  # only paid for by profiled requests
+
+            self.profiler = cProfile.Profile()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: phases as ``dur`` in ms, counters as ``desc``."""
+        parts = [f"{name};dur={seconds * 1000.0:.3f}" for name, seconds in self.timings.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000.0:.3f}")
+        parts.extend(f'{name};desc="{value}"' for name, value in self.counters.items())
+        return ", ".join(parts)
+
+    def finish_profile(self) -> str | None:
+        """Stop the profiler and return its report, or None when not profiling."""
+        if self.profiler is None:
+            return None
+        import io
+        import pstats
+
+        self.profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LIMIT)
+        self.profiler = None
+        return out.getvalue()
+
+
+_current: contextvars.ContextVar[Recorder | None] = contextvars.ContextVar("galactic_recorder", default=None)
+
+
+def current() -> Recorder | None:
+    return _current.get()
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Add ``amount`` to a counter of the active request, if any."""
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.counters[name] = recorder.counters.get(name, 0) + amount
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Time the block as phase ``name`` of the active request, if any.
+
+    Repeated phases accumulate. Nested phases are each timed in full, so
+    e.g. ``compile`` time is also part of the ``solve`` around it.
+    """
+    recorder = _current.get()
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.timings[name] = recorder.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+# --- Process-wide totals ---
+
+_lock = threading.Lock()
+_totals: dict[str, dict[str, dict[str, float] | int]] = {}
+
+
+def _fold(recorder: Recorder) -> None:
+    with _lock:
+        entry = _totals.setdefault(recorder.endpoint, {"requests": 0, "timings_ms": {}, "counters": {}})
+        entry["requests"] += 1  # type: ignore[operator]
+        timings = entry["timings_ms"]
+        for name, seconds in recorder.timings.items():
+            timings[name] = timings.get(name, 0.0) + seconds * 1000.0  # type: ignore[union-attr]
+        timings["total"] = timings.get("total", 0.0) + recorder.elapsed() * 1000.0  # type: ignore[union-attr]
+        counters = entry["counters"]
+        for name, value in recorder.counters.items():
+            counters[name] = counters.get(name, 0) + value  # type: ignore[union-attr]
+
+
+@contextmanager
+def request(endpoint: str, profile: bool = False) -> Iterator[Recorder]:
+    """Collect timings and counters for one request to ``endpoint``."""
+    recorder = Recorder(endpoint, profile)
+    token = _current.set(recorder)
+    if recorder.profiler is not None:
+        recorder.profiler.enable()
+    try:
+        yield recorder
+    finally:
+        recorder.finish_profile()
+        _current.reset(token)
+        _fold(recorder)
+
+
+def snapshot() -> dict[str, dict]:
+    """Totals and per-request means for every endpoint seen so far."""
+    with _lock:
+        result = {}
+        for endpoint, entry in _totals.items():
+            requests = int(entry["requests"])  # type: ignore[arg-type]
+            timings = dict(entry["timings_ms"])  # type: ignore[arg-type]
+            result[endpoint] = {
+                "requests": requests,
+                "timings_ms": {k: round(v, 3) for k, v in timings.items()},
+                "mean_ms": {k: round(v / requests, 3) for k, v in timings.items()},
+                "counters": dict(entry["counters"]),  # type: ignore[arg-type]
+            }
+        return result
+
+
+def reset_metrics() -> None:
+    with _lock:
+        _totals.clear()
@@ -0,0 +1,727 @@
+"""Exact round-transition kernel for any combat configuration.
+
+The Taflin tables in ``engine.probabilities`` only cover vanilla d6 pools.
+This module enumerates every dice outcome under a compiled rule set (hero
+die, structures, tuning) using the same semantics as
+``resolve_single_round``, and propagates them into exact end-state
+distributions for whole battles.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from fractions import Fraction
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Generic, Sequence, TypeVar
+
+from engine import instrument
+from engine.dicepool import make_pool, top_k_counts
+from engine.heroes import get_die_size
+from engine.models import Hero, Structure
+from engine.structures import compile_structures
+from engine.tuning import CombatTuning
+
+if TYPE_CHECKING:
+    from engine.tablestore import TableStore
+
+
+@dataclass(frozen=True)
+class RoundRules:
+    """Everything that changes the odds of a single combat round.
+
+    Compiled once per battle from hero, structures and tuning so exact
+    solvers can cache on a small hashable key.
+    """
+
+    hero_die_size: int = 6
+    attacker_bonus: int = 0
+    defender_bonus: int = 0
+    defender_rerolls: int = 0
+    attacker_highest_penalty: int = 0
+    extra_defender_dice: int = 0
+    absorb: int = 0
+    absorb_chances: tuple[tuple[Fraction, int], ...] = ()
+    absorb_charges: int = 0  # limited-use absorb available at the start of a battle
+    ties_to_attacker: bool = False
+
+    def attacker_dice(self, attacker_units: int) -> int:
+        return min(3, attacker_units - 1)
+
+    def defender_dice(self, defender_units: int) -> int:
+        return min(2, defender_units) + self.extra_defender_dice
+
+    def with_charges(self, charges: int) -> RoundRules:
+        """The same rules with ``charges`` limited-use absorb left."""
+        if charges == self.absorb_charges:
+            return self
+        return replace(self, absorb_charges=charges)
+
+
+def compile_rules(
+    hero: Hero | None = None,
+    structures: list[Structure] | None = None,
+    tuning: CombatTuning | None = None,
+) -> RoundRules:
+    """Collapse a battle configuration into its ``RoundRules``."""
+    with instrument.timer("compile"):
+        effects = compile_structures(structures or [])
+        active_tuning = tuning or CombatTuning()
+        return RoundRules(
+            hero_die_size=get_die_size(hero),
+            attacker_bonus=active_tuning.attacker_total_bonus(),
+            defender_bonus=active_tuning.defender_total_bonus(),
+            defender_rerolls=active_tuning.defender_rerolls_per_round(),
+            attacker_highest_penalty=active_tuning.attacker_highest_die_penalty(),
+            extra_defender_dice=effects.extra_defender_dice,
+            absorb=effects.absorb,
+            absorb_chances=effects.absorb_chances,
+            absorb_charges=effects.absorb_charges,
+            ties_to_attacker=effects.ties_to_attacker,
+        )
+
+
+# --- Roll enumeration ---
+
+@lru_cache(maxsize=None)
+def _attacker_roll_counts(
+    num_dice: int,
+    hero_die_size: int,
+    penalty: int,
+) -> tuple[tuple[tuple[int, ...], int], ...]:
+    """Count sorted attacker rolls after the highest-die penalty.
+
+    Counts share the denominator ``hero_die_size * 6 ** (num_dice - 1)``.
+    """
+    if penalty <= 0:
+        return top_k_counts(make_pool(num_dice, (hero_die_size,)))
+    counts: dict[tuple[int, ...], int] = {}
+    for values, weight in top_k_counts(make_pool(num_dice, (hero_die_size,))):
+        ordered = list(values)
+        ordered[0] = max(1, ordered[0] - penalty)
+        ordered.sort(reverse=True)
+        key = tuple(ordered)
+        counts[key] = counts.get(key, 0) + weight
+    return tuple(counts.items())
+
+
+@lru_cache(maxsize=None)
+def _defender_roll_counts(num_dice: int, rerolls: int) -> tuple[tuple[tuple[int, ...], int], ...]:
+    """Count sorted defender rolls after lowest-die rerolls.
+
+    A reroll is kept only when the new lowest die beats the old one, which
+    mirrors ``resolve_single_round``. Every reroll is enumerated even when
+    rejected, so counts share the denominator ``6 ** (num_dice + rerolls)``.
+    """
+    if rerolls <= 0:
+        return top_k_counts(make_pool(num_dice))
+    counts: dict[tuple[int, ...], int] = {}
+    for rolls, base_weight in top_k_counts(make_pool(num_dice)):
+        states = {rolls: base_weight}
+        for _ in range(rerolls):
+            next_states: dict[tuple[int, ...], int] = {}
+            for current, weight in states.items():
+                original_lowest = current[-1]
+                for face in range(1, 7):
+                    rerolled = tuple(sorted(current[:-1] + (face,), reverse=True))
+                    kept = rerolled if rerolled[-1] > original_lowest else current
+                    next_states[kept] = next_states.get(kept, 0) + weight
+            states = next_states
+        for key, weight in states.items():
+            counts[key] = counts.get(key, 0) + weight
+    return tuple(counts.items())
+
+
+def _absorb_outcomes(
+    rules: RoundRules,
+    losses: int,
+    charges: int,
+) -> list[tuple[int, int, int]]:
+    """Weighted (def_losses, charges_spent, weight) after every absorb layer.
+
+    Order matches ``BattleEffects.absorb_losses``: fixed absorb, then each
+    chance absorb, then limited-use charges.
+    """
+    branches = {losses - min(losses, rules.absorb): 1}
+    for chance, amount in rules.absorb_chances:
+        nxt: dict[int, int] = {}
+        for remaining, weight in branches.items():
+            hit = max(0, remaining - amount)
+            nxt[hit] = nxt.get(hit, 0) + weight * chance.numerator
+            nxt[remaining] = nxt.get(remaining, 0) + weight * (chance.denominator - chance.numerator)
+        branches = nxt
+    result = []
+    for remaining, weight in branches.items():
+        spent = min(remaining, charges)
+        result.append((remaining - spent, spent, weight))
+    return result
+
+
+@lru_cache(maxsize=None)
+def round_loss_counts(
+    rules: RoundRules,
+    atk_dice: int,
+    def_dice: int,
+    charges: int = 0,
+) -> tuple[tuple[tuple[int, int, int], int], ...]:
+    """Integer outcome counts of one round, keyed by (atk_losses, def_losses, charges_spent).
+
+    ``charges`` is the limited-use absorb still available this battle. All
+    counts share the denominator returned by ``round_denominator``.
+    """
+    atk_counts = _attacker_roll_counts(atk_dice, rules.hero_die_size, rules.attacker_highest_penalty)
+    def_counts = _defender_roll_counts(def_dice, rules.defender_rerolls)
+    pairs = min(atk_dice, def_dice)
+    margin = 0 if rules.ties_to_attacker else 1
+
+    # Raw defender losses before any absorb, by count.
+    raw = [0] * (pairs + 1)
+    for atk_rolls, atk_weight in atk_counts:
+        for def_rolls, def_weight in def_counts:
+            def_losses = 0
+            for i in range(pairs):
+                if atk_rolls[i] + rules.attacker_bonus >= def_rolls[i] + rules.defender_bonus + margin:
+                    def_losses += 1
+            raw[def_losses] += atk_weight * def_weight
+
+    outcomes: dict[tuple[int, int, int], int] = {}
+    for losses, count in enumerate(raw):
+        if count == 0:
+            continue
+        for def_losses, spent, weight in _absorb_outcomes(rules, losses, charges):
+            key = (pairs - losses, def_losses, spent)
+            outcomes[key] = outcomes.get(key, 0) + count * weight
+    return tuple(sorted(outcomes.items()))
+
+
+def round_denominator(rules: RoundRules, atk_dice: int, def_dice: int) -> int:
+    """Common denominator of ``round_loss_counts`` for the given dice."""
+    total = rules.hero_die_size * 6 ** (atk_dice - 1) * 6 ** (def_dice + rules.defender_rerolls)
+    for chance, _ in rules.absorb_chances:
+        total *= chance.denominator
+    return total
+
+
+def round_distribution(
+    rules: RoundRules,
+    atk_dice: int,
+    def_dice: int,
+    charges: int | None = None,
+) -> dict[tuple[int, int], Fraction]:
+    """Exact single-round outcome probabilities, shaped like the Taflin table.
+
+    ``charges`` defaults to the limited-use absorb available at battle start.
+    """
+    available = rules.absorb_charges if charges is None else charges
+    total = round_denominator(rules, atk_dice, def_dice)
+    dist: dict[tuple[int, int], Fraction] = {}
+    for (al, dl, _), count in round_loss_counts(rules, atk_dice, def_dice, available):
+        dist[(al, dl)] = dist.get((al, dl), 0) + Fraction(count, total)
+    return dist
+
+
+# --- Battle end states ---
+
+@lru_cache(maxsize=65536)
+def state_transitions(
+    rules: RoundRules,
+    attacker_units: int,
+    defender_units: int,
+    charges: int = 0,
+) -> tuple[float, tuple[tuple[int, int, int, float], ...]]:
+    """Return (stay_probability, moves) for one state.
+
+    ``moves`` are (next_attacker, next_defender, next_charges, probability)
+    conditioned on the round changing the state, so callers can skip the
+    self-loop that full absorption creates. No moves means the battle can
+    never end from this state.
+    """
+    atk_dice = rules.attacker_dice(attacker_units)
+    def_dice = rules.defender_dice(defender_units)
+    total = round_denominator(rules, atk_dice, def_dice)
+    stay = 0
+    moves: list[tuple[int, int, int, int]] = []
+    for (al, dl, spent), count in round_loss_counts(rules, atk_dice, def_dice, charges):
+        if al == 0 and dl == 0 and spent == 0:
+            stay = count
+            continue
+        moves.append((attacker_units - al, max(0, defender_units - dl), charges - spent, count))
+    moving = total - stay
+    if moving == 0:
+        return 1.0, ()
+    return stay / total, tuple((na, nd, nc, count / moving) for na, nd, nc, count in moves)
+
+
+@dataclass(frozen=True)
+class BattleDistribution:
+    """Exact distribution of how a fought-to-the-end battle finishes.
+
+    Treat instances as read-only: they are shared through the cache.
+    """
+
+    attacker_units: int
+    defender_units: int
+    attacker_wins: dict[int, float] = field(default_factory=dict)  # attacker remaining -> probability
+    defender_wins: dict[int, float] = field(default_factory=dict)  # defender remaining -> probability
+    stalemate: float = 0.0  # probability of reaching a state no round can change
+    expected_rounds: float = 0.0
+
+    @property
+    def win_probability(self) -> float:
+        return sum(self.attacker_wins.values())
+
+    def expected_attacker_remaining(self) -> float:
+        return (
+            sum(units * p for units, p in self.attacker_wins.items())
+            + sum(p for p in self.defender_wins.values())
+        )
+
+    def expected_defender_remaining(self) -> float:
+        return sum(units * p for units, p in self.defender_wins.items())
+
+
+@lru_cache(maxsize=4096)
+def battle_distribution(
+    attacker_units: int,
+    defender_units: int,
+    rules: RoundRules = RoundRules(),
+) -> BattleDistribution:
+    """Propagate probability mass from (attacker, defender) to the end states.
+
+    Every round either loops in place (fully absorbed), spends limited-use
+    absorb charges, or strictly lowers one side, so states are visited once
+    in descending (charges, attacker, defender) order.
+    """
+    if attacker_units <= 1 or defender_units <= 0:
+        won = defender_units <= 0
+        return BattleDistribution(
+            attacker_units=attacker_units,
+            defender_units=defender_units,
+            attacker_wins={attacker_units: 1.0} if won else {},
+            defender_wins={} if won else {defender_units: 1.0},
+        )
+
+    top = rules.absorb_charges
+    mass = [[[0.0] * (defender_units + 1) for _ in range(attacker_units + 1)] for _ in range(top + 1)]
+    mass[top][attacker_units][defender_units] = 1.0
+    attacker_wins: dict[int, float] = {}
+    defender_wins: dict[int, float] = {}
+    stalemate = 0.0
+    expected_rounds = 0.0
+
+    for c in range(top, -1, -1):
+        layer = mass[c]
+        for a in range(attacker_units, 1, -1):
+            row = layer[a]
+            for d in range(defender_units, 0, -1):
+                m = row[d]
+                if m == 0.0:
+                    continue
+                stay, moves = state_transitions(rules, a, d, c)
+                if not moves:
+                    stalemate += m
+                    continue
+                expected_rounds += m / (1.0 - stay)
+                for na, nd, nc, p in moves:
+                    mass[nc][na][nd] += m * p
+
+        for a in range(2, attacker_units + 1):
+            m = layer[a][0]
+            if m > 0.0:
+                attacker_wins[a] = attacker_wins.get(a, 0.0) + m
+        for d in range(1, defender_units + 1):
+            m = layer[1][d]
+            if m > 0.0:
+                defender_wins[d] = defender_wins.get(d, 0.0) + m
+
+    return BattleDistribution(
+        attacker_units=attacker_units,
+        defender_units=defender_units,
+        attacker_wins=dict(sorted(attacker_wins.items())),
+        defender_wins=dict(sorted(defender_wins.items())),
+        stalemate=stalemate,
+        expected_rounds=expected_rounds,
+    )
+
+
+@dataclass(frozen=True)
+class BattleSurfaces:
+    """Per-state battle summaries; every table is indexed ``[attacker][defender]``.
+
+    Tables describe battles starting with the rules' full absorb charges.
+    States no round can change count as defender holds that last no further
+    rounds, matching ``BattleDistribution.stalemate``.
+    """
+
+    win_probability: tuple[tuple[float, ...], ...]
+    attacker_remaining: tuple[tuple[float, ...], ...]
+    defender_remaining: tuple[tuple[float, ...], ...]
+    rounds: tuple[tuple[float, ...], ...]
+
+
+def _backward_layers(
+    rules: RoundRules,
+    max_a: int,
+    max_d: int,
+    with_summaries: bool,
+) -> list[list[list[list[float]]]]:
+    """Backward pass over every (charges, attacker, defender) state.
+
+    Returns one table per quantity (win probability, then optionally
+    attacker survivors, defender survivors and rounds), each indexed
+    ``[charges][attacker][defender]``. Layers with fewer charges are solved
+    first because spending a charge only ever moves down a layer.
+    """
+    layers = rules.absorb_charges + 1
+    instrument.count("dp_cells", layers * max(0, max_a - 1) * max_d)
+    win = [[[0.0] * (max_d + 1) for _ in range(max_a + 1)] for _ in range(layers)]
+    tables = [win]
+    if with_summaries:
+        atk = [[[float(a)] * (max_d + 1) for a in range(max_a + 1)] for _ in range(layers)]
+        dfn = [[[float(d) for d in range(max_d + 1)] for _ in range(max_a + 1)] for _ in range(layers)]
+        rounds = [[[0.0] * (max_d + 1) for _ in range(max_a + 1)] for _ in range(layers)]
+        tables += [atk, dfn, rounds]
+
+    for c in range(layers):
+        for a in range(1, max_a + 1):
+            win[c][a][0] = 1.0
+        for a in range(2, max_a + 1):
+            win_row = win[c][a]
+            for d in range(1, max_d + 1):
+                stay, moves = state_transitions(rules, a, d, c)
+                if not moves:
+                    continue
+                w = 0.0
+                for na, nd, nc, p in moves:
+                    w += p * win[nc][na][nd]
+                win_row[d] = w
+                if with_summaries:
+                    s_a = s_d = r = 0.0
+                    for na, nd, nc, p in moves:
+                        s_a += p * atk[nc][na][nd]
+                        s_d += p * dfn[nc][na][nd]
+                        r += p * rounds[nc][na][nd]
+                    atk[c][a][d] = s_a
+                    dfn[c][a][d] = s_d
+                    rounds[c][a][d] = r + 1.0 / (1.0 - stay)
+    return tables
+
+
+def _freeze(table: list[list[float]]) -> tuple[tuple[float, ...], ...]:
+    return tuple(tuple(row) for row in table)
+
+
+T = TypeVar("T")
+
+# Rule sets whose surfaces stay cached. Every distinct RoundRules a server
+# or search touches adds an entry, so the caches evict least recently used.
+SURFACE_CACHE_SIZE = 32
+RATIONAL_CACHE_SIZE = 8
+# Cells of cached win-probability surfaces kept in total; a cell of a
+# tuple-of-floats surface takes about 32 bytes, so this is ~64 MB. A
+# surface larger than this on its own is returned without being cached.
+SURFACE_CACHE_CELLS = 2_000_000
+# A request grows the cached surface for its rules to the union of both
+# corners only when that union has at most this many times the cells of
+# the two together. A tall query followed by a wide one therefore gets a
+# surface of its own instead of a full square.
+SURFACE_GROWTH_SLACK = 2.0
+
+
+class _RulesCache(Generic[T]):
+    """Least-recently-used map from RoundRules to a solved table.
+
+    With ``max_cells`` set, entries are 2-D tables and the total of their
+    cells is bounded as well as their number.
+    """
+
+    __slots__ = ("maxsize", "max_cells", "cells", "_entries", "_cells")
+
+    def __init__(self, maxsize: int, max_cells: int | None = None) -> None:
+        self.maxsize = maxsize
+        self.max_cells = max_cells
+        self.cells = 0
+        self._entries: OrderedDict[RoundRules, T] = OrderedDict()
+        self._cells: dict[RoundRules, int] = {}
+
+    def get(self, rules: RoundRules) -> T | None:
+        entry = self._entries.get(rules)
+        if entry is not None:
+            self._entries.move_to_end(rules)
+        return entry
+
+    def __setitem__(self, rules: RoundRules, table: T) -> None:
+        cells = 0
+        if self.max_cells is not None:
+            cells = len(table) * len(table[0]) if table else 0  # type: ignore[arg-type,index]
+            if cells > self.max_cells:
+                return
+        self.pop(rules)
+        self._entries[rules] = table
+        self._cells[rules] = cells
+        self.cells += cells
+        while len(self._entries) > self.maxsize or (self.max_cells is not None and self.cells > self.max_cells):
+            oldest, _ = self._entries.popitem(last=False)
+            self.cells -= self._cells.pop(oldest)
+
+    def pop(self, rules: RoundRules, default: T | None = None) -> T | None:
+        entry = self._entries.pop(rules, None)
+        if entry is None:
+            return default
+        self.cells -= self._cells.pop(rules)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._cells.clear()
+        self.cells = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Largest rational win-probability tables solved so far for each rule set,
+# as (numerator, denominator) cells indexed [charges][attacker][defender].
+_RATIONAL_LAYERS: _RulesCache[list[list[list[tuple[int, int]]]]] = _RulesCache(RATIONAL_CACHE_SIZE)
+
+
+def _rational_layers(rules: RoundRules, max_a: int, max_d: int) -> list[list[list[tuple[int, int]]]]:
+    """Exact backward pass in integer arithmetic.
+
+    Every cell is an unreduced numerator over a denominator built from the
+    round denominators along the way (6^k * 12^m for an Admiral, times any
+    chance-absorb denominators), so the inner loop is integer multiplies
+    and one lcm per cell instead of a Fraction normalisation per term.
+    Tables are cached per rule set and only the missing rows and columns
+    are solved when a larger corner is requested.
+    """
+    cached = _RATIONAL_LAYERS.get(rules)
+    if cached is not None and len(cached[0]) > max_a and len(cached[0][0]) > max_d:
+        instrument.count("rational_cache_hits")
+        return cached
+    instrument.count("rational_cache_misses")
+    if cached is not None:
+        max_a = max(max_a, len(cached[0]) - 1)
+        max_d = max(max_d, len(cached[0][0]) - 1)
+        old_a, old_d = len(cached[0]) - 1, len(cached[0][0]) - 1
+    else:
+        old_a = old_d = -1
+
+    layers = rules.absorb_charges + 1
+    lose = (0, 1)
+    win = [[[lose] * (max_d + 1) for _ in range(max_a + 1)] for _ in range(layers)]
+    for c in range(layers):
+        for a in range(1, max_a + 1):
+            win[c][a][0] = (1, 1)
+        if cached is not None:
+            for a in range(old_a + 1):
+                win[c][a][: old_d + 1] = cached[c][a]
+
+    solved = 0
+    for c in range(layers):
+        for a in range(2, max_a + 1):
+            row = win[c][a]
+            for d in range(1, max_d + 1):
+                if a <= old_a and d <= old_d:
+                    continue
+                solved += 1
+                atk_dice = rules.attacker_dice(a)
+                def_dice = rules.defender_dice(d)
+                moving = round_denominator(rules, atk_dice, def_dice)
+                terms = []
+                for (al, dl, spent), count in round_loss_counts(rules, atk_dice, def_dice, c):
+                    if al == 0 and dl == 0 and spent == 0:
+                        moving -= count  # full absorption: condition it away
+                        continue
+                    num, den = win[c - spent][a - al][max(0, d - dl)]
+                    if num:
+                        terms.append((count * num, den))
+                if moving == 0 or not terms:
+                    continue
+                common = math.lcm(*(den for _, den in terms))
+                row[d] = (sum(num * (common // den) for num, den in terms), moving * common)
+
+    instrument.count("dp_cells", solved)
+    _RATIONAL_LAYERS[rules] = win
+    return win
+
+
+def win_probability_rational(
+    attacker_units: int,
+    defender_units: int,
+    rules: RoundRules = RoundRules(),
+) -> Fraction:
+    """The attacker's win probability as an exact rational.
+
+    Slower than ``win_probability_surface``; use it to certify published
+    odds, not to serve requests. Stalemates count as defender holds.
+    """
+    if attacker_units <= 1:
+        return Fraction(0)
+    if defender_units <= 0:
+        return Fraction(1)
+    win = _rational_layers(rules, attacker_units, defender_units)
+    num, den = win[rules.absorb_charges][attacker_units][defender_units]
+    return Fraction(num, den)
+
+
+# Largest win-probability surface solved so far for each recently used rule set.
+_SURFACES: _RulesCache[Sequence[Sequence[float]]] = _RulesCache(SURFACE_CACHE_SIZE, SURFACE_CACHE_CELLS)
+
+# Cross-process store consulted before a surface is solved (see engine.tablestore).
+_TABLE_STORE: TableStore | None = None
+
+# With a store set, only the corner of each rule set's stored surface is
+# kept here. The grid is read through the store on every call, so the
+# store's own LRU decides which mappings stay open and which files are hot.
+_STORED_CORNERS: _RulesCache[tuple[int, int]] = _RulesCache(SURFACE_CACHE_SIZE)
+
+
+def set_table_store(store: TableStore | None) -> None:
+    """Read and publish surfaces through ``store``; ``None`` solves locally only."""
+    global _TABLE_STORE
+    _TABLE_STORE = store
+    _STORED_CORNERS.clear()
+
+
+def _solve_surface(rules: RoundRules, max_a: int, max_d: int) -> list[list[float]]:
+    [win] = _backward_layers(rules, max_a, max_d, with_summaries=False)
+    return win[rules.absorb_charges]
+
+
+def _known_corner(rules: RoundRules) -> tuple[int, int] | None:
+    """Corner of the surface held for ``rules`` (locally or in the store), if any."""
+    if _TABLE_STORE is not None:
+        corner = _STORED_CORNERS.get(rules)
+        if corner is not None:
+            return corner
+    cached = _SURFACES.get(rules)
+    if cached is None:
+        return None
+    return len(cached) - 1, len(cached[0]) - 1
+
+
+def surface_corner(max_attacker_units: int, max_defender_units: int, rules: RoundRules = RoundRules()) -> tuple[int, int]:
+    """The corner ``win_probability_surface`` would solve for this request if it is not cached.
+
+    That is the request grown to the cached surface's corner when the two
+    overlap well enough (see ``SURFACE_GROWTH_SLACK``), else the request.
+    """
+    max_a = max(1, max_attacker_units)
+    max_d = max(0, max_defender_units)
+    known = _known_corner(rules)
+    if known is None:
+        return max_a, max_d
+    union_a, union_d = max(max_a, known[0]), max(max_d, known[1])
+    separate = (max_a + 1) * (max_d + 1) + (known[0] + 1) * (known[1] + 1)
+    if (union_a + 1) * (union_d + 1) <= SURFACE_GROWTH_SLACK * separate:
+        return union_a, union_d
+    return max_a, max_d
+
+
+def win_probability_surface(
+    max_attacker_units: int,
+    max_defender_units: int,
+    rules: RoundRules = RoundRules(),
+) -> Sequence[Sequence[float]]:
+    """Return q where q[a][d] is the attacker's win probability from (a, d).
+
+    One backward pass fills every cell up to the requested corner. Surfaces
+    are cached for recently used rule sets (at most ``SURFACE_CACHE_SIZE``
+    of them and ``SURFACE_CACHE_CELLS`` cells) and grown on demand when a
+    request overlaps the cached corner, so the returned table may be larger
+    than requested. A request that does not overlap gets a surface of its
+    own, cached instead of the held one only if at least as large.
+    Stalemate states count as defender holds.
+
+    With a table store set, rows are read-only views of a shared file
+    rather than tuples. A surface too large for the store is solved and
+    cached locally instead.
+    """
+    cached = _SURFACES.get(rules)
+    if cached is not None and len(cached) > max_attacker_units and len(cached[0]) > max_defender_units:
+        instrument.count("surface_cache_hits")
+        return cached
+    store = _TABLE_STORE
+    corner = _STORED_CORNERS.get(rules) if store is not None else None
+    if corner is not None and corner[0] >= max_attacker_units and corner[1] >= max_defender_units:
+        instrument.count("surface_cache_hits")
+        return store.get("win", (rules, *corner), lambda: _solve_surface(rules, *corner))
+    instrument.count("surface_cache_misses")
+
+    max_a, max_d = surface_corner(max_attacker_units, max_defender_units, rules)
+    known = _known_corner(rules)
+    # A separate (not grown) surface replaces the held one only if at least as large.
+    keep = known is None or (max_a + 1) * (max_d + 1) >= (known[0] + 1) * (known[1] + 1)
+    solved: list[list[list[float]]] = []
+
+    def solve() -> list[list[float]]:
+        solved.append(_solve_surface(rules, max_a, max_d))
+        return solved[-1]
+
+    if store is not None:
+        try:
+            surface = store.get("win", (rules, max_a, max_d), solve)
+        except ValueError:  # larger than the whole store
+            pass
+        else:
+            if keep:
+                _STORED_CORNERS[rules] = (max_a, max_d)
+                _SURFACES.pop(rules)
+            return surface
+    surface = _freeze(solved[-1] if solved else solve())
+    if keep:
+        _SURFACES[rules] = surface
+    return surface
+
+
+@lru_cache(maxsize=64)
+def battle_surfaces(
+    max_attacker_units: int,
+    max_defender_units: int,
+    rules: RoundRules = RoundRules(),
+) -> BattleSurfaces:
+    """Win probability, expected survivors and expected rounds for every state, in one pass."""
+    max_a = max(1, max_attacker_units)
+    max_d = max(0, max_defender_units)
+    win, atk, dfn, rounds = _backward_layers(rules, max_a, max_d, with_summaries=True)
+    top = rules.absorb_charges
+    return BattleSurfaces(
+        win_probability=_freeze(win[top]),
+        attacker_remaining=_freeze(atk[top]),
+        defender_remaining=_freeze(dfn[top]),
+        rounds=_freeze(rounds[top]),
+    )
+
+
+def cached_surface(rules: RoundRules) -> Sequence[Sequence[float]] | None:
+    """The largest surface this process holds for ``rules``, or None; never solves.
+
+    Surfaces published to a table store are not held, so they are not reported.
+    """
+    return _SURFACES.get(rules)
+
+
+def cache_sizes() -> dict[str, Any]:
+    """Entries held by each kernel cache, for diagnostics."""
+    return {
+        "win_probability_surfaces": len(_SURFACES),
+        "surface_cells": _SURFACES.cells,
+        "stored_surfaces": len(_STORED_CORNERS),
+        "rational_tables": len(_RATIONAL_LAYERS),
+        "battle_surfaces": battle_surfaces.cache_info()._asdict(),
+        "battle_distribution": battle_distribution.cache_info()._asdict(),
+        "state_transitions": state_transitions.cache_info()._asdict(),
+    }
+
+
+def clear_caches() -> None:
+    """Drop every solved table, e.g. to measure a cold process."""
+    _SURFACES.clear()
+    _STORED_CORNERS.clear()
+    _RATIONAL_LAYERS.clear()
+    state_transitions.cache_clear()
+    round_loss_counts.cache_clear()
+    battle_distribution.cache_clear()
+    battle_surfaces.cache_clear()
@@ -0,0 +1,406 @@
+"""Self-play leagues: many headless games per rules variant and lineup.
+
+A league plays ``games`` games for every (variant, lineup) pair, where a
+variant is a named ``GameRules`` and a lineup names the policy in each
+seat. Games are split into chunks and played across a process pool. Each
+game's seed is derived from the league seed and the game's position, so
+results do not depend on how chunks are scheduled. Chunk results are
+integer counters that merge by addition and stream into a running total.
+That total is checkpointed as JSON and a rerun with the same config
+resumes from it.
+
+    python -m engine.league --variants standard no-structures --lineups greedy,greedy mcts,greedy \\
+        --games 2000 --workers 8 --checkpoint league.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterator
+
+from engine.game import SHIP_TIERS, Game, GameResult, GameRules, GreedyPolicy, Policy, RandomPolicy
+from engine import tablestore
+from engine.starmap import GalaxyMap, ring_galaxy
+from engine.structures import STRUCTURES
+from engine.tuning import CombatTuning
+
+# --- Registries ---
+
+PolicyFactory = Callable[[int], Policy]  # game seed -> a fresh policy
+POLICIES: dict[str, PolicyFactory] = {}
+
+
+def register_policy(name: str) -> Callable[[PolicyFactory], PolicyFactory]:
+    """Register a policy factory for use in lineups."""
+    def decorator(factory: PolicyFactory) -> PolicyFactory:
+        POLICIES[name] = factory
+        return factory
+    return decorator
+
+
+@register_policy("passive")
+def _passive(seed: int) -> Policy:  # noqa: ARG001
+    return Policy()
+
+
+@register_policy("random")
+def _random_policy(seed: int) -> Policy:  # noqa: ARG001
+    return RandomPolicy()
+
+
+@register_policy("greedy")
+def _greedy(seed: int) -> Policy:  # noqa: ARG001
+    return GreedyPolicy()
+
+
+@register_policy("greedy-no-ship")
+def _greedy_no_ship(seed: int) -> Policy:  # noqa: ARG001
+    return GreedyPolicy(use_ship=False)
+
+
+@register_policy("greedy-no-build")
+def _greedy_no_build(seed: int) -> Policy:  # noqa: ARG001
+    return GreedyPolicy(build_order=())
+
+
+@register_policy("mcts")
+def _mcts(seed: int) -> Policy:
+    from engine.mcts import MCTSPolicy, SearchConfig
+
+    # An iteration budget, not a time budget, keeps league games reproducible.
+    return MCTSPolicy(SearchConfig(time_budget=0, iterations=60, rollout_turns=1), seed=seed)
+
+
+VARIANTS: dict[str, GameRules] = {
+    "standard": GameRules(),
+    # Shields and fortresses too; lone garrisons behind them hold forever,
+    # so most games end as stalled draws (see engine.game).
+    "all-structures": GameRules(structure_keys=tuple(STRUCTURES)),
+    "no-structures": GameRules(structure_keys=()),
+    "build-cost-3": GameRules(build_cost=3),
+    "no-promotion": GameRules(promote_after_captures=0),
+    "fortify-path": GameRules(fortify_path=True),
+    "planet-upgrades-3": GameRules(tuning=CombatTuning(planet_upgrade_level=3)),
+}
+
+
+# --- Aggregates ---
+
+@dataclass
+class MatchupStats:
+    """Counters for one (variant, lineup); every field merges by addition."""
+
+    seats: int
+    games: int = 0
+    wins: list[int] = field(default_factory=list)  # per seat
+    draws: int = 0
+    stalled: int = 0
+    turns: int = 0
+    turns_squared: int = 0
+    battles: int = 0
+    ships_destroyed: list[int] = field(default_factory=list)  # per seat
+    games_with_ship_lost: int = 0
+    structures_built: list[int] = field(default_factory=list)  # per seat
+    games_with_structures: int = 0
+    top_tier_reached: list[int] = field(default_factory=list)  # games each seat's ship hit the top tier
+
+    def __post_init__(self) -> None:
+        for name in ("wins", "ships_destroyed", "structures_built", "top_tier_reached"):
+            if not getattr(self, name):
+                setattr(self, name, [0] * self.seats)
+
+    def add(self, result: GameResult) -> None:
+        self.games += 1
+        if result.winner is None:
+            self.draws += 1
+        else:
+            self.wins[result.winner] += 1
+        self.stalled += result.stalled
+        self.turns += result.turns
+        self.turns_squared += result.turns * result.turns
+        self.battles += result.battles
+        self.games_with_ship_lost += any(result.ships_destroyed)
+        self.games_with_structures += any(result.structures_built)
+        for seat in range(self.seats):
+            self.ships_destroyed[seat] += result.ships_destroyed[seat]
+            self.structures_built[seat] += result.structures_built[seat]
+            self.top_tier_reached[seat] += result.max_ship_tier[seat] == len(SHIP_TIERS)
+
+    def merge(self, other: MatchupStats) -> None:
+        for name, value in vars(other).items():
+            if name == "seats":
+                continue
+            if isinstance(value, list):
+                mine = getattr(self, name)
+                for i, v in enumerate(value):
+                    mine[i] += v
+            else:
+                setattr(self, name, getattr(self, name) + value)
+
+    def win_rate(self, seat: int) -> float:
+        return self.wins[seat] / self.games if self.games else 0.0
+
+    def mean_turns(self) -> float:
+        return self.turns / self.games if self.games else 0.0
+
+    def turns_stdev(self) -> float:
+        if self.games < 2:
+            return 0.0
+        mean = self.mean_turns()
+        return math.sqrt(max(0.0, (self.turns_squared - self.games * mean * mean) / (self.games - 1)))
+
+
+def matchup_key(variant: str, lineup: tuple[str, ...]) -> str:
+    return f"{variant}|{','.join(lineup)}"
+
+
+@dataclass
+class LeagueStats:
+    matchups: dict[str, MatchupStats] = field(default_factory=dict)
+
+    def merge_matchup(self, key: str, stats: MatchupStats) -> None:
+        if key in self.matchups:
+            self.matchups[key].merge(stats)
+        else:
+            self.matchups[key] = MatchupStats(**{k: (v[:] if isinstance(v, list) else v) for k, v in vars(stats).items()})
+
+    def merge(self, other: LeagueStats) -> None:
+        for key, stats in other.matchups.items():
+            self.merge_matchup(key, stats)
+
+    @property
+    def games(self) -> int:
+        return sum(s.games for s in self.matchups.values())
+
+    def to_dict(self) -> dict:
+        return {key: asdict(stats) for key, stats in sorted(self.matchups.items())}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> LeagueStats:
+        return cls({key: MatchupStats(**stats) for key, stats in data.items()})
+
+
+# --- Running ---
+
+@dataclass(frozen=True)
+class LeagueConfig:
+    variants: tuple[str, ...] = ("standard",)
+    lineups: tuple[tuple[str, ...], ...] = (("greedy", "greedy"),)
+    games: int = 1000  # per (variant, lineup)
+    seed: int = 0
+    num_sectors: int = 6
+    planets_per_sector: int = 7
+    map_seed: int = 0
+    chunk_size: int = 50
+
+    def validate(self) -> None:
+        unknown_variants = [v for v in self.variants if v not in VARIANTS]
+        unknown_policies = sorted({p for lineup in self.lineups for p in lineup} - set(POLICIES))
+        if unknown_variants:
+            raise ValueError(f"Unknown variants {unknown_variants}; expected some of {sorted(VARIANTS)}")
+        if unknown_policies:
+            raise ValueError(f"Unknown policies {unknown_policies}; expected some of {sorted(POLICIES)}")
+        if any(len(lineup) < 2 for lineup in self.lineups):
+            raise ValueError("Every lineup needs at least two seats")
+
+    def fingerprint(self) -> str:
+        """Identifies the games a checkpoint belongs to."""
+        return hashlib.sha256(json.dumps(asdict(self), sort_keys=True).encode()).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class _Chunk:
+    variant: str
+    lineup: tuple[str, ...]
+    start: int
+    stop: int
+
+    @property
+    def chunk_id(self) -> str:
+        return f"{matchup_key(self.variant, self.lineup)}#{self.start}"
+
+
+def game_seed(league_seed: int, variant: str, lineup: tuple[str, ...], index: int) -> int:
+    digest = hashlib.blake2b(f"{league_seed}|{matchup_key(variant, lineup)}|{index}".encode(), digest_size=8)
+    return int.from_bytes(digest.digest(), "big")
+
+
+@lru_cache(maxsize=8)
+def _galaxy(num_sectors: int, planets_per_sector: int, map_seed: int) -> GalaxyMap:
+    return ring_galaxy(num_sectors, planets_per_sector, map_seed)
+
+
+def play_league_game(config: LeagueConfig, variant: str, lineup: tuple[str, ...], index: int) -> GameResult:
+    """Play game ``index`` of a matchup exactly as the league does."""
+    seed = game_seed(config.seed, variant, lineup, index)
+    rules = VARIANTS[variant]
+    if rules.num_players != len(lineup):
+        rules = replace(rules, num_players=len(lineup))
+    policies = [POLICIES[name](seed + seat) for seat, name in enumerate(lineup)]
+    galaxy = _galaxy(config.num_sectors, config.planets_per_sector, config.map_seed)
+    return Game(galaxy, policies, rules, random.Random(seed)).play()
+
+
+def _play_chunk(config: LeagueConfig, chunk: _Chunk) -> tuple[str, MatchupStats]:
+    stats = MatchupStats(seats=len(chunk.lineup))
+    for index in range(chunk.start, chunk.stop):
+        stats.add(play_league_game(config, chunk.variant, chunk.lineup, index))
+    return chunk.chunk_id, stats
+
+
+def _chunks(config: LeagueConfig) -> Iterator[_Chunk]:
+    for variant in config.variants:
+        for lineup in config.lineups:
+            for start in range(0, config.games, config.chunk_size):
+                yield _Chunk(variant, tuple(lineup), start, min(config.games, start + config.chunk_size))
+
+
+def load_checkpoint(path: Path, config: LeagueConfig) -> tuple[LeagueStats, set[str]]:
+    """Stats and finished chunk ids saved for ``config``; empty when there is no checkpoint."""
+    if not path.exists():
+        return LeagueStats(), set()
+    data = json.loads(path.read_text())
+    if data.get("fingerprint") != config.fingerprint():
+        raise ValueError(f"{path} belongs to a different league configuration")
+    return LeagueStats.from_dict(data["stats"]), set(data["done"])
+
+
+def save_checkpoint(path: Path, config: LeagueConfig, stats: LeagueStats, done: set[str]) -> None:
+    """Write atomically, so an interrupted run never leaves a torn checkpoint."""
+    payload = {
+        "fingerprint": config.fingerprint(),
+        "config": asdict(config),
+        "done": sorted(done),
+        "stats": stats.to_dict(),
+    }
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=1) + "\n")
+    os.replace(tmp, path)
+
+
+def run_league(
+    config: LeagueConfig,
+    workers: int = 1,
+    checkpoint: Path | None = None,
+    checkpoint_every: float = 30.0,
+    progress: Callable[[LeagueStats, int, int], None] | None = None,
+    tables: Path | None = None,
+) -> LeagueStats:
+    """Play every remaining chunk of ``config`` and return the merged stats.
+
+    With ``checkpoint`` set, finished chunks are loaded from it, skipped,
+    and the file is rewritten at most every ``checkpoint_every`` seconds
+    and at the end. ``progress`` is called with (stats, chunks done, chunks
+    total) as chunks finish. Workers share win-probability surfaces through
+    a ``TableStore`` in ``tables``, or in a temporary directory when it is
+    not given; a kept ``tables`` directory also warms later runs.
+    """
+    config.validate()
+    stats, done = load_checkpoint(checkpoint, config) if checkpoint else (LeagueStats(), set())
+    pending = [chunk for chunk in _chunks(config) if chunk.chunk_id not in done]
+    total = len(pending) + len(done)
+    last_save = time.monotonic()
+
+    def finish(chunk_id: str, chunk_stats: MatchupStats) -> None:
+        nonlocal last_save
+        stats.merge_matchup(chunk_id.split("#")[0], chunk_stats)
+        done.add(chunk_id)
+        if progress is not None:
+            progress(stats, len(done), total)
+        if checkpoint and time.monotonic() - last_save >= checkpoint_every:
+            save_checkpoint(checkpoint, config, stats, done)
+            last_save = time.monotonic()
+
+    parallel = workers > 1 and len(pending) > 1
+    scratch = tempfile.TemporaryDirectory(prefix="league-tables-") if parallel and tables is None else None
+    previous = tablestore.installed()
+    try:
+        if parallel or tables is not None:
+            tablestore.install(tables or scratch.name)
+        if parallel:
+            with ProcessPoolExecutor(max_workers=workers, **tablestore.pool_kwargs()) as executor:
+                futures = [executor.submit(_play_chunk, config, chunk) for chunk in pending]
+                for future in as_completed(futures):
+                    finish(*future.result())
+        else:
+            for chunk in pending:
+                finish(*_play_chunk(config, chunk))
+    finally:
+        tablestore.use(previous)
+        if scratch is not None:
+            scratch.cleanup()
+        if checkpoint:
+            save_checkpoint(checkpoint, config, stats, done)
+    return stats
+
+
+def format_report(stats: LeagueStats) -> str:
+    lines = [
+        f"{'matchup':<40} {'games':>7} {'seat win %':>18} {'draw %':>7} {'turns':>12} "
+        f"{'ship lost %':>11} {'builds/game':>11}",
+    ]
+    for key, s in sorted(stats.matchups.items()):
+        n = max(1, s.games)
+        seats = "/".join(f"{100 * s.win_rate(i):.0f}" for i in range(s.seats))
+        lines.append(
+            f"{key:<40} {s.games:>7} {seats:>18} {100 * s.draws / n:>6.1f}% "
+            f"{s.mean_turns():>6.1f}±{s.turns_stdev():<5.1f} {100 * s.games_with_ship_lost / n:>10.1f}% "
+            f"{sum(s.structures_built) / n:>11.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m engine.league", description=__doc__.split("\n")[0])
+    parser.add_argument("--variants", nargs="+", default=["standard"], help=f"from {sorted(VARIANTS)}")
+    parser.add_argument("--lineups", nargs="+", default=["greedy,greedy"],
+                        help=f"comma-separated policies per seat, from {sorted(POLICIES)}")
+    parser.add_argument("--games", type=int, default=1000, help="games per variant and lineup")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--map-seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--checkpoint", type=Path, default=None, help="resume from and save to this file")
+    parser.add_argument("--tables", type=Path, default=None, help="keep shared probability tables in this directory")
+    args = parser.parse_args(argv)
+
+    config = LeagueConfig(
+        variants=tuple(args.variants),
+        lineups=tuple(tuple(lineup.split(",")) for lineup in args.lineups),
+        games=args.games,
+        seed=args.seed,
+        map_seed=args.map_seed,
+        chunk_size=args.chunk_size,
+    )
+    started = time.perf_counter()
+
+    def progress(stats: LeagueStats, done: int, total: int) -> None:
+        print(f"\r{done}/{total} chunks, {stats.games} games, {time.perf_counter() - started:.0f}s",
+              end="", file=sys.stderr, flush=True)
+
+    try:
+        stats = run_league(
+            config, workers=args.workers, checkpoint=args.checkpoint, progress=progress, tables=args.tables
+        )
+    except KeyboardInterrupt:
+        print("\ninterrupted; rerun with the same arguments to resume", file=sys.stderr)
+        return 130
+    print(file=sys.stderr)
+    print(format_report(stats))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Monte Carlo tree search over one player's turn.
+
+``MCTSPolicy`` searches the Command, Attack and Build decisions of the
+turn being played. Every attack is a chance node whose outcome is drawn
+from the kernel's exact end-state distribution (``Game._fight``), never
+rolled die by die. After the turn, a short greedy rollout through the
+opponents' replies ends in a heuristic score. Nodes live in a
+transposition table keyed by ``(phase, GameState.key())``, so move orders
+that reach the same board share statistics, and the table is kept across
+the decisions of one turn.
+
+With ``workers > 1`` each decision is searched independently in a process
+pool (root parallelisation) and the root statistics are summed. Workers
+share surfaces through the installed ``engine.tablestore`` if there is one.
+"""
+
+from __future__ import annotations
+
+import math
+import random as _random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+from engine import tablestore
+from engine.game import NO_SHIP, AttackOrder, Game, GameState, GreedyPolicy, Policy
+from engine.starmap import bits, planets_in
+
+PHASES: tuple[str, ...] = ("command", "attack", "build")
+_DONE = "done"
+
+
+@dataclass(frozen=True)
+class SearchConfig:
+    time_budget: float = 0.3  # seconds per decision; 0 = iterations only
+    iterations: int = 0  # iterations per decision (per worker); 0 = time only
+    exploration: float = 0.7  # UCT constant; values are in [0, 1]
+    max_attacks: int = 6  # candidate attacks per decision, best odds first
+    min_attack_odds: float = 0.2
+    max_ship_moves: int = 4
+    max_builds: int = 4
+    rollout_turns: int = 2  # greedy player turns played after the searched turn
+    workers: int = 1
+
+
+def evaluate(state: GameState, player: int) -> float:
+    """Heuristic value of ``state`` for ``player`` in [0, 1].
+
+    Mean of the player's share of planets, armies and reinforcement income.
+    """
+    winner = state.winner()
+    if winner is not None:
+        return 1.0 if winner == player else 0.0
+    if not state.alive(player):
+        return 0.0
+    owned = state.territory.owned
+    armies = state.armies
+    mine = sum(armies[p] for p in bits(owned[player]))
+    total_armies = sum(armies)
+    incomes = [state.reinforcements(p) if state.alive(p) else 0 for p in range(len(owned))]
+    return (
+        state.planet_counts[player] / state.galaxy.size
+        + mine / total_armies
+        + incomes[player] / max(1, sum(incomes))
+    ) / 3.0
+
+
+# --- Candidate actions ---
+
+def _attack_actions(state: GameState, player: int, config: SearchConfig) -> list[Hashable]:
+    scored = []
+    for source in bits(state.territory.owned[player]):
+        if state.armies[source] < 2:
+            continue
+        for target in state.enemy_neighbors(source):
+            odds = state.attack_odds(source, target)
+            if odds >= config.min_attack_odds:
+                scored.append((odds, source, target))
+    scored.sort(reverse=True)
+    actions: list[Hashable] = [None]  # stop attacking
+    for _, source, target in scored[: config.max_attacks]:
+        actions.append(AttackOrder(source, target))
+        if state.armies[source] >= 6:  # a cautious variant that keeps a garrison
+            actions.append(AttackOrder(source, target, retreat_at=state.armies[source] // 2))
+    return actions
+
+
+def _ship_actions(state: GameState, player: int, config: SearchConfig) -> list[Hashable]:
+    here = state.ship_planet[player]
+    if here == NO_SHIP:
+        return [None]
+    fronts = [p for p in state.ship_destinations(player) if p != here and state.is_frontier(p)]
+    fronts.sort(key=lambda p: -state.armies[p])
+    return [None, *fronts[: config.max_ship_moves]]
+
+
+def _build_actions(state: GameState, player: int, config: SearchConfig) -> list[Hashable]:
+    keys = state.rules.structure_keys
+    border = planets_in(state.territory.border(player))
+    border.sort(key=lambda p: -state.armies[p])
+    actions: list[Hashable] = [None]
+    for planet in border[: config.max_builds]:
+        for bit, key in enumerate(keys):
+            if not state.structures[planet] >> bit & 1:
+                actions.append((planet, key))
+    return actions
+
+
+_ACTIONS = {"command": _ship_actions, "attack": _attack_actions, "build": _build_actions}
+
+
+def _apply(game: Game, phase: str, player: int, action: Hashable) -> str:
+    """Play ``action`` in ``phase``; return the phase that follows."""
+    if phase == "command":
+        if action is not None:
+            game.move_ship(player, action)  # type: ignore[arg-type]
+        return "attack"
+    if phase == "attack":
+        if action is not None and game.attack(player, action):  # type: ignore[arg-type]
+            return _DONE if game.state.winner() is not None else "attack"
+        game.fortify_phase(player)
+        return "build"
+    if action is not None:
+        game.build(player, action)  # type: ignore[arg-type]
+    game.end_turn()
+    return _DONE
+
+
+def _rollout(game: Game, phase: str, player: int, config: SearchConfig) -> float:
+    """Finish the turn greedily, play ``rollout_turns`` more turns, then score."""
+    state = game.state
+    if phase != _DONE:
+        if phase == "command":
+            game.command(player)
+        if phase in ("command", "attack"):
+            game.attack_phase(player)
+            game.fortify_phase(player)
+        game.build_phase(player)
+        game.end_turn()
+    for _ in range(config.rollout_turns):
+        if state.winner() is not None:
+            break
+        game.play_turn()
+    return evaluate(state, player)
+
+
+# --- Tree ---
+
+class _Node:
+    __slots__ = ("actions", "visits", "edge_visits", "edge_value")
+
+    def __init__(self, actions: list[Hashable]) -> None:
+        self.actions = actions
+        self.visits = 0
+        self.edge_visits = [0] * len(actions)
+        self.edge_value = [0.0] * len(actions)
+
+    def select(self, exploration: float) -> int:
+        for i, n in enumerate(self.edge_visits):
+            if n == 0:
+                return i  # actions are ordered best-first, so try them in order
+        log_n = math.log(self.visits)
+        best, best_score = 0, -1.0
+        for i, (n, w) in enumerate(zip(self.edge_visits, self.edge_value)):
+            score = w / n + exploration * math.sqrt(log_n / n)
+            if score > best_score:
+                best, best_score = i, score
+        return best
+
+
+Table = dict[tuple[str, bytes], _Node]
+
+
+def search(
+    state: GameState,
+    phase: str,
+    config: SearchConfig,
+    rng: Any,
+    table: Table | None = None,
+) -> dict[Hashable, tuple[int, float]]:
+    """Search ``phase`` of the current player's turn from ``state``.
+
+    Returns (visits, total value) for every root action. ``state`` is not
+    modified.
+    """
+    if phase not in PHASES:
+        raise ValueError(f"Unknown phase {phase!r}; expected one of {PHASES}")
+    if config.time_budget <= 0 and config.iterations <= 0:
+        raise ValueError("SearchConfig needs a time budget or an iteration count")
+    player = state.player
+    table = {} if table is None else table
+    greedy = [GreedyPolicy()] * state.rules.num_players
+    root_key = (phase, state.key())
+    root = table.get(root_key)
+    if root is None:
+        root = table[root_key] = _Node(_ACTIONS[phase](state, player, config))
+
+    deadline = time.perf_counter() + config.time_budget if config.time_budget > 0 else math.inf
+    iterations = 0
+    while time.perf_counter() < deadline and not (config.iterations and iterations >= config.iterations):
+        iterations += 1
+        game = Game.from_state(state.copy(), greedy, _random.Random(rng.getrandbits(64)))
+        current, node = phase, root
+        path: list[tuple[_Node, int]] = []
+        while True:  # select down the tree; stop at the first new node
+            i = node.select(config.exploration)
+            path.append((node, i))
+            current = _apply(game, current, player, node.actions[i])
+            if current == _DONE:
+                break
+            key = (current, game.state.key())
+            child = table.get(key)
+            if child is None:
+                table[key] = _Node(_ACTIONS[current](game.state, player, config))
+                break
+            node = child
+
+        value = _rollout(game, current, player, config)
+        for visited, i in path:
+            visited.visits += 1
+            visited.edge_visits[i] += 1
+            visited.edge_value[i] += value
+
+    return {a: (n, w) for a, n, w in zip(root.actions, root.edge_visits, root.edge_value)}
+
+
+def _search_worker(state: GameState, phase: str, config: SearchConfig, seed: int) -> dict[Hashable, tuple[int, float]]:
+    return search(state, phase, config, _random.Random(seed))
+
+
+def best_action(stats: dict[Hashable, tuple[int, float]]) -> Hashable:
+    """Most-visited root action; ties go to the higher mean value."""
+    return max(stats, key=lambda a: (stats[a][0], stats[a][1] / max(1, stats[a][0])))
+
+
+class MCTSPolicy(Policy):
+    """Search-based player for Command Ship moves, attacks, retreats and builds.
+
+    Placement, move-in and fortify follow ``GreedyPolicy``. A Command Ship
+    returning after being destroyed is placed greedily too. Call ``close``
+    to shut down the worker pool when ``workers > 1``.
+    """
+
+    def __init__(self, config: SearchConfig | None = None, seed: int | None = None) -> None:
+        self.config = config or SearchConfig()
+        self.greedy = GreedyPolicy()
+        self.rng = _random.Random(seed)
+        self.table: Table = {}
+        self._table_turn: int | None = None
+        self._pool: ProcessPoolExecutor | None = None
+        self.decisions = 0
+        self.iterations = 0
+
+    def _decide(self, state: GameState, phase: str) -> Hashable:
+        if state.turn != self._table_turn:
+            self.table.clear()
+            self._table_turn = state.turn
+        config = self.config
+        if len(_ACTIONS[phase](state, state.player, config)) == 1:
+            return None
+
+        futures = []
+        if config.workers > 1:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(config.workers - 1, **tablestore.pool_kwargs())
+            futures = [
+                self._pool.submit(_search_worker, state, phase, config, self.rng.getrandbits(64))
+                for _ in range(config.workers - 1)
+            ]
+        stats = dict(search(state, phase, config, self.rng, self.table))
+        for future in futures:
+            for action, (n, w) in future.result().items():
+                visits, value = stats.get(action, (0, 0.0))
+                stats[action] = (visits + n, value + w)
+        self.decisions += 1
+        self.iterations += sum(n for n, _ in stats.values())
+        return best_action(stats)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def place(self, state, player, armies, rng):
+        return self.greedy.place(state, player, armies, rng)
+
+    def move_ship(self, state, player, destinations, rng):
+        if state.ship_planet[player] == NO_SHIP or state.player != player:
+            return self.greedy.move_ship(state, player, destinations, rng)
+        return self._decide(state, "command")
+
+    def attack(self, state, player, rng):
+        return self._decide(state, "attack")
+
+    def move_in(self, state, order, survivors, rng):
+        return self.greedy.move_in(state, order, survivors, rng)
+
+    def fortify(self, state, player, rng):
+        return self.greedy.fortify(state, player, rng)
+
+    def build(self, state, player, rng):
+        return self._decide(state, "build")
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from array import array
+from collections.abc import Iterable, Sequence
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, overload
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Hero:
     name: str
     die_size: int = 6  # d6, d8, d10, d12
@@ -12,24 +15,33 @@ class Hero:
         return f"{self.name} (d{self.die_size})"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Structure:
     name: str
-    effect: str  # "reroll_lowest", "extra_defender_die", "ties_favor_attacker"
+    effect: str  # key into engine.structures.EFFECT_HANDLERS, e.g. "absorb", "extra_defender_die"
     description: str = ""
+    amount: int = 1  # dice granted / losses absorbed / absorb charges, depending on effect
+    chance: float = 1.0  # trigger probability per round for "chance_absorb"
 
     def __str__(self) -> str:
         return self.name
 
 
-@dataclass
+@dataclass(slots=True)
 class Army:
     units: int
     hero: Hero | None = None
     structures: list[Structure] = field(default_factory=list)
 
+    @property
+    def structure_mask(self) -> int | None:
+        """Bitmask of ``STRUCTURES`` entries, or None if any structure is custom or repeated."""
+        from engine.structures import structure_mask
 
-@dataclass
+        return structure_mask(self.structures)
+
+
+@dataclass(slots=True)
 class RoundResult:
     attacker_rolls: list[int]
     defender_rolls: list[int]
@@ -40,10 +52,111 @@ class RoundResult:
     notes: list[str] = field(default_factory=list)
 
 
-@dataclass
+class RoundLog(Sequence[RoundResult]):
+    """A battle's rounds packed into flat arrays.
+
+    Reads like a list of ``RoundResult`` (indexing builds one on demand),
+    but stores each round as a few machine integers plus a reference to a
+    notes tuple that ``engine.combat`` shares across rounds.
+    """
+
+    __slots__ = ("_rolls", "_starts", "_counts", "_remaining", "_notes")
+
+    def __init__(self, rounds: Iterable[RoundResult] = ()) -> None:
+        self._rolls = array("H")  # attacker rolls then defender rolls, round after round
+        self._starts = array("I", [0])  # per round: offset of its attacker rolls; one extra at the end
+        self._counts = array("H")  # per round: attacker dice, attacker losses, defender losses
+        self._remaining = array("q")  # per round: attacker remaining, defender remaining
+        self._notes: list[tuple[str, ...]] = []
+        for result in rounds:
+            self.append(result)
+
+    def record(
+        self,
+        attacker_rolls: Sequence[int],
+        defender_rolls: Sequence[int],
+        attacker_losses: int,
+        defender_losses: int,
+        attacker_remaining: int,
+        defender_remaining: int,
+        notes: tuple[str, ...] = (),
+    ) -> None:
+        """Append one round without building a ``RoundResult``."""
+        self._rolls.extend(attacker_rolls)
+        self._rolls.extend(defender_rolls)
+        self._starts.append(len(self._rolls))
+        self._counts.extend((len(attacker_rolls), attacker_losses, defender_losses))
+        self._remaining.extend((attacker_remaining, defender_remaining))
+        self._notes.append(notes)
+
+    def append(self, result: RoundResult) -> None:
+        self.record(
+            result.attacker_rolls,
+            result.defender_rolls,
+            result.attacker_losses,
+            result.defender_losses,
+            result.attacker_remaining,
+            result.defender_remaining,
+            tuple(result.notes),
+        )
+
+    def __len__(self) -> int:
+        return len(self._notes)
+
+    @overload
+    def __getitem__(self, index: int) -> RoundResult: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[RoundResult]: ...
+
+    def __getitem__(self, index: int | slice) -> RoundResult | list[RoundResult]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("round index out of range")
+        start, end = self._starts[index], self._starts[index + 1]
+        atk_dice, atk_losses, def_losses = self._counts[3 * index : 3 * index + 3]
+        atk_left, def_left = self._remaining[2 * index : 2 * index + 2]
+        return RoundResult(
+            attacker_rolls=self._rolls[start : start + atk_dice].tolist(),
+            defender_rolls=self._rolls[start + atk_dice : end].tolist(),
+            attacker_losses=atk_losses,
+            defender_losses=def_losses,
+            attacker_remaining=atk_left,
+            defender_remaining=def_left,
+            notes=list(self._notes[index]),
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (RoundLog, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"RoundLog({list(self)!r})"
+
+    def nbytes(self) -> int:
+        """Bytes held by the packed arrays (notes tuples are shared and not counted)."""
+        return sum(a.itemsize * len(a) for a in (self._rolls, self._starts, self._counts, self._remaining)) + 8 * len(self._notes)
+
+
+@dataclass(slots=True)
 class BattleResult:
-    rounds: list[RoundResult]
+    rounds: RoundLog  # a list of RoundResult is accepted and packed
     attacker_remaining: int
     defender_remaining: int
     attacker_retreated: bool
     winner: str  # "attacker" or "defender"
+    truncated: bool = False  # stopped at max_rounds with both sides still fighting
+
+    def __post_init__(self) -> None:
+        if not isinstance(self.rounds, RoundLog):
+            self.rounds = RoundLog(self.rounds)
+
+    def to_dict(self) -> dict[str, Any]:
+        """``dataclasses.asdict`` equivalent, with rounds unpacked into plain dicts."""
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        data["rounds"] = [asdict(r) for r in self.rounds]
+        return data
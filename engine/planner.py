@@ -0,0 +1,431 @@
+"""Cost-based planning and admission control for expensive battle queries.
+
+A query asks for the attacker's win probability under some rules, to
+within a tolerance. The planner prices every engine that could answer it
+from the stack sizes and the rules:
+
+- ``table``: a win-probability surface already in the kernel cache
+- ``exact``: the kernel's backward DP, one cell per state
+- ``asymptotic``: the large-army approximation, roughly constant time
+- ``monte_carlo``: battles drawn from cached transition tables
+
+It then picks the cheapest engine whose estimated error meets the tolerance
+and whose estimated time fits the budget. Simulation requests, which
+want a sample of battles rather than one number, are planned separately:
+they are sampled from transition tables, or rolled die by die (``dice``)
+when they need a retreat callback, and get fewer battles when the full
+count would not fit.
+
+Estimates are in seconds on a cold process (see ``SECONDS_PER_DP_CELL``
+and friends), so they are conservative once caches are warm. A
+``Deadline`` enforces a request's wall-clock and CPU budgets while the
+answer is computed. Sampling engines stop early and return what they
+have. ``AdmissionController`` caps the estimated seconds in flight per
+process and per client. It queues briefly, then rejects work that does
+not fit, so one heavy client cannot starve the rest.
+"""
+
+from __future__ import annotations
+
+import math
+import random as _random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, Callable, Iterator
+
+from engine import kernel
+from engine.asymptotic import ApproximateOutcome, approximate_battle, step_moments
+from engine.kernel import RoundRules, compile_rules, state_transitions, win_probability_surface
+from engine.simulation import CHAIN_TABLES_MAX, STOP_CHECK_EVERY, SimulationConfig, SimulationResult, chain_sampler, run_simulation
+
+ENGINES: tuple[str, ...] = ("table", "exact", "asymptotic", "monte_carlo")
+# What each engine's ``estimated_error`` means.
+ERROR_BASIS: dict[str, str] = {
+    "table": "exact",
+    "exact": "exact",
+    "asymptotic": "calibrated",  # empirical margin, see engine.asymptotic
+    "monte_carlo": "confidence_95",
+}
+
+# Measured on a cold process (transition tables not yet built).
+SECONDS_PER_DP_CELL = 12e-6
+SECONDS_PER_CHAIN_ROUND = 2e-6  # through states already visited; see chain_seconds
+SECONDS_PER_CHAIN_TABLE = 40e-6  # building a state's transition table on its first visit
+SECONDS_PER_DICE_ROUND = 30e-6
+SECONDS_PER_BATTLE = 3e-6  # bookkeeping around each sampled battle
+ASYMPTOTIC_SECONDS = 0.02  # includes solving its boundary band once
+TABLE_SECONDS = 1e-5
+# Sampled battles from one start spread over about this many times
+# sqrt(rounds) defender counts at each attacker count.
+PATH_SPREAD = 3.0
+CHECK_SECONDS = 0.05  # estimated work between deadline checks
+
+Z_95 = 1.96  # Monte Carlo errors are 95% half-widths at p = 0.5
+MIN_SIMULATED_BATTLES = 100
+MONTE_CARLO_BATCH = 256  # most battles between deadline checks
+
+
+class OverBudget(ValueError):
+    """No engine can answer within the budget; ``plan`` is the cheapest that would."""
+
+    def __init__(self, message: str, plan: Plan) -> None:
+        super().__init__(message)
+        self.plan = plan
+
+
+class Rejected(RuntimeError):
+    """Admission control turned a request away; retry after ``retry_after`` seconds."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class Query:
+    attacker_units: int
+    defender_units: int
+    rules: RoundRules = RoundRules()
+    tolerance: float = 0.0  # acceptable absolute error on the win probability
+
+
+@dataclass(frozen=True)
+class Plan:
+    engine: str
+    seconds: float  # estimated
+    estimated_error: float  # see ERROR_BASIS
+    samples: int = 0  # battles drawn by sampling engines
+
+
+@dataclass(frozen=True)
+class Answer:
+    win_probability: float
+    estimated_error: float  # see ERROR_BASIS
+    engine: str
+    samples: int = 0
+    partial: bool = False  # stopped at the deadline before drawing every planned sample
+
+
+class Deadline:
+    """Wall-clock and CPU budgets for work done on the calling thread."""
+
+    __slots__ = ("wall", "cpu")
+
+    def __init__(self, seconds: float, cpu_seconds: float | None = None) -> None:
+        self.wall = time.perf_counter() + seconds
+        self.cpu = time.thread_time() + (seconds if cpu_seconds is None else cpu_seconds)
+
+    def expired(self) -> bool:
+        return time.perf_counter() >= self.wall or time.thread_time() >= self.cpu
+
+    def remaining(self) -> float:
+        return max(0.0, self.wall - time.perf_counter())
+
+
+# --- Cost model ---
+
+@lru_cache(maxsize=256)
+def can_stall(rules: RoundRules) -> bool:
+    """Whether some state has no round that can change it.
+
+    Only the dice counts matter, so one state per (attack dice, defender
+    stack below the full pool) is checked. A die-by-die battle that
+    reaches such a state never ends.
+    """
+    return any(
+        not state_transitions(rules, atk_dice + 1, def_units, 0)[1]
+        for atk_dice in (1, 2, 3)
+        for def_units in (1, 2)
+    )
+
+
+def expected_rounds(attacker_units: int, defender_units: int, rules: RoundRules) -> tuple[float, float]:
+    """Rough (rounds that change the state, all rounds) for one battle.
+
+    Uses the interior loss rates: the battle lasts about as long as the
+    side that runs out first takes to lose its stack.
+    """
+    m = step_moments(rules)
+    if m.stay >= 1.0:
+        return 1.0, math.inf
+    budgets = []
+    if m.mean_attacker > 0:
+        budgets.append(max(1, attacker_units - 1) / m.mean_attacker)
+    if m.mean_defender > 0:
+        budgets.append((defender_units + rules.absorb_charges) / m.mean_defender)
+    moving = min(budgets) + 1.0
+    return moving, moving / (1.0 - m.stay)
+
+
+def chain_seconds(attacker_units: int, defender_units: int, rules: RoundRules, battles: int) -> float:
+    """Estimated seconds to sample ``battles`` battles from transition tables.
+
+    Warm rounds slow down as the tables outgrow the CPU caches (measured
+    at 1.5us a round for 15-round battles, 7.7us for 4600-round ones).
+    Each state visited for the first time also builds its table, which
+    costs about 20 warm rounds. States the process's sampler already
+    holds are taken as visited. When the states battles spread over
+    outnumber the tables a sampler keeps (``CHAIN_TABLES_MAX``), visits to
+    the states it cannot hold are cold every time.
+    """
+    moving, _ = expected_rounds(attacker_units, defender_units, rules)
+    per_round = SECONDS_PER_CHAIN_ROUND * min(4.0, max(1.0, math.sqrt(moving) / 8.0))
+    states = moving * min(battles, PATH_SPREAD * math.sqrt(moving))
+    held = min(float(CHAIN_TABLES_MAX), states)
+    cold = max(0.0, held - len(chain_sampler(rules)))
+    if states > held:
+        cold += battles * moving * (1.0 - held / states)
+    return battles * (SECONDS_PER_BATTLE + moving * per_round) + cold * SECONDS_PER_CHAIN_TABLE
+
+
+def check_interval(seconds_per_battle: float, most: int) -> int:
+    """Battles between deadline checks: about ``CHECK_SECONDS`` of work, at most ``most``."""
+    if seconds_per_battle <= 0.0:
+        return most
+    return max(1, min(most, int(CHECK_SECONDS / seconds_per_battle)))
+
+
+def _affordable(cost: Callable[[int], float], budget: float, limit: int) -> int:
+    """Largest n <= ``limit`` with ``cost(n) <= budget``, for a non-decreasing cost."""
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if cost(mid) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def monte_carlo_samples(tolerance: float) -> int:
+    """Battles needed for a 95% half-width of ``tolerance`` in the worst case."""
+    return max(MIN_SIMULATED_BATTLES, math.ceil((Z_95 * 0.5 / tolerance) ** 2))
+
+
+def monte_carlo_error(samples: int) -> float:
+    return Z_95 * 0.5 / math.sqrt(samples) if samples else 1.0
+
+
+@lru_cache(maxsize=1024)
+def _approximate(attacker_units: int, defender_units: int, rules: RoundRules) -> ApproximateOutcome:
+    return approximate_battle(attacker_units, defender_units, rules)
+
+
+def candidate_plans(query: Query) -> list[Plan]:
+    """Every engine that can answer ``query``, with its cost and estimated error."""
+    a, d, rules = query.attacker_units, query.defender_units, query.rules
+    plans = []
+    cached = kernel.cached_surface(rules)
+    if cached is not None and len(cached) > a and len(cached[0]) > d:
+        plans.append(Plan("table", TABLE_SECONDS, 0.0))
+    # The kernel may grow a cached surface rather than solve just (a, d).
+    max_a, max_d = kernel.surface_corner(a, d, rules)
+    exact = SECONDS_PER_DP_CELL * (rules.absorb_charges + 1) * max_a * max_d
+    plans.append(Plan("exact", exact, 0.0))
+    if exact > ASYMPTOTIC_SECONDS:  # otherwise exact is cheaper and as good
+        plans.append(Plan("asymptotic", ASYMPTOTIC_SECONDS, _approximate(a, d, rules).estimated_error))
+    if query.tolerance > 0:
+        n = monte_carlo_samples(query.tolerance)
+        plans.append(Plan("monte_carlo", chain_seconds(a, d, rules, n), monte_carlo_error(n), n))
+    return plans
+
+
+def plan_query(query: Query, budget: float) -> Plan:
+    """The cheapest plan within ``query.tolerance``; OverBudget if it costs more than ``budget`` seconds."""
+    if query.attacker_units <= 1 or query.defender_units <= 0:
+        return Plan("table", TABLE_SECONDS, 0.0)
+    accurate = [plan for plan in candidate_plans(query) if plan.estimated_error <= query.tolerance]
+    best = min(accurate, key=lambda plan: plan.seconds)
+    if best.seconds > budget:
+        raise OverBudget(
+            f"{query.attacker_units}v{query.defender_units} to within {query.tolerance} needs "
+            f"~{best.seconds:.1f}s ({best.engine}); the budget is {budget:.1f}s",
+            best,
+        )
+    return best
+
+
+def plan_most_accurate(query: Query, budget: float) -> Plan:
+    """The most accurate plan that fits ``budget`` seconds, whatever ``query.tolerance`` says.
+
+    Ties go to the cheaper plan, so exact answers win whenever they fit.
+    OverBudget if even the cheapest plan does not.
+    """
+    if query.attacker_units <= 1 or query.defender_units <= 0:
+        return Plan("table", TABLE_SECONDS, 0.0)
+    plans = candidate_plans(replace(query, tolerance=0.0))
+    fitting = [plan for plan in plans if plan.seconds <= budget]
+    if not fitting:
+        cheapest = min(plans, key=lambda plan: plan.seconds)
+        raise OverBudget(
+            f"{query.attacker_units}v{query.defender_units} needs ~{cheapest.seconds:.1f}s "
+            f"({cheapest.engine}); the budget is {budget:.1f}s",
+            cheapest,
+        )
+    return min(fitting, key=lambda plan: (plan.estimated_error, plan.seconds))
+
+
+def answer(query: Query, plan: Plan, deadline: Deadline | None = None, rng: Any = _random) -> Answer:
+    """Run ``plan``. Only ``monte_carlo`` can stop early at the deadline."""
+    a, d, rules = query.attacker_units, query.defender_units, query.rules
+    if a <= 1 or d <= 0:
+        return Answer(1.0 if d <= 0 else 0.0, 0.0, plan.engine)
+    if plan.engine in ("table", "exact"):
+        return Answer(win_probability_surface(a, d, rules)[a][d], 0.0, plan.engine)
+    if plan.engine == "asymptotic":
+        outcome = _approximate(a, d, rules)
+        return Answer(outcome.win_probability, outcome.estimated_error, plan.engine)
+    if plan.engine != "monte_carlo":
+        raise ValueError(f"Unknown engine {plan.engine!r}; expected one of {ENGINES}")
+
+    sampler = chain_sampler(rules)
+    batch = check_interval(plan.seconds / max(1, plan.samples), MONTE_CARLO_BATCH)
+    wins = n = 0
+    while n < plan.samples:
+        if n and deadline is not None and deadline.expired():
+            break
+        for _ in range(min(batch, plan.samples - n)):
+            wins += sampler.sample(a, d, rng)[1] <= 0
+            n += 1
+    return Answer(wins / n, monte_carlo_error(n), plan.engine, n, n < plan.samples)
+
+
+# --- Simulations ---
+
+def plan_simulation(
+    config: SimulationConfig,
+    budget: float,
+    min_battles: int = MIN_SIMULATED_BATTLES,
+) -> Plan:
+    """Choose how to run ``config`` and how many of its battles fit in ``budget`` seconds.
+
+    Raises OverBudget when not even ``min_battles`` fit, or when a
+    retreat callback forces die-by-die battles under rules that can stall.
+    """
+    a, d = config.attacker_units, config.defender_units
+    rules = compile_rules(config.attacker_hero, config.defender_structures, config.tuning)
+    if config.retreat_policy is None:
+        engine = "monte_carlo"
+
+        def cost(battles: int) -> float:
+            return chain_seconds(a, d, rules, battles)
+    else:
+        engine = "dice"
+        if can_stall(rules):
+            raise OverBudget("These rules can stall a battle forever; drop the retreat policy", Plan(engine, math.inf, 1.0))
+        _, total = expected_rounds(a, d, rules)
+        per_battle = SECONDS_PER_BATTLE + total * SECONDS_PER_DICE_ROUND
+
+        def cost(battles: int) -> float:
+            return battles * per_battle
+
+    requested = max(1, config.num_battles)
+    samples = _affordable(cost, budget, requested)
+    needed = min(requested, min_battles)
+    if samples < needed:
+        raise OverBudget(
+            f"{needed} battles of {a}v{d} need ~{cost(needed):.1f}s; the budget is {budget:.1f}s",
+            Plan(engine, cost(needed), monte_carlo_error(needed), needed),
+        )
+    return Plan(engine, cost(samples), monte_carlo_error(samples), samples)
+
+
+def simulate(
+    config: SimulationConfig,
+    plan: Plan,
+    deadline: Deadline | None = None,
+    rng: Any = _random,
+) -> SimulationResult:
+    """Run a simulation plan; ``num_battles`` in the result is how many actually ran.
+
+    The deadline is checked about every ``CHECK_SECONDS`` of estimated
+    work, down to every battle when battles are slow.
+    """
+    mode = "dice" if plan.engine == "dice" else "chain"
+    stop = deadline.expired if deadline is not None else None
+    check_every = check_interval(plan.seconds / max(1, plan.samples), STOP_CHECK_EVERY)
+    return run_simulation(replace(config, num_battles=plan.samples), rng, mode=mode, stop=stop, check_every=check_every)
+
+
+# --- Admission ---
+
+class AdmissionController:
+    """Caps the estimated seconds of work in flight, per process and per client.
+
+    Work estimated at or below ``free_below`` seconds is always admitted.
+    Anything else waits up to ``queue_timeout`` seconds for room. Room
+    means the total stays within ``capacity``, and a client that already
+    has work in flight stays within ``client_share`` of it. A request that
+    still does not fit is rejected. A lone request is always admitted, so
+    work larger than ``capacity`` runs by itself rather than never.
+    """
+
+    def __init__(
+        self,
+        capacity: float,
+        client_share: float = 0.5,
+        queue_timeout: float = 1.0,
+        free_below: float = 0.05,
+    ) -> None:
+        self.capacity = capacity
+        self.client_share = client_share
+        self.queue_timeout = queue_timeout
+        self.free_below = free_below
+        self.in_flight = 0.0
+        self._active = 0  # requests holding capacity; in_flight is a float sum
+        self._clients: dict[str, float] = {}
+        self._cond = threading.Condition()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def _fits(self, client: str, cost: float) -> bool:
+        mine = self._clients.get(client, 0.0)
+        if mine > 0.0 and mine + cost > self.capacity * self.client_share:
+            return False
+        return self._active == 0 or self.in_flight + cost <= self.capacity
+
+    @contextmanager
+    def admit(self, client: str, cost: float) -> Iterator[None]:
+        """Hold ``cost`` seconds of capacity for ``client`` while the block runs."""
+        if cost <= self.free_below:
+            yield
+            return
+        with self._cond:
+            if not self._fits(client, cost):
+                self.queued += 1
+                if not self._cond.wait_for(lambda: self._fits(client, cost), self.queue_timeout):
+                    self.rejected += 1
+                    raise Rejected(
+                        f"Server busy: {self.in_flight:.1f}s of work in flight",
+                        retry_after=math.ceil(min(self.in_flight, self.capacity)),
+                    )
+            self.admitted += 1
+            self._active += 1
+            self.in_flight += cost
+            self._clients[client] = self._clients.get(client, 0.0) + cost
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                # Reset exactly so rounding never leaves phantom work in flight.
+                self.in_flight = max(0.0, self.in_flight - cost) if self._active else 0.0
+                left = self._clients.pop(client) - cost
+                if left > 1e-9:
+                    self._clients[client] = left
+                self._cond.notify_all()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                "capacity_seconds": self.capacity,
+                "in_flight_seconds": round(self.in_flight, 3),
+                "clients": len(self._clients),
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+            }
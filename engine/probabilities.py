@@ -11,6 +11,8 @@ from __future__ import annotations
 
 from fractions import Fraction
 
+from engine.kernel import win_probability_rational as _kernel_rational
+
 
 # Table 1 from the Taflin paper — exact probabilities for a single roll.
 # Key: (attacker_dice, defender_dice)
@@ -67,12 +69,22 @@ def attacker_advantage_ratio(atk_dice: int, def_dice: int) -> float:
     return round(dfn / atk, 4)
 
 
+# Float copies of the tables above for the DP inner loop:
+# (atk_dice, def_dice) -> ((atk_losses, def_losses, probability), ...)
+_FLOAT_TABLES: dict[tuple[int, int], tuple[tuple[int, int, float], ...]] = {
+    dice: tuple((al, dl, float(p)) for (al, dl), p in outcomes.items())
+    for dice, outcomes in SINGLE_ROLL_PROBABILITIES.items()
+}
+
+
 def win_probability_exact(atk_armies: int, def_armies: int) -> float:
     """Calculate exact attacker win probability using Markov chain approach.
 
     This implements the random walk through (A, D) space described in the
     Taflin paper. We compute Q(a, d) = probability attacker wins from
     state (a, d) for all reachable states using dynamic programming.
+    This is the float64 serving path; ``win_probability_rational`` gives
+    the same number as an exact fraction.
 
     Boundary conditions:
       Q(1, d) = 0 for all d >= 1  (attacker can't attack with 1 unit)
@@ -93,22 +105,25 @@ def win_probability_exact(atk_armies: int, def_armies: int) -> float:
     for a in range(max_a):
         q[a][0] = 1.0
 
-    # Fill in from small states upward
+    # Fill in from small states upward. A round never costs the attacker
+    # its last unit, so new_a >= 1 without clamping.
     for a in range(2, max_a):
+        row = q[a]
+        atk_dice = min(3, a - 1)
         for d in range(1, max_d):
-            atk_dice = min(3, a - 1)
-            def_dice = min(2, d)
-            probs = SINGLE_ROLL_PROBABILITIES[(atk_dice, def_dice)]
-
             val = 0.0
-            for (al, dl), p in probs.items():
-                new_a = a - al
+            for al, dl, p in _FLOAT_TABLES[(atk_dice, min(2, d))]:
                 new_d = d - dl
-                if new_a < 1:
-                    new_a = 1
-                if new_d < 0:
-                    new_d = 0
-                val += float(p) * q[new_a][new_d]
-            q[a][d] = val
+                val += p * q[a - al][new_d if new_d > 0 else 0]
+            row[d] = val
 
     return round(q[atk_armies][def_armies], 6)
+
+
+def win_probability_rational(atk_armies: int, def_armies: int) -> Fraction:
+    """Exact attacker win probability as a fraction, for certifying published odds.
+
+    Solved with integer outcome counts over powers of 6, so no rounding
+    happens anywhere. Intermediate rows are cached between calls.
+    """
+    return _kernel_rational(atk_armies, def_armies)
@@ -0,0 +1,149 @@
+"""Optimal retreat policies via optimal stopping over the (attacker, defender) grid.
+
+The expansion rules let the attacker retreat after any round. Given a
+utility for ending the battle in each state, backward induction over the
+exact transition kernel yields the value of every state and whether to
+keep fighting there.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+from engine.kernel import RoundRules, state_transitions
+
+
+@dataclass(frozen=True)
+class RetreatUtility:
+    """Linear payoff for how a battle ends.
+
+    Values are relative to the starting state; constant terms (the starting
+    stacks) cancel out of every retreat decision, so one solved table serves
+    every start. Subclass and override the two methods for other payoffs.
+    """
+
+    capture_value: float = 10.0
+    unit_cost: float = 1.0  # value of each attacker unit still alive
+    kill_value: float = 0.0  # value of each defender unit destroyed
+
+    def stop_value(self, attacker_units: int, defender_units: int) -> float:
+        """Payoff of walking away (or being stopped at 1 unit) in this state."""
+        return self.unit_cost * attacker_units - self.kill_value * defender_units
+
+    def capture_payoff(self, attacker_units: int) -> float:
+        """Payoff of eliminating the defender with ``attacker_units`` left."""
+        return self.capture_value + self.unit_cost * attacker_units
+
+
+@dataclass(frozen=True)
+class RetreatPolicy:
+    """Solved values and fight/retreat decisions for every state.
+
+    ``values[a][d]`` and ``fight[a][d]`` are indexed by unit counts and
+    assume the defender's limited-use absorb charges are untouched.
+    ``layer_values[c]`` and ``layer_fight[c]`` hold the same tables with
+    ``c`` charges left.
+    """
+
+    rules: RoundRules
+    utility: RetreatUtility
+    layer_values: tuple[tuple[tuple[float, ...], ...], ...]
+    layer_fight: tuple[tuple[tuple[bool, ...], ...], ...]
+
+    @property
+    def values(self) -> tuple[tuple[float, ...], ...]:
+        return self.layer_values[-1]
+
+    @property
+    def fight(self) -> tuple[tuple[bool, ...], ...]:
+        return self.layer_fight[-1]
+
+    @property
+    def max_attacker_units(self) -> int:
+        return len(self.values) - 1
+
+    @property
+    def max_defender_units(self) -> int:
+        return len(self.values[0]) - 1
+
+    def _layer(self, charges: int | None) -> int:
+        top = len(self.layer_values) - 1
+        return top if charges is None else max(0, min(top, charges))
+
+    def value(self, attacker_units: int, defender_units: int, charges: int | None = None) -> float:
+        return self.layer_values[self._layer(charges)][attacker_units][defender_units]
+
+    def should_retreat(self, attacker_units: int, defender_units: int, charges: int | None = None) -> bool:
+        """True when retreating beats fighting on from this state.
+
+        States outside the solved grid fall back to fighting on.
+        """
+        if attacker_units <= 1 or defender_units <= 0:
+            return False
+        if attacker_units > self.max_attacker_units or defender_units > self.max_defender_units:
+            return False
+        return not self.layer_fight[self._layer(charges)][attacker_units][defender_units]
+
+    def retreat_threshold(self, defender_units: int) -> int | None:
+        """Smallest attacker stack that still fights against ``defender_units``."""
+        for a in range(2, self.max_attacker_units + 1):
+            if self.fight[a][defender_units]:
+                return a
+        return None
+
+
+@lru_cache(maxsize=256)
+def solve_retreat_policy(
+    attacker_units: int,
+    defender_units: int,
+    utility: RetreatUtility = RetreatUtility(),
+    rules: RoundRules = RoundRules(),
+) -> RetreatPolicy:
+    """Backward induction over every state up to (attacker_units, defender_units).
+
+    Fighting from a state that can loop in place (full absorption) is worth
+    the expected value of the first round that changes something; a state no
+    round can change is always a retreat.
+    """
+    max_a = max(1, attacker_units)
+    max_d = max(0, defender_units)
+    layer_values = []
+    layer_fight = []
+
+    # Spending absorb charges only moves down a layer, so solve fewest charges first.
+    for c in range(rules.absorb_charges + 1):
+        values: list[list[float]] = [[0.0] * (max_d + 1) for _ in range(max_a + 1)]
+        fight: list[list[bool]] = [[False] * (max_d + 1) for _ in range(max_a + 1)]
+        for a in range(1, max_a + 1):
+            values[a][0] = utility.capture_payoff(a)
+        for d in range(1, max_d + 1):
+            values[1][d] = utility.stop_value(1, d)
+
+        for a in range(2, max_a + 1):
+            row = values[a]
+            fight_row = fight[a]
+            for d in range(1, max_d + 1):
+                stop = utility.stop_value(a, d)
+                _, moves = state_transitions(rules, a, d, c)
+                if not moves:
+                    row[d] = stop
+                    continue
+                cont = 0.0
+                for na, nd, nc, p in moves:
+                    cont += p * (values[na][nd] if nc == c else layer_values[nc][na][nd])
+                if cont > stop:
+                    row[d] = cont
+                    fight_row[d] = True
+                else:
+                    row[d] = stop
+
+        layer_values.append(tuple(tuple(row) for row in values))
+        layer_fight.append(tuple(tuple(row) for row in fight))
+
+    return RetreatPolicy(
+        rules=rules,
+        utility=utility,
+        layer_values=tuple(layer_values),
+        layer_fight=tuple(layer_fight),
+    )
@@ -0,0 +1,199 @@
+"""Multi-turn sieges of one planet, solved exactly as a Markov chain.
+
+A siege alternates two phases. On the attacker's turn it assaults the
+planet until it captures it, is worn down to one army, retreats (its
+retreat policy says so) or stalls (no round can change anything, e.g. a
+lone defender behind enough absorption). On the defender's turn the
+garrison is reinforced and the next structure in the build order goes up,
+paid for from those reinforcements as in the Build phase of
+``docs/expansion-rules.md``. The attacker may also bring up armies
+before its next assault.
+
+The chain's state is (turn, attacker armies, defender armies, structures).
+Structures only depend on the turn, so each turn carries a probability
+distribution over (attacker, defender) and one structure bitmask. A whole
+turn is one forward sweep of that distribution through the cached
+``state_transitions`` kernel. Every round lowers a side or spends an
+absorb charge, so each state is visited once per turn, and the sweep
+never re-solves a battle per starting state or nests a simulation.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable
+
+from engine.kernel import RoundRules, compile_rules, state_transitions
+from engine.models import Hero, Structure
+from engine.structures import STRUCTURE_BITS, STRUCTURES, structure_mask, structures_from_mask
+from engine.tuning import CombatTuning
+
+State = tuple[int, int]  # (attacker armies, defender armies)
+
+
+@dataclass(frozen=True)
+class DefenderPolicy:
+    """How the defender shores up the planet after each assault."""
+
+    units_per_turn: int = 3  # armies placed on the planet each defender turn
+    build_order: tuple[str, ...] = ()  # STRUCTURES keys; the next one not yet built goes up each turn
+    build_cost: int = 0  # armies a build takes out of that turn's reinforcements
+    max_units: int | None = None  # garrison cap, if any
+
+
+@dataclass
+class SiegeConfig:
+    attacker_units: int = 20
+    defender_units: int = 5
+    attacker_hero: Hero | None = None
+    defender_structures: list[Structure] = field(default_factory=list)  # STRUCTURES entries only
+    tuning: CombatTuning = field(default_factory=CombatTuning)
+    turns: int = 5
+    defender: DefenderPolicy = field(default_factory=DefenderPolicy)
+    attacker_reinforcements: int = 0  # armies brought up before every assault after the first
+    # (attacker_units, defender_units) -> True to end this turn's assault, e.g. RetreatPolicy.should_retreat
+    retreat_policy: Callable[[int, int], bool] | None = None
+
+
+@dataclass
+class SiegeResult:
+    capture_by_turn: list[float]  # probability the planet has fallen by the end of turn t (index t - 1)
+    structures_by_turn: list[int]  # STRUCTURES bitmask the defender holds during each assault
+    expected_attacker_losses: float  # over every turn played, captured or not
+    expected_defender_losses: float
+    expected_rounds: float
+    holding: dict[State, float] = field(default_factory=dict)  # still besieged after the last turn
+
+    @property
+    def capture_probability(self) -> float:
+        return self.capture_by_turn[-1] if self.capture_by_turn else 0.0
+
+    @property
+    def cost_per_capture(self) -> float:
+        """Expected attacker armies lost per planet taken; infinite if it never falls."""
+        p = self.capture_probability
+        return self.expected_attacker_losses / p if p > 0.0 else float("inf")
+
+
+def build_schedule(initial_mask: int, policy: DefenderPolicy, turns: int) -> list[int]:
+    """Structure bitmask during each of ``turns`` assaults.
+
+    One structure is built per defender turn, skipping any the planet
+    already has (at most one of each).
+    """
+    queue = []
+    for key in policy.build_order:
+        if key not in STRUCTURES:
+            raise ValueError(f"Unknown structure {key!r} in build order")
+        queue.append(STRUCTURE_BITS[STRUCTURES[key]])
+    masks = []
+    mask = initial_mask
+    for _ in range(turns):
+        masks.append(mask)
+        while queue and mask & queue[0]:
+            queue.pop(0)
+        if queue:
+            mask |= queue.pop(0)
+    return masks
+
+
+def assault(
+    rules: RoundRules,
+    start: dict[State, float],
+    retreat: Callable[[int, int], bool] | None = None,
+) -> tuple[dict[State, float], dict[int, float], float]:
+    """Sweep one turn's assault from a distribution of starting states.
+
+    Returns (where the assault stopped without a capture, attacker armies
+    left on capture, expected rounds fought). Mass only moves to fewer
+    armies or fewer absorb charges, so visiting states in descending
+    (charges, attacker, defender) order settles each one before it is read.
+    """
+    held: dict[State, float] = {}
+    captured: dict[int, float] = {}
+    if not start:
+        return held, captured, 0.0
+    max_a = max(a for a, _ in start)
+    max_d = max(d for _, d in start)
+    top = rules.absorb_charges
+    mass = [[[0.0] * (max_d + 1) for _ in range(max_a + 1)] for _ in range(top + 1)]
+    for (a, d), p in start.items():
+        mass[top][a][d] += p
+    rounds = 0.0
+
+    for c in range(top, -1, -1):
+        layer = mass[c]
+        for a in range(max_a, 0, -1):
+            row = layer[a]
+            for d in range(max_d, -1, -1):
+                m = row[d]
+                if m == 0.0:
+                    continue
+                if d == 0:
+                    captured[a] = captured.get(a, 0.0) + m
+                    continue
+                if a <= 1 or (retreat is not None and retreat(a, d)):
+                    held[(a, d)] = held.get((a, d), 0.0) + m
+                    continue
+                stay, moves = state_transitions(rules, a, d, c)
+                if not moves:  # stalled: the attacker breaks off with what it has
+                    held[(a, d)] = held.get((a, d), 0.0) + m
+                    continue
+                rounds += m / (1.0 - stay)
+                for na, nd, nc, p in moves:
+                    mass[nc][na][nd] += m * p
+    return held, captured, rounds
+
+
+def solve_siege(config: SiegeConfig) -> SiegeResult:
+    """Exact capture probabilities and costs over ``config.turns`` turns."""
+    initial_mask = structure_mask(config.defender_structures)
+    if initial_mask is None:
+        raise ValueError("Siege structures must be distinct STRUCTURES entries")
+    if config.attacker_units < 1 or config.defender_units < 1:
+        raise ValueError("Both sides need at least one army")
+    policy = config.defender
+    masks = build_schedule(initial_mask, policy, config.turns)
+    rules_by_mask: dict[int, RoundRules] = {}
+
+    state: dict[State, float] = {(config.attacker_units, config.defender_units): 1.0}
+    capture_by_turn: list[float] = []
+    captured_total = attacker_losses = defender_losses = rounds = 0.0
+
+    for turn, mask in enumerate(masks):
+        rules = rules_by_mask.get(mask)
+        if rules is None:
+            rules = compile_rules(config.attacker_hero, structures_from_mask(mask), config.tuning)
+            rules_by_mask[mask] = rules
+        held, captured, turn_rounds = assault(rules, state, config.retreat_policy)
+
+        attacker_losses += sum(a * p for (a, _), p in state.items())
+        attacker_losses -= sum(a * p for (a, _), p in held.items()) + sum(a * p for a, p in captured.items())
+        defender_losses += sum(d * p for (_, d), p in state.items()) - sum(d * p for (_, d), p in held.items())
+        rounds += turn_rounds
+        captured_total += sum(captured.values())
+        capture_by_turn.append(captured_total)
+        if turn == len(masks) - 1:
+            state = held
+            break
+
+        # Defender's turn, then the attacker's armies move up.
+        builds = masks[turn + 1] != mask
+        arrivals = max(0, policy.units_per_turn - (policy.build_cost if builds else 0))
+        state = {}
+        for (a, d), p in held.items():
+            if policy.max_units is None:
+                d += arrivals
+            else:
+                d = max(d, min(d + arrivals, policy.max_units))
+            key = (a + config.attacker_reinforcements, d)
+            state[key] = state.get(key, 0.0) + p
+
+    return SiegeResult(
+        capture_by_turn=capture_by_turn,
+        structures_by_turn=masks,
+        expected_attacker_losses=attacker_losses,
+        expected_defender_losses=defender_losses,
+        expected_rounds=rounds,
+        holding=dict(sorted(state.items())),
+    )
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
-import copy
+import bisect
+import math
 import random as _random
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Any
+from functools import lru_cache
+from typing import Any, Callable
 
+from engine import instrument
 from engine.combat import resolve_battle
+from engine.kernel import RoundRules, battle_surfaces, compile_rules, state_transitions
 from engine.models import Army, Hero, Structure
 from engine.tuning import CombatTuning
 
@@ -18,6 +23,9 @@ class SimulationConfig:
     defender_structures: list[Structure] = field(default_factory=list)
     tuning: CombatTuning = field(default_factory=CombatTuning)
     num_battles: int = 10000
+    # (attacker_units, defender_units[, charges]) -> True to retreat, e.g.
+    # RetreatPolicy.should_retreat; see resolve_battle
+    retreat_policy: Callable[..., bool] | None = None
 
 
 @dataclass
@@ -38,14 +46,38 @@ class SimulationResult:
     # Breakdown: when defender wins, what do the numbers look like?
     def_win_avg_remaining: float
     def_win_avg_rounds: float
+    attacker_retreats: int = 0
+
+
+SIMULATION_MODES: tuple[str, ...] = ("dice", "chain")
+STOP_CHECK_EVERY = 64  # battles between ``stop`` checks
 
 
 def run_simulation(
     config: SimulationConfig,
     rng: Any = _random,
+    mode: str = "dice",
+    stop: Callable[[], bool] | None = None,
+    check_every: int = STOP_CHECK_EVERY,
 ) -> SimulationResult:
-    """Run many battles and collect statistics."""
+    """Run many battles and collect statistics.
+
+    ``dice`` rolls every round through ``resolve_battle``. ``chain`` draws
+    each battle from cached transition tables instead, which is the same
+    distribution at a fraction of the cost, ends battles that reach a
+    stalemate as defender holds, and does not support ``retreat_policy``.
+    ``stop`` is polled every ``check_every`` battles; once it returns True
+    the result covers only the battles run so far.
+    """
+    if mode not in SIMULATION_MODES:
+        raise ValueError(f"Unknown mode {mode!r}; expected one of {SIMULATION_MODES}")
+    if mode == "chain" and config.retreat_policy is not None:
+        raise ValueError("chain mode does not support retreat_policy")
+    sampler = None
+    if mode == "chain":
+        sampler = chain_sampler(compile_rules(config.attacker_hero, config.defender_structures, config.tuning))
     attacker_wins = 0
+    attacker_retreats = 0
     total_rounds = 0
     total_atk_remaining = 0
     total_def_remaining = 0
@@ -58,39 +90,48 @@ def run_simulation(
     def_win_remaining_sum = 0
     def_win_rounds_sum = 0
 
-    for _ in range(config.num_battles):
-        attacker = Army(
-            units=config.attacker_units,
-            hero=copy.deepcopy(config.attacker_hero),
-            structures=[],
-        )
-        defender = Army(
-            units=config.defender_units,
-            structures=list(config.defender_structures),
-        )
+    n = 0
+    while n < config.num_battles:
+        if stop is not None and n and n % check_every == 0 and stop():
+            break
+        n += 1
+        if sampler is not None:
+            attacker_remaining, defender_remaining, num_rounds = sampler.sample(
+                config.attacker_units, config.defender_units, rng
+            )
+            retreated = False
+        else:
+            # Heroes and structures are immutable and combat never edits
+            # the structure list, so every battle shares the config's.
+            attacker = Army(config.attacker_units, config.attacker_hero)
+            defender = Army(config.defender_units, structures=config.defender_structures)
 
-        result = resolve_battle(
-            attacker,
-            defender,
-            auto_resolve=True,
-            rng=rng,
-            tuning=config.tuning,
-        )
-        num_rounds = len(result.rounds)
+            result = resolve_battle(
+                attacker,
+                defender,
+                auto_resolve=True,
+                rng=rng,
+                tuning=config.tuning,
+                retreat=config.retreat_policy,
+            )
+            attacker_remaining, defender_remaining = result.attacker_remaining, result.defender_remaining
+            num_rounds = len(result.rounds)
+            retreated = result.attacker_retreated
         total_rounds += num_rounds
-        total_atk_remaining += result.attacker_remaining
-        total_def_remaining += result.defender_remaining
+        total_atk_remaining += attacker_remaining
+        total_def_remaining += defender_remaining
 
-        if result.winner == "attacker":
+        if defender_remaining <= 0:
             attacker_wins += 1
-            atk_win_remaining_sum += result.attacker_remaining
+            atk_win_remaining_sum += attacker_remaining
             atk_win_rounds_sum += num_rounds
         else:
-            def_win_remaining_sum += result.defender_remaining
+            attacker_retreats += retreated
+            def_win_remaining_sum += defender_remaining
             def_win_rounds_sum += num_rounds
 
-    n = config.num_battles
     defender_wins = n - attacker_wins
+    instrument.count("battles", n)
 
     return SimulationResult(
         num_battles=n,
@@ -107,4 +148,159 @@ def run_simulation(
         atk_win_avg_rounds=round(atk_win_rounds_sum / attacker_wins, 1) if attacker_wins else 0,
         def_win_avg_remaining=round(def_win_remaining_sum / defender_wins, 1) if defender_wins else 0,
         def_win_avg_rounds=round(def_win_rounds_sum / defender_wins, 1) if defender_wins else 0,
+        attacker_retreats=attacker_retreats,
     )
+
+
+# --- Batched evaluation ---
+
+BATCH_MODES: tuple[str, ...] = ("exact", "monte_carlo")
+
+
+@dataclass
+class BattleSpec:
+    attacker_units: int
+    defender_units: int
+    attacker_hero: Hero | None = None
+    defender_structures: list[Structure] = field(default_factory=list)
+    tuning: CombatTuning = field(default_factory=CombatTuning)
+    num_battles: int = 1000  # Monte Carlo budget for this spec
+
+
+@dataclass
+class BattleEstimate:
+    attacker_win_probability: float
+    expected_attacker_remaining: float
+    expected_defender_remaining: float
+    expected_rounds: float
+    samples: int  # 0 for exact results
+
+
+# Transition tables one sampler keeps (about 900 bytes each), and rule sets
+# whose samplers stay cached; least recently used tables are rebuilt.
+CHAIN_TABLES_MAX = 50_000
+CHAIN_SAMPLER_CACHE_SIZE = 4
+
+
+class _ChainSampler:
+    """Samples battles by walking cached per-state transition tables.
+
+    One sampler serves every spec that compiles to the same rules, so
+    cumulative tables built for one spec are reused by the rest. At most
+    ``CHAIN_TABLES_MAX`` tables are kept, least recently used evicted.
+    """
+
+    def __init__(self, rules: RoundRules) -> None:
+        self.rules = rules
+        self._tables: OrderedDict[tuple[int, int, int], tuple[float, list[float], list[tuple[int, int, int]]]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        """States whose tables are built, i.e. cheap to walk through again."""
+        return len(self._tables)
+
+    def _table(self, a: int, d: int, c: int) -> tuple[float, list[float], list[tuple[int, int, int]]]:
+        key = (a, d, c)
+        tables = self._tables
+        table = tables.get(key)
+        if table is not None:
+            tables.move_to_end(key)
+        else:
+            stay, moves = state_transitions(self.rules, a, d, c)
+            cumulative: list[float] = []
+            targets: list[tuple[int, int, int]] = []
+            running = 0.0
+            for na, nd, nc, p in moves:
+                running += p
+                cumulative.append(running)
+                targets.append((na, nd, nc))
+            table = (stay, cumulative, targets)
+            tables[key] = table
+            if len(tables) > CHAIN_TABLES_MAX:
+                tables.popitem(last=False)
+        return table
+
+    def sample(self, a: int, d: int, rng: Any, retreat_at: int = 1) -> tuple[int, int, int]:
+        """Play one battle from (a, d); return (attacker_left, defender_left, rounds).
+
+        The attacker withdraws once its stack is down to ``retreat_at``.
+        """
+        c = self.rules.absorb_charges
+        rounds = 0
+        while a > retreat_at and d > 0:
+            stay, cumulative, targets = self._table(a, d, c)
+            if not targets:
+                break  # stalemate: no round can change this state
+            rounds += 1
+            if stay > 0.0:
+                # Rounds spent looping in place are geometric.
+                rounds += int(math.log(1.0 - rng.random()) / math.log(stay))
+            i = bisect.bisect_left(cumulative, rng.random() * cumulative[-1])
+            a, d, c = targets[min(i, len(targets) - 1)]
+        return a, d, rounds
+
+
+@lru_cache(maxsize=CHAIN_SAMPLER_CACHE_SIZE)
+def chain_sampler(rules: RoundRules) -> _ChainSampler:
+    """The process-wide sampler for ``rules``, so its tables warm up once."""
+    return _ChainSampler(rules)
+
+
+def evaluate_battles(
+    specs: list[BattleSpec],
+    mode: str = "exact",
+    rng: Any = _random,
+) -> list[BattleEstimate]:
+    """Evaluate many distinct battles together, in input order.
+
+    Specs are grouped by their compiled rules. ``exact`` fills every spec
+    in a group from one set of battle surfaces; ``monte_carlo`` samples
+    ``spec.num_battles`` battles per spec from shared transition tables
+    instead of rolling dice round by round.
+    """
+    if mode not in BATCH_MODES:
+        raise ValueError(f"Unknown mode {mode!r}; expected one of {BATCH_MODES}")
+
+    groups: dict[RoundRules, list[int]] = {}
+    for index, spec in enumerate(specs):
+        rules = compile_rules(spec.attacker_hero, spec.defender_structures, spec.tuning)
+        groups.setdefault(rules, []).append(index)
+
+    results: list[BattleEstimate | None] = [None] * len(specs)
+    for rules, indices in groups.items():
+        if mode == "exact":
+            max_a = max(specs[i].attacker_units for i in indices)
+            max_d = max(specs[i].defender_units for i in indices)
+            surfaces = battle_surfaces(max(1, max_a), max(0, max_d), rules)
+            for i in indices:
+                a = max(1, specs[i].attacker_units)
+                d = max(0, specs[i].defender_units)
+                results[i] = BattleEstimate(
+                    attacker_win_probability=surfaces.win_probability[a][d],
+                    expected_attacker_remaining=surfaces.attacker_remaining[a][d],
+                    expected_defender_remaining=surfaces.defender_remaining[a][d],
+                    expected_rounds=surfaces.rounds[a][d],
+                    samples=0,
+                )
+        else:
+            sampler = chain_sampler(rules)
+            for i in indices:
+                spec = specs[i]
+                n = max(1, spec.num_battles)
+                wins = atk_left = def_left = rounds = 0
+                for _ in range(n):
+                    a, d, r = sampler.sample(spec.attacker_units, spec.defender_units, rng)
+                    wins += d <= 0
+                    atk_left += a
+                    def_left += d
+                    rounds += r
+                instrument.count("battles", n)
+                results[i] = BattleEstimate(
+                    attacker_win_probability=wins / n,
+                    expected_attacker_remaining=atk_left / n,
+                    expected_defender_remaining=def_left / n,
+                    expected_rounds=rounds / n,
+                    samples=n,
+                )
+    return results  # type: ignore[return-value]
@@ -0,0 +1,267 @@
+"""Star map: planets, sectors and hyperspace lanes as integer bitsets.
+
+Planets are numbered ``0..size-1`` and every set of planets is an ``int``
+with bit ``p`` set for planet ``p``, so adjacency, sector and ownership
+tests are single bitwise operations. ``Territory`` tracks who holds each
+planet and the connected regions each player controls, updated locally
+when a planet changes hands instead of re-running a search over the map.
+It answers the two questions the rules keep asking: where can the Command
+Ship go (up to 3 hops through owned planets) and which owned planets are
+connected.
+"""
+
+from __future__ import annotations
+
+import random as _random
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Iterator
+
+UNOWNED = -1
+
+
+def bits(mask: int) -> Iterator[int]:
+    """Planet indices set in ``mask``, ascending."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def planets_in(mask: int) -> list[int]:
+    return list(bits(mask))
+
+
+@dataclass(frozen=True)
+class GalaxyMap:
+    """Planets, the sector each belongs to, and the hyperspace lanes between them."""
+
+    names: tuple[str, ...]
+    sectors: tuple[int, ...]  # sector index of each planet
+    neighbors: tuple[tuple[int, ...], ...]  # planets one lane away, ascending
+    sector_bonuses: tuple[int, ...]  # armies for holding a whole sector
+
+    @property
+    def size(self) -> int:
+        return len(self.names)
+
+    @property
+    def num_sectors(self) -> int:
+        return len(self.sector_bonuses)
+
+    @cached_property
+    def all_planets(self) -> int:
+        return (1 << self.size) - 1
+
+    @cached_property
+    def neighbor_masks(self) -> tuple[int, ...]:
+        return tuple(sum(1 << n for n in neighbors) for neighbors in self.neighbors)
+
+    @cached_property
+    def sector_masks(self) -> tuple[int, ...]:
+        masks = [0] * self.num_sectors
+        for planet, sector in enumerate(self.sectors):
+            masks[sector] |= 1 << planet
+        return tuple(masks)
+
+    def sector_planets(self, sector: int) -> tuple[int, ...]:
+        return tuple(bits(self.sector_masks[sector]))
+
+    def expand(self, mask: int) -> int:
+        """Every planet one lane away from a planet in ``mask``."""
+        neighbor_masks = self.neighbor_masks
+        out = 0
+        while mask:
+            low = mask & -mask
+            out |= neighbor_masks[low.bit_length() - 1]
+            mask ^= low
+        return out
+
+    @cached_property
+    def _balls(self) -> dict[int, tuple[int, ...]]:
+        return {}
+
+    def ball(self, planet: int, hops: int) -> int:
+        """Planets within ``hops`` lanes of ``planet``, ignoring ownership. Cached."""
+        balls = self._balls.get(hops)
+        if balls is None:
+            rings = [1 << p for p in range(self.size)]
+            for _ in range(hops):
+                rings = [mask | self.expand(mask) for mask in rings]
+            balls = self._balls[hops] = tuple(rings)
+        return balls[planet]
+
+
+def galaxy_from_lanes(
+    names: list[str],
+    sectors: list[int],
+    lanes: list[tuple[int, int]],
+    sector_bonuses: list[int],
+) -> GalaxyMap:
+    """Build a map from an undirected lane list."""
+    adjacent: list[set[int]] = [set() for _ in names]
+    for a, b in lanes:
+        if a == b:
+            raise ValueError(f"Lane from planet {a} to itself")
+        adjacent[a].add(b)
+        adjacent[b].add(a)
+    return GalaxyMap(
+        names=tuple(names),
+        sectors=tuple(sectors),
+        neighbors=tuple(tuple(sorted(n)) for n in adjacent),
+        sector_bonuses=tuple(sector_bonuses),
+    )
+
+
+def ring_galaxy(num_sectors: int = 6, planets_per_sector: int = 7, seed: int = 0) -> GalaxyMap:
+    """A classic-sized star chart: sectors of ringed planets, sectors linked in a ring.
+
+    Each sector gets one random chord and each pair of neighbouring sectors
+    one random lane, so maps differ by ``seed`` but are always connected.
+    """
+    rng = _random.Random(seed)
+    n = planets_per_sector
+    lanes: set[tuple[int, int]] = set()
+
+    def link(a: int, b: int) -> None:
+        if a != b:
+            lanes.add((min(a, b), max(a, b)))
+
+    for s in range(num_sectors):
+        base = s * n
+        for k in range(n):
+            link(base + k, base + (k + 1) % n)
+        if n > 3:
+            link(base + rng.randrange(n), base + rng.randrange(n))
+    for s in range(num_sectors if num_sectors > 2 else num_sectors - 1):
+        t = (s + 1) % num_sectors
+        link(s * n + rng.randrange(n), t * n + rng.randrange(n))
+
+    return galaxy_from_lanes(
+        names=[f"{s}.{k}" for s in range(num_sectors) for k in range(n)],
+        sectors=[s for s in range(num_sectors) for _ in range(n)],
+        lanes=sorted(lanes),
+        sector_bonuses=[max(1, n // 2)] * num_sectors,
+    )
+
+
+class Territory:
+    """Who holds each planet, as bitsets, with each player's connected regions.
+
+    A region is a maximal set of one player's planets connected through
+    that player's planets. Gaining a planet merges the regions around it;
+    losing one re-floods only the region it belonged to. Ship reach is
+    cached per (planet, hops) until its owner's planets change.
+    """
+
+    __slots__ = ("galaxy", "owner", "owned", "_region_id", "_regions", "_next_id", "_reach")
+
+    def __init__(self, galaxy: GalaxyMap, num_players: int, owner: list[int] | None = None) -> None:
+        self.galaxy = galaxy
+        self.owner = [UNOWNED] * galaxy.size
+        self.owned = [0] * num_players  # bitset of planets held, per player
+        self._region_id = [UNOWNED] * galaxy.size
+        self._regions: dict[int, int] = {}  # region id -> planet mask
+        self._next_id = 0
+        self._reach: list[dict[tuple[int, int], int]] = [{} for _ in range(num_players)]
+        for planet, player in enumerate(owner or ()):
+            if player != UNOWNED:
+                self.set_owner(planet, player)
+
+    def copy(self) -> Territory:
+        other = Territory.__new__(Territory)
+        other.galaxy = self.galaxy
+        other.owner = self.owner[:]
+        other.owned = self.owned[:]
+        other._region_id = self._region_id[:]
+        other._regions = dict(self._regions)
+        other._next_id = self._next_id
+        other._reach = [dict(cache) for cache in self._reach]
+        return other
+
+    # --- Updates ---
+
+    def _new_region(self, mask: int) -> None:
+        region = self._next_id
+        self._next_id += 1
+        self._regions[region] = mask
+        for planet in bits(mask):
+            self._region_id[planet] = region
+
+    def _flood(self, start: int, allowed: int) -> int:
+        reached = frontier = 1 << start
+        while frontier:
+            frontier = self.galaxy.expand(frontier) & allowed & ~reached
+            reached |= frontier
+        return reached
+
+    def set_owner(self, planet: int, player: int) -> None:
+        """Hand ``planet`` to ``player`` (or ``UNOWNED``), updating regions locally."""
+        previous = self.owner[planet]
+        if previous == player:
+            return
+        bit = 1 << planet
+        if previous != UNOWNED:
+            self.owned[previous] &= ~bit
+            self._reach[previous].clear()
+            rest = self._regions.pop(self._region_id[planet]) & ~bit
+            while rest:  # the old region may split; flood what is left of it
+                part = self._flood((rest & -rest).bit_length() - 1, rest)
+                self._new_region(part)
+                rest &= ~part
+        self.owner[planet] = player
+        self._region_id[planet] = UNOWNED
+        if player == UNOWNED:
+            return
+        self.owned[player] |= bit
+        self._reach[player].clear()
+        merged = bit
+        for neighbor in bits(self.galaxy.neighbor_masks[planet] & self.owned[player]):
+            region = self._region_id[neighbor]
+            if region in self._regions:
+                merged |= self._regions.pop(region)
+        self._new_region(merged)
+
+    # --- Queries ---
+
+    def region(self, planet: int) -> int:
+        """Mask of planets connected to ``planet`` through its owner's planets."""
+        if self.owner[planet] == UNOWNED:
+            return 0
+        return self._regions[self._region_id[planet]]
+
+    def connected(self, a: int, b: int) -> bool:
+        return self.owner[a] != UNOWNED and self._region_id[a] == self._region_id[b]
+
+    def reachable(self, planet: int, hops: int) -> int:
+        """Planets reachable from ``planet`` in at most ``hops`` moves through its owner's planets."""
+        player = self.owner[planet]
+        if player == UNOWNED:
+            return 0
+        cache = self._reach[player]
+        key = (planet, hops)
+        mask = cache.get(key)
+        if mask is None:
+            owned = self.owned[player]
+            ball = self.galaxy.ball(planet, hops)
+            if ball & ~owned == 0:
+                mask = ball  # nothing in range is blocked
+            else:
+                mask = frontier = 1 << planet
+                for _ in range(hops):
+                    frontier = self.galaxy.expand(frontier) & owned & ~mask
+                    if not frontier:
+                        break
+                    mask |= frontier
+            cache[key] = mask
+        return mask
+
+    def border(self, player: int) -> int:
+        """The player's planets with at least one lane to someone else's planet."""
+        owned = self.owned[player]
+        neighbor_masks = self.galaxy.neighbor_masks
+        return sum(1 << p for p in bits(owned) if neighbor_masks[p] & ~owned)
+
+    def holds_sector(self, player: int, sector: int) -> bool:
+        mask = self.galaxy.sector_masks[sector]
+        return self.owned[player] & mask == mask
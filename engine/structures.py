@@ -1,5 +1,10 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, replace
+from fractions import Fraction
+from functools import lru_cache
+from typing import Any, Callable
+
 from engine.models import Structure
 
 
@@ -30,16 +35,151 @@ STRUCTURES: dict[str, Structure] = {
 }
 
 
+# Structures are immutable, so the entries above are shared everywhere they
+# are used. A set of them packs into one int, bit i for the i-th entry.
+STRUCTURE_BITS: dict[Structure, int] = {structure: 1 << i for i, structure in enumerate(STRUCTURES.values())}
+
+
+def structure_mask(structures: list[Structure]) -> int | None:
+    """Bitmask of ``STRUCTURES`` entries; None if any structure is custom or repeated."""
+    mask = 0
+    for structure in structures:
+        bit = STRUCTURE_BITS.get(structure)
+        if bit is None or mask & bit:
+            return None
+        mask |= bit
+    return mask
+
+
+def structures_from_mask(mask: int) -> list[Structure]:
+    """The ``STRUCTURES`` entries whose bits are set in ``mask``."""
+    return [structure for structure, bit in STRUCTURE_BITS.items() if mask & bit]
+
+
+# --- Effect pipeline ---
+#
+# Every structure effect string maps to a handler that folds the structure
+# into a StructureEffects summary. A planet's structures are compiled once
+# per battle; combat and the exact solvers only read the summary, so new
+# structure designs need a handler here and nothing in combat.py.
+
+@dataclass(frozen=True)
+class StructureEffects:
+    """Everything a planet's structures do in combat, compiled once."""
+
+    extra_defender_dice: int = 0
+    absorb: int = 0  # defender losses negated every round
+    # (chance, amount): each entry negates up to `amount` losses in a round
+    # with probability `chance`, after the fixed absorb.
+    absorb_chances: tuple[tuple[Fraction, int], ...] = ()
+    absorb_charges: int = 0  # losses negated per battle, spent last
+    ties_to_attacker: bool = False
+
+    def start_battle(self) -> BattleEffects:
+        return BattleEffects(self, self.absorb_charges)
+
+
+class BattleEffects:
+    """Battle-scoped structure state (limited-use absorb charges)."""
+
+    __slots__ = ("effects", "charges_left")
+
+    def __init__(self, effects: StructureEffects, charges_left: int) -> None:
+        self.effects = effects
+        self.charges_left = charges_left
+
+    def absorb_losses(self, def_losses: int, rng: Any) -> int:
+        """Return how many of ``def_losses`` are negated, spending charges."""
+        effects = self.effects
+        absorbed = min(def_losses, effects.absorb)
+        for chance, amount in effects.absorb_chances:
+            if absorbed >= def_losses:
+                break
+            if rng.randint(1, chance.denominator) <= chance.numerator:
+                absorbed = min(def_losses, absorbed + amount)
+        spent = min(def_losses - absorbed, self.charges_left)
+        self.charges_left -= spent
+        return absorbed + spent
+
+
+EffectHandler = Callable[[StructureEffects, Structure], StructureEffects]
+EFFECT_HANDLERS: dict[str, EffectHandler] = {}
+
+
+def register_effect(effect: str) -> Callable[[EffectHandler], EffectHandler]:
+    """Register the handler that compiles structures with this effect string."""
+    def decorator(handler: EffectHandler) -> EffectHandler:
+        EFFECT_HANDLERS[effect] = handler
+        return handler
+    return decorator
+
+
+@register_effect("absorb")
+def _absorb(effects: StructureEffects, structure: Structure) -> StructureEffects:
+    return replace(effects, absorb=effects.absorb + structure.amount)
+
+
+@register_effect("extra_defender_die")
+def _extra_defender_die(effects: StructureEffects, structure: Structure) -> StructureEffects:
+    return replace(effects, extra_defender_dice=effects.extra_defender_dice + structure.amount)
+
+
+@register_effect("ties_favor_attacker")
+def _ties_favor_attacker(effects: StructureEffects, structure: Structure) -> StructureEffects:  # noqa: ARG001
+    return replace(effects, ties_to_attacker=True)
+
+
+@register_effect("chance_absorb")
+def _chance_absorb(effects: StructureEffects, structure: Structure) -> StructureEffects:
+    chance = Fraction(structure.chance).limit_denominator(1000)
+    if chance <= 0:
+        return effects
+    if chance >= 1:
+        return _absorb(effects, structure)
+    return replace(effects, absorb_chances=effects.absorb_chances + ((chance, structure.amount),))
+
+
+@register_effect("limited_absorb")
+def _limited_absorb(effects: StructureEffects, structure: Structure) -> StructureEffects:
+    return replace(effects, absorb_charges=effects.absorb_charges + structure.amount)
+
+
+def compile_structures(structures: list[Structure]) -> StructureEffects:
+    """Fold a planet's structures into one StructureEffects.
+
+    Structures with an unregistered effect string have no combat effect.
+    Sets of built-in structures are compiled once per bitmask.
+    """
+    mask = structure_mask(structures)
+    if mask is not None:
+        return _compile_mask(mask)
+    return _fold(structures)
+
+
+@lru_cache(maxsize=None)
+def _compile_mask(mask: int) -> StructureEffects:
+    return _fold(structures_from_mask(mask))
+
+
+def _fold(structures: list[Structure]) -> StructureEffects:
+    effects = StructureEffects()
+    for structure in structures:
+        handler = EFFECT_HANDLERS.get(structure.effect)
+        if handler is not None:
+            effects = handler(effects, structure)
+    return effects
+
+
 def has_effect(structures: list[Structure], effect: str) -> bool:
     """Check if any structure in the list provides the given effect."""
     return any(s.effect == effect for s in structures)
 
 
 def damage_absorbed(structures: list[Structure]) -> int:
-    """Return the number of defender losses negated per round by structures."""
-    return sum(1 for s in structures if s.effect == "absorb")
+    """Return the number of defender losses negated every round by structures."""
+    return compile_structures(structures).absorb
 
 
 def extra_defender_dice(structures: list[Structure]) -> int:
     """Return the number of extra dice granted by structures."""
-    return sum(1 for s in structures if s.effect == "extra_defender_die")
+    return compile_structures(structures).extra_defender_dice
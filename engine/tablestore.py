@@ -0,0 +1,239 @@
+"""Probability tables shared between processes through memory-mapped files.
+
+Workers in a process pool would otherwise each solve and hold their own
+copy of every win-probability surface. A ``TableStore`` keeps each table
+in one file under a shared directory, named by a hash of what the table
+depends on. The first process to need a table solves it and writes it
+atomically. Every other process maps the file read-only and reads cells
+straight from the page cache, so all the workers share one physical copy.
+
+The directory is bounded to ``max_bytes``. The least recently used tables
+are deleted first. Each process touches a file when it maps it and again,
+at most every ``TOUCH_INTERVAL`` seconds, while it keeps reading it.
+Deleting a file that is still mapped elsewhere is safe: the mapping stays
+valid until its last reader lets go.
+
+``install`` points the kernel at a store, and ``pool_kwargs`` passes the
+same store to ``ProcessPoolExecutor`` workers:
+
+    store = install("/tmp/galactic-tables")
+    with ProcessPoolExecutor(8, **pool_kwargs()) as pool:
+        ...
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Hashable, Sequence
+
+from engine import instrument
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+TOUCH_INTERVAL = 1.0  # seconds between recency updates for a table read from memory
+_MAGIC = b"GCT1"
+_HEADER = struct.Struct("<4sII4x")  # magic, rows, columns; padded so cells are 8-byte aligned
+_SUFFIX = ".tbl"
+
+Grid = tuple[memoryview, ...]  # read-only rows of float cells, indexed [row][column]
+
+
+@lru_cache(maxsize=1024)
+def table_name(kind: str, key: Hashable) -> str:
+    """File name for a table, stable across processes and runs.
+
+    ``key`` must have a deterministic ``repr`` (frozen dataclasses, tuples
+    and numbers do).
+    """
+    digest = hashlib.blake2b(repr((kind, key)).encode(), digest_size=16).hexdigest()
+    return f"{kind}-{digest}{_SUFFIX}"
+
+
+def _write(path: Path, rows: Sequence[Sequence[float]]) -> None:
+    columns = len(rows[0]) if rows else 0
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(rows), columns))
+        for row in rows:
+            f.write(struct.pack(f"<{columns}d", *row))
+    os.replace(tmp, path)
+
+
+def _map(path: Path) -> tuple[Grid, int]:
+    """Map a table file read-only; return its rows and size in bytes."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    magic, rows, columns = _HEADER.unpack(view[: _HEADER.size])
+    if magic != _MAGIC or size != _HEADER.size + 8 * rows * columns:
+        raise ValueError(f"{path} is not a complete table file")
+    cells = view[_HEADER.size :].cast("d")
+    return tuple(cells[r * columns : (r + 1) * columns] for r in range(rows)), size
+
+
+class TableStore:
+    """A directory of read-only float tables shared by every process that opens it."""
+
+    def __init__(self, directory: str | os.PathLike, max_bytes: int = DEFAULT_MAX_BYTES, wait: float = 60.0) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.wait = wait  # seconds to wait for another process that is building a table
+        self._mapped: OrderedDict[str, tuple[Grid, int]] = OrderedDict()
+        self._mapped_bytes = 0
+        self._touched: dict[str, float] = {}  # monotonic time each mapped file was last touched
+
+    def get(self, kind: str, key: Hashable, build: Callable[[], Sequence[Sequence[float]]]) -> Grid:
+        """Return the table for (kind, key), building it with ``build`` if no process has yet."""
+        name = table_name(kind, key)
+        entry = self._mapped.get(name)
+        if entry is not None:
+            self._mapped.move_to_end(name)
+            if time.monotonic() - self._touched[name] >= TOUCH_INTERVAL:
+                self._touch(self.directory / name)
+            instrument.count("table_store_hits")
+            return entry[0]
+
+        path = self.directory / name
+        grid = self._open(path)
+        if grid is None:
+            grid = self._build(path, build)
+        return grid
+
+    def _open(self, path: Path) -> Grid | None:
+        try:
+            grid, size = _map(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        self._touch(path)
+        instrument.count("table_store_maps")
+        self._remember(path.name, grid, size)
+        return grid
+
+    def _touch(self, path: Path) -> None:
+        self._touched[path.name] = time.monotonic()
+        try:
+            os.utime(path)  # recency for directory eviction
+        except FileNotFoundError:
+            pass
+
+    def _build(self, path: Path, build: Callable[[], Sequence[Sequence[float]]]) -> Grid:
+        lock = path.with_name(path.name + ".lock")
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            # Another process is building this table; map it when it lands.
+            deadline = time.monotonic() + self.wait
+            while time.monotonic() < deadline:
+                time.sleep(0.005)
+                grid = self._open(path)
+                if grid is not None:
+                    return grid
+                if not lock.exists():
+                    break
+            grid = self._open(path)
+            if grid is not None:
+                return grid
+        try:
+            instrument.count("table_store_builds")
+            rows = build()
+            size = _HEADER.size + 8 * len(rows) * (len(rows[0]) if rows else 0)
+            if size > self.max_bytes:
+                # Writing it would only make trim() empty the directory.
+                raise ValueError(f"Table {path.name} needs {size} bytes; max_bytes is {self.max_bytes}")
+            _write(path, rows)
+        finally:
+            try:
+                os.unlink(lock)
+            except FileNotFoundError:
+                pass
+        self.trim()
+        grid = self._open(path)
+        if grid is None:  # deleted by another process's trim before it could be mapped
+            raise ValueError(f"Table {path.name} was evicted before it could be mapped")
+        return grid
+
+    def _remember(self, name: str, grid: Grid, size: int) -> None:
+        self._mapped[name] = (grid, size)
+        self._mapped_bytes += size
+        while self._mapped_bytes > self.max_bytes and len(self._mapped) > 1:
+            # Dropping the rows unmaps the file once no caller still holds them.
+            dropped_name, (_, dropped) = self._mapped.popitem(last=False)
+            self._mapped_bytes -= dropped
+            self._touched.pop(dropped_name, None)
+
+    def trim(self) -> int:
+        """Delete least recently used tables until the directory fits; return bytes freed."""
+        files = []
+        for path in self.directory.glob("*" + _SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        freed = 0
+        for _, size, path in sorted(files):
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            freed += size
+            instrument.count("table_store_evictions")
+        return freed
+
+    def nbytes(self) -> int:
+        """Bytes of tables currently in the directory."""
+        return sum(path.stat().st_size for path in self.directory.glob("*" + _SUFFIX))
+
+    def clear(self) -> None:
+        """Forget every mapping and delete every table in the directory."""
+        self._mapped.clear()
+        self._mapped_bytes = 0
+        self._touched.clear()
+        for path in self.directory.glob("*" + _SUFFIX):
+            path.unlink(missing_ok=True)
+
+
+# --- Process-wide store used by the kernel ---
+
+_STORE: TableStore | None = None
+
+
+def installed() -> TableStore | None:
+    return _STORE
+
+
+def use(store: TableStore | None) -> None:
+    """Make the kernel read and publish surfaces through ``store``; ``None`` stops.
+
+    Surfaces this process already solved stay in its own cache.
+    """
+    global _STORE
+    from engine import kernel
+
+    _STORE = store
+    kernel.set_table_store(store)
+
+
+def install(directory: str | os.PathLike, max_bytes: int = DEFAULT_MAX_BYTES) -> TableStore:
+    """Open a store in ``directory`` and ``use`` it. Also the pool worker initializer."""
+    store = TableStore(directory, max_bytes)
+    use(store)
+    return store
+
+
+def pool_kwargs() -> dict[str, Any]:
+    """``ProcessPoolExecutor`` arguments that give each worker the installed store."""
+    if _STORE is None:
+        return {}
+    return {"initializer": install, "initargs": (str(_STORE.directory), _STORE.max_bytes)}
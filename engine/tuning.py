@@ -7,6 +7,11 @@ PLANET_UPGRADE_MODES: tuple[str, ...] = (
     "reroll_lowest_defender",
     "suppress_attacker_highest",
 )
+# Ranges the API accepts (see CombatTuning.field_bounds).
+ABILITY_MIN = -6
+ABILITY_MAX = 6
+VALUE_PER_UPGRADE_MIN = 0
+VALUE_PER_UPGRADE_MAX = 4
 
 
 def _clamp(value: int, minimum: int, maximum: int) -> int:
@@ -34,6 +39,22 @@ class CombatTuning:
     max_planet_upgrade_level: int = 3
     planet_upgrade_mode: str = "flat_bonus"
 
+    def field_bounds(self, name: str) -> tuple[int, int]:
+        """Inclusive range the API accepts for integer field ``name``.
+
+        Upgrade levels run up to their caps; the caps themselves are fixed.
+        """
+        if name in ("attacker_ability", "defender_ability"):
+            return ABILITY_MIN, ABILITY_MAX
+        if name in ("hero_value_per_upgrade", "planet_value_per_upgrade"):
+            return VALUE_PER_UPGRADE_MIN, VALUE_PER_UPGRADE_MAX
+        if name == "hero_upgrade_level":
+            return 0, max(0, self.max_hero_upgrade_level)
+        if name == "planet_upgrade_level":
+            return 0, max(0, self.max_planet_upgrade_level)
+        value = getattr(self, name)
+        return value, value
+
     def clamped_hero_upgrade_level(self) -> int:
         return _clamp(self.hero_upgrade_level, 0, max(0, self.max_hero_upgrade_level))
 
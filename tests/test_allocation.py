@@ -0,0 +1,70 @@
+from itertools import product
+
+import pytest
+
+from engine.allocation import AllocationTarget, allocate_reinforcements, capture_curve
+from engine.kernel import battle_distribution
+from engine.models import Hero
+from engine.structures import STRUCTURES
+
+
+def _brute_force(reinforcements, targets):
+    best = -1.0
+    for split in product(range(reinforcements + 1), repeat=len(targets)):
+        if sum(split) != reinforcements:
+            continue
+        score = sum(t.value * capture_curve(t, reinforcements)[k] for t, k in zip(targets, split))
+        best = max(best, score)
+    return best
+
+
+class TestCaptureCurve:
+    def test_matches_battle_distribution(self):
+        target = AllocationTarget(defender_units=4, attacker_units=3)
+        curve = capture_curve(target, 5)
+        for k, p in enumerate(curve):
+            assert abs(p - battle_distribution(3 + k, 4).win_probability) < 1e-9
+
+    def test_non_decreasing(self):
+        target = AllocationTarget(defender_units=6, structures=[STRUCTURES["orbital_battery"]])
+        curve = capture_curve(target, 15)
+        assert all(b >= a - 1e-12 for a, b in zip(curve, curve[1:]))
+
+
+class TestAllocateReinforcements:
+    def test_places_every_army(self):
+        targets = [AllocationTarget(defender_units=3), AllocationTarget(defender_units=5)]
+        result = allocate_reinforcements(10, targets)
+        assert sum(result.allocation) == 10
+
+    def test_matches_brute_force(self):
+        targets = [
+            AllocationTarget(defender_units=2, attacker_units=2),
+            AllocationTarget(defender_units=5, attacker_units=3, hero=Hero("Admiral", 12)),
+            AllocationTarget(defender_units=3, structures=[STRUCTURES["orbital_battery"]], value=2.0),
+        ]
+        result = allocate_reinforcements(8, targets)
+        assert abs(result.objective_value - _brute_force(8, targets)) < 1e-9
+
+    def test_skips_unwinnable_target(self):
+        fortified = [STRUCTURES["shield_generator"], STRUCTURES["fortress"]]
+        targets = [
+            AllocationTarget(defender_units=3, structures=fortified),
+            AllocationTarget(defender_units=3),
+        ]
+        result = allocate_reinforcements(6, targets)
+        assert result.allocation[1] >= 5
+
+    def test_capture_all_objective(self):
+        targets = [AllocationTarget(defender_units=2), AllocationTarget(defender_units=2)]
+        result = allocate_reinforcements(6, targets, objective="capture_all")
+        assert result.allocation == [3, 3]
+        expected = result.win_probabilities[0] * result.win_probabilities[1]
+        assert abs(result.objective_value - expected) < 1e-12
+
+    def test_unknown_objective(self):
+        with pytest.raises(ValueError):
+            allocate_reinforcements(3, [AllocationTarget(defender_units=1)], objective="glory")
+
+    def test_no_targets(self):
+        assert allocate_reinforcements(5, []).allocation == []
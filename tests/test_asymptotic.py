@@ -0,0 +1,84 @@
+import math
+
+from engine import kernel
+from engine.asymptotic import BAND_ATTACKER_CAP, BOUNDARY_BAND, EXACT_THRESHOLD, approximate_battle, estimate_battle, step_moments
+from engine.kernel import RoundRules, compile_rules, win_probability_surface
+from engine.models import Hero
+from engine.structures import STRUCTURES
+from engine.tuning import CombatTuning
+
+
+class TestStepMoments:
+    def test_vanilla_three_vs_two(self):
+        m = step_moments(RoundRules())
+        assert m.stay == 0.0
+        # Taflin 3v2: defender loses 2 in 2890/7776, attacker 2 in 2275, split 2611.
+        assert abs(m.mean_attacker - 7161 / 7776) < 1e-12
+        assert abs(m.mean_defender - 8391 / 7776) < 1e-12
+        assert m.cov < 0
+
+    def test_absorb_stretches_time(self):
+        # Two absorbs cancel the defender's worst case entirely.
+        rules = compile_rules(None, [STRUCTURES["shield_generator"], STRUCTURES["fortress"]])
+        m = step_moments(rules)
+        assert abs(m.stay - 2890 / 7776) < 1e-12
+        assert m.mean_attacker + m.mean_defender > 0.99
+
+
+class TestApproximateBattle:
+    def test_within_bound_of_exact(self):
+        configs = [
+            RoundRules(),
+            compile_rules(Hero("Admiral", 12)),
+            compile_rules(None, [STRUCTURES["orbital_battery"]]),
+            compile_rules(Hero("Admiral", 12), [STRUCTURES["shield_generator"]]),
+            compile_rules(Hero("Admiral", 12), list(STRUCTURES.values()), CombatTuning(hero_upgrade_level=3)),
+        ]
+        for rules in configs:
+            q = win_probability_surface(200, 200, rules)
+            for a, d in [(60, 60), (120, 100), (200, 180), (80, 200)]:
+                approx = approximate_battle(a, d, rules)
+                assert abs(approx.win_probability - q[a][d]) <= approx.estimated_error
+
+    def test_invincible_garrison_is_not_captured(self):
+        # One absorb stops the last defender from ever dying.
+        rules = compile_rules(Hero("Admiral", 12), [STRUCTURES["shield_generator"]])
+        assert approximate_battle(400, 300, rules).win_probability < 0.01
+
+    def test_expected_rounds_track_stack_sizes(self):
+        small = approximate_battle(1000, 1000).expected_rounds
+        large = approximate_battle(10000, 10000).expected_rounds
+        assert 8 < large / small < 12
+
+    def test_huge_battle_only_solves_the_band(self):
+        # Attackers lose ~0.85 units per defender unit, so this is near even.
+        outcome = approximate_battle(100000, 116000)
+        assert 0.0 < outcome.win_probability < 1.0
+        assert outcome.estimated_error < 0.01
+        # The work is the boundary band, whatever the stack sizes (timed in benchmarks/).
+        rules = RoundRules(attacker_bonus=1, defender_bonus=1)
+        kernel._SURFACES.pop(rules, None)
+        approximate_battle(100000, 116000, rules)
+        surface = kernel.cached_surface(rules)
+        assert len(surface) == BAND_ATTACKER_CAP + 1 and len(surface[0]) == BOUNDARY_BAND + 1
+
+
+class TestEstimateBattle:
+    def test_small_battles_are_exact(self):
+        outcome = estimate_battle(10, 5)
+        assert outcome.method == "exact"
+        assert outcome.estimated_error == 0.0
+        assert abs(outcome.win_probability - 0.872936) < 1e-6
+
+    def test_switches_above_threshold(self):
+        assert estimate_battle(EXACT_THRESHOLD + 1, 100).method == "asymptotic"
+        assert estimate_battle(EXACT_THRESHOLD, 100).method == "exact"
+
+    def test_trivial_battles(self):
+        assert estimate_battle(1, 5).win_probability == 0.0
+        assert estimate_battle(5, 0).win_probability == 1.0
+
+    def test_lopsided_battles(self):
+        assert estimate_battle(100000, 5).win_probability > 0.999
+        assert estimate_battle(5, 100000).win_probability < 1e-3
+        assert not math.isnan(estimate_battle(5, 100000).expected_rounds)
@@ -0,0 +1,66 @@
+import pytest
+
+from engine.balance import (
+    BalanceScenario,
+    evaluate_parameters,
+    scenario_rules,
+    solve_balance,
+)
+from engine.kernel import battle_distribution
+from engine.models import Hero
+from engine.structures import STRUCTURES
+from engine.tuning import CombatTuning
+
+FULL_DEFENSE = [STRUCTURES["shield_generator"], STRUCTURES["orbital_battery"], STRUCTURES["fortress"]]
+
+
+class TestScenarioRules:
+    def test_tuning_and_rule_overrides(self):
+        scenario = BalanceScenario(10, 10, structures=FULL_DEFENSE, tuning=CombatTuning(hero_upgrade_level=3))
+        rules = scenario_rules(scenario, {"hero_value_per_upgrade": 2, "absorb": 1})
+        assert rules.attacker_bonus == 6
+        assert rules.absorb == 1
+        assert rules.extra_defender_dice == 1
+
+
+class TestEvaluateParameters:
+    def test_matches_exact_solver(self):
+        scenario = BalanceScenario(8, 6, hero=Hero("General", 10))
+        [p] = evaluate_parameters([scenario], {"attacker_ability": 1})
+        rules = scenario_rules(scenario, {"attacker_ability": 1})
+        assert abs(p - battle_distribution(8, 6, rules).win_probability) < 1e-9
+
+
+class TestSolveBalance:
+    def test_finds_ability_for_even_odds(self):
+        scenario = BalanceScenario(10, 10, target_win_probability=0.5, hero=Hero("Admiral", 12))
+        result = solve_balance([scenario], {"defender_ability": range(0, 5)}, tolerance=0.1)
+        assert result.converged
+        assert result.parameters["defender_ability"] > 0
+        assert result.max_error <= 0.1
+
+    def test_admiral_vs_full_defense_targets(self):
+        tuning = CombatTuning(hero_upgrade_level=3, planet_upgrade_level=3)
+        scenarios = [
+            BalanceScenario(n, n, hero=Hero("Admiral", 12), structures=FULL_DEFENSE, tuning=tuning)
+            for n in (8, 12)
+        ]
+        result = solve_balance(
+            scenarios,
+            {"hero_value_per_upgrade": range(0, 5), "planet_value_per_upgrade": range(0, 5), "absorb": range(0, 3)},
+            tolerance=0.1,
+        )
+        assert result.converged
+        assert len(result.win_probabilities) == 2
+
+    def test_parallel_matches_serial(self):
+        scenario = BalanceScenario(6, 6, target_win_probability=0.3)
+        space = {"attacker_ability": range(-2, 3), "defender_ability": range(-2, 3)}
+        serial = solve_balance([scenario], space, tolerance=0.0)
+        parallel = solve_balance([scenario], space, tolerance=0.0, workers=2)
+        assert serial.parameters == parallel.parameters
+        assert serial.win_probabilities == parallel.win_probabilities
+
+    def test_unknown_parameter(self):
+        with pytest.raises(ValueError):
+            solve_balance([BalanceScenario(5, 5)], {"luck": range(3)})
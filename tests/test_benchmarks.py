@@ -0,0 +1,58 @@
+from benchmarks.suite import (
+    BENCHMARKS,
+    Measurement,
+    find_regressions,
+    load_baselines,
+    measure,
+    relative_change,
+    save_baselines,
+)
+from engine.tuning import PLANET_UPGRADE_MODES
+
+
+class TestSuite:
+    def test_covers_canonical_configs(self):
+        for kind in ("round", "battle", "simulation"):
+            assert f"{kind}/vanilla-10v10" in BENCHMARKS
+            assert f"{kind}/admiral-vs-all" in BENCHMARKS
+            for mode in PLANET_UPGRADE_MODES:
+                assert f"{kind}/{mode}-3" in BENCHMARKS
+        assert "exact/win_probability_exact-50x50" in BENCHMARKS
+
+    def test_committed_baselines_cover_every_case(self):
+        baselines = load_baselines()
+        assert set(baselines) == set(BENCHMARKS)
+        for name, baseline in baselines.items():
+            assert baseline.unit == BENCHMARKS[name].unit
+
+    def test_measure_reports_positive_values(self):
+        m = measure(BENCHMARKS["exact/win_probability_exact-50x50"], repeats=1)
+        assert m.value > 0 and m.unit == "ms/solve"
+
+
+class TestRegressions:
+    def test_throughput_and_latency_directions(self):
+        assert relative_change(Measurement("a", 80.0, "battles/s"), Measurement("a", 100.0, "battles/s")) == 0.2
+        assert relative_change(Measurement("b", 12.0, "ms/solve"), Measurement("b", 10.0, "ms/solve")) == 0.2
+        assert relative_change(Measurement("b", 5.0, "ms/solve"), Measurement("b", 10.0, "ms/solve")) < 0
+
+    def test_flags_only_cases_past_threshold(self):
+        baselines = {
+            "fast": Measurement("fast", 100.0, "battles/s"),
+            "slow": Measurement("slow", 100.0, "battles/s"),
+            "solve": Measurement("solve", 10.0, "ms/solve"),
+        }
+        current = [
+            Measurement("fast", 90.0, "battles/s"),
+            Measurement("slow", 50.0, "battles/s"),
+            Measurement("solve", 20.0, "ms/solve"),
+            Measurement("new", 1.0, "battles/s"),
+        ]
+        flagged = [m.name for m, _, _ in find_regressions(current, baselines, threshold=0.25)]
+        assert flagged == ["slow", "solve"]
+
+    def test_save_merges_into_existing_file(self, tmp_path):
+        path = tmp_path / "baselines.json"
+        save_baselines([Measurement("a", 1.0, "ms/solve")], path)
+        save_baselines([Measurement("b", 2.0, "rounds/s")], path)
+        assert set(load_baselines(path)) == {"a", "b"}
@@ -0,0 +1,49 @@
+from engine.chain import ChainTarget, attack_chain_distribution, leave_behind
+from engine.kernel import battle_distribution
+from engine.models import Hero
+from engine.structures import STRUCTURES
+
+
+class TestAttackChain:
+    def test_single_target_matches_battle(self):
+        result = attack_chain_distribution(10, [ChainTarget(units=5)])
+        exact = battle_distribution(10, 5)
+        assert abs(result.steps[0].capture_probability - exact.win_probability) < 1e-12
+        assert abs(result.reach_distribution[1] - exact.win_probability) < 1e-12
+
+    def test_reach_distribution_sums_to_one(self):
+        targets = [ChainTarget(units=3), ChainTarget(units=2), ChainTarget(units=4)]
+        result = attack_chain_distribution(15, targets)
+        assert len(result.reach_distribution) == 4
+        assert abs(sum(result.reach_distribution) - 1.0) < 1e-9
+
+    def test_capture_probability_is_non_increasing(self):
+        targets = [ChainTarget(units=2) for _ in range(4)]
+        result = attack_chain_distribution(12, targets)
+        probs = [step.capture_probability for step in result.steps]
+        assert probs == sorted(probs, reverse=True)
+
+    def test_move_all_matches_manual_convolution(self):
+        result = attack_chain_distribution(8, [ChainTarget(units=2), ChainTarget(units=2)])
+        first = battle_distribution(8, 2)
+        expected = sum(
+            p * battle_distribution(remaining - 1, 2).win_probability
+            for remaining, p in first.attacker_wins.items()
+        )
+        assert abs(result.steps[1].capture_probability - expected) < 1e-12
+
+    def test_leaving_garrisons_lowers_later_odds(self):
+        targets = [ChainTarget(units=2), ChainTarget(units=3)]
+        push = attack_chain_distribution(12, targets)
+        garrison = attack_chain_distribution(12, targets, move_in=leave_behind(4))
+        assert garrison.steps[0].capture_probability == push.steps[0].capture_probability
+        assert garrison.steps[1].capture_probability < push.steps[1].capture_probability
+        assert max(garrison.steps[0].moved_in) <= 12 - 4
+
+    def test_hero_only_boosts_first_attack_by_default(self):
+        targets = [ChainTarget(units=3), ChainTarget(units=3, structures=[STRUCTURES["orbital_battery"]])]
+        hero = Hero("Admiral", 12)
+        staying = attack_chain_distribution(12, targets, hero=hero)
+        following = attack_chain_distribution(12, targets, hero=hero, hero_follows_stack=True)
+        assert staying.steps[0].capture_probability == following.steps[0].capture_probability
+        assert following.steps[1].capture_probability > staying.steps[1].capture_probability
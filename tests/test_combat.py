@@ -1,7 +1,7 @@
 import random
 
 from engine.combat import resolve_battle, resolve_single_round
-from engine.models import Army, Hero, Structure
+from engine.models import Army, BattleResult, Hero, RoundLog, RoundResult, Structure
 from engine.structures import STRUCTURES
 from engine.tuning import CombatTuning
 
@@ -88,6 +88,17 @@ class TestResolveSingleRound:
         # 1 def loss from dice, 2 absorb available, but can't go below 0
         assert result.defender_losses == 0
 
+    def test_ties_favor_attacker_structure(self):
+        class ConstantRng:
+            def randint(self, a, b):  # noqa: ARG002
+                return 3
+
+        attacker = Army(units=5)
+        defender = Army(units=5, structures=[Structure("Sabotaged Grid", "ties_favor_attacker")])
+        result = resolve_single_round(attacker, defender, ConstantRng())
+        assert result.attacker_losses == 0
+        assert result.defender_losses == 2
+
     def test_orbital_battery_extra_die(self):
         """Orbital Battery should give defender an extra die."""
         rng = random.Random(42)
@@ -179,6 +190,14 @@ class TestResolveBattle:
         result = resolve_battle(attacker, defender, auto_resolve=False, rng=rng)
         assert len(result.rounds) == 1
 
+    def test_max_rounds_ends_a_stalemate(self):
+        """Two absorbers against an attacker who wins every die never trade losses."""
+        attacker = Army(units=10)
+        defender = Army(units=3, structures=[STRUCTURES["shield_generator"], STRUCTURES["fortress"]])
+        result = resolve_battle(attacker, defender, tuning=CombatTuning(attacker_ability=6), max_rounds=50)
+        assert result.truncated and len(result.rounds) == 50
+        assert result.winner == "defender" and result.attacker_remaining == 10
+
     def test_attacker_stops_at_one_unit(self):
         """Attacker can't attack with only 1 unit remaining."""
         rng = random.Random(42)
@@ -188,6 +207,23 @@ class TestResolveBattle:
         assert result.attacker_remaining >= 1
         assert result.winner == "defender"
 
+    def test_limited_absorb_is_spent_over_the_battle(self):
+        class AttackerAlwaysWins:
+            def __init__(self):
+                self._call = 0
+
+            def randint(self, a, b):
+                self._call += 1
+                # 3 attacker dice then 2 defender dice each round
+                return b if self._call % 5 in (1, 2, 3) else a
+
+        reserves = Structure("Reserves", "limited_absorb", amount=3)
+        attacker = Army(units=10)
+        defender = Army(units=4, structures=[reserves])
+        result = resolve_battle(attacker, defender, rng=AttackerAlwaysWins())
+        assert [r.defender_losses for r in result.rounds] == [0, 1, 2, 1]
+        assert result.winner == "attacker"
+
     def test_battle_with_attacker_hero(self):
         """Heroes are attacker-only — they upgrade attack dice."""
         rng = random.Random(42)
@@ -196,3 +232,50 @@ class TestResolveBattle:
         result = resolve_battle(attacker, defender, auto_resolve=True, rng=rng)
         assert result.winner in ("attacker", "defender")
         assert len(result.rounds) > 0
+
+
+class TestRoundLog:
+    def test_battle_rounds_read_like_round_results(self):
+        rng = random.Random(7)
+        attacker = Army(units=12, hero=Hero("Admiral", 12))
+        defender = Army(units=8, structures=[STRUCTURES["orbital_battery"], STRUCTURES["fortress"]])
+        result = resolve_battle(attacker, defender, rng=rng, tuning=CombatTuning(planet_upgrade_level=1))
+        assert isinstance(result.rounds, RoundLog)
+        rounds = list(result.rounds)
+        assert all(isinstance(r, RoundResult) for r in rounds)
+        assert rounds[-1] == result.rounds[-1] and rounds[1:3] == result.rounds[1:3]
+        assert rounds[-1].attacker_remaining == result.attacker_remaining
+        assert rounds[-1].defender_remaining == result.defender_remaining
+        assert all(len(r.defender_rolls) == min(2, r.defender_remaining + r.defender_losses) + 1 for r in rounds)
+        assert "Admiral upgrades one attack die to d12" in rounds[0].notes
+
+    def test_matches_single_rounds_with_the_same_dice(self):
+        tuning = CombatTuning(planet_upgrade_level=2, planet_upgrade_mode="suppress_attacker_highest")
+        battle = resolve_battle(Army(10), Army(6), rng=random.Random(3), tuning=tuning)
+        rng = random.Random(3)
+        attacker, defender = Army(10), Army(6)
+        singles = []
+        while attacker.units > 1 and defender.units > 0:
+            singles.append(resolve_single_round(attacker, defender, rng, tuning))
+        assert battle.rounds == singles
+
+    def test_battle_result_packs_a_list(self):
+        rounds = [RoundResult([6, 5, 1], [4, 2], 1, 1, 9, 4, ["note"])]
+        result = BattleResult(rounds, 9, 4, False, "defender")
+        assert isinstance(result.rounds, RoundLog)
+        assert result.rounds == rounds
+        assert result.to_dict()["rounds"] == [
+            {
+                "attacker_rolls": [6, 5, 1],
+                "defender_rolls": [4, 2],
+                "attacker_losses": 1,
+                "defender_losses": 1,
+                "attacker_remaining": 9,
+                "defender_remaining": 4,
+                "notes": ["note"],
+            }
+        ]
+
+    def test_packed_rounds_are_compact(self):
+        result = resolve_battle(Army(200), Army(200), rng=random.Random(1))
+        assert result.rounds.nbytes() < 64 * len(result.rounds)
@@ -0,0 +1,78 @@
+import random
+from collections import Counter
+
+from benchmarks.conformance import (
+    ConformanceConfig,
+    chi_square_sf,
+    chi_square_test,
+    check_rounds,
+    kolmogorov_sf,
+    ks_two_sample,
+    run_conformance,
+)
+from engine.kernel import RoundRules, battle_distribution
+from engine.models import Hero
+from engine.simulation import chain_sampler
+from engine.tuning import CombatTuning
+
+
+class TestStatistics:
+    def test_chi_square_critical_values(self):
+        assert abs(chi_square_sf(3.841, 1) - 0.05) < 1e-4
+        assert abs(chi_square_sf(18.307, 10) - 0.05) < 1e-4
+        assert abs(chi_square_sf(9.210, 2) - 0.01) < 1e-4
+
+    def test_kolmogorov_critical_value(self):
+        assert abs(kolmogorov_sf(1.358) - 0.05) < 1e-3
+        assert kolmogorov_sf(0.0) == 1.0
+
+    def test_impossible_outcome_fails(self):
+        result = chi_square_test("t", {"a": 10, "b": 1}, {"a": 1.0})
+        assert result.p_value == 0.0
+
+    def test_rare_bins_are_pooled(self):
+        expected = {i: p for i, p in enumerate([0.9, 0.05, 0.03, 0.01, 0.01])}
+        observed = {0: 90, 1: 5, 2: 3, 3: 1, 4: 1}
+        result = chi_square_test("t", observed, expected)
+        assert result.dof == 2  # {0}, {1}, {2, 3, 4}
+        assert result.p_value > 0.5
+
+    def test_ks_same_and_shifted_samples(self):
+        rng = random.Random(4)
+        xs = [rng.randint(1, 10) for _ in range(2000)]
+        ys = [rng.randint(1, 10) for _ in range(2000)]
+        assert ks_two_sample("t", xs, ys).p_value > 0.01
+        assert ks_two_sample("t", xs, [y + 1 for y in ys]).p_value < 1e-6
+
+
+class TestPower:
+    """A subtly wrong engine must be caught at the sample sizes the grid uses."""
+
+    def test_detects_wrong_sampler_rules(self):
+        rng = random.Random(5)
+        sampler = chain_sampler(RoundRules(attacker_bonus=1))
+        observed = Counter()
+        for _ in range(2000):
+            a, d, _ = sampler.sample(6, 4, rng)
+            observed[("attacker", a) if d <= 0 else ("defender", d)] += 1
+        dist = battle_distribution(6, 4)
+        expected = {("attacker", a): p for a, p in dist.attacker_wins.items()}
+        expected.update({("defender", d): p for d, p in dist.defender_wins.items()})
+        assert chi_square_test("t", observed, expected).p_value < 1e-6
+
+    def test_reference_rounds_fit_their_own_rules(self):
+        config = ConformanceConfig(4, 2, Hero("Admiral", 12), (), CombatTuning(
+            planet_upgrade_level=3, planet_upgrade_mode="suppress_attacker_highest",
+        ))
+        results = check_rounds(config, random.Random(6), 2000)
+        assert len(results) == 6
+        assert all(r.p_value > 1e-4 for r in results)
+
+
+class TestRunConformance:
+    def test_random_grid_conforms(self):
+        report = run_conformance(num_configs=6, round_samples=1500, battle_samples=1500, seed=11)
+        assert report.passed, report.summary()
+        assert len(report.results) == 6 * 9
+        modes = {c.tuning.planet_upgrade_mode for c, _ in report.results}
+        assert len(modes) == 3
@@ -0,0 +1,93 @@
+import random
+from fractions import Fraction
+from itertools import product
+
+import pytest
+
+from engine.dicepool import (
+    Die,
+    comparison_loss_distribution,
+    make_pool,
+    roll_pool,
+    top_k_counts,
+    top_k_distribution,
+)
+from engine.probabilities import SINGLE_ROLL_PROBABILITIES
+
+
+def _brute_force_top_k(pool, k):
+    counts = {}
+    faces = [range(1 + d.modifier, d.sides + 1 + d.modifier) for d in pool]
+    for rolls in product(*faces):
+        key = tuple(sorted(rolls, reverse=True)[:k])
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+class TestMakePool:
+    def test_admiral_attack(self):
+        assert make_pool(3, (12,)) == (Die(12), Die(6), Die(6))
+
+    def test_upgrades_replace_dice(self):
+        assert make_pool(1, (12, 10)) == (Die(12),)
+
+    def test_empty(self):
+        assert make_pool(0, (12,)) == ()
+
+    def test_invalid_die(self):
+        with pytest.raises(ValueError):
+            Die(0)
+
+
+class TestRollPool:
+    def test_sorted_with_modifiers(self):
+        rng = random.Random(42)
+        for _ in range(50):
+            result = roll_pool((Die(4, 10), Die(6), Die(20)), rng)
+            assert result == sorted(result, reverse=True)
+            assert 11 <= max(result) <= 20
+
+    def test_top_pair_frequency_matches_exact(self):
+        rng = random.Random(7)
+        pool = make_pool(3, (12,))
+        exact = top_k_distribution(pool, 1)
+        n = 20000
+        hits = sum(roll_pool(pool, rng)[0] == 12 for _ in range(n))
+        assert abs(hits / n - float(exact[(12,)])) < 0.02
+
+
+class TestTopK:
+    def test_matches_brute_force_mixed_pool(self):
+        pool = (Die(4), Die(8, 1), Die(20), Die(6))
+        for k in (1, 2, 4):
+            assert dict(top_k_counts(pool, k)) == _brute_force_top_k(pool, k)
+
+    def test_order_of_dice_does_not_matter(self):
+        assert top_k_counts((Die(12), Die(6)), 2) == top_k_counts((Die(6), Die(12)), 2)
+
+    def test_distribution_sums_to_one(self):
+        dist = top_k_distribution(make_pool(3, (10, 8)), 2)
+        assert sum(dist.values()) == 1
+
+    def test_single_die_max(self):
+        dist = top_k_distribution((Die(6), Die(6)), 1)
+        assert dist[(6,)] == Fraction(11, 36)
+
+
+class TestComparisonLossDistribution:
+    def test_matches_taflin_table(self):
+        for (atk_dice, def_dice), expected in SINGLE_ROLL_PROBABILITIES.items():
+            assert comparison_loss_distribution(make_pool(atk_dice), make_pool(def_dice)) == expected
+
+    def test_defender_hero_helps_defender(self):
+        vanilla = comparison_loss_distribution(make_pool(3), make_pool(2))
+        hero = comparison_loss_distribution(make_pool(3), make_pool(2, (10,)))
+        assert hero[(2, 0)] > vanilla[(2, 0)]
+
+    def test_ties_to_attacker(self):
+        dist = comparison_loss_distribution((Die(6),), (Die(6),), ties_to_attacker=True)
+        assert dist[(0, 1)] == Fraction(21, 36)
+
+    def test_modifiers_shift_odds(self):
+        dist = comparison_loss_distribution((Die(6, 6),), (Die(6),))
+        assert dist == {(0, 1): Fraction(1)}
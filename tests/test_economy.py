@@ -0,0 +1,83 @@
+import itertools
+import random
+
+import pytest
+
+from engine.economy import (
+    CardRules,
+    EconomyConfig,
+    capture_chance,
+    find_set,
+    forecast_income,
+    simulate_income,
+)
+from engine.kernel import RoundRules, win_probability_surface
+
+
+class TestCardRules:
+    def test_escalation_schedule(self):
+        rules = CardRules()
+        assert [rules.set_value(n) for n in range(9)] == [4, 6, 8, 10, 12, 15, 20, 25, 30]
+
+    def test_find_set_keeps_wilds(self):
+        assert find_set((3, 1, 0, 1)) == (3, 0, 0, 0)
+        assert find_set((1, 1, 1, 1)) == (1, 1, 1, 0)
+        assert find_set((0, 2, 0, 1)) == (0, 2, 0, 1)
+        assert find_set((1, 0, 1, 1)) == (1, 0, 1, 1)
+        assert find_set((0, 0, 1, 2)) == (0, 0, 1, 2)
+        assert find_set((2, 2, 0, 0)) is None
+
+    def test_every_five_card_hand_has_a_set(self):
+        for hand in itertools.product(range(6), repeat=4):
+            if sum(hand) == 5 and hand[3] <= 2:
+                traded = find_set(hand)
+                assert traded is not None and sum(traded) == 3
+                assert all(t <= h for t, h in zip(traded, hand))
+
+
+class TestForecastIncome:
+    def test_distributions_are_normalised(self):
+        forecast = forecast_income(EconomyConfig(rival_trade_chance=0.3, owned_fraction=0.4), 12)
+        for dist in forecast.income_by_turn:
+            assert sum(dist.values()) == pytest.approx(1.0)
+
+    def test_no_captures_no_cards(self):
+        forecast = forecast_income(EconomyConfig(capture_chances=(0.0,)), 6)
+        assert forecast.income_by_turn == [{3: 1.0}] * 6
+        assert forecast.expected_sets_traded == 0.0
+
+    def test_certain_draws_follow_the_schedule(self):
+        config = EconomyConfig(cards=CardRules(deck=(1, 0, 0, 0)), capture_chances=(1.0,))
+        forecast = forecast_income(config, 10)
+        assert forecast.expected_income == [3, 3, 3, 7, 3, 3, 9, 3, 3, 11]
+        assert forecast.expected_sets_traded == 3
+
+    def test_forced_policy_waits_for_five_cards(self):
+        config = EconomyConfig(cards=CardRules(deck=(1, 0, 0, 0)), capture_chances=(1.0,), trade_policy="forced")
+        assert forecast_income(config, 7).expected_income == [3, 3, 3, 3, 3, 7, 3]
+
+    def test_capture_chance_by_turn(self):
+        config = EconomyConfig(cards=CardRules(deck=(1, 0, 0, 0)), capture_chances=(1.0, 1.0, 0.0))
+        assert forecast_income(config, 6).expected_income == [3] * 6
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            forecast_income(EconomyConfig(trade_policy="hoard"), 3)
+
+
+class TestSimulateIncome:
+    def test_matches_forecast(self):
+        config = EconomyConfig(capture_chances=(0.8,), rival_trade_chance=0.2, owned_fraction=0.3)
+        forecast = forecast_income(config, 15)
+        samples = simulate_income(config, 15, 4000, random.Random(3))
+        assert sum(samples.totals) / len(samples.totals) == pytest.approx(forecast.expected_total, rel=0.02)
+        assert samples.quantile(0.05) <= forecast.expected_total <= samples.quantile(0.95)
+
+
+class TestCaptureChance:
+    def test_independent_attacks(self):
+        rules = RoundRules()
+        p = win_probability_surface(8, 5, rules)[8][5]
+        assert capture_chance([(8, 5, rules)]) == pytest.approx(p)
+        assert capture_chance([(8, 5, rules), (8, 5, rules)]) == pytest.approx(1 - (1 - p) ** 2)
+        assert capture_chance([]) == 0.0
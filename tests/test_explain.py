@@ -0,0 +1,97 @@
+import http.client
+import json
+
+import pytest
+
+from benchmarks.loadtest import LocalServers
+from engine.explain import explain_battle
+from engine.heroes import HERO_TIERS
+from engine.kernel import compile_rules, win_probability_surface
+from engine.models import Hero
+from engine.structures import STRUCTURES
+from engine.tuning import PLANET_UPGRADE_MODES, CombatTuning
+
+HERO = Hero(name="admiral", die_size=HERO_TIERS["admiral"])
+SHIELD = STRUCTURES["shield_generator"]
+BATTERY = STRUCTURES["orbital_battery"]
+TUNING = CombatTuning(hero_upgrade_level=2)
+
+
+def _exact(a, d, hero, structures, tuning):
+    return win_probability_surface(a, d, compile_rules(hero, structures, tuning))[a][d]
+
+
+class TestExplainBattle:
+    def test_vanilla_battle_has_no_factors(self):
+        result = explain_battle(8, 6)
+        assert result.factors == []
+        assert result.win_probability == result.vanilla_win_probability
+        assert result.interaction == pytest.approx(0.0)
+
+    def test_factor_deltas_are_exact_ablations(self):
+        result = explain_battle(10, 8, HERO, [SHIELD, BATTERY], TUNING)
+        baseline = _exact(10, 8, HERO, [SHIELD, BATTERY], TUNING)
+        assert result.win_probability == pytest.approx(baseline)
+        by_name = {f.name: f for f in result.factors}
+        assert set(by_name) == {"admiral", SHIELD.name, BATTERY.name, "hero_upgrade_level"}
+        assert by_name["admiral"].delta == pytest.approx(baseline - _exact(10, 8, None, [SHIELD, BATTERY], TUNING))
+        assert by_name[SHIELD.name].delta == pytest.approx(baseline - _exact(10, 8, HERO, [BATTERY], TUNING))
+        assert by_name[SHIELD.name].delta < 0 < by_name["admiral"].delta
+        total = result.win_probability - result.vanilla_win_probability
+        assert sum(f.delta for f in result.factors) + result.interaction == pytest.approx(total)
+
+    def test_sensitivities_step_each_field(self):
+        result = explain_battle(10, 8, HERO, [SHIELD, BATTERY], TUNING)
+        by_name = {s.parameter: s for s in result.sensitivities}
+        assert set(by_name["hero_upgrade_level"].win_probabilities) == {1, 3}
+        assert set(by_name["planet_upgrade_level"].win_probabilities) == {1}  # no negative levels
+        assert "max_hero_upgrade_level" not in by_name  # fixed by the API
+
+    def test_sensitivities_stay_in_api_ranges_and_change_the_rules(self):
+        result = explain_battle(6, 6, tuning=CombatTuning(attacker_ability=6, planet_value_per_upgrade=4))
+        by_name = {s.parameter: s for s in result.sensitivities}
+        assert set(by_name["attacker_ability"].win_probabilities) == {5}
+        # No planet upgrades bought, so the per-upgrade values and modes change nothing.
+        assert "planet_value_per_upgrade" not in by_name and "planet_upgrade_mode" not in by_name
+        upgraded = explain_battle(6, 6, tuning=CombatTuning(planet_upgrade_level=1))
+        by_name = {s.parameter: s for s in upgraded.sensitivities}
+        assert set(by_name["planet_upgrade_mode"].win_probabilities) == set(PLANET_UPGRADE_MODES) - {"flat_bonus"}
+        assert by_name["attacker_ability"].slope(result.win_probability) > 0
+        assert by_name["defender_ability"].slope(result.win_probability) < 0
+
+    def test_identical_rule_sets_are_solved_once(self):
+        # Without upgrades bought, the value-per-upgrade knobs compile to the same rules.
+        result = explain_battle(6, 6)
+        variants = 2 + sum(len(s.win_probabilities) for s in result.sensitivities)
+        assert result.rule_sets < variants
+
+    def test_parallel_matches_serial(self):
+        serial = explain_battle(12, 9, HERO, [SHIELD, BATTERY], TUNING)
+        parallel = explain_battle(12, 9, HERO, [SHIELD, BATTERY], TUNING, workers=2)
+        assert parallel == serial
+
+
+def _post(port, body):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request("POST", "/api/explain", body=json.dumps(body).encode())
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+class TestEndpoint:
+    def test_explain_endpoint(self):
+        body = {
+            "attacker": {"units": 10, "hero": "admiral"},
+            "defender": {"units": 8, "structures": ["shield_generator", "orbital_battery"]},
+            "balance": {"hero_upgrade_level": 2},
+        }
+        with LocalServers(["explain"]) as servers:
+            status, payload = _post(servers.ports["explain"], body)
+        assert status == 200
+        assert {f["name"] for f in payload["factors"]} == {"admiral", SHIELD.name, BATTERY.name, "hero_upgrade_level"}
+        assert payload["rule_sets"] > 1
+        slopes = {s["parameter"]: s["slope"] for s in payload["sensitivities"]}
+        assert slopes["attacker_ability"] > 0
@@ -0,0 +1,186 @@
+import random
+
+import pytest
+
+from engine.game import (
+    NO_SHIP,
+    SHIP_TIERS,
+    _SHIP_HEROES,
+    AttackOrder,
+    Game,
+    GameRules,
+    GreedyPolicy,
+    Policy,
+    RandomPolicy,
+    play_game,
+)
+from engine.heroes import HEROES
+from engine.kernel import win_probability_surface
+from engine.starmap import galaxy_from_lanes, ring_galaxy
+from engine.structures import STRUCTURES
+
+
+def _line_galaxy(n=4):
+    # 0 - 1 - 2 - ... in two sectors split down the middle
+    return galaxy_from_lanes(
+        names=[str(i) for i in range(n)],
+        sectors=[0 if i < n // 2 else 1 for i in range(n)],
+        lanes=[(i, i + 1) for i in range(n - 1)],
+        sector_bonuses=[2, 2],
+    )
+
+
+def _game(galaxy, owners, armies, policies=None, rules=None, seed=0):
+    policies = policies or [Policy(), Policy()]
+    game = Game(galaxy, policies, rules or GameRules(), random.Random(seed))
+    state = game.state
+    for planet, (owner, units) in enumerate(zip(owners, armies)):
+        state.set_owner(planet, owner)
+        state.armies[planet] = units
+    return game
+
+
+class TestState:
+    def test_reinforcements_include_sector_bonus(self):
+        game = _game(_line_galaxy(), [0, 0, 1, 0], [1, 1, 1, 1])
+        assert game.state.reinforcements(0) == 3 + 2
+        assert game.state.reinforcements(1) == 3
+
+    def test_ship_destinations_stop_at_enemy_planets_and_three_hops(self):
+        galaxy = _line_galaxy(6)
+        game = _game(galaxy, [0, 0, 0, 0, 0, 1], [1] * 6)
+        game.state.ship_planet[0] = 0
+        assert game.state.ship_destinations(0) == [0, 1, 2, 3]
+        game.state.set_owner(2, 1)
+        assert game.state.ship_destinations(0) == [0, 1]
+
+    def test_attack_odds_use_ship_and_structures(self):
+        game = _game(_line_galaxy(), [0, 0, 1, 1], [1, 8, 5, 1])
+        state = game.state
+        assert state.attack_odds(1, 2) == pytest.approx(win_probability_surface(8, 5)[8][5])
+        state.ship_planet[0] = 1
+        boosted = state.attack_odds(1, 2)
+        state.structures[2] = 1 << state.rules.structure_keys.index("orbital_battery")
+        assert state.attack_odds(1, 2) < boosted
+
+    def test_ship_heroes_are_the_shared_instances(self):
+        assert all(hero is HEROES[tier] for tier, hero in zip(SHIP_TIERS, _SHIP_HEROES, strict=True))
+
+    def test_copy_is_independent(self):
+        game = _game(_line_galaxy(), [0, 0, 1, 1], [1, 8, 5, 1])
+        clone = game.state.copy()
+        clone.armies[1] = 99
+        assert game.state.armies[1] == 8
+
+
+class TestPhases:
+    def test_capture_moves_armies_and_destroys_ship(self):
+        game = _game(_line_galaxy(), [0, 0, 1, 1], [1, 40, 1, 3])
+        state = game.state
+        state.ship_planet[1] = 2
+        while state.owner[2] != 0:
+            state.armies[1] = 40
+            game.attack(0, AttackOrder(1, 2))
+        assert state.armies[1] == 1 and state.armies[2] >= 1
+        assert state.planet_counts == [3, 1]
+        assert state.ship_planet[1] == NO_SHIP and game.result.ships_destroyed[1] == 1
+
+    def test_destroyed_ship_returns_at_tier_one(self):
+        game = _game(_line_galaxy(), [0, 0, 1, 1], [1, 3, 1, 5])
+        state = game.state
+        state.ship_planet[1] = NO_SHIP
+        state.ship_tier[1] = 3
+        game.command(1)
+        assert state.ship_planet[1] == 3 and state.ship_tier[1] == 1
+
+    def test_promotion_after_captures(self):
+        galaxy = _line_galaxy(5)
+        rules = GameRules(promote_after_captures=2)
+        game = _game(galaxy, [0, 1, 1, 1, 1], [60, 1, 1, 1, 1], rules=rules, seed=1)
+        state = game.state
+        for source in range(2):
+            while state.owner[source + 1] != 0:
+                game.attack(0, AttackOrder(source, source + 1))
+                state.armies[source] = max(state.armies[source], 30)
+        assert state.ship_tier[0] == 2 and game.result.max_ship_tier[0] == 2
+
+    def test_illegal_orders_raise(self):
+        game = _game(_line_galaxy(), [0, 0, 1, 1], [1, 5, 2, 1])
+        with pytest.raises(ValueError):
+            game.attack(0, AttackOrder(0, 2))  # not adjacent
+        with pytest.raises(ValueError):
+            game.attack(0, AttackOrder(0, 1))  # own planet
+        with pytest.raises(ValueError):
+            game.fortify(0, (1, 0, 5))  # must leave one behind
+        game.build(0, (1, "orbital_battery"))
+        with pytest.raises(ValueError):
+            game.build(0, (1, "orbital_battery"))
+
+    def test_fortify_path_allows_connected_planets(self):
+        galaxy = _line_galaxy()
+        with pytest.raises(ValueError):
+            _game(galaxy, [0, 0, 0, 1], [5, 1, 1, 1]).fortify(0, (0, 2, 3))
+        game = _game(galaxy, [0, 0, 0, 1], [5, 1, 1, 1], rules=GameRules(fortify_path=True))
+        game.fortify(0, (0, 2, 3))
+        assert game.state.armies[:3] == [2, 1, 4]
+        game.state.set_owner(1, 1)
+        with pytest.raises(ValueError):
+            game.fortify(0, (0, 2, 1))
+
+    def test_build_cost_comes_out_of_next_reinforcements(self):
+        game = _game(_line_galaxy(), [0, 0, 1, 1], [1, 5, 2, 1], rules=GameRules(build_cost=2))
+        before = game.state.reinforcements(0)
+        game.build(0, (1, "orbital_battery"))
+        assert game.state.reinforcements(0) == before - 2
+        game.reinforce(0)
+        assert game.state.build_debt[0] == 0
+
+
+class TestFullGames:
+    def test_same_seed_replays_the_same_game(self):
+        galaxy = ring_galaxy()
+        rules = GameRules(structure_keys=("orbital_battery",))
+        first = play_game(galaxy, [GreedyPolicy(), GreedyPolicy()], rules, seed=7)
+        second = play_game(galaxy, [GreedyPolicy(), GreedyPolicy()], rules, seed=7)
+        assert first == second
+        assert first.winner is not None
+        assert first.captures[first.winner] > 0
+
+    def test_random_play_keeps_the_board_consistent(self):
+        galaxy = ring_galaxy(num_sectors=3, planets_per_sector=5)
+        rules = GameRules(num_players=3, max_turns=60)
+        game = Game(galaxy, [RandomPolicy(), RandomPolicy(), RandomPolicy()], rules, random.Random(2))
+        game.setup()
+        state = game.state
+        for _ in range(60):
+            game.play_turn()
+            assert all(units >= 1 for units in state.armies)
+            assert sum(state.planet_counts) == galaxy.size
+            assert all(state.owner[p] == player for player, p in enumerate(state.ship_planet) if p != NO_SHIP)
+            assert all(mask < 1 << len(rules.structure_keys) for mask in state.structures)
+            if state.winner() is not None:
+                break
+
+    def test_dice_mode_plays_to_the_end(self):
+        galaxy = ring_galaxy(num_sectors=2, planets_per_sector=4)
+        rules = GameRules(combat="dice", structure_keys=())
+        result = play_game(galaxy, [GreedyPolicy(), Policy()], rules, seed=3)
+        assert result.winner == 0
+        assert result.eliminated_turn[1] is not None
+
+    def test_absorb_structures_stall_greedy_play(self):
+        rules = GameRules(structure_keys=tuple(STRUCTURES), stall_turns=20)
+        result = play_game(ring_galaxy(), [GreedyPolicy(), GreedyPolicy()], rules, seed=5)
+        assert result.winner is None and result.stalled
+        assert sum(result.structures_built) > 0
+
+    def test_default_rules_finish_greedy_play(self):
+        assert "shield_generator" not in GameRules().structure_keys
+        for seed in range(5):
+            result = play_game(ring_galaxy(), [GreedyPolicy(), GreedyPolicy()], seed=seed)
+            assert result.winner is not None and not result.stalled
+            assert sum(result.structures_built) > 0
+
+    def test_unknown_combat_mode(self):
+        with pytest.raises(ValueError):
+            Game(ring_galaxy(), [Policy(), Policy()], GameRules(combat="psychic"))
@@ -0,0 +1,60 @@
+import base64
+import http.client
+import json
+import sys
+from array import array
+
+from benchmarks.loadtest import LocalServers
+from engine.kernel import battle_surfaces, compile_rules
+from engine.models import Hero
+from engine.structures import STRUCTURES
+
+
+def _post(port, body):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request("POST", "/api/heatmap", body=json.dumps(body).encode())
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+class TestHeatmapEndpoint:
+    def test_parses_armies_and_returns_json_grids(self):
+        body = {
+            "attacker": {"units": 1, "hero": "general"},
+            "defender": {"structures": ["orbital_battery"]},
+            "max_attacker_units": 6,
+            "max_defender_units": 4,
+            "metrics": ["win_probability", "bogus"],
+        }
+        with LocalServers(["heatmap"]) as servers:
+            status, payload = _post(servers.ports["heatmap"], body)
+        assert status == 200
+        assert payload["encoding"] == "json" and payload["shape"] == [6, 4]
+        assert set(payload) == {"encoding", "shape", "attacker_units", "defender_units", "win_probability"}
+        rules = compile_rules(Hero("general", 10), [STRUCTURES["orbital_battery"]])
+        expected = battle_surfaces(6, 4, rules).win_probability
+        assert payload["win_probability"][5][3] == round(expected[6][4], 4)
+        assert payload["win_probability"][0] == [0.0] * 4  # one attacker cannot attack
+
+    def test_clamps_sizes_and_falls_back_on_bad_options(self):
+        body = {"max_attacker_units": 10**6, "max_defender_units": -3, "encoding": "xml", "metrics": "rounds"}
+        with LocalServers(["heatmap"]) as servers:
+            status, payload = _post(servers.ports["heatmap"], body)
+        assert status == 200
+        assert payload["shape"] == [100, 1] and payload["encoding"] == "json"
+        assert {"win_probability", "attacker_remaining", "defender_remaining", "rounds"} <= set(payload)
+
+    def test_float32_payload(self):
+        body = {"max_attacker_units": 5, "max_defender_units": 3, "encoding": "float32", "metrics": ["rounds"]}
+        with LocalServers(["heatmap"]) as servers:
+            status, payload = _post(servers.ports["heatmap"], body)
+        assert status == 200
+        cells = array("f", base64.b64decode(payload["rounds"]))
+        if sys.byteorder != "little":
+            cells.byteswap()
+        assert len(cells) == 5 * 3
+        expected = battle_surfaces(5, 3, compile_rules()).rounds
+        assert abs(cells[4 * 3 + 2] - expected[5][3]) < 1e-5
@@ -1,6 +1,6 @@
 import random
 
-from engine.heroes import get_die_size, roll_with_hero
+from engine.heroes import HERO_TIERS, HEROES, get_die_size, roll_with_hero
 from engine.models import Hero
 
 
@@ -46,3 +46,10 @@ class TestRollWithHero:
         for _ in range(50):
             result = roll_with_hero(3, hero, rng)
             assert result == sorted(result, reverse=True)
+
+
+class TestHeroes:
+    def test_one_shared_instance_per_tier(self):
+        assert {name: hero.die_size for name, hero in HEROES.items()} == HERO_TIERS
+        assert HEROES["admiral"] == Hero("admiral", 12)
+        assert hash(HEROES["admiral"]) == hash(Hero("admiral", 12))
@@ -0,0 +1,32 @@
+from benchmarks.importtime import handler_modules, measure_import, parse_importtime
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   json.decoder
+import time:        50 |        150 | json
+import time:       300 |        300 |     engine.models
+import time:       200 |        500 |   engine.kernel
+import time:       400 |        900 | api.heatmap
+import time:        10 |         10 | zlib
+"""
+
+
+class TestParse:
+    def test_keeps_only_the_module_subtree(self):
+        report = parse_importtime(SAMPLE, "api.heatmap")
+        assert report.total_ms == 0.9
+        assert [m.name for m in report.modules] == ["engine.models", "engine.kernel", "api.heatmap"]
+        assert report.top(1)[0].name == "api.heatmap"
+        assert all(m.in_repo for m in report.modules)
+
+    def test_missing_module(self):
+        assert parse_importtime(SAMPLE, "api.nope").total_ms == 0.0
+
+
+class TestMeasure:
+    def test_config_handler_skips_the_engine(self):
+        assert "config" in handler_modules()
+        report = measure_import("api.config", repeats=1)
+        names = {m.name for m in report.modules}
+        assert report.total_ms > 0
+        assert "engine.kernel" not in names and "engine.structures" not in names
+        assert "engine.tuning" not in names  # its dataclasses import alone costs ~25ms
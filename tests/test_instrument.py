@@ -0,0 +1,87 @@
+import http.client
+import json
+import time
+
+from benchmarks.loadtest import LocalServers
+from engine import instrument, kernel
+from engine.combat import resolve_battle
+from engine.kernel import RoundRules, win_probability_surface
+from engine.models import Army
+
+
+class TestRecorder:
+    def test_noop_outside_a_request(self):
+        with instrument.timer("solve"):
+            instrument.count("rounds", 5)
+        assert instrument.current() is None
+
+    def test_collects_timings_and_counters(self):
+        instrument.reset_metrics()
+        rules = RoundRules(attacker_bonus=2)
+        kernel._SURFACES.pop(rules, None)
+        with instrument.request("unit") as recorder:
+            with instrument.timer("solve"):
+                resolve_battle(Army(units=10), Army(units=10))
+            win_probability_surface(3, 3, rules)
+            win_probability_surface(3, 3, rules)
+        assert recorder.counters["rounds"] > 0
+        assert recorder.counters["surface_cache_misses"] == 1
+        assert recorder.counters["surface_cache_hits"] == 1
+        assert recorder.counters["dp_cells"] > 0
+        assert "solve;dur=" in recorder.server_timing()
+        assert 'rounds;desc="' in recorder.server_timing()
+        totals = instrument.snapshot()["unit"]
+        assert totals["requests"] == 1
+        assert totals["counters"]["rounds"] == recorder.counters["rounds"]
+
+    def test_profile_report(self):
+        with instrument.request("unit", profile=True) as recorder:
+            resolve_battle(Army(units=5), Army(units=5))
+            report = recorder.finish_profile()
+        assert "resolve_battle" in report
+        assert recorder.finish_profile() is None
+
+
+def _get(port, method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request(method, path, body=json.dumps(body).encode() if body is not None else None)
+        response = conn.getresponse()
+        return response.getheader("Server-Timing"), json.loads(response.read())
+    finally:
+        conn.close()
+
+
+class TestEndpoints:
+    def test_diagnostics_are_off_by_default(self, monkeypatch):
+        monkeypatch.delenv("GALACTIC_DIAGNOSTICS", raising=False)
+        with LocalServers(["simulate", "metrics"]) as servers:
+            _, body = _get(servers.ports["simulate"], "POST", "/api/simulate?profile=1", {"num_battles": 100})
+            assert "profile" not in body
+            conn = http.client.HTTPConnection("127.0.0.1", servers.ports["metrics"], timeout=30)
+            try:
+                conn.request("GET", "/api/metrics")
+                response = conn.getresponse()
+                assert response.status == 404
+                assert "caches" not in json.loads(response.read())
+            finally:
+                conn.close()
+
+    def test_server_timing_profile_and_metrics(self, monkeypatch):
+        monkeypatch.setenv("GALACTIC_DIAGNOSTICS", "1")
+        instrument.reset_metrics()
+        with LocalServers(["simulate", "config", "metrics"]) as servers:
+            timing, _ = _get(servers.ports["config"], "GET", "/api/config")
+            assert "total;dur=" in timing
+            timing, body = _get(servers.ports["simulate"], "POST", "/api/simulate?profile=1", {"num_battles": 200})
+            assert "solve;dur=" in timing and 'battles;desc="200"' in timing
+            assert "run_simulation" in body["profile"]
+            # Totals are folded in after the response is written.
+            for _ in range(100):
+                _, metrics = _get(servers.ports["metrics"], "GET", "/api/metrics")
+                if "simulate" in metrics["endpoints"]:
+                    break
+                time.sleep(0.01)
+        assert metrics["endpoints"]["simulate"]["counters"]["battles"] == 200
+        assert metrics["endpoints"]["config"]["requests"] == 1
+        assert "battle_surfaces" in metrics["caches"]
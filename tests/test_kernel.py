@@ -0,0 +1,274 @@
+import random
+from fractions import Fraction
+
+from engine.combat import resolve_battle, resolve_single_round
+from engine import kernel
+from engine.kernel import (
+    SURFACE_CACHE_SIZE,
+    RoundRules,
+    _defender_roll_counts,
+    battle_distribution,
+    battle_surfaces,
+    compile_rules,
+    round_distribution,
+    win_probability_rational,
+    win_probability_surface,
+)
+from engine.models import Army, Hero, Structure
+from engine.probabilities import SINGLE_ROLL_PROBABILITIES, win_probability_exact
+from engine.structures import STRUCTURES
+from engine.tuning import CombatTuning
+
+NUM_TRIALS = 20000
+TOLERANCE = 0.02
+
+
+class TestCompileRules:
+    def test_vanilla_defaults(self):
+        assert compile_rules() == RoundRules()
+
+    def test_hero_structures_and_tuning(self):
+        rules = compile_rules(
+            Hero("Admiral", 12),
+            [STRUCTURES["shield_generator"], STRUCTURES["orbital_battery"]],
+            CombatTuning(hero_upgrade_level=2, planet_upgrade_level=1, planet_upgrade_mode="reroll_lowest_defender"),
+        )
+        assert rules.hero_die_size == 12
+        assert rules.attacker_bonus == 2
+        assert rules.defender_bonus == 0
+        assert rules.defender_rerolls == 1
+        assert rules.extra_defender_dice == 1
+        assert rules.absorb == 1
+
+
+class TestRoundDistribution:
+    def test_vanilla_matches_taflin_table(self):
+        for (atk_dice, def_dice), expected in SINGLE_ROLL_PROBABILITIES.items():
+            assert round_distribution(RoundRules(), atk_dice, def_dice) == expected
+
+    def test_probabilities_sum_to_one(self):
+        rules = RoundRules(hero_die_size=10, defender_rerolls=2, extra_defender_dice=1, absorb=1)
+        assert sum(round_distribution(rules, 3, 3).values()) == 1
+
+    def test_reroll_needs_new_lowest_to_be_higher(self):
+        """Rerolling one of two tied lowest dice can never raise the pool's lowest."""
+        counts = dict(_defender_roll_counts(2, 1))
+        # (2, 2) stays put on every reroll (6) and is reached from (2, 1)/(1, 2)
+        # when the 1 is rerolled into a 2 (2).
+        assert counts[(2, 2)] == 8
+        assert sum(counts.values()) == 6 ** 3
+
+    def _observed_round(self, attacker_units, defender_units, hero, structures, tuning):
+        rng = random.Random(2024)
+        counts = {}
+        for _ in range(NUM_TRIALS):
+            attacker = Army(units=attacker_units, hero=hero)
+            defender = Army(units=defender_units, structures=list(structures))
+            result = resolve_single_round(attacker, defender, rng, tuning=tuning)
+            key = (result.attacker_losses, result.defender_losses)
+            counts[key] = counts.get(key, 0) + 1
+        return {k: v / NUM_TRIALS for k, v in counts.items()}
+
+    def test_matches_simulated_round_with_upgrades(self):
+        hero = Hero("General", 10)
+        structures = [STRUCTURES["fortress"], STRUCTURES["orbital_battery"]]
+        tuning = CombatTuning(planet_upgrade_level=2, planet_upgrade_mode="reroll_lowest_defender")
+        rules = compile_rules(hero, structures, tuning)
+        exact = round_distribution(rules, 3, rules.defender_dice(5))
+        observed = self._observed_round(6, 5, hero, structures, tuning)
+        for outcome, p in exact.items():
+            assert abs(observed.get(outcome, 0) - float(p)) < TOLERANCE, outcome
+
+    def test_matches_simulated_round_with_suppression(self):
+        hero = Hero("Admiral", 12)
+        tuning = CombatTuning(planet_upgrade_level=3, planet_upgrade_mode="suppress_attacker_highest")
+        rules = compile_rules(hero, [], tuning)
+        exact = round_distribution(rules, 3, 2)
+        observed = self._observed_round(6, 5, hero, [], tuning)
+        for outcome, p in exact.items():
+            assert abs(observed.get(outcome, 0) - float(p)) < TOLERANCE, outcome
+
+
+class TestBattleDistribution:
+    def test_vanilla_matches_win_probability_exact(self):
+        for a, d in [(2, 1), (5, 5), (10, 10), (20, 3)]:
+            dist = battle_distribution(a, d)
+            assert abs(dist.win_probability - win_probability_exact(a, d)) < 1e-6
+
+    def test_end_states_sum_to_one(self):
+        rules = compile_rules(Hero("Admiral", 12), [STRUCTURES["shield_generator"]])
+        dist = battle_distribution(12, 8, rules)
+        total = dist.win_probability + sum(dist.defender_wins.values()) + dist.stalemate
+        assert abs(total - 1.0) < 1e-9
+
+    def test_trivial_states(self):
+        assert battle_distribution(1, 5).win_probability == 0.0
+        assert battle_distribution(5, 0).win_probability == 1.0
+
+    def test_unbreakable_defense_is_stalemate(self):
+        """Attacker always wins every pair but every loss is absorbed."""
+        rules = RoundRules(attacker_bonus=6, absorb=2)
+        dist = battle_distribution(10, 5, rules)
+        assert dist.win_probability == 0.0
+        assert abs(dist.stalemate - 1.0) < 1e-9
+
+    def test_matches_simulated_battles_with_absorb(self):
+        hero = Hero("Admiral", 12)
+        structures = [STRUCTURES["shield_generator"]]
+        rules = compile_rules(hero, structures)
+        exact = battle_distribution(10, 4, rules)
+
+        rng = random.Random(77)
+        wins = 0
+        rounds = 0
+        for _ in range(NUM_TRIALS):
+            attacker = Army(units=10, hero=hero)
+            defender = Army(units=4, structures=list(structures))
+            result = resolve_battle(attacker, defender, rng=rng)
+            wins += result.winner == "attacker"
+            rounds += len(result.rounds)
+        assert abs(wins / NUM_TRIALS - exact.win_probability) < TOLERANCE
+        assert abs(rounds / NUM_TRIALS - exact.expected_rounds) < 0.2
+
+
+class TestWinProbabilitySurface:
+    def test_matches_battle_distribution(self):
+        rules = compile_rules(Hero("Captain", 8), [STRUCTURES["orbital_battery"]])
+        surface = win_probability_surface(12, 9, rules)
+        for a, d in [(2, 1), (6, 4), (12, 9)]:
+            assert abs(surface[a][d] - battle_distribution(a, d, rules).win_probability) < 1e-9
+
+    def test_grows_and_reuses_cache(self):
+        rules = RoundRules(attacker_bonus=1)
+        small = win_probability_surface(5, 5, rules)
+        large = win_probability_surface(20, 7, rules)
+        assert len(large) > 20 and len(large[0]) > 7
+        assert win_probability_surface(4, 4, rules) is large
+        assert abs(small[5][5] - large[5][5]) < 1e-12
+
+    def test_cache_evicts_least_recently_used_rules(self):
+        first = RoundRules(defender_bonus=-1)
+        win_probability_surface(3, 3, first)
+        for bonus in range(SURFACE_CACHE_SIZE):
+            win_probability_surface(3, 3, RoundRules(attacker_bonus=10 + bonus))
+        assert kernel.cache_sizes()["win_probability_surfaces"] == SURFACE_CACHE_SIZE
+        assert kernel.cached_surface(first) is None
+
+    def test_tall_then_wide_request_is_not_grown_to_a_square(self):
+        rules = RoundRules(attacker_bonus=-1)
+        win_probability_surface(400, 5, rules)
+        assert kernel.surface_corner(5, 400, rules) == (5, 400)
+        wide = win_probability_surface(5, 400, rules)
+        assert (len(wide), len(wide[0])) == (6, 401)
+        assert kernel.surface_corner(410, 6, rules) == (410, 6)
+        assert kernel.surface_corner(20, 300, rules) == (20, 400)
+        band = win_probability_surface(200, 2, rules)
+        assert len(band) == 201 and kernel.cached_surface(rules) is wide
+
+    def test_cache_is_bounded_by_cells(self, monkeypatch):
+        monkeypatch.setattr(kernel._SURFACES, "max_cells", 800)
+        first = RoundRules(attacker_bonus=-2)
+        win_probability_surface(20, 20, first)
+        win_probability_surface(20, 20, RoundRules(attacker_bonus=-3))
+        assert kernel.cached_surface(first) is None
+        assert kernel.cache_sizes()["surface_cells"] <= 800
+        win_probability_surface(40, 40, RoundRules(attacker_bonus=-4))
+        assert kernel.cached_surface(RoundRules(attacker_bonus=-4)) is None
+
+
+class TestWinProbabilityRational:
+    def test_two_vs_one_is_one_die(self):
+        assert win_probability_rational(2, 1) == Fraction(15, 36)
+
+    def test_matches_float_surface(self):
+        for rules in [RoundRules(), compile_rules(Hero("Admiral", 12), [STRUCTURES["orbital_battery"]])]:
+            surface = win_probability_surface(25, 20, rules)
+            for a, d in [(3, 2), (10, 10), (25, 20)]:
+                assert abs(float(win_probability_rational(a, d, rules)) - surface[a][d]) < 1e-12
+
+    def test_absorb_self_loops_and_charges(self):
+        shield = compile_rules(None, [STRUCTURES["shield_generator"]])
+        assert win_probability_rational(10, 1, shield) == 0
+        limited = compile_rules(None, [Structure("Ablative Plating", "limited_absorb", "", amount=2)])
+        surface = win_probability_surface(8, 6, limited)
+        assert abs(float(win_probability_rational(8, 6, limited)) - surface[8][6]) < 1e-12
+
+    def test_grown_cache_agrees(self):
+        rules = RoundRules(defender_bonus=1)
+        small = win_probability_rational(6, 4, rules)
+        win_probability_rational(15, 12, rules)
+        assert win_probability_rational(6, 4, rules) == small
+
+
+class TestBattleSurfaces:
+    def test_matches_battle_distribution(self):
+        rules = compile_rules(Hero("General", 10), [STRUCTURES["shield_generator"]])
+        surfaces = battle_surfaces(10, 8, rules)
+        for a, d in [(2, 1), (5, 3), (10, 8)]:
+            dist = battle_distribution(a, d, rules)
+            assert abs(surfaces.win_probability[a][d] - dist.win_probability) < 1e-9
+            assert abs(surfaces.attacker_remaining[a][d] - dist.expected_attacker_remaining()) < 1e-9
+            assert abs(surfaces.defender_remaining[a][d] - dist.expected_defender_remaining()) < 1e-9
+            assert abs(surfaces.rounds[a][d] - dist.expected_rounds) < 1e-9
+
+    def test_terminal_states(self):
+        surfaces = battle_surfaces(4, 4)
+        assert surfaces.win_probability[3][0] == 1.0
+        assert surfaces.win_probability[1][3] == 0.0
+        assert surfaces.defender_remaining[1][3] == 3.0
+        assert surfaces.rounds[1][3] == 0.0
+
+
+class TestStructureVariants:
+    def _simulated_win_rate(self, attacker_units, defender_units, hero, structures):
+        rng = random.Random(31337)
+        wins = 0
+        rounds = 0
+        for _ in range(NUM_TRIALS):
+            attacker = Army(units=attacker_units, hero=hero)
+            defender = Army(units=defender_units, structures=list(structures))
+            result = resolve_battle(attacker, defender, rng=rng)
+            wins += result.winner == "attacker"
+            rounds += len(result.rounds)
+        return wins / NUM_TRIALS, rounds / NUM_TRIALS
+
+    def test_chance_absorb_round(self):
+        rules = compile_rules(None, [Structure("Flicker Shield", "chance_absorb", chance=0.5)])
+        dist = round_distribution(rules, 3, 2)
+        vanilla = SINGLE_ROLL_PROBABILITIES[(3, 2)]
+        assert dist[(0, 2)] == vanilla[(0, 2)] / 2
+        assert dist[(0, 1)] == vanilla[(0, 2)] / 2
+        assert sum(dist.values()) == 1
+
+    def test_ties_favor_attacker_round(self):
+        rules = compile_rules(None, [Structure("Sabotaged Grid", "ties_favor_attacker")])
+        # Attacker wins a 1v1 on >=, i.e. 21 of 36 outcomes.
+        assert round_distribution(rules, 1, 1)[(0, 1)] == Fraction(21, 36)
+
+    def test_limited_absorb_round_depends_on_charges(self):
+        rules = compile_rules(None, [Structure("Reserves", "limited_absorb", amount=2)])
+        assert round_distribution(rules, 3, 2, charges=0) == SINGLE_ROLL_PROBABILITIES[(3, 2)]
+        assert round_distribution(rules, 3, 2)[(0, 0)] == SINGLE_ROLL_PROBABILITIES[(3, 2)][(0, 2)]
+
+    def test_chance_absorb_battle_matches_simulation(self):
+        hero = Hero("Admiral", 12)
+        structures = [Structure("Flicker Shield", "chance_absorb", chance=0.5), STRUCTURES["orbital_battery"]]
+        exact = battle_distribution(10, 8, compile_rules(hero, structures))
+        observed, rounds = self._simulated_win_rate(10, 8, hero, structures)
+        assert abs(observed - exact.win_probability) < TOLERANCE
+        assert abs(rounds - exact.expected_rounds) < 0.2
+
+    def test_limited_absorb_battle_matches_simulation(self):
+        structures = [Structure("Reserves", "limited_absorb", amount=3)]
+        rules = compile_rules(None, structures)
+        exact = battle_distribution(12, 6, rules)
+        observed, rounds = self._simulated_win_rate(12, 6, None, structures)
+        assert abs(observed - exact.win_probability) < TOLERANCE
+        assert abs(rounds - exact.expected_rounds) < 0.2
+        assert abs(win_probability_surface(12, 6, rules)[12][6] - exact.win_probability) < 1e-9
+        assert abs(battle_surfaces(12, 6, rules).rounds[12][6] - exact.expected_rounds) < 1e-9
+
+    def test_limited_absorb_is_weaker_than_permanent(self):
+        limited = compile_rules(None, [Structure("Reserves", "limited_absorb", amount=3)])
+        permanent = compile_rules(None, [STRUCTURES["fortress"]])
+        assert battle_distribution(10, 10, limited).win_probability > battle_distribution(10, 10, permanent).win_probability
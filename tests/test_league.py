@@ -0,0 +1,82 @@
+import pytest
+
+from engine.league import (
+    LeagueConfig,
+    LeagueStats,
+    MatchupStats,
+    load_checkpoint,
+    play_league_game,
+    run_league,
+)
+
+SMALL = LeagueConfig(
+    variants=("no-structures",),
+    lineups=(("greedy", "greedy"), ("greedy", "random", "greedy")),
+    games=6,
+    num_sectors=3,
+    planets_per_sector=4,
+    chunk_size=2,
+)
+
+
+class TestStats:
+    def test_merge_matches_sequential_adds(self):
+        results = [play_league_game(SMALL, "no-structures", ("greedy", "greedy"), i) for i in range(4)]
+        together = MatchupStats(seats=2)
+        for result in results:
+            together.add(result)
+        first, second = MatchupStats(seats=2), MatchupStats(seats=2)
+        for result in results[:2]:
+            first.add(result)
+        for result in results[2:]:
+            second.add(result)
+        first.merge(second)
+        assert first == together
+        assert sum(together.wins) + together.draws == 4
+        assert together.mean_turns() == sum(r.turns for r in results) / 4
+
+    def test_json_round_trip(self):
+        stats = run_league(SMALL)
+        assert LeagueStats.from_dict(stats.to_dict()) == stats
+
+
+class TestRunLeague:
+    def test_games_are_reproducible(self):
+        a = play_league_game(SMALL, "no-structures", ("greedy", "random", "greedy"), 3)
+        b = play_league_game(SMALL, "no-structures", ("greedy", "random", "greedy"), 3)
+        assert a == b
+        assert len(a.captures) == 3
+
+    def test_workers_do_not_change_results(self):
+        serial = run_league(SMALL)
+        parallel = run_league(SMALL, workers=2)
+        assert serial == parallel
+        assert serial.games == 12
+        assert set(serial.matchups) == {"no-structures|greedy,greedy", "no-structures|greedy,random,greedy"}
+
+    def test_resume_after_interruption(self, tmp_path):
+        path = tmp_path / "league.json"
+
+        def interrupt(stats, done, total):
+            if done == 2:
+                raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            run_league(SMALL, checkpoint=path, progress=interrupt)
+        partial, done = load_checkpoint(path, SMALL)
+        assert len(done) == 2 and partial.games == 4
+
+        resumed = run_league(SMALL, checkpoint=path)
+        assert resumed == run_league(SMALL)
+
+    def test_checkpoint_from_other_config_is_rejected(self, tmp_path):
+        path = tmp_path / "league.json"
+        run_league(SMALL, checkpoint=path)
+        with pytest.raises(ValueError):
+            run_league(LeagueConfig(variants=("no-structures",), games=6, seed=1), checkpoint=path)
+
+    def test_unknown_names(self):
+        with pytest.raises(ValueError):
+            run_league(LeagueConfig(variants=("moon-base",)))
+        with pytest.raises(ValueError):
+            run_league(LeagueConfig(lineups=(("greedy", "oracle"),)))
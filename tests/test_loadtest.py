@@ -0,0 +1,48 @@
+import json
+import random
+
+from _shared import _parse_army
+from benchmarks.loadtest import ENDPOINTS, MIXES, LoadReport, build_plan, format_report, percentile, run_load
+
+
+class TestPlan:
+    def test_seeded_plans_repeat(self):
+        assert build_plan(MIXES["default"], 50, seed=3) == build_plan(MIXES["default"], 50, seed=3)
+
+    def test_plan_follows_mix(self):
+        names = {name for name, _ in build_plan(MIXES["light"], 200)}
+        assert names == set(MIXES["light"])
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([7.0], 95) == 7.0
+
+    def test_allocate_body_parses_to_generated_sizes(self):
+        rng = random.Random(0)
+        sizes = set()
+        for _ in range(20):
+            for target in ENDPOINTS["allocate"].body(rng)["targets"]:
+                for side in ("attacker", "defender"):
+                    units = _parse_army(target[side]).units
+                    assert units == target[side]["units"]
+                    sizes.add(units)
+        assert len(sizes) > 1  # not every battle collapses to the 1v1 default
+
+
+class TestRunLoad:
+    def test_light_mix_reports_every_endpoint(self):
+        report = run_load("light", requests=40, concurrency=4, warmup=3)
+        assert report.requests == 40
+        assert set(report.endpoints) == set(MIXES["light"])
+        assert sum(s.requests for s in report.endpoints.values()) == 40
+        for stats in report.endpoints.values():
+            assert stats.errors == 0
+            assert stats.p50_ms <= stats.p95_ms <= stats.p99_ms <= stats.max_ms
+
+    def test_report_round_trips_through_json(self):
+        report = run_load("light", requests=10, concurrency=2)
+        restored = LoadReport.from_json(json.loads(json.dumps(report.to_json())))
+        assert restored == report
+        assert "p50" in format_report(report, restored)
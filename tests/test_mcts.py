@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from engine.game import AttackOrder, Game, GameRules, GreedyPolicy, Policy
+from engine.mcts import MCTSPolicy, SearchConfig, best_action, evaluate, search
+from engine.starmap import galaxy_from_lanes, ring_galaxy
+
+FAST = SearchConfig(time_budget=0, iterations=40, rollout_turns=1)
+
+
+def _line_game(owners, armies, rules=None):
+    n = len(owners)
+    galaxy = galaxy_from_lanes([str(i) for i in range(n)], [0] * n, [(i, i + 1) for i in range(n - 1)], [2])
+    game = Game(galaxy, [Policy(), Policy()], rules or GameRules(), random.Random(0))
+    for planet, (owner, units) in enumerate(zip(owners, armies)):
+        game.state.set_owner(planet, owner)
+        game.state.armies[planet] = units
+    game.state.ship_planet[:] = [0, n - 1]
+    return game
+
+
+class TestEvaluate:
+    def test_bounds_and_terminal_values(self):
+        game = _line_game([0, 0, 1, 1], [5, 5, 1, 1])
+        value = evaluate(game.state, 0)
+        assert 0.5 < value < 1.0
+        assert evaluate(game.state, 1) == pytest.approx(1.0 - value, abs=0.05)
+        game.state.set_owner(2, 0)
+        game.state.set_owner(3, 0)
+        assert evaluate(game.state, 0) == 1.0 and evaluate(game.state, 1) == 0.0
+
+
+class TestSearch:
+    def test_stats_cover_root_actions_and_leave_state_untouched(self):
+        game = Game(ring_galaxy(), [GreedyPolicy(), GreedyPolicy()], GameRules(), random.Random(4))
+        game.setup()
+        game.begin_turn()
+        before = game.state.key()
+        stats = search(game.state, "attack", FAST, random.Random(1))
+        assert game.state.key() == before
+        assert None in stats
+        assert sum(n for n, _ in stats.values()) == FAST.iterations
+        assert all(0.0 <= w <= n for n, w in stats.values())
+
+    def test_takes_the_winning_attack(self):
+        game = _line_game([0, 0, 1], [1, 30, 1])
+        stats = search(game.state, "attack", FAST, random.Random(2))
+        assert best_action(stats) == AttackOrder(1, 2)
+
+    def test_transposition_table_is_reused(self):
+        game = _line_game([0, 0, 1, 1], [1, 12, 3, 2])
+        table = {}
+        search(game.state, "attack", FAST, random.Random(3), table)
+        first = len(table)
+        stats = search(game.state, "attack", FAST, random.Random(3), table)
+        assert sum(n for n, _ in stats.values()) == 2 * FAST.iterations
+        assert len(table) >= first
+
+    def test_rejects_bad_arguments(self):
+        game = _line_game([0, 1], [3, 1])
+        with pytest.raises(ValueError):
+            search(game.state, "fortify", FAST, random.Random(0))
+        with pytest.raises(ValueError):
+            search(game.state, "attack", SearchConfig(time_budget=0, iterations=0), random.Random(0))
+
+
+class TestPolicy:
+    def test_plays_a_full_game(self):
+        rules = GameRules(structure_keys=("orbital_battery",))
+        galaxy = ring_galaxy(num_sectors=3, planets_per_sector=4)
+        policy = MCTSPolicy(FAST, seed=1)
+        result = Game(galaxy, [policy, GreedyPolicy()], rules, random.Random(5)).play()
+        assert result.winner is not None
+        assert policy.decisions > 0 and policy.iterations >= policy.decisions
+
+    def test_no_options_means_no_search(self):
+        game = _line_game([0, 1], [1, 5])
+        policy = MCTSPolicy(FAST)
+        assert policy.attack(game.state, 0, None) is None
+        assert policy.decisions == 0
+
+    def test_parallel_workers_merge_root_statistics(self):
+        game = _line_game([0, 0, 1, 1], [1, 12, 3, 2])
+        policy = MCTSPolicy(SearchConfig(time_budget=0, iterations=10, rollout_turns=1, workers=2), seed=0)
+        try:
+            order = policy.attack(game.state, 0, None)
+        finally:
+            policy.close()
+        assert order is None or order.source == 1
+        assert policy.iterations == 20
@@ -0,0 +1,240 @@
+import http.client
+import json
+import random
+import threading
+
+import pytest
+
+from _shared import REQUEST_BUDGET_SECONDS, admission
+from benchmarks.loadtest import LocalServers
+from engine import kernel, planner
+from engine.kernel import RoundRules, compile_rules, win_probability_surface
+from engine.planner import (
+    MONTE_CARLO_BATCH,
+    SECONDS_PER_DP_CELL,
+    AdmissionController,
+    Deadline,
+    OverBudget,
+    Plan,
+    Query,
+    Rejected,
+    answer,
+    can_stall,
+    chain_seconds,
+    plan_most_accurate,
+    plan_query,
+    plan_simulation,
+    simulate,
+)
+from engine.simulation import SimulationConfig
+from engine.structures import STRUCTURES
+from engine.tuning import CombatTuning
+
+# Two absorbing structures against an attacker who wins every die: no round
+# can change the state, so a die-by-die battle never ends.
+STALL_STRUCTURES = [STRUCTURES["shield_generator"], STRUCTURES["fortress"]]
+STALL_TUNING = CombatTuning(attacker_ability=6)
+
+
+class _ExpiresAfter:
+    """A Deadline stand-in that expires on its ``checks``-th check."""
+
+    def __init__(self, checks: int) -> None:
+        self.checks = checks
+
+    def expired(self) -> bool:
+        self.checks -= 1
+        return self.checks <= 0
+
+
+class TestPlanQuery:
+    def test_small_battles_are_solved_exactly(self):
+        rules = RoundRules(attacker_bonus=3)
+        kernel._SURFACES.pop(rules, None)
+        plan = plan_query(Query(12, 9, rules), budget=1.0)
+        assert plan.engine == "exact"
+        assert answer(Query(12, 9, rules), plan).win_probability == win_probability_surface(12, 9, rules)[12][9]
+        assert plan_query(Query(10, 5, rules), budget=1.0).engine == "table"
+
+    def test_huge_battles_use_the_approximation_or_are_refused(self):
+        query = Query(1_000_000, 999_000, tolerance=0.01)
+        plan = plan_query(query, budget=2.0)
+        assert plan.engine == "asymptotic" and plan.estimated_error <= 0.01
+        with pytest.raises(OverBudget) as info:
+            plan_query(Query(1_000_000, 999_000), budget=2.0)
+        assert info.value.plan.engine == "exact" and info.value.plan.seconds > 2.0
+
+    def test_exact_plans_price_the_surface_the_kernel_solves(self):
+        rules = RoundRules(attacker_bonus=-2)
+        kernel._SURFACES.pop(rules, None)
+        for a, d in [(600, 20), (20, 600)]:
+            plan = plan_query(Query(a, d, rules), budget=2.0)
+            assert plan.engine == "exact"
+            assert plan.seconds == pytest.approx(SECONDS_PER_DP_CELL * a * d)
+            answer(Query(a, d, rules), plan)
+            surface = kernel.cached_surface(rules)
+            assert (len(surface), len(surface[0])) == (a + 1, d + 1)
+        assert plan_query(Query(15, 590, rules), budget=2.0).engine == "table"
+        grown = plan_query(Query(40, 610, rules), budget=2.0)
+        assert grown.seconds == pytest.approx(SECONDS_PER_DP_CELL * 40 * 610)
+
+    def test_most_accurate_plan_prefers_exact_within_budget(self):
+        rules = RoundRules(defender_bonus=2)
+        kernel._SURFACES.pop(rules, None)
+        assert plan_most_accurate(Query(150, 150, rules, tolerance=0.5), budget=2.0).engine == "exact"
+        assert plan_most_accurate(Query(5000, 5000), budget=2.0).engine == "asymptotic"
+        with pytest.raises(OverBudget):
+            plan_most_accurate(Query(5000, 5000), budget=0.001)
+
+    def test_monte_carlo_stops_at_the_deadline(self):
+        query = Query(20, 15)
+        exact = win_probability_surface(20, 15)[20][15]
+        full = answer(query, Plan("monte_carlo", 0.0, 0.0, 4000), rng=random.Random(1))
+        assert abs(full.win_probability - exact) < full.estimated_error and not full.partial
+        partial = answer(query, Plan("monte_carlo", 0.0, 0.0, 4000), Deadline(0.0), random.Random(1))
+        assert partial.partial and partial.samples == MONTE_CARLO_BATCH
+
+
+class TestSimulationPlans:
+    def test_battles_are_cut_to_the_budget(self):
+        config = SimulationConfig(200, 200, num_battles=50000)
+        plan = plan_simulation(config, budget=0.5)
+        assert plan.engine == "monte_carlo" and 100 <= plan.samples < 50000 and plan.seconds <= 0.5
+        assert plan_simulation(SimulationConfig(10, 5, num_battles=500), budget=0.5).samples == 500
+        with pytest.raises(OverBudget):
+            plan_simulation(SimulationConfig(10**6, 10**6), budget=2.0)
+
+    def test_chain_pricing_charges_states_the_sampler_cannot_hold(self, monkeypatch):
+        rules = RoundRules(attacker_bonus=1, defender_bonus=1)
+        large, small = chain_seconds(5000, 5000, rules, 300), chain_seconds(20, 20, rules, 300)
+        monkeypatch.setattr(planner, "CHAIN_TABLES_MAX", 10**9)
+        assert large > chain_seconds(5000, 5000, rules, 300)
+        assert small == chain_seconds(20, 20, rules, 300)
+
+    def test_slow_battles_check_the_deadline_every_battle(self):
+        config = SimulationConfig(30, 30, num_battles=2000)
+        # Planned at 50ms a battle, so the deadline is checked after each one.
+        result = simulate(config, Plan("monte_carlo", 100.0, 0.0, 2000), _ExpiresAfter(3))
+        assert result.num_battles == 3
+
+    def test_stalling_rules_finish(self):
+        rules = compile_rules(None, STALL_STRUCTURES, STALL_TUNING)
+        assert can_stall(rules) and not can_stall(RoundRules())
+        config = SimulationConfig(30, 30, defender_structures=STALL_STRUCTURES, tuning=STALL_TUNING, num_battles=300)
+        result = simulate(config, plan_simulation(config, budget=1.0), Deadline(1.0))
+        assert result.num_battles == 300 and result.attacker_wins == 0
+
+    def test_retreat_policies_need_dice(self):
+        config = SimulationConfig(10, 5, num_battles=200, retreat_policy=lambda a, d: a < 4)
+        assert plan_simulation(config, budget=1.0).engine == "dice"
+        stalling = SimulationConfig(10, 5, defender_structures=STALL_STRUCTURES, tuning=STALL_TUNING,
+                                    retreat_policy=lambda a, d: False)
+        with pytest.raises(OverBudget):
+            plan_simulation(stalling, budget=1.0)
+
+
+class TestAdmission:
+    def test_cheap_work_is_never_queued(self):
+        gate = AdmissionController(capacity=1.0)
+        with gate.admit("a", 1.0):
+            with gate.admit("b", 0.01):
+                pass
+        assert gate.admitted == 1 and gate.rejected == 0
+
+    def test_full_capacity_rejects_after_the_queue_timeout(self):
+        gate = AdmissionController(capacity=1.0, queue_timeout=0.05)
+        with gate.admit("a", 0.8):
+            with pytest.raises(Rejected) as info:
+                with gate.admit("b", 0.5):
+                    pass
+        assert info.value.retry_after >= 1
+        with gate.admit("b", 0.5):
+            assert gate.snapshot()["in_flight_seconds"] == 0.5
+
+    def test_lone_oversized_request_runs_after_rounding_leftovers(self):
+        gate = AdmissionController(capacity=1.0, queue_timeout=0.05)
+        with gate.admit("a", 0.1):
+            with gate.admit("b", 0.2):
+                pass
+        assert gate.in_flight == 0.0
+        with gate.admit("c", 5.0):
+            pass
+        assert gate.rejected == 0
+
+    def test_one_client_cannot_take_all_the_capacity(self):
+        gate = AdmissionController(capacity=4.0, client_share=0.5, queue_timeout=0.05)
+        with gate.admit("heavy", 1.5):
+            with pytest.raises(Rejected):
+                with gate.admit("heavy", 1.0):
+                    pass
+            with gate.admit("light", 1.0):
+                pass
+
+    def test_queued_request_runs_when_room_frees_up(self):
+        gate = AdmissionController(capacity=1.0, queue_timeout=5.0)
+        entered = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with gate.admit("a", 1.0):
+                entered.set()
+                release.wait(5.0)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        entered.wait(5.0)
+        threading.Timer(0.05, release.set).start()
+        with gate.admit("b", 1.0):
+            pass
+        holder.join()
+        assert gate.queued == 1 and gate.admitted == 2
+
+
+def _post(port, path, body):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request("POST", path, body=json.dumps(body).encode())
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+class TestEndpoints:
+    def test_simulate_reports_its_plan_and_refuses_huge_stacks(self, monkeypatch):
+        gate = admission()
+        monkeypatch.setattr(gate, "free_below", 0.0)
+        with LocalServers(["simulate"]) as servers:
+            status, body = _post(servers.ports["simulate"], "/api/simulate", {"num_battles": 500})
+            assert status == 200
+            assert body["num_battles"] == 500 and body["plan"]["engine"] == "monte_carlo"
+            assert not body["plan"]["partial"]
+            huge = {"attacker": {"units": 10**6}, "defender": {"units": 10**6}, "num_battles": 1000}
+            admitted = gate.admitted
+            status, body = _post(servers.ports["simulate"], "/api/simulate", huge)
+        assert status == 413
+        assert gate.admitted == admitted + 1  # the fallback estimate is admitted too
+        assert body["estimate"]["engine"] == "asymptotic"
+
+    def test_simulate_large_stacks_stay_within_the_budget(self):
+        with LocalServers(["simulate"]) as servers:
+            for units in (1000, 3000, 5000):
+                body = {"attacker": {"units": units}, "defender": {"units": units}, "num_battles": 10000}
+                status, body = _post(servers.ports["simulate"], "/api/simulate", body)
+                assert status in (200, 413)
+                if status == 200:
+                    assert body["plan"]["estimated_seconds"] <= REQUEST_BUDGET_SECONDS
+                    assert body["num_battles"] <= body["plan"]["requested_battles"]
+                else:
+                    assert body["estimated_seconds"] > REQUEST_BUDGET_SECONDS
+
+    def test_battle_stops_a_stalemate(self):
+        stall = {
+            "attacker": {"units": 20},
+            "defender": {"units": 5, "structures": ["shield_generator", "fortress"]},
+            "balance": {"attacker_ability": 6},
+        }
+        with LocalServers(["battle"]) as servers:
+            status, body = _post(servers.ports["battle"], "/api/battle", stall)
+        assert status == 200
+        assert body["truncated"] and body["winner"] == "defender"
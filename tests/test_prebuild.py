@@ -0,0 +1,59 @@
+import http.client
+import json
+
+from _prebuild import VANILLA_TABLE_MAX, build
+from _shared import load_prebuilt
+from benchmarks.loadtest import LocalServers
+from engine.asymptotic import estimate_battle
+from engine.kernel import win_probability_surface
+
+
+class TestPrebuilt:
+    def test_committed_payloads_are_current(self):
+        assert build(check=True) == [], "run `python _prebuild.py` and commit prebuilt/"
+
+    def test_etag_is_strong_and_stable(self):
+        body, etag = load_prebuilt("config.json")
+        assert etag.startswith('"') and not etag.startswith('W/')
+        assert load_prebuilt("config.json") == (body, etag)
+
+
+def _request(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request(method, path, body=json.dumps(body).encode() if body is not None else None, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+class TestHandlers:
+    def test_config_revalidates_with_etag(self):
+        with LocalServers(["config"]) as servers:
+            status, headers, body = _request(servers.ports["config"], "GET", "/api/config")
+            assert status == 200
+            assert "max-age" in headers["Cache-Control"]
+            assert set(json.loads(body)) >= {"hero_tiers", "structures", "planet_upgrade_modes"}
+            status, _, body = _request(
+                servers.ports["config"], "GET", "/api/config", headers={"If-None-Match": headers["ETag"]},
+            )
+            assert status == 304 and body == b""
+
+    def test_exact_table_matches_engine(self):
+        with LocalServers(["exact"]) as servers:
+            for a, d in [(10, 5), (VANILLA_TABLE_MAX, VANILLA_TABLE_MAX), (2000, 1900)]:
+                _, _, body = _request(servers.ports["exact"], "POST", "/api/exact", {"attacker_units": a, "defender_units": d})
+                result = json.loads(body)
+                estimate = estimate_battle(a, d)
+                assert result["attacker_win_probability"] == round(estimate.win_probability * 100, 2)
+                assert result["method"] == estimate.method
+                assert result["error_basis"] == ("calibrated" if estimate.method == "asymptotic" else "exact")
+
+    def test_exact_past_the_table_stays_exact_by_default(self):
+        with LocalServers(["exact"]) as servers:
+            for a, d in [(VANILLA_TABLE_MAX + 1, 5), (120, 120), (150, 150)]:
+                _, _, body = _request(servers.ports["exact"], "POST", "/api/exact", {"attacker_units": a, "defender_units": d})
+                result = json.loads(body)
+                assert result["method"] == "exact" and result["estimated_error"] == 0.0
+                assert result["attacker_win_probability"] == round(win_probability_surface(a, d)[a][d] * 100, 2)
@@ -17,6 +17,7 @@ from engine.probabilities import (
     expected_losses,
     attacker_advantage_ratio,
     win_probability_exact,
+    win_probability_rational,
 )
 
 NUM_TRIALS = 50000
@@ -184,3 +185,18 @@ class TestBattleWinProbabilities:
     def test_hopeless_attack(self):
         exact = win_probability_exact(2, 10)
         assert exact < 0.05, f"2v10 should be near-certain defender win, got {exact}"
+
+
+class TestWinProbabilityRational:
+    """The exact-fraction mode agrees with the float64 DP."""
+
+    def test_matches_float_path(self):
+        for a, d in [(2, 1), (3, 3), (10, 5), (10, 10), (30, 30)]:
+            assert round(float(win_probability_rational(a, d)), 6) == win_probability_exact(a, d)
+
+    def test_denominator_divides_a_power_of_six(self):
+        den = win_probability_rational(10, 10).denominator
+        for prime in (2, 3):
+            while den % prime == 0:
+                den //= prime
+        assert den == 1
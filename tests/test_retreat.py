@@ -0,0 +1,121 @@
+import random
+
+from engine.combat import resolve_battle
+from engine.kernel import battle_distribution, compile_rules
+from engine.models import Army, Structure
+from engine.retreat import RetreatUtility, solve_retreat_policy
+from engine.simulation import SimulationConfig, run_simulation
+from engine.structures import STRUCTURES
+
+
+class TestSolveRetreatPolicy:
+    def test_free_units_always_fight(self):
+        """When units cost nothing, fighting on is never worse than leaving."""
+        utility = RetreatUtility(capture_value=1.0, unit_cost=0.0)
+        policy = solve_retreat_policy(10, 10, utility)
+        assert all(policy.fight[a][d] for a in range(2, 11) for d in range(1, 11))
+        assert abs(policy.value(10, 10) - battle_distribution(10, 10).win_probability) < 1e-9
+
+    def test_worthless_capture_always_retreats(self):
+        utility = RetreatUtility(capture_value=0.0, unit_cost=1.0)
+        policy = solve_retreat_policy(8, 8, utility)
+        assert not any(policy.fight[a][d] for a in range(2, 9) for d in range(1, 9))
+        assert policy.should_retreat(8, 8)
+
+    def test_value_never_below_retreating(self):
+        utility = RetreatUtility(capture_value=5.0, unit_cost=1.0)
+        policy = solve_retreat_policy(15, 10, utility)
+        for a in range(2, 16):
+            for d in range(1, 11):
+                assert policy.value(a, d) >= utility.stop_value(a, d) - 1e-12
+
+    def test_threshold_grows_with_defenders(self):
+        policy = solve_retreat_policy(30, 10, RetreatUtility(capture_value=8.0))
+        thresholds = [policy.retreat_threshold(d) for d in range(1, 11)]
+        known = [t for t in thresholds if t is not None]
+        assert known == sorted(known)
+
+    def test_unbreakable_defense_retreats(self):
+        rules = compile_rules(None, [STRUCTURES["shield_generator"], STRUCTURES["fortress"]])
+        policy = solve_retreat_policy(10, 3, RetreatUtility(capture_value=100.0), rules)
+        # 1 attack die vs 2 absorbs can never hurt the defender.
+        assert policy.should_retreat(2, 3)
+
+    def test_limited_absorb_layers(self):
+        rules = compile_rules(None, [Structure("Reserves", "limited_absorb", amount=2)])
+        policy = solve_retreat_policy(10, 6, RetreatUtility(capture_value=8.0), rules)
+        assert len(policy.layer_values) == 3
+        # Spent charges can only make the attacker's position better.
+        assert policy.value(10, 6, charges=0) >= policy.value(10, 6) - 1e-12
+
+
+class TestPolicySimulation:
+    def test_resolve_battle_follows_retreat(self):
+        rng = random.Random(5)
+        result = resolve_battle(Army(units=10), Army(units=10), rng=rng, retreat=lambda a, d: a <= 6)
+        assert result.attacker_retreated or result.winner == "attacker"
+        if result.attacker_retreated:
+            assert result.attacker_remaining <= 6
+            assert result.winner == "defender"
+
+    def test_simulated_value_matches_solved_value(self):
+        utility = RetreatUtility(capture_value=6.0, unit_cost=1.0)
+        policy = solve_retreat_policy(12, 8, utility)
+        rng = random.Random(99)
+        n = 20000
+        total = 0.0
+        for _ in range(n):
+            attacker = Army(units=12)
+            defender = Army(units=8)
+            result = resolve_battle(attacker, defender, rng=rng, retreat=policy.should_retreat)
+            if result.winner == "attacker":
+                total += utility.capture_payoff(result.attacker_remaining)
+            else:
+                total += utility.stop_value(result.attacker_remaining, result.defender_remaining)
+        assert abs(total / n - policy.value(12, 8)) < 0.1
+
+    def test_retreat_sees_remaining_charges(self):
+        reserves = Structure("Reserves", "limited_absorb", amount=2)
+        seen = []
+
+        def retreat(a, d, charges):
+            seen.append(charges)
+            return False
+
+        resolve_battle(Army(units=12), Army(units=8, structures=[reserves]), rng=random.Random(4), retreat=retreat)
+        assert seen[0] == 2 and seen[-1] == 0
+        assert seen == sorted(seen, reverse=True)
+
+    def test_simulated_value_matches_solved_value_with_limited_absorb(self):
+        reserves = Structure("Reserves", "limited_absorb", amount=2)
+        utility = RetreatUtility(capture_value=16.0, unit_cost=1.0)
+        policy = solve_retreat_policy(12, 8, utility, compile_rules(None, [reserves]))
+        assert any(
+            policy.should_retreat(a, d, charges=0) != policy.should_retreat(a, d)
+            for a in range(2, 13)
+            for d in range(1, 9)
+        )
+        # Reading only the full-charge layer scores about 0.46 lower.
+        rng = random.Random(7)
+        n = 20000
+        total = 0.0
+        for _ in range(n):
+            result = resolve_battle(
+                Army(units=12), Army(units=8, structures=[reserves]), rng=rng, retreat=policy.should_retreat
+            )
+            if result.winner == "attacker":
+                total += utility.capture_payoff(result.attacker_remaining)
+            else:
+                total += utility.stop_value(result.attacker_remaining, result.defender_remaining)
+        assert abs(total / n - policy.value(12, 8)) < 0.15
+
+    def test_run_simulation_counts_retreats(self):
+        config = SimulationConfig(
+            attacker_units=10,
+            defender_units=10,
+            num_battles=500,
+            retreat_policy=lambda a, d: a < d,
+        )
+        result = run_simulation(config, rng=random.Random(3))
+        assert result.attacker_retreats > 0
+        assert result.attacker_wins + result.defender_wins == 500
@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+from engine.combat import resolve_battle
+from engine.heroes import HEROES
+from engine.kernel import battle_distribution, compile_rules
+from engine.models import Army
+from engine.retreat import RetreatUtility, solve_retreat_policy
+from engine.siege import DefenderPolicy, SiegeConfig, build_schedule, solve_siege
+from engine.structures import STRUCTURES, structure_mask, structures_from_mask
+from engine.tuning import CombatTuning
+
+SHIELD = STRUCTURES["shield_generator"]
+BATTERY = STRUCTURES["orbital_battery"]
+
+
+def _simulate(config, rng, sieges):
+    """Play sieges battle by battle; return capture frequency by turn."""
+    masks = build_schedule(structure_mask(config.defender_structures), config.defender, config.turns)
+    captured_by = [0] * config.turns
+    for _ in range(sieges):
+        a, d = config.attacker_units, config.defender_units
+        for turn, mask in enumerate(masks):
+            attacker = Army(a, config.attacker_hero)
+            defender = Army(d, structures=structures_from_mask(mask))
+            result = resolve_battle(attacker, defender, rng=rng, tuning=config.tuning, max_rounds=2000)
+            if result.winner == "attacker":
+                for t in range(turn, config.turns):
+                    captured_by[t] += 1
+                break
+            builds = turn + 1 < len(masks) and masks[turn + 1] != mask
+            a = result.attacker_remaining + config.attacker_reinforcements
+            d = result.defender_remaining + config.defender.units_per_turn - (config.defender.build_cost if builds else 0)
+    return [c / sieges for c in captured_by]
+
+
+class TestSolveSiege:
+    def test_one_turn_is_one_battle(self):
+        config = SiegeConfig(12, 7, HEROES["general"], [BATTERY], turns=1)
+        result = solve_siege(config)
+        exact = battle_distribution(12, 7, compile_rules(HEROES["general"], [BATTERY], CombatTuning()))
+        assert result.capture_probability == pytest.approx(exact.win_probability)
+        assert result.expected_rounds == pytest.approx(exact.expected_rounds)
+        assert result.capture_probability + sum(result.holding.values()) == pytest.approx(1.0)
+
+    def test_later_turns_add_captures(self):
+        config = SiegeConfig(10, 8, turns=4, defender=DefenderPolicy(units_per_turn=1), attacker_reinforcements=5)
+        result = solve_siege(config)
+        assert result.capture_by_turn == sorted(result.capture_by_turn)
+        assert result.capture_by_turn[-1] > result.capture_by_turn[0] + 0.1
+        assert result.capture_probability + sum(result.holding.values()) == pytest.approx(1.0)
+        assert result.expected_attacker_losses > 0 and result.cost_per_capture > result.expected_attacker_losses
+
+    def test_single_absorb_planet_never_falls(self):
+        # A lone defender rolls one die against absorb 1: no round can take it.
+        config = SiegeConfig(
+            20, 6, HEROES["admiral"], [SHIELD], turns=6,
+            defender=DefenderPolicy(units_per_turn=0), attacker_reinforcements=10,
+        )
+        result = solve_siege(config)
+        assert result.capture_probability == 0.0
+        assert result.cost_per_capture == float("inf")
+        assert all(d >= 1 for _, d in result.holding)
+
+    def test_retreat_policy_saves_armies(self):
+        rules = compile_rules(None, [BATTERY], CombatTuning())
+        policy = solve_retreat_policy(40, 40, RetreatUtility(capture_value=5.0), rules)
+        base = SiegeConfig(15, 10, None, [BATTERY], turns=3, attacker_reinforcements=3)
+        fight = solve_siege(base)
+        base.retreat_policy = policy.should_retreat
+        careful = solve_siege(base)
+        assert careful.expected_attacker_losses < fight.expected_attacker_losses
+
+    def test_matches_battle_by_battle_simulation(self):
+        config = SiegeConfig(
+            10, 5, HEROES["captain"], [], turns=3,
+            defender=DefenderPolicy(units_per_turn=2, build_order=("orbital_battery",), build_cost=1),
+            attacker_reinforcements=4,
+        )
+        exact = solve_siege(config).capture_by_turn
+        sampled = _simulate(config, random.Random(5), 3000)
+        for p, q in zip(exact, sampled):
+            assert abs(p - q) < 4 * (p * (1 - p) / 3000) ** 0.5 + 1e-9
+
+    def test_rejects_custom_structures(self):
+        with pytest.raises(ValueError):
+            solve_siege(SiegeConfig(defender_structures=[SHIELD, SHIELD]))
+
+
+class TestBuildSchedule:
+    def test_one_build_per_turn_skipping_existing(self):
+        policy = DefenderPolicy(build_order=("shield_generator", "fortress", "orbital_battery"))
+        masks = build_schedule(structure_mask([SHIELD]), policy, 4)
+        assert [structures_from_mask(m) for m in masks] == [
+            [SHIELD],
+            [SHIELD, STRUCTURES["fortress"]],
+            list(STRUCTURES.values()),
+            list(STRUCTURES.values()),
+        ]
+
+    def test_unknown_structure(self):
+        with pytest.raises(ValueError):
+            build_schedule(0, DefenderPolicy(build_order=("moat",)), 2)
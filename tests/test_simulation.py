@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from engine import simulation
+from engine.kernel import RoundRules, battle_distribution, compile_rules
+from engine.models import Hero, Structure
+from engine.simulation import BattleSpec, SimulationConfig, chain_sampler, evaluate_battles, run_simulation
+from engine.structures import STRUCTURES
+from engine.tuning import CombatTuning
+
+TOLERANCE = 0.02
+
+
+def _specs():
+    return [
+        BattleSpec(10, 10),
+        BattleSpec(12, 6, attacker_hero=Hero("Admiral", 12), defender_structures=[STRUCTURES["shield_generator"]]),
+        BattleSpec(6, 4, tuning=CombatTuning(planet_upgrade_level=2, planet_upgrade_mode="reroll_lowest_defender")),
+        BattleSpec(8, 8),
+        BattleSpec(9, 5, defender_structures=[Structure("Reserves", "limited_absorb", amount=2)]),
+    ]
+
+
+class TestEvaluateBattlesExact:
+    def test_matches_battle_distribution(self):
+        specs = _specs()
+        results = evaluate_battles(specs)
+        assert len(results) == len(specs)
+        for spec, result in zip(specs, results):
+            rules = compile_rules(spec.attacker_hero, spec.defender_structures, spec.tuning)
+            dist = battle_distribution(spec.attacker_units, spec.defender_units, rules)
+            assert abs(result.attacker_win_probability - dist.win_probability) < 1e-9
+            assert abs(result.expected_rounds - dist.expected_rounds) < 1e-9
+            assert result.samples == 0
+
+    def test_empty_batch(self):
+        assert evaluate_battles([]) == []
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            evaluate_battles([BattleSpec(3, 3)], mode="guess")
+
+
+class TestEvaluateBattlesMonteCarlo:
+    def test_matches_exact_within_tolerance(self):
+        specs = _specs()
+        for spec in specs:
+            spec.num_battles = 20000
+        exact = evaluate_battles(specs)
+        sampled = evaluate_battles(specs, mode="monte_carlo", rng=random.Random(11))
+        for e, s in zip(exact, sampled):
+            assert s.samples == 20000
+            assert abs(e.attacker_win_probability - s.attacker_win_probability) < TOLERANCE
+            assert abs(e.expected_rounds - s.expected_rounds) < 0.15 + 0.02 * e.expected_rounds
+            assert abs(e.expected_attacker_remaining - s.expected_attacker_remaining) < 0.15
+
+    def test_matches_dice_simulation(self):
+        spec = BattleSpec(10, 5, attacker_hero=Hero("General", 10), defender_structures=[STRUCTURES["orbital_battery"]], num_battles=20000)
+        [sampled] = evaluate_battles([spec], mode="monte_carlo", rng=random.Random(5))
+        config = SimulationConfig(10, 5, spec.attacker_hero, spec.defender_structures, num_battles=20000)
+        simulated = run_simulation(config, rng=random.Random(6))
+        assert abs(sampled.attacker_win_probability * 100 - simulated.attacker_win_pct) < TOLERANCE * 100
+
+
+class TestRunSimulationModes:
+    def test_chain_mode_matches_dice(self):
+        config = SimulationConfig(10, 5, Hero("General", 10), [STRUCTURES["orbital_battery"]], num_battles=20000)
+        dice = run_simulation(config, rng=random.Random(6))
+        chain = run_simulation(config, rng=random.Random(7), mode="chain")
+        assert chain.num_battles == 20000
+        assert abs(dice.attacker_win_pct - chain.attacker_win_pct) < TOLERANCE * 100
+        assert abs(dice.avg_rounds - chain.avg_rounds) < 0.2
+
+    def test_stop_keeps_the_battles_run_so_far(self):
+        calls = []
+        result = run_simulation(SimulationConfig(10, 5, num_battles=1000), mode="chain", stop=lambda: calls.append(1) or True)
+        assert result.num_battles == 64 and calls == [1]
+        assert result.attacker_wins + result.defender_wins == 64
+
+    def test_bad_modes(self):
+        with pytest.raises(ValueError):
+            run_simulation(SimulationConfig(num_battles=10), mode="psychic")
+        with pytest.raises(ValueError):
+            run_simulation(SimulationConfig(num_battles=10, retreat_policy=lambda a, d: False), mode="chain")
+
+    def test_chain_sampler_keeps_a_bounded_number_of_tables(self, monkeypatch):
+        monkeypatch.setattr(simulation, "CHAIN_TABLES_MAX", 50)
+        rules = RoundRules(attacker_bonus=2, defender_bonus=2)
+        sampler = chain_sampler(rules)
+        rng = random.Random(8)
+        wins = sum(sampler.sample(40, 30, rng)[1] <= 0 for _ in range(2000))
+        assert len(sampler) == 50
+        assert abs(wins / 2000 - battle_distribution(40, 30, rules).win_probability) < TOLERANCE
@@ -0,0 +1,89 @@
+import random
+from collections import deque
+
+import pytest
+
+from engine.starmap import UNOWNED, Territory, galaxy_from_lanes, planets_in, ring_galaxy
+
+
+def _bfs(galaxy, owner, start, hops=None):
+    seen = {start: 0}
+    queue = deque([start])
+    while queue:
+        planet = queue.popleft()
+        if hops is not None and seen[planet] == hops:
+            continue
+        for n in galaxy.neighbors[planet]:
+            if n not in seen and owner[n] == owner[start]:
+                seen[n] = seen[planet] + 1
+                queue.append(n)
+    return sorted(seen)
+
+
+class TestGalaxyMap:
+    def test_ring_galaxy_is_connected_and_symmetric(self):
+        galaxy = ring_galaxy(seed=3)
+        assert galaxy.size == 42 and galaxy.num_sectors == 6
+        for planet, neighbors in enumerate(galaxy.neighbors):
+            assert planet not in neighbors
+            assert all(planet in galaxy.neighbors[n] for n in neighbors)
+        assert _bfs(galaxy, [0] * galaxy.size, 0) == list(range(galaxy.size))
+
+    def test_masks_match_lists(self):
+        galaxy = ring_galaxy(seed=1)
+        for planet, neighbors in enumerate(galaxy.neighbors):
+            assert planets_in(galaxy.neighbor_masks[planet]) == list(neighbors)
+        assert sum(galaxy.sector_masks) == galaxy.all_planets
+        assert galaxy.sector_planets(2) == tuple(range(14, 21))
+
+    def test_ball(self):
+        galaxy = ring_galaxy(seed=2)
+        for planet in range(galaxy.size):
+            assert planets_in(galaxy.ball(planet, 2)) == _bfs(galaxy, [0] * galaxy.size, planet, 2)
+
+    def test_self_lane_rejected(self):
+        with pytest.raises(ValueError):
+            galaxy_from_lanes(["a"], [0], [(0, 0)], [1])
+
+
+class TestTerritory:
+    def test_regions_and_reach_track_random_captures(self):
+        galaxy = ring_galaxy(seed=4)
+        rng = random.Random(0)
+        owner = [rng.randrange(3) for _ in range(galaxy.size)]
+        territory = Territory(galaxy, 3, owner)
+        for _ in range(400):
+            planet = rng.randrange(galaxy.size)
+            owner[planet] = rng.randrange(3)
+            territory.set_owner(planet, owner[planet])
+            probe = rng.randrange(galaxy.size)
+            assert planets_in(territory.region(probe)) == _bfs(galaxy, owner, probe)
+            assert planets_in(territory.reachable(probe, 3)) == _bfs(galaxy, owner, probe, 3)
+        for player in range(3):
+            assert planets_in(territory.owned[player]) == [p for p, o in enumerate(owner) if o == player]
+
+    def test_split_and_merge(self):
+        line = galaxy_from_lanes([str(i) for i in range(5)], [0] * 5, [(i, i + 1) for i in range(4)], [3])
+        territory = Territory(line, 2, [0] * 5)
+        assert territory.connected(0, 4)
+        territory.set_owner(2, 1)
+        assert not territory.connected(0, 4)
+        assert planets_in(territory.region(0)) == [0, 1]
+        assert planets_in(territory.reachable(4, 3)) == [3, 4]
+        territory.set_owner(2, 0)
+        assert territory.connected(0, 4) and territory.holds_sector(0, 0)
+
+    def test_border_and_unowned(self):
+        line = galaxy_from_lanes([str(i) for i in range(4)], [0] * 4, [(i, i + 1) for i in range(3)], [2])
+        territory = Territory(line, 2, [0, 0, 1, 1])
+        assert planets_in(territory.border(0)) == [1]
+        territory.set_owner(3, UNOWNED)
+        assert territory.region(3) == 0 and territory.reachable(3, 3) == 0
+        assert planets_in(territory.border(1)) == [2]
+
+    def test_copy_is_independent(self):
+        galaxy = ring_galaxy()
+        territory = Territory(galaxy, 2, [p % 2 for p in range(galaxy.size)])
+        clone = territory.copy()
+        clone.set_owner(0, 1)
+        assert territory.owner[0] == 0 and territory.owned[0] & 1
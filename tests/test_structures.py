@@ -1,9 +1,20 @@
-from engine.models import Structure
+from dataclasses import FrozenInstanceError, replace
+from fractions import Fraction
+
+import pytest
+
+from engine.models import Army, Structure
 from engine.structures import (
+    EFFECT_HANDLERS,
     STRUCTURES,
+    StructureEffects,
+    compile_structures,
     damage_absorbed,
     extra_defender_dice,
     has_effect,
+    register_effect,
+    structure_mask,
+    structures_from_mask,
 )
 
 
@@ -49,3 +60,98 @@ class TestExtraDefenderDice:
     def test_non_dice_structure(self):
         shield = STRUCTURES["shield_generator"]
         assert extra_defender_dice([shield]) == 0
+
+
+class TestCompileStructures:
+    def test_stock_structures(self):
+        effects = compile_structures(list(STRUCTURES.values()))
+        assert effects.absorb == 2
+        assert effects.extra_defender_dice == 1
+        assert effects.absorb_chances == ()
+        assert effects.absorb_charges == 0
+        assert effects.ties_to_attacker is False
+
+    def test_amount_scales_effect(self):
+        effects = compile_structures([Structure("Citadel", "absorb", amount=2)])
+        assert effects.absorb == 2
+
+    def test_chance_absorb(self):
+        effects = compile_structures([Structure("Flicker Shield", "chance_absorb", chance=0.5)])
+        assert effects.absorb_chances == ((Fraction(1, 2), 1),)
+        assert effects.absorb == 0
+
+    def test_certain_chance_absorb_is_fixed_absorb(self):
+        effects = compile_structures([Structure("Solid Shield", "chance_absorb", chance=1.0)])
+        assert effects.absorb == 1
+        assert effects.absorb_chances == ()
+
+    def test_limited_absorb_and_ties(self):
+        effects = compile_structures([
+            Structure("Reserves", "limited_absorb", amount=3),
+            Structure("Sabotaged Grid", "ties_favor_attacker"),
+        ])
+        assert effects.absorb_charges == 3
+        assert effects.ties_to_attacker is True
+
+    def test_unknown_effect_is_ignored(self):
+        assert compile_structures([Structure("Statue", "inspire")]) == StructureEffects()
+
+    def test_registered_handler_is_used(self):
+        @register_effect("test_double_die")
+        def _double_die(effects, structure):
+            return replace(effects, extra_defender_dice=effects.extra_defender_dice + 2 * structure.amount)
+
+        try:
+            assert extra_defender_dice([Structure("Twin Battery", "test_double_die")]) == 2
+        finally:
+            del EFFECT_HANDLERS["test_double_die"]
+
+
+class TestStructureMask:
+    def test_stock_structures_round_trip(self):
+        shield, battery, fortress = STRUCTURES.values()
+        mask = structure_mask([fortress, shield])
+        assert mask == 0b101
+        assert structures_from_mask(mask) == [shield, fortress]
+        assert Army(5, structures=[battery]).structure_mask == 0b010
+
+    def test_custom_or_repeated_structures_have_no_mask(self):
+        shield = STRUCTURES["shield_generator"]
+        assert structure_mask([shield, Structure("Citadel", "absorb", amount=2)]) is None
+        assert structure_mask([shield, shield]) is None
+        assert compile_structures([shield, shield]).absorb == 2
+
+    def test_masked_sets_share_one_compiled_summary(self):
+        structures = [STRUCTURES["fortress"], STRUCTURES["orbital_battery"]]
+        assert compile_structures(structures) is compile_structures(structures[::-1])
+
+    def test_structures_are_immutable(self):
+        with pytest.raises(FrozenInstanceError):
+            STRUCTURES["fortress"].amount = 5
+
+
+class TestBattleEffects:
+    class CoinRng:
+        def __init__(self, values):
+            self._values = iter(values)
+
+        def randint(self, a, b):  # noqa: ARG002
+            return next(self._values)
+
+    def test_charges_are_spent_across_rounds(self):
+        state = compile_structures([Structure("Reserves", "limited_absorb", amount=3)]).start_battle()
+        assert state.absorb_losses(2, None) == 2
+        assert state.absorb_losses(2, None) == 1
+        assert state.absorb_losses(2, None) == 0
+        assert state.charges_left == 0
+
+    def test_charges_spent_after_fixed_absorb(self):
+        structs = [STRUCTURES["fortress"], Structure("Reserves", "limited_absorb", amount=2)]
+        state = compile_structures(structs).start_battle()
+        assert state.absorb_losses(1, None) == 1
+        assert state.charges_left == 2
+
+    def test_chance_absorb_uses_rng(self):
+        state = compile_structures([Structure("Flicker Shield", "chance_absorb", chance=0.5)]).start_battle()
+        assert state.absorb_losses(2, self.CoinRng([1])) == 1
+        assert state.absorb_losses(2, self.CoinRng([2])) == 0
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from engine import kernel, tablestore
+from engine.kernel import RoundRules, win_probability_surface
+from engine.tablestore import TableStore, table_name
+
+RULES = RoundRules(attacker_bonus=1, defender_rerolls=1)
+
+
+def _boom():
+    raise AssertionError("table was rebuilt")
+
+
+def _worker_reads(corner):
+    surface = kernel._TABLE_STORE.get("win", (RULES, corner, corner), _boom)
+    return os.getpid(), surface[corner][corner]
+
+
+@pytest.fixture
+def store(tmp_path):
+    previous = tablestore.installed()
+    yield tablestore.install(tmp_path)
+    tablestore.use(previous)
+
+
+class TestTableStore:
+    def test_built_once_then_mapped_read_only(self, tmp_path):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return [[0.5, 1.0], [0.25, 0.75]]
+
+        grid = TableStore(tmp_path).get("t", ("x", 1), build)
+        again = TableStore(tmp_path).get("t", ("x", 1), build)
+        assert calls == [1]
+        assert [list(row) for row in again] == [[0.5, 1.0], [0.25, 0.75]]
+        with pytest.raises(TypeError):
+            grid[0][0] = 2.0
+
+    def test_truncated_file_is_rebuilt(self, tmp_path):
+        store = TableStore(tmp_path)
+        store.get("t", 1, lambda: [[1.0, 2.0]])
+        path = tmp_path / table_name("t", 1)
+        path.write_bytes(path.read_bytes()[:-4])
+        assert list(TableStore(tmp_path).get("t", 1, lambda: [[3.0, 4.0]])[0]) == [3.0, 4.0]
+
+    def test_least_recently_used_tables_are_evicted(self, tmp_path):
+        row = [[0.0] * 100]  # 816 bytes on disk
+        store = TableStore(tmp_path, max_bytes=2000)
+        store.get("t", "a", lambda: row)
+        store.get("t", "b", lambda: row)
+        past = time.time() - 60
+        os.utime(tmp_path / table_name("t", "b"), (past, past))
+        store.get("t", "c", lambda: row)
+        assert sorted(p.name for p in tmp_path.glob("*.tbl")) == sorted(table_name("t", k) for k in "ac")
+        assert store.nbytes() <= 2000
+
+    def test_waits_for_another_builder(self, tmp_path):
+        path = tmp_path / table_name("t", 1)
+        lock = path.with_name(path.name + ".lock")
+        lock.touch()  # another process holds the build lock
+
+        def other_process():
+            time.sleep(0.05)
+            tablestore._write(path, [[7.0]])
+            lock.unlink()
+
+        builder = threading.Thread(target=other_process)
+        builder.start()
+        try:
+            assert list(TableStore(tmp_path).get("t", 1, _boom)[0]) == [7.0]
+        finally:
+            builder.join()
+
+
+class TestKernelIntegration:
+    def test_surfaces_match_local_solve(self, store):
+        kernel._SURFACES.pop(RULES, None)
+        shared = win_probability_surface(12, 12, RULES)
+        assert isinstance(shared[0], memoryview)
+        tablestore.use(None)
+        kernel._SURFACES.pop(RULES, None)
+        local = win_probability_surface(12, 12, RULES)
+        assert [list(row) for row in shared] == [list(row) for row in local]
+
+    def test_pool_workers_map_the_parents_table(self, store):
+        kernel._SURFACES.pop(RULES, None)
+        expected = win_probability_surface(20, 20, RULES)[20][20]
+        with ProcessPoolExecutor(2, **tablestore.pool_kwargs()) as pool:
+            results = list(pool.map(_worker_reads, [20] * 4))
+        assert {value for _, value in results} == {expected}
+        assert len(list(store.directory.glob("*.tbl"))) == 1
+
+    def test_reads_go_through_the_store(self, store, monkeypatch):
+        monkeypatch.setattr(tablestore, "TOUCH_INTERVAL", 0.0)
+        win_probability_surface(12, 12, RULES)
+        assert kernel.cached_surface(RULES) is None
+        [path] = store.directory.glob("*.tbl")
+        past = time.time() - 60
+        os.utime(path, (past, past))
+        win_probability_surface(5, 5, RULES)
+        assert path.stat().st_mtime > past + 30  # hot tables stay recent for trim()
+
+    def test_surface_too_large_for_the_store_is_solved_locally(self, tmp_path):
+        previous = tablestore.installed()
+        store = tablestore.install(tmp_path, max_bytes=20000)
+        try:
+            store.get("t", "kept", lambda: [[1.0]])
+            rules = RoundRules(defender_bonus=1)
+            surface = win_probability_surface(60, 60, rules)
+            assert isinstance(surface[0], tuple)
+            assert win_probability_surface(60, 60, rules) is surface
+            assert [p.name for p in tmp_path.glob("*.tbl")] == [table_name("t", "kept")]
+        finally:
+            tablestore.use(previous)
+            kernel._SURFACES.pop(RoundRules(defender_bonus=1), None)